@@ -20,6 +20,14 @@ except Exception:
     import difflib
     _HAVE_RAPIDFUZZ = False
 
+try:
+    from .team_resolver import resolve_team, team_key
+except ImportError:
+    try:
+        from scripts.team_resolver import resolve_team, team_key  # type: ignore
+    except ImportError:
+        from team_resolver import resolve_team, team_key  # type: ignore
+
 
 # ------------------------
 # Utilidades de arquivo
@@ -128,11 +136,15 @@ def load_alias_maps() -> Dict[str, str]:
 
 
 def apply_alias(name: str, alias_map: Optional[Dict[str, str]] = None) -> str:
-    """Aplica alias se houver, respeitando normalização da chave."""
-    if alias_map is None:
-        alias_map = load_alias_maps()
-    nk = norm_name(name)
-    return alias_map.get(nk, name)
+    """
+    Aplica alias se houver, respeitando normalização da chave.
+    Sem alias_map (ou sem entrada nele) usa o índice único de scripts/team_resolver.py.
+    """
+    if alias_map is not None:
+        nk = norm_name(name)
+        if nk in alias_map:
+            return alias_map[nk]
+    return resolve_team(name)
 
 
 # ------------------------
@@ -9,24 +9,32 @@ from __future__ import annotations
 import argparse, os
 from pathlib import Path
 from typing import Optional, Tuple
-from datetime import date, timedelta
+from datetime import date
 
-import requests
 import pandas as pd
 import numpy as np
 from rapidfuzz import fuzz
 
+try:
+    from scripts.afb_http import get_client
+    from scripts.fixtures_index import FixturesIndex
+    from scripts.team_resolver import resolve_team
+except ImportError:
+    from afb_http import get_client
+    from fixtures_index import FixturesIndex
+    from team_resolver import resolve_team
+
 API_HOST = "api-football-v1.p.rapidapi.com"
 API_BASE = f"https://{API_HOST}/v3"
 
-def _headers():
+def _client():
     key = os.getenv("RAPIDAPI_KEY", "").strip()
     if not key:
         raise RuntimeError("[referee] RAPIDAPI_KEY não definido.")
-    return {"X-RapidAPI-Key": key, "X-RapidAPI-Host": API_HOST}
+    return get_client(key, API_HOST)
 
 def _get(path: str, params: dict) -> dict:
-    r = requests.get(f"{API_BASE}{path}", headers=_headers(), params=params, timeout=30)
+    r = _client().request(path, params)
     r.raise_for_status()
     j = r.json()
     if isinstance(j, dict) and j.get("errors"):
@@ -34,7 +42,7 @@ def _get(path: str, params: dict) -> dict:
     return j
 
 def _norm(s: str) -> str:
-    s = (s or "").lower().strip()
+    s = resolve_team(s or "").lower().strip()
     rep = [(" futebol clube",""),(" futebol",""),(" clube",""),(" club",""),
            (" fc",""),(" afc",""),(" sc",""),(" ac",""),(" de futebol",""),
            ("-sp",""),("-rj",""),("-mg",""),("-rs",""),("-pr",""),
@@ -59,8 +67,13 @@ def _find_team_id(name: str, country_hint: Optional[str]=None) -> Tuple[int,str,
             best=(score, it["team"]["id"], tname, country)
     return int(best[1]), str(best[2]), str(best[3])
 
-def _fixtures_by_date(d: str) -> list:
-    return _get("/fixtures", {"date": d}).get("response", [])
+_FIXTURES: Optional[FixturesIndex] = None
+
+def _fixtures_index() -> FixturesIndex:
+    global _FIXTURES
+    if _FIXTURES is None:
+        _FIXTURES = FixturesIndex(lambda params: _get("/fixtures", params).get("response", []), norm=_norm)
+    return _FIXTURES
 
 def _find_fixture_id(date_iso: str, home: str, away: str, season_year: int,
                      country_hint: Optional[str], days_window: int, min_match: int) -> Optional[int]:
@@ -82,20 +95,9 @@ def _find_fixture_id(date_iso: str, home: str, away: str, season_year: int,
             return int(best["fixture"]["id"])
     except Exception:
         pass
-    # varredura por nome
-    d0 = date.fromisoformat(date_iso)
-    best_id=None; best_score=-1
-    for off in range(-(days_window), days_window+1):
-        dstr = (d0 + timedelta(days=off)).isoformat()
-        for it in _fixtures_by_date(dstr):
-            hn = (it.get("teams",{}).get("home",{}) or {}).get("name","")
-            an = (it.get("teams",{}).get("away",{}) or {}).get("name","")
-            s1 = fuzz.token_set_ratio(_norm(home), _norm(hn))
-            s2 = fuzz.token_set_ratio(_norm(away), _norm(an))
-            sc = (s1+s2)//2
-            if sc > best_score:
-                best_score=sc; best_id=int(it["fixture"]["id"])
-    return best_id if best_score>=min_match else None
+    # varredura por nome (páginas do dia em memória, fuzzy só no bloco da janela)
+    hit = _fixtures_index().find(home, away, date_iso, window=days_window, min_score=min_match)
+    return hit[0] if hit else None
 
 def _probs_from_odds(oh, od, oa):
     arr = np.array([oh,od,oa], dtype=float)
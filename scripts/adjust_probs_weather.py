@@ -7,12 +7,21 @@ from __future__ import annotations
 import argparse, os, math
 from pathlib import Path
 from typing import Optional, Tuple
-from datetime import date, timedelta, datetime
+from datetime import date
 
 import requests
 import pandas as pd
 import numpy as np
-from rapidfuzz import fuzz
+from rapidfuzz import fuzz, process
+
+try:
+    from scripts.afb_http import get_client
+    from scripts.fixtures_index import FixturesIndex
+    from scripts.team_resolver import resolve_team
+except ImportError:
+    from afb_http import get_client
+    from fixtures_index import FixturesIndex
+    from team_resolver import resolve_team
 
 # ---------- Config ----------
 API_HOST = "api-football-v1.p.rapidapi.com"
@@ -28,14 +37,14 @@ DAYS_WINDOW_DEFAULT = 2
 MIN_MATCH_DEFAULT = 85
 
 # ---------- HTTP ----------
-def _headers():
+def _client():
     key = os.getenv("RAPIDAPI_KEY", "").strip()
     if not key:
         raise RuntimeError("[weather] RAPIDAPI_KEY não definido (usado para fixtures/venue).")
-    return {"X-RapidAPI-Key": key, "X-RapidAPI-Host": API_HOST}
+    return get_client(key, API_HOST)
 
 def api_get(path: str, params: dict) -> dict:
-    r = requests.get(f"{API_BASE}{path}", headers=_headers(), params=params, timeout=30)
+    r = _client().request(path, params)
     r.raise_for_status()
     j = r.json()
     if isinstance(j, dict) and j.get("errors"):
@@ -49,7 +58,7 @@ def openmeteo_get(params: dict) -> dict:
 
 # ---------- Utils ----------
 def _norm(s: str) -> str:
-    s = (s or "").lower().strip()
+    s = resolve_team(s or "").lower().strip()
     rep = [(" futebol clube",""),(" futebol",""),(" clube",""),(" club",""),
            (" fc",""),(" afc",""),(" sc",""),(" ac",""),(" de futebol",""),
            ("-sp",""),("-rj",""),("-mg",""),("-rs",""),("-pr",""),
@@ -63,23 +72,24 @@ def find_team_id(name: str, country_hint: Optional[str]=None) -> Tuple[int,str,s
     res = data.get("response", [])
     if not res:
         raise RuntimeError(f"[weather] time não encontrado: {name}")
-    best=(0,None,"","")
-    for it in res:
-        tname = it["team"]["name"]
-        country = (it.get("team",{}) or {}).get("country") or ""
-        score = fuzz.token_set_ratio(_norm(name), _norm(tname))
-        if country_hint and country and country_hint.lower() in country.lower():
-            score += 3
-        if score > best[0]:
-            best=(score, it["team"]["id"], tname, country)
-    return int(best[1]), str(best[2]), str(best[3])
-
-def fixtures_by_date(d: str) -> list:
-    return api_get("/fixtures", {"date": d}).get("response", [])
-
-def find_fixture_id(date_iso: str, home: str, away: str, season_year: int,
-                    country_hint: Optional[str], days_window: int, min_match: int) -> Optional[int]:
-    # 1) tenta H2H por IDs
+    names = [it["team"]["name"] for it in res]
+    countries = [(it.get("team",{}) or {}).get("country") or "" for it in res]
+    score = process.cdist([_norm(name)], [_norm(t) for t in names], scorer=fuzz.token_set_ratio)[0].astype(float)
+    if country_hint:
+        score += 3 * np.array([bool(c) and country_hint.lower() in c.lower() for c in countries])
+    i = int(np.argmax(score))
+    return int(res[i]["team"]["id"]), str(names[i]), str(countries[i])
+
+_FIXTURES: Optional[FixturesIndex] = None
+
+def _fixtures_index() -> FixturesIndex:
+    global _FIXTURES
+    if _FIXTURES is None:
+        _FIXTURES = FixturesIndex(lambda params: api_get("/fixtures", params).get("response", []), norm=_norm)
+    return _FIXTURES
+
+def _find_fixture_h2h(date_iso: str, home: str, away: str, season_year: int,
+                      country_hint: Optional[str]) -> Optional[int]:
     try:
         hid,_,_ = find_team_id(home, country_hint)
         aid,_,_ = find_team_id(away, country_hint)
@@ -98,24 +108,25 @@ def find_fixture_id(date_iso: str, home: str, away: str, season_year: int,
             return int(best["fixture"]["id"])
     except Exception:
         pass
-    # 2) varredura ±window por nome
-    d0 = date.fromisoformat(date_iso)
-    best_id=None; best_score=-1
-    for off in range(-days_window, days_window+1):
-        dstr = (d0 + timedelta(days=off)).isoformat()
-        resp = fixtures_by_date(dstr)
-        for it in resp:
-            hn = (it.get("teams",{}).get("home",{}) or {}).get("name","")
-            an = (it.get("teams",{}).get("away",{}) or {}).get("name","")
-            s1 = fuzz.token_set_ratio(_norm(home), _norm(hn))
-            s2 = fuzz.token_set_ratio(_norm(away), _norm(an))
-            sc = (s1+s2)//2
-            if sc > best_score:
-                best_score = sc; best_id = int(it["fixture"]["id"])
-    if best_score >= min_match:
-        return best_id
     return None
 
+def find_fixture_ids(date_iso: str, pairs: list, season_year: int,
+                     country_hint: Optional[str], days_window: int, min_match: int) -> list:
+    """fixture_id (ou None) para cada (home, away) da rodada."""
+    # 1) tenta H2H por IDs
+    fids = [_find_fixture_h2h(date_iso, h, a, season_year, country_hint) for h, a in pairs]
+    # 2) varredura ±window por nome: matriz jogos×fixtures da janela + atribuição 1-para-1
+    todo = [i for i, f in enumerate(fids) if f is None]
+    if todo:
+        try:
+            hits = _fixtures_index().assign([(*pairs[i], date_iso) for i in todo], window=days_window,
+                                            min_score=min_match, exclude=[f for f in fids if f])
+        except Exception:
+            hits = {}
+        for k, (fid, _, _) in hits.items():
+            fids[todo[k]] = fid
+    return fids
+
 def probs_from_odds(oh, od, oa) -> np.ndarray:
     arr = np.array([oh,od,oa], dtype=float)
     with np.errstate(divide="ignore", invalid="ignore"):
@@ -222,9 +233,14 @@ def main():
     date_iso = args.rodada.split("_",1)[0]
     season_year = int(date_iso.split("-")[0])
 
+    has_odds = df[["odd_home","odd_draw","odd_away"]].notna().all(axis=1)
+    pairs = list(zip(df.loc[has_odds, "home"].astype(str), df.loc[has_odds, "away"].astype(str)))
+    fixture_ids = dict(zip(df.index[has_odds], find_fixture_ids(
+        date_iso, pairs, season_year, country_hint=args.country_hint,
+        days_window=args.days_window, min_match=args.min_match)))
+
     rows=[]
-    for _, r in df.iterrows():
-        home = str(r["home"]); away = str(r["away"])
+    for idx, r in df.iterrows():
         oh, od, oa = r["odd_home"], r["odd_draw"], r["odd_away"]
 
         # Se não tem odds, apenas repassa NaNs nas p_*
@@ -238,12 +254,7 @@ def main():
         p = probs_from_odds(float(oh), float(od), float(oa))
 
         # 1) fixture -> venue
-        try:
-            fid = find_fixture_id(date_iso, home, away, season_year,
-                                  country_hint=args.country_hint,
-                                  days_window=args.days_window, min_match=args.min_match)
-        except Exception:
-            fid = None
+        fid = fixture_ids.get(idx)
 
         lat = lon = elev = None
         if fid:
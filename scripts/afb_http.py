@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+afb_http.py
+Cliente HTTP único para a API-Football (RapidAPI ou API-Sports direto).
+
+- Session com keep-alive e pool de conexões (compartilhada no processo)
+- Token bucket com a cota do plano (AFB_RATE_PER_MIN, padrão 30/min; AFB_BURST)
+- Backoff exponencial em 429/5xx e falhas de rede, respeitando Retry-After
+- Contadores de chamadas, retries, erros e latência por endpoint
+- Cache SQLite de respostas com TTL por endpoint (scripts/http_cache.py; AFB_CACHE=0 desliga,
+  AFB_CACHE_OFFLINE=1 roda só com o que já está em cache)
+
+Credenciais (primeira encontrada):
+  RapidAPI:   RAPIDAPI_KEY, RAPID_API_KEY, X_RAPIDAPI_KEY
+  API-Sports: API_FOOTBALL_KEY, APISPORTS_KEY  (host v3.football.api-sports.io)
+
+Uso:
+  from scripts.afb_http import get_client
+  js = get_client().get_json("/fixtures", {"date": "2025-09-27"})
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from scripts.http_cache import ResponseCache, default_cache
+except ImportError:
+    from http_cache import ResponseCache, default_cache
+
+RAPIDAPI_HOST = "api-football-v1.p.rapidapi.com"
+APISPORTS_HOST = "v3.football.api-sports.io"
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+def _env(*names: str) -> str:
+    for n in names:
+        v = os.environ.get(n)
+        if v and v.strip():
+            return v.strip()
+    return ""
+
+
+def resolve_credentials(key: Optional[str] = None, host: Optional[str] = None) -> Tuple[str, str]:
+    """(chave, host): chave explícita ou do ambiente; host API-Sports só para chave direta."""
+    if key:
+        return key, host or RAPIDAPI_HOST
+    rapid = _env("RAPIDAPI_KEY", "RAPID_API_KEY", "X_RAPIDAPI_KEY")
+    if rapid:
+        return rapid, host or RAPIDAPI_HOST
+    direct = _env("API_FOOTBALL_KEY", "APISPORTS_KEY")
+    return direct, host or (APISPORTS_HOST if direct else RAPIDAPI_HOST)
+
+
+class TokenBucket:
+    """Token bucket thread-safe: `rate_per_min` fichas por minuto, até `burst` acumuladas."""
+
+    def __init__(self, rate_per_min: float, burst: Optional[int] = None):
+        self.rate = max(rate_per_min, 1e-6) / 60.0
+        self.capacity = float(burst if burst else max(1, int(rate_per_min // 6)))
+        self.tokens = self.capacity
+        self.stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Bloqueia até haver uma ficha; retorna o tempo esperado (s)."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+                self.stamp = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return waited
+                wait = (1.0 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+class ApiFootballClient:
+    """
+    Cliente compartilhado. `request()` devolve a última Response (mesmo com status de erro,
+    para o chamador manter sua própria semântica); `get_json()` levanta em erro HTTP.
+    """
+
+    def __init__(self, key: Optional[str] = None, host: Optional[str] = None,
+                 rate_per_min: Optional[float] = None, burst: Optional[int] = None,
+                 max_retries: int = 4, backoff: float = 1.0, timeout: float = 30.0,
+                 pool_size: int = 16, cache: Optional[ResponseCache] = None):
+        self.key, self.host = resolve_credentials(key, host)
+        self.base = f"https://{self.host}/v3"
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        rate = rate_per_min if rate_per_min else float(_env("AFB_RATE_PER_MIN") or 30)
+        self.bucket = TokenBucket(rate, burst or int(_env("AFB_BURST") or 0) or None)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(self._headers())
+
+        self.cache = cache if cache is not None else default_cache()
+        self._lock = threading.Lock()
+        self.counters: Dict[str, Dict[str, float]] = {}
+
+    def _headers(self) -> Dict[str, str]:
+        if self.host == APISPORTS_HOST:
+            return {"x-apisports-key": self.key}
+        return {"X-RapidAPI-Key": self.key, "X-RapidAPI-Host": self.host}
+
+    def _count(self, path: str, **inc):
+        with self._lock:
+            c = self.counters.setdefault(path, {"calls": 0, "cache_hits": 0, "retries": 0, "errors": 0,
+                                                "latency_s": 0.0, "max_latency_s": 0.0, "wait_s": 0.0})
+            for k, v in inc.items():
+                if k == "max_latency_s":
+                    c[k] = max(c[k], v)
+                else:
+                    c[k] += v
+
+    def _sleep_for(self, attempt: int, resp: Optional[requests.Response]) -> float:
+        if resp is not None:
+            ra = resp.headers.get("Retry-After")
+            try:
+                if ra is not None:
+                    return min(60.0, float(ra))
+            except ValueError:
+                pass
+        return self.backoff * (2 ** attempt) * (1.0 + 0.25 * random.random())
+
+    def _from_cache(self, path: str, params: Optional[Dict[str, Any]], body: bytes) -> requests.Response:
+        resp = requests.Response()
+        resp.status_code = 200
+        resp._content = body
+        resp.headers["X-Cache"] = "HIT"
+        resp.url = self.base + path
+        resp.encoding = "utf-8"
+        self._count(path, cache_hits=1)
+        return resp
+
+    def request(self, path: str, params: Optional[Dict[str, Any]] = None,
+                max_retries: Optional[int] = None, timeout: Optional[float] = None,
+                use_cache: bool = True) -> requests.Response:
+        path = "/" + path.lstrip("/")
+        cache = self.cache if use_cache else None
+        if cache is not None:
+            body = cache.get(path, params)
+            if body is not None:
+                return self._from_cache(path, params, body)
+            if cache.offline:
+                raise requests.ConnectionError(f"[apifootball] offline e sem cache para {path} {params}")
+        retries = self.max_retries if max_retries is None else max_retries
+        last_exc: Optional[Exception] = None
+        resp: Optional[requests.Response] = None
+        for attempt in range(retries + 1):
+            waited = self.bucket.acquire()
+            t0 = time.perf_counter()
+            try:
+                resp = self.session.get(self.base + path, params=params or {},
+                                        timeout=timeout or self.timeout)
+                last_exc = None
+            except (requests.ConnectionError, requests.Timeout) as e:
+                resp, last_exc = None, e
+            dt = time.perf_counter() - t0
+            self._count(path, calls=1, latency_s=dt, max_latency_s=dt, wait_s=waited)
+
+            transient = resp is None or resp.status_code in RETRY_STATUS
+            if not transient or attempt >= retries:
+                break
+            self._count(path, retries=1)
+            time.sleep(self._sleep_for(attempt, resp))
+
+        if resp is None:
+            self._count(path, errors=1)
+            raise last_exc
+        if resp.status_code != 200:
+            self._count(path, errors=1)
+        elif cache is not None:
+            cache.put(path, params, resp.content)
+        return resp
+
+    def get_json(self, path: str, params: Optional[Dict[str, Any]] = None, **kw) -> Dict[str, Any]:
+        r = self.request(path, params, **kw)
+        r.raise_for_status()
+        return r.json()
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {k: dict(v) for k, v in self.counters.items()}
+
+    def print_stats(self, tag: str = "apifootball", file=sys.stderr):
+        for path, c in sorted(self.stats().items()):
+            avg = c["latency_s"] / c["calls"] if c["calls"] else 0.0
+            print(f"[{tag}] {path}: calls={int(c['calls'])} cache={int(c['cache_hits'])} retries={int(c['retries'])} "
+                  f"errors={int(c['errors'])} lat_med={avg:.3f}s lat_max={c['max_latency_s']:.3f}s "
+                  f"espera_cota={c['wait_s']:.1f}s", file=file)
+
+
+_CLIENTS: Dict[Tuple[str, str], ApiFootballClient] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def get_client(key: Optional[str] = None, host: Optional[str] = None) -> ApiFootballClient:
+    """Cliente compartilhado por (chave, host): mesma Session e mesma cota no processo."""
+    probe = resolve_credentials(key, host)
+    with _CLIENTS_LOCK:
+        cli = _CLIENTS.get(probe)
+        if cli is None:
+            cli = _CLIENTS[probe] = ApiFootballClient(key=probe[0], host=probe[1])
+        return cli
@@ -5,26 +5,26 @@ Cliente fino para API-Football via RapidAPI.
 """
 
 import os
-import time
-import requests
 from typing import Dict, Any, Optional
 
-BASE_URL = "https://api-football-v1.p.rapidapi.com/v3"
+try:
+    from scripts.afb_http import get_client, RAPIDAPI_HOST
+except ImportError:
+    from afb_http import get_client, RAPIDAPI_HOST
 
-def _headers() -> Dict[str, str]:
+BASE_URL = f"https://{RAPIDAPI_HOST}/v3"
+
+def _client():
     api_key = os.getenv("X_RAPIDAPI_KEY", "").strip()
     if not api_key:
         raise SystemExit("[apifoot] ERRO: X_RAPIDAPI_KEY ausente.")
-    return {
-        "X-RapidAPI-Key": api_key,
-        "X-RapidAPI-Host": "api-football-v1.p.rapidapi.com"
-    }
+    return get_client(api_key, RAPIDAPI_HOST)
 
 def _get(path: str, params: Optional[Dict[str, Any]] = None, debug: bool = False) -> Dict[str, Any]:
     url = f"{BASE_URL}/{path.lstrip('/')}"
     if debug:
         print(f"[apifoot][DEBUG] GET {url} params={params}")
-    r = requests.get(url, headers=_headers(), params=params or {}, timeout=30)
+    r = _client().request(path, params or {})
     if r.status_code != 200:
         raise SystemExit(f"[apifoot] HTTP {r.status_code} em {url} body={r.text[:300]}")
     data = r.json()
@@ -55,6 +55,3 @@ def teams_stats(league_id: int, season: int, team_id: int, debug: bool=False) ->
 
 def fixture_stats(fixture_id: int, debug: bool=False) -> Dict[str, Any]:
     return _get("fixtures/statistics", {"fixture": fixture_id}, debug)
-
-def sleep_rl():
-    time.sleep(0.35)
\ No newline at end of file
@@ -5,7 +5,12 @@ import pandas as pd
 import numpy as np
 import os
 from datetime import datetime
-from scipy.stats import poisson
+
+# motor de grades em lote (compartilhado pelos modelos de gols)
+try:
+    from scripts.poisson_grid import outcome_probs
+except ImportError:
+    from poisson_grid import outcome_probs
 
 def _log(msg: str) -> None:
     print(f"[bivariate_estimator] {msg}", flush=True)
@@ -29,51 +34,47 @@ def estimate_bivariate(history_df: pd.DataFrame, matches_df: pd.DataFrame) -> pd
     _log(f"Colunas no history: {list(history_df.columns)}")
     _log(f"Linhas no history: {len(history_df)}")
 
-    results = []
-    for _, row in matches_df.iterrows():
-        home_team = row[home_col]
-        away_team = row[away_col]
-
-        # Inicializar valores padrão
-        home_goals_lambda = 1.0
-        away_goals_lambda = 1.0
-        prob_home = 0.33
-        prob_draw = 0.33
-        prob_away = 0.34
-
-        if not history_df.empty and 'team' in history_df.columns and 'avg_goals_scored' in history_df.columns and 'avg_goals_conceded' in history_df.columns:
-            home_history = history_df[history_df['team'] == home_team]
-            if not home_history.empty:
-                home_goals_lambda = home_history['avg_goals_scored'].mean() if home_history['avg_goals_scored'].notnull().any() else 1.0
-                away_goals_lambda = home_history['avg_goals_conceded'].mean() if home_history['avg_goals_conceded'].notnull().any() else 1.0
+    home_teams = matches_df[home_col].tolist()
+    away_teams = matches_df[away_col].tolist()
+    n = len(home_teams)
+
+    # Valores padrão
+    home_goals_lambda = np.ones(n)
+    away_goals_lambda = np.ones(n)
+    prob_home = np.full(n, 0.33)
+    prob_draw = np.full(n, 0.33)
+    prob_away = np.full(n, 0.34)
+
+    if not history_df.empty and 'team' in history_df.columns and 'avg_goals_scored' in history_df.columns and 'avg_goals_conceded' in history_df.columns:
+        # médias por time calculadas uma única vez (NaN-only -> 1.0)
+        team_means = history_df.groupby('team')[['avg_goals_scored', 'avg_goals_conceded']].mean().fillna(1.0)
+        scored = team_means['avg_goals_scored'].to_dict()
+        conceded = team_means['avg_goals_conceded'].to_dict()
+
+        for k, (home_team, away_team) in enumerate(zip(home_teams, away_teams)):
+            if home_team in scored:
+                home_goals_lambda[k] = scored[home_team]
+                away_goals_lambda[k] = conceded[home_team]
             else:
                 _log(f"[WARNING] Time não encontrado no history: {home_team}")
 
-            away_history = history_df[history_df['team'] == away_team]
-            if not away_history.empty:
-                away_goals_lambda = away_history['avg_goals_scored'].mean() if away_history['avg_goals_scored'].notnull().any() else 1.0
-                home_goals_lambda = away_history['avg_goals_conceded'].mean() if away_history['avg_goals_conceded'].notnull().any() else 1.0
+            if away_team in scored:
+                away_goals_lambda[k] = scored[away_team]
+                home_goals_lambda[k] = conceded[away_team]
             else:
                 _log(f"[WARNING] Time não encontrado no history: {away_team}")
 
-            # Simples modelo Poisson para probabilidades
-            max_goals = 5
-            prob_matrix = np.zeros((max_goals + 1, max_goals + 1))
-            for i in range(max_goals + 1):
-                for j in range(max_goals + 1):
-                    prob_matrix[i, j] = poisson.pmf(i, home_goals_lambda) * poisson.pmf(j, away_goals_lambda)
-            
-            prob_home = sum(prob_matrix[i, j] for i in range(max_goals + 1) for j in range(max_goals + 1) if i > j)
-            prob_draw = sum(prob_matrix[i, i] for i in range(max_goals + 1))
-            prob_away = sum(prob_matrix[i, j] for i in range(max_goals + 1) for j in range(max_goals + 1) if i < j)
-
-        results.append({
-            'team_home': home_team,
-            'team_away': away_team,
-            'prob_home': prob_home,
-            'prob_draw': prob_draw,
-            'prob_away': prob_away
-        })
+        # Simples modelo Poisson para probabilidades (grade 0..5, sem renormalizar)
+        probs = outcome_probs(home_goals_lambda, away_goals_lambda, max_goals=5, normalize=False)
+        prob_home, prob_draw, prob_away = probs['p_home'], probs['p_draw'], probs['p_away']
+
+    results = {
+        'team_home': home_teams,
+        'team_away': away_teams,
+        'prob_home': prob_home,
+        'prob_draw': prob_draw,
+        'prob_away': prob_away
+    }
 
     df = pd.DataFrame(results)
     _log(f"Gerado DataFrame com {len(df)} jogos estimados")
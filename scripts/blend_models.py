@@ -20,6 +20,11 @@ import sys
 import argparse
 import pandas as pd
 
+try:
+    from scripts.match_registry import load_registry
+except ImportError:
+    from match_registry import load_registry
+
 
 def die(msg: str, code: int = 24):
     print(f"##[error]{msg}", file=sys.stderr, flush=True)
@@ -67,6 +72,16 @@ def std_teams(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+def join_match(reg, left: pd.DataFrame, right: pd.DataFrame, cols, how: str = "left") -> pd.DataFrame:
+    """Merge pelo mid do registro da rodada; sem registro (ou sem como casar), pelo match_id."""
+    if reg is not None:
+        try:
+            return reg.join(left, right, how=how, cols=cols)
+        except ValueError:
+            pass
+    return left.merge(right[["match_id"] + list(cols)], on="match_id", how=how)
+
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--rodada", required=True)
@@ -114,11 +129,12 @@ def main():
     w_calib /= w_sum
     w_market /= w_sum
 
+    reg = load_registry(out_dir)
     df = base.copy()[["match_id","team_home","team_away"]]
     if not market.empty:
-        df = df.merge(market[["match_id","p_home","p_draw","p_away"]], on="match_id", how="left", suffixes=("","_m"))
+        df = join_match(reg, df, market, ["p_home","p_draw","p_away"])
     if not calib.empty:
-        df = df.merge(calib[["match_id","calib_home","calib_draw","calib_away"]], on="match_id", how="left")
+        df = join_match(reg, df, calib, ["calib_home","calib_draw","calib_away"])
 
     # se só existe uma fonte, usa-a; senão blend
     def blend(row):
@@ -158,8 +174,9 @@ def main():
         ctx = read_csv_ok(os.path.join(out_dir, "context_features.csv"))
         if ctx.empty or "context_score" not in ctx.columns:
             die("Contexto habilitado mas context_features.csv está ausente/incompleto (sem 'context_score').")
-        ctx = ensure_match_id(ctx)[["match_id","context_score"]]
-        final = blend_df.merge(ctx, on="match_id", how="inner")
+        ctx = ensure_match_id(ctx)
+        final = join_match(reg, blend_df, ctx, ["context_score"], how="inner")
+        final = final.drop(columns=[c for c in ("mid","home_id","away_id") if c in final.columns])
         if final.empty or final["context_score"].isna().any():
             die("Falha no merge do contexto: linhas ausentes ou context_score NaN.")
         # ajuste simples: suaviza probs em direção ao favorito quando context_score é alto
@@ -1,34 +1,22 @@
 # scripts/calib_isotonic.py
-# Treina calibração isotônica por classe (1, X, 2) usando o histórico.
+# Treina calibração por classe (1, X, 2) usando o histórico e exporta tabelas NumPy
+# (scripts/calibration_tables.py): o arquivo de saída é um .npz sem pickle, lido por
+# stack_probs/stack_probs_bivar sem sklearn e sem reajuste.
 from __future__ import annotations
-import argparse, joblib
+import argparse
 from pathlib import Path
-import numpy as np
 import pandas as pd
-from sklearn.isotonic import IsotonicRegression
 
-CLASSES = ["1","X","2"]
-
-def _prepare_xy(hist: pd.DataFrame):
-    """Espera colunas: p_home, p_draw, p_away, resultado ('1'/'X'/'2')."""
-    hist = hist.dropna(subset=["p_home","p_draw","p_away","resultado"]).copy()
-    hist["resultado"] = hist["resultado"].astype(str).str.upper().str.strip()
-    X = {
-        "1": hist["p_home"].to_numpy(float),
-        "X": hist["p_draw"].to_numpy(float),
-        "2": hist["p_away"].to_numpy(float),
-    }
-    Y = {
-        "1": (hist["resultado"]=="1").astype(int).to_numpy(),
-        "X": (hist["resultado"]=="X").astype(int).to_numpy(),
-        "2": (hist["resultado"]=="2").astype(int).to_numpy(),
-    }
-    return X, Y
+try:
+    from scripts.calibration_tables import METHODS, fit_from_frame, save_tables
+except ImportError:
+    from calibration_tables import METHODS, fit_from_frame, save_tables
 
 def main():
-    ap = argparse.ArgumentParser(description="Calibração isotônica 1/X/2")
+    ap = argparse.ArgumentParser(description="Calibração 1/X/2 (tabelas isotônica/platt/temperature/dirichlet)")
     ap.add_argument("--history-path", default="data/history/calibration.csv")
     ap.add_argument("--out-path", default="models/calib_isotonic.pkl")
+    ap.add_argument("--method", choices=METHODS, default="isotonic")
     args = ap.parse_args()
 
     hp = Path(args.history_path)
@@ -40,20 +28,11 @@ def main():
     if not need.issubset(df.columns):
         raise RuntimeError(f"[calib] histórico sem colunas necessárias: {sorted(need)}")
 
-    X, Y = _prepare_xy(df)
-    models={}
-    for c in CLASSES:
-        x = X[c]; y = Y[c]
-        if len(x)==0 or y.sum()==0 or y.sum()==len(y):
-            # dados insuficientes -> identidade
-            models[c] = ("identity", None)
-            continue
-        ir = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds="clip")
-        ir.fit(x, y)
-        models[c] = ("isotonic", ir)
-
-    Path(args.out_path).parent.mkdir(parents=True, exist_ok=True)
-    joblib.dump(models, args.out_path)
+    tables = fit_from_frame(df[list(need)].dropna(), args.method)
+    save_tables(tables, args.out_path)
+    m = tables["meta"]
+    if m:
+        print(f"[calib] {args.method}: n={m['n']} logloss {m['before']['logloss']:.4f} -> {m['after']['logloss']:.4f}")
     print(f"[calib] OK -> {args.out_path}")
 
 if __name__ == "__main__":
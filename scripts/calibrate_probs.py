@@ -2,73 +2,56 @@
 import argparse
 import sys
 import pandas as pd
-import pickle
 import os
 import numpy as np
 
+try:
+    from scripts.calibration_tables import apply_tables, load_calibration
+except ImportError:
+    from calibration_tables import apply_tables, load_calibration
+
 def _log(msg: str) -> None:
     print(f"[calibrate] {msg}", flush=True)
 
-def calibrate_probs(predictions_df: pd.DataFrame, calibrator) -> pd.DataFrame:
-    _log(f"Versão do pandas: {pd.__version__}")
-    
+# nomes alternativos (saída do predict_dynamic_model)
+_RENAME = {'home_team': 'team_home', 'away_team': 'team_away',
+           'home_prob': 'prob_home', 'draw_prob': 'prob_draw', 'away_prob': 'prob_away'}
+_PROB_COLS = ['prob_home', 'prob_draw', 'prob_away']
+_DEFAULT = np.array([0.33, 0.33, 0.34])
+
+def calibrate_probs(predictions_df: pd.DataFrame, tables) -> pd.DataFrame:
+    predictions_df = predictions_df.rename(columns={k: v for k, v in _RENAME.items()
+                                                    if k in predictions_df.columns and v not in predictions_df.columns})
+
     # Verificar colunas no predictions_df
-    required_cols = ['team_home', 'team_away', 'prob_home', 'prob_draw', 'prob_away']
+    required_cols = ['team_home', 'team_away'] + _PROB_COLS
     missing_cols = [col for col in required_cols if col not in predictions_df.columns]
     if missing_cols:
         _log(f"Aviso: Colunas ausentes no predictions.csv: {missing_cols}. Usando valores padrão.")
-        # Inicializar DataFrame com valores padrão
-        results = []
-        for _, row in predictions_df.iterrows():
-            results.append({
-                'team_home': row.get('team_home', 'unknown'),
-                'team_away': row.get('team_away', 'unknown'),
-                'prob_home': 0.33,
-                'prob_draw': 0.33,
-                'prob_away': 0.34
-            })
-        return pd.DataFrame(results)
+        n = len(predictions_df)
+        return pd.DataFrame({
+            'team_home': predictions_df['team_home'] if 'team_home' in predictions_df.columns else ['unknown'] * n,
+            'team_away': predictions_df['team_away'] if 'team_away' in predictions_df.columns else ['unknown'] * n,
+            'prob_home': [_DEFAULT[0]] * n, 'prob_draw': [_DEFAULT[1]] * n, 'prob_away': [_DEFAULT[2]] * n,
+        })
 
     _log(f"Processando {len(predictions_df)} jogos do predictions.csv")
 
-    results = []
-    for _, row in predictions_df.iterrows():
-        home_team = row['team_home']
-        away_team = row['team_away']
-        prob_home = row['prob_home']
-        prob_draw = row['prob_draw']
-        prob_away = row['prob_away']
-
-        # Aplicar calibrador se disponível
-        if calibrator is not None:
-            try:
-                prob_home = calibrator.predict([prob_home])[0] if not np.isnan(prob_home) else 0.33
-                prob_draw = calibrator.predict([prob_draw])[0] if not np.isnan(prob_draw) else 0.33
-                prob_away = calibrator.predict([prob_away])[0] if not np.isnan(prob_away) else 0.34
-                # Normalizar probabilidades para somar 1
-                total = prob_home + prob_draw + prob_away
-                if total > 0:
-                    prob_home /= total
-                    prob_draw /= total
-                    prob_away /= total
-                else:
-                    prob_home, prob_draw, prob_away = 0.33, 0.33, 0.34
-            except Exception as e:
-                _log(f"Erro ao calibrar para {home_team} x {away_team}: {str(e)}, usando valores padrão")
-                prob_home, prob_draw, prob_away = 0.33, 0.33, 0.34
-        else:
-            _log(f"Calibrador não disponível para {home_team} x {away_team}, usando valores padrão")
-            prob_home, prob_draw, prob_away = 0.33, 0.33, 0.34
-
-        results.append({
-            'team_home': home_team,
-            'team_away': away_team,
-            'prob_home': prob_home,
-            'prob_draw': prob_draw,
-            'prob_away': prob_away
-        })
+    # todas as linhas de uma vez: interpolação nas tabelas (3 classes) + renormalização
+    P = predictions_df[_PROB_COLS].to_numpy(dtype=float)
+    bad = ~np.isfinite(P).all(axis=1)
+    if bad.any():
+        _log(f"{int(bad.sum())} jogo(s) sem probabilidades, usando valores padrão")
+        P[bad] = _DEFAULT
+    if tables is None:
+        _log("Calibrador não disponível, mantendo probabilidades originais")
+    Q = apply_tables(P, tables) if tables is not None else P / P.sum(axis=1, keepdims=True)
 
-    df = pd.DataFrame(results)
+    df = pd.DataFrame({
+        'team_home': predictions_df['team_home'].values,
+        'team_away': predictions_df['team_away'].values,
+        'prob_home': Q[:, 0], 'prob_draw': Q[:, 1], 'prob_away': Q[:, 2],
+    })
     _log(f"Gerado DataFrame com {len(df)} jogos calibrados")
     return df
 
@@ -94,15 +77,10 @@ def main():
         _log("Arquivo predictions.csv está vazio, gerando DataFrame vazio")
         predictions_df = pd.DataFrame(columns=['team_home', 'team_away', 'prob_home', 'prob_draw', 'prob_away'])
 
-    # Carregar calibrador
-    calibrator = None
-    if os.path.isfile(args.cal):
-        try:
-            with open(args.cal, 'rb') as f:
-                calibrator = pickle.load(f)
-            _log(f"Calibrador carregado de {args.cal}")
-        except Exception as e:
-            _log(f"Erro ao carregar calibrador {args.cal}: {e}, prosseguindo sem calibrador")
+    # Carregar calibrador (tabelas .npz; pickles antigos convertidos na leitura)
+    calibrator = load_calibration(args.cal)
+    if calibrator is not None:
+        _log(f"Calibrador carregado de {args.cal} ({calibrator['method']})")
     else:
         _log(f"Calibrador {args.cal} não encontrado, prosseguindo sem calibrador")
 
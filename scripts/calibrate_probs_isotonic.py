@@ -5,12 +5,21 @@
 # Observações:
 #   • Para cada classe k, ajusta P(y=k | p_k) ≈ f_k(p_k), depois renormaliza por linha.
 #   • Funciona mesmo que a distribuição esteja mal calibrada (não assume forma paramétrica).
+#   • O ajuste vira tabelas NumPy (calibration_tables.py) guardadas em --tables; só é refeito
+#     quando o calibration.csv muda. --method troca isotônica por platt/temperature/dirichlet.
 from __future__ import annotations
 import argparse
 from pathlib import Path
 import numpy as np
 import pandas as pd
 
+try:
+    from scripts.calibration_tables import (METHODS, apply_tables, file_fingerprint, fit_tables,
+                                            labels_index, load_calibration, save_tables)
+except ImportError:
+    from calibration_tables import (METHODS, apply_tables, file_fingerprint, fit_tables,
+                                    labels_index, load_calibration, save_tables)
+
 def _pick_joined(base: Path) -> Path:
     for name in ["joined_referee.csv","joined_weather.csv","joined_enriched.csv","joined.csv"]:
         p = base / name
@@ -41,6 +50,8 @@ def main():
     ap.add_argument("--rodada", required=True)
     ap.add_argument("--history-path", default="data/history/calibration.csv")
     ap.add_argument("--min-samples", type=int, default=200, help="mínimo de amostras no histórico para calibrar")
+    ap.add_argument("--tables", default="data/history/calibration_tables.npz", help="tabelas em cache (refeitas se o histórico mudar)")
+    ap.add_argument("--method", choices=METHODS, default="isotonic")
     args = ap.parse_args()
 
     base = Path(f"data/out/{args.rodada}")
@@ -63,33 +74,18 @@ def main():
         print(f"[iso] histórico insuficiente/indisponível (n={len(H)}); cópia salva sem calibração.")
         return
 
-    # prepara histórico
-    P_hist = H[["p_home","p_draw","p_away"]].values.astype(float)
-    y_map = {"1":0,"X":1,"2":2}
-    y_idx = np.array([y_map[str(v).upper()] for v in H["resultado"].values], dtype=int)
-    # alvos one-vs-rest
-    Y1 = (y_idx == 0).astype(float)
-    YX = (y_idx == 1).astype(float)
-    Y2 = (y_idx == 2).astype(float)
-
-    # fit isotônicas
-    try:
-        from sklearn.isotonic import IsotonicRegression
-    except Exception:
-        raise RuntimeError("[iso] scikit-learn não instalado. Adicione 'scikit-learn' nas dependências.")
-
-    iso1 = IsotonicRegression(out_of_bounds="clip"); iso1.fit(P_hist[:,0], Y1)
-    isox = IsotonicRegression(out_of_bounds="clip"); isox.fit(P_hist[:,1], YX)
-    iso2 = IsotonicRegression(out_of_bounds="clip"); iso2.fit(P_hist[:,2], Y2)
+    # tabelas ajustadas uma vez por versão do histórico (sha1 do CSV); rodadas seguintes só aplicam
+    fp = file_fingerprint(hist)
+    tables = load_calibration(args.tables)
+    if not tables or tables["meta"].get("source_sha1") != fp or tables["method"] != args.method:
+        H = H.dropna(subset=list(need))
+        tables = fit_tables(H[["p_home","p_draw","p_away"]].values.astype(float), labels_index(H["resultado"]), args.method)
+        tables["meta"]["source_sha1"] = fp
+        save_tables(tables, args.tables)
+        print(f"[iso] tabelas {args.method} ajustadas (n={tables['meta'].get('n', 0)}) -> {args.tables}")
 
     # aplica no atual
-    P_now = _ensure_probs(df)
-    q1 = np.clip(iso1.predict(P_now[:,0]), 1e-9, 1.0)
-    qx = np.clip(isox.predict(P_now[:,1]), 1e-9, 1.0)
-    q2 = np.clip(iso2.predict(P_now[:,2]), 1e-9, 1.0)
-    Q = np.vstack([q1,qx,q2]).T
-    Q = np.clip(Q, 1e-9, 1.0)
-    Q = Q / Q.sum(axis=1, keepdims=True)
+    Q = apply_tables(_ensure_probs(df), tables)
 
     # escreve e gera odds coerentes
     df["p_home"], df["p_draw"], df["p_away"] = Q[:,0], Q[:,1], Q[:,2]
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+calibration_tables.py
+Calibração multiclasse 1/X/2 exportada como tabelas lineares por partes (NumPy).
+
+Ajuste (uma vez, sobre o histórico) — métodos:
+  isotonic     isotônica one-vs-rest por classe (sklearn só no ajuste)
+  platt        sigmoide por classe sobre logit(p_k)
+  temperature  um T global: softmax(log p / T)
+  dirichlet    Dirichlet diagonal: softmax(a_k·log p_k + b_k)
+
+Todos viram o mesmo formato: f_k(p) amostrada numa grade uniforme de GRID_SIZE pontos
+em [0, 1] (tabela 3 × G). Para temperature/dirichlet, f_k(p) = p^a_k·e^b_k e a
+renormalização da linha reproduz o softmax; para isotonic/platt é o one-vs-rest de sempre.
+
+Aplicar = uma interpolação vetorizada nas 3 colunas + renormalização (apply_tables).
+Arquivo .npz sem pickle (grid, table, method, meta em JSON); carregar não exige sklearn
+nem reajuste. load_calibration também aceita os pickles antigos (dict {"1": ("isotonic",
+ir), ...} do calib_isotonic.py, {"home","draw","away"} ou um único IsotonicRegression)
+e os converte em tabela na leitura.
+
+Uso:
+  python scripts/calibration_tables.py --history data/history/calibration.csv --out models/calib_tables.npz --method isotonic
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import pickle
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize
+
+GRID_SIZE = 1001
+METHODS = ("isotonic", "platt", "temperature", "dirichlet")
+EPS = 1e-6
+
+# rótulos aceitos -> índice da classe (0=casa/1, 1=empate/X, 2=fora/2)
+_LABELS = {"1": 0, "X": 1, "2": 2, "H": 0, "D": 1, "A": 2, "HOME": 0, "DRAW": 1, "AWAY": 2}
+
+
+def _log(msg: str) -> None:
+    print(f"[calib_tables] {msg}", flush=True)
+
+
+def labels_index(values) -> np.ndarray:
+    """'1'/'X'/'2', 'H'/'D'/'A' ou 'home'/'draw'/'away' -> 0/1/2 (-1 se desconhecido)."""
+    s = pd.Series(values).astype(str).str.strip().str.upper()
+    return s.map(_LABELS).fillna(-1).astype(int).to_numpy()
+
+
+def _normalize(P: np.ndarray) -> np.ndarray:
+    P = np.clip(np.asarray(P, dtype=float), EPS, None)
+    return P / P.sum(axis=1, keepdims=True)
+
+
+def metrics(P: np.ndarray, y: np.ndarray) -> dict:
+    P = _normalize(P)
+    Y = np.eye(3)[y]
+    return {"logloss": float(-np.mean(np.log(P[np.arange(len(y)), y]))),
+            "brier": float(np.mean(np.sum((P - Y) ** 2, axis=1)))}
+
+
+def grid() -> np.ndarray:
+    return np.linspace(0.0, 1.0, GRID_SIZE)
+
+
+def identity_tables() -> dict:
+    g = grid()
+    return {"method": "identity", "grid": g, "table": np.tile(g, (3, 1)), "meta": {}}
+
+
+# ---------- ajuste ----------
+def _fit_isotonic(P, y, g):
+    from sklearn.isotonic import IsotonicRegression
+    T = np.empty((3, g.size))
+    for k in range(3):
+        yk = (y == k).astype(float)
+        if yk.min() == yk.max():
+            T[k] = g  # classe constante no histórico -> identidade
+            continue
+        ir = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds="clip").fit(P[:, k], yk)
+        T[k] = ir.predict(g)
+    return T, {}
+
+
+def _fit_platt(P, y, g):
+    T = np.empty((3, g.size))
+    coef = []
+    lg = np.log(np.clip(g, EPS, 1 - EPS) / (1 - np.clip(g, EPS, 1 - EPS)))
+    for k in range(3):
+        x = np.log(P[:, k] / (1 - np.clip(P[:, k], None, 1 - EPS)))
+        yk = (y == k).astype(float)
+
+        def nll(ab):
+            z = ab[0] * x + ab[1]
+            # log(1+e^z) - y·z, com gradiente analítico
+            q = 1.0 / (1.0 + np.exp(-z))
+            val = np.mean(np.logaddexp(0.0, z) - yk * z)
+            r = q - yk
+            return val, np.array([np.mean(r * x), np.mean(r)])
+
+        ab = minimize(nll, np.array([1.0, 0.0]), jac=True, method="L-BFGS-B").x
+        coef.append([float(ab[0]), float(ab[1])])
+        T[k] = 1.0 / (1.0 + np.exp(-(ab[0] * lg + ab[1])))
+    return T, {"platt": coef}
+
+
+def _softmax_nll(L, y, a, b):
+    """NLL média de softmax(a·L + b) e gradientes em a (3,) e b (3,)."""
+    Z = L * a + b
+    Z = Z - Z.max(axis=1, keepdims=True)
+    E = np.exp(Z)
+    Q = E / E.sum(axis=1, keepdims=True)
+    n = len(y)
+    val = -np.mean(Z[np.arange(n), y] - np.log(E.sum(axis=1)))
+    R = Q.copy()
+    R[np.arange(n), y] -= 1.0
+    return val, (R * L).mean(axis=0), R.mean(axis=0)
+
+
+def _power_tables(g, a, b):
+    lg = np.log(np.clip(g, EPS, 1.0))
+    return np.exp(np.outer(a, np.ones_like(g)) * lg + np.asarray(b)[:, None])
+
+
+def _fit_temperature(P, y, g):
+    L = np.log(P)
+
+    def nll(t):
+        val, ga, _ = _softmax_nll(L, y, np.full(3, t[0]), np.zeros(3))
+        return val, np.array([ga.sum()])
+
+    inv_t = float(minimize(nll, np.array([1.0]), jac=True, method="L-BFGS-B", bounds=[(0.05, 20.0)]).x[0])
+    return _power_tables(g, np.full(3, inv_t), np.zeros(3)), {"temperature": 1.0 / inv_t}
+
+
+def _fit_dirichlet(P, y, g, reg: float = 1e-3):
+    L = np.log(P)
+
+    # theta = a(3) + b(2); b do empate/fora relativo à casa (b_casa = 0)
+    def nll(theta):
+        a, b = theta[:3], np.r_[0.0, theta[3:]]
+        val, ga, gb = _softmax_nll(L, y, a, b)
+        # leve encolhimento para a = 1, b = 0 (histórico curto)
+        val += reg * (np.sum((a - 1.0) ** 2) + np.sum(b ** 2))
+        return val, np.r_[ga + 2 * reg * (a - 1.0), gb[1:] + 2 * reg * b[1:]]
+
+    th = minimize(nll, np.r_[np.ones(3), np.zeros(2)], jac=True, method="L-BFGS-B").x
+    a, b = th[:3], np.r_[0.0, th[3:]]
+    return _power_tables(g, a, b), {"dirichlet_a": a.tolist(), "dirichlet_b": b.tolist()}
+
+
+_FITTERS = {"isotonic": _fit_isotonic, "platt": _fit_platt,
+            "temperature": _fit_temperature, "dirichlet": _fit_dirichlet}
+
+
+def fit_tables(P, y, method: str = "isotonic") -> dict:
+    """P (n,3) probabilidades 1/X/2, y (n,) classes 0/1/2 -> tabelas {method, grid, table, meta}."""
+    if method not in _FITTERS:
+        raise ValueError(f"[calib_tables] método desconhecido: {method} (use {', '.join(METHODS)})")
+    P = np.asarray(P, dtype=float)
+    y = np.asarray(y, dtype=int)
+    ok = np.isfinite(P).all(axis=1) & (y >= 0) & (y <= 2)
+    P, y = _normalize(P[ok]), y[ok]
+    if len(y) == 0:
+        return identity_tables()
+    g = grid()
+    T, extra = _FITTERS[method](P, y, g)
+    tables = {"method": method, "grid": g, "table": np.clip(T, EPS, None), "meta": {}}
+    tables["meta"] = {"n": int(len(y)), "before": metrics(P, y), "after": metrics(apply_tables(P, tables), y),
+                      "fitted_at": datetime.now(timezone.utc).isoformat(timespec="seconds"), **extra}
+    return tables
+
+
+def fit_from_frame(df: pd.DataFrame, method: str = "isotonic") -> dict:
+    """Histórico com p_home/p_draw/p_away (ou prob_*) e resultado/result."""
+    df = df.rename(columns=str.lower)
+    cols = next((c for c in (["p_home", "p_draw", "p_away"], ["prob_home", "prob_draw", "prob_away"])
+                 if set(c).issubset(df.columns)), None)
+    label = next((c for c in ("resultado", "result") if c in df.columns), None)
+    if cols is None or label is None:
+        raise ValueError("[calib_tables] histórico precisa de p_home/p_draw/p_away (ou prob_*) e resultado/result")
+    return fit_tables(df[cols].to_numpy(dtype=float), labels_index(df[label]), method)
+
+
+# ---------- aplicação ----------
+def apply_tables(P, tables: Optional[dict]) -> np.ndarray:
+    """Interpola as 3 colunas de uma vez na grade uniforme e renormaliza cada linha."""
+    P = np.asarray(P, dtype=float)
+    if not tables:
+        return P
+    T = tables["table"]
+    G = T.shape[1]
+    pos = np.clip(np.nan_to_num(P, nan=1.0 / 3), 0.0, 1.0) * (G - 1)
+    i0 = np.minimum(pos.astype(np.intp), G - 2)
+    frac = pos - i0
+    k = np.arange(3)[None, :]
+    Q = T[k, i0] * (1.0 - frac) + T[k, i0 + 1] * frac
+    Q = np.clip(Q, EPS, None)
+    return Q / Q.sum(axis=1, keepdims=True)
+
+
+# ---------- arquivo ----------
+def save_tables(tables: dict, path) -> Path:
+    """Grava .npz (sem pickle) no caminho exato recebido."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as f:
+        np.savez(f, grid=tables["grid"], table=tables["table"], method=np.array(tables["method"]),
+                 meta=np.array(json.dumps(tables.get("meta") or {}, ensure_ascii=False)))
+    return path
+
+
+def _from_legacy(obj) -> Optional[dict]:
+    """Pickles antigos (sklearn) -> tabela, avaliando cada modelo na grade."""
+    g = grid()
+
+    def ev(m):
+        if m is None:
+            return g
+        if isinstance(m, tuple):
+            kind, m = m
+            if kind != "isotonic" or m is None:
+                return g
+        return np.asarray(m.predict(g), dtype=float)
+
+    if isinstance(obj, dict):
+        if {"1", "X", "2"} & set(obj):
+            rows = [ev(obj.get(k)) for k in ("1", "X", "2")]
+        elif {"home", "draw", "away"} & set(obj):
+            rows = [ev(obj.get(k)) for k in ("home", "draw", "away")]
+        else:
+            return None
+    elif hasattr(obj, "predict"):
+        try:
+            row = ev(obj)
+        except Exception:
+            return None  # IsotonicRegression nunca ajustado (padrão antigo) = sem calibração
+        rows = [row, row, row]
+    else:
+        return None
+    return {"method": "legacy", "grid": g, "table": np.clip(np.vstack(rows), EPS, None), "meta": {}}
+
+
+def load_calibration(path) -> Optional[dict]:
+    """Tabelas .npz; pickle/joblib antigo é convertido. None se ausente/ilegível."""
+    path = Path(path)
+    if not path.exists() or path.stat().st_size == 0:
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as z:
+            return {"method": str(z["method"]), "grid": z["grid"], "table": z["table"],
+                    "meta": json.loads(str(z["meta"]))}
+    except Exception:
+        pass
+    try:
+        try:
+            import joblib
+            obj = joblib.load(path)
+        except ImportError:
+            with open(path, "rb") as f:
+                obj = pickle.load(f)
+    except Exception as e:
+        _log(f"não foi possível ler {path}: {e}")
+        return None
+    return _from_legacy(obj)
+
+
+def file_fingerprint(path) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Ajusta tabelas de calibração 1/X/2")
+    ap.add_argument("--history", default="data/history/calibration.csv")
+    ap.add_argument("--out", default="models/calib_tables.npz")
+    ap.add_argument("--method", choices=METHODS, default="isotonic")
+    args = ap.parse_args(argv)
+
+    h = Path(args.history)
+    df = pd.read_parquet(h) if h.suffix == ".parquet" else pd.read_csv(h)
+    tables = fit_from_frame(df, args.method)
+    save_tables(tables, args.out)
+    m = tables["meta"]
+    if m:
+        _log(f"{args.method}: n={m['n']} logloss {m['before']['logloss']:.4f} -> {m['after']['logloss']:.4f}, "
+             f"brier {m['before']['brier']:.4f} -> {m['after']['brier']:.4f}")
+    _log(f"OK -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,51 +1,57 @@
 # -*- coding: utf-8 -*-
+# Ajusta a calibração das três classes (casa/empate/fora) uma vez e grava as tabelas
+# NumPy de scripts/calibration_tables.py (.npz sem pickle) em --out.
 import argparse
 import sys
 import pandas as pd
-import pickle
 import os
-from sklearn.isotonic import IsotonicRegression
+
+try:
+    from scripts.calibration_tables import METHODS, fit_tables, identity_tables, labels_index, save_tables
+except ImportError:
+    from calibration_tables import METHODS, fit_tables, identity_tables, labels_index, save_tables
 
 def _log(msg: str) -> None:
     print(f"[calibrator_train] {msg}", flush=True)
 
-def train_calibrator(history_df: pd.DataFrame) -> IsotonicRegression:
+def train_calibrator(history_df: pd.DataFrame, method: str = 'isotonic') -> dict:
     # Verificar colunas no history_df
     required_cols = ['prob_home', 'prob_draw', 'prob_away', 'result']
     missing_cols = [col for col in required_cols if col not in history_df.columns]
     if missing_cols:
         _log(f"Aviso: Colunas ausentes no history: {missing_cols}. Usando calibrador padrão.")
-        return IsotonicRegression(out_of_bounds='clip')
+        return identity_tables()
 
     _log(f"Colunas no history: {list(history_df.columns)}")
     _log(f"Linhas no history: {len(history_df)}")
 
     if history_df.empty:
         _log("Histórico vazio, usando calibrador padrão")
-        return IsotonicRegression(out_of_bounds='clip')
+        return identity_tables()
 
     # Filtrar dados válidos
     history_df = history_df.dropna(subset=required_cols)
+    y = labels_index(history_df['result'])
+    history_df, y = history_df[y >= 0], y[y >= 0]
     if history_df.empty:
         _log("Nenhum dado válido para treinamento após remoção de nulos, usando calibrador padrão")
-        return IsotonicRegression(out_of_bounds='clip')
+        return identity_tables()
 
-    # Treinar calibrador (exemplo simplificado para prob_home)
+    # Três classes de uma vez (home/draw/away)
     try:
-        X = history_df['prob_home'].values
-        y = (history_df['result'] == 'home').astype(int).values
-        calibrator = IsotonicRegression(out_of_bounds='clip')
-        calibrator.fit(X, y)
-        _log("Calibrador treinado com sucesso")
-        return calibrator
+        tables = fit_tables(history_df[['prob_home', 'prob_draw', 'prob_away']].to_numpy(float), y, method)
+        m = tables['meta']
+        _log(f"Calibrador treinado ({method}): logloss {m['before']['logloss']:.4f} -> {m['after']['logloss']:.4f}")
+        return tables
     except Exception as e:
         _log(f"Erro ao treinar calibrador: {e}, usando calibrador padrão")
-        return IsotonicRegression(out_of_bounds='clip')
+        return identity_tables()
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--history", required=True)
     ap.add_argument("--out", required=True)
+    ap.add_argument("--method", choices=METHODS, default="isotonic")
     args = ap.parse_args()
 
     if not os.path.isfile(args.history):
@@ -58,11 +64,9 @@ def main():
             _log(f"Erro ao ler {args.history}: {e}, usando calibrador padrão")
             history_df = pd.DataFrame(columns=['prob_home', 'prob_draw', 'prob_away', 'result'])
 
-    calibrator = train_calibrator(history_df)
-    os.makedirs(os.path.dirname(args.out), exist_ok=True)
-    with open(args.out, 'wb') as f:
-        pickle.dump(calibrator, f)
+    tables = train_calibrator(history_df, args.method)
+    save_tables(tables, args.out)
     _log(f"Arquivo {args.out} gerado")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -26,6 +26,11 @@ import argparse
 import numpy as np
 import pandas as pd
 
+try:
+    from scripts.features_univariado import implied_fair
+except ImportError:
+    from features_univariado import implied_fair
+
 
 def parse_args():
     ap = argparse.ArgumentParser()
@@ -35,26 +40,6 @@ def parse_args():
     return ap.parse_args()
 
 
-def to_prob_from_odds(k):
-    if k is None:
-        return np.nan
-    try:
-        k = float(k)
-        return 1.0 / k if k > 0 else np.nan
-    except Exception:
-        return np.nan
-
-
-def desvig(p1, pX, p2):
-    vec = np.array([p1, pX, p2], dtype=float)
-    if np.isnan(vec).any():
-        return p1, pX, p2
-    s = vec.sum()
-    if s <= 0:
-        return p1, pX, p2
-    return tuple(vec / s)
-
-
 def main():
     args = parse_args()
     rodada = args.rodada
@@ -85,46 +70,26 @@ def main():
         # 2) Caso contrário, tenta derivar de odds:
         #    Primeiro tenta novo esquema (home_price/draw_price/away_price), senão k1/kx/k2.
         if set(["home_price", "draw_price", "away_price"]).issubset(df.columns):
-            p1_raw = df["home_price"].apply(to_prob_from_odds)
-            pX_raw = df["draw_price"].apply(to_prob_from_odds)
-            p2_raw = df["away_price"].apply(to_prob_from_odds)
+            cols = ["home_price", "draw_price", "away_price"]
         else:
             # esquema antigo k1/kx/k2
             for c in ["k1", "kx", "k2"]:
                 if c not in df.columns:
                     df[c] = np.nan
-            p1_raw = df["k1"].apply(to_prob_from_odds)
-            pX_raw = df["kx"].apply(to_prob_from_odds)
-            p2_raw = df["k2"].apply(to_prob_from_odds)
-
-        # remove vigorish (normaliza)
-        p1_list, pX_list, p2_list = [], [], []
-        for a, b, c in zip(p1_raw, pX_raw, p2_raw):
-            p1n, pXn, p2n = desvig(a, b, c)
-            p1_list.append(p1n)
-            pX_list.append(pXn)
-            p2_list.append(p2n)
-        df["p1"], df["pX"], df["p2"] = p1_list, pX_list, p2_list
+            cols = ["k1", "kx", "k2"]
+        odds = df[cols].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+
+        # remove vigorish (devig multiplicativo, todas as linhas de uma vez); odd <= 0 = ausente
+        _, _, fair = implied_fair(np.where(odds > 0, odds, np.nan))
+        df["p1"], df["pX"], df["p2"] = fair[:, 0], fair[:, 1], fair[:, 2]
 
     # Calcula xg usando a proxy com média de gols
     total = float(args.total_goals)
-    def row_to_xg(r):
-        p1 = r.get("p1", np.nan)
-        pX = r.get("pX", np.nan)
-        p2 = r.get("p2", np.nan)
-        if any(pd.isna([p1, pX, p2])):
-            return np.nan, np.nan, np.nan
-        xg_home = total * (p1 + 0.5 * pX)
-        xg_away = total * (p2 + 0.5 * pX)
-        xg_draw = pX  # mantemos como referência/compatibilidade
-        return xg_home, xg_draw, xg_away
-
-    xg_home, xg_draw, xg_away = [], [], []
-    for _, r in df.iterrows():
-        h, d, a = row_to_xg(r)
-        xg_home.append(h)
-        xg_draw.append(d)
-        xg_away.append(a)
+    P = df[["p1", "pX", "p2"]].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+    missing = np.isnan(P).any(axis=1)
+    xg_home = np.where(missing, np.nan, total * (P[:, 0] + 0.5 * P[:, 1]))
+    xg_away = np.where(missing, np.nan, total * (P[:, 2] + 0.5 * P[:, 1]))
+    xg_draw = np.where(missing, np.nan, P[:, 1])  # mantemos como referência/compatibilidade
 
     out = pd.DataFrame({
         "match_id": df.get("match_id", pd.Series(dtype=str)),
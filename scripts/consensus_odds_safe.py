@@ -11,15 +11,15 @@ from typing import Dict, Tuple, List
 # -------- imports robustos do util --------
 try:
     # se estiver dentro do pacote "scripts"
-    from ._utils_norm import norm_name, load_json
+    from ._utils_norm import norm_name, load_json, team_key
 except Exception:
     try:
         # se for chamado como "python -m scripts.xxx"
-        from scripts._utils_norm import norm_name, load_json  # type: ignore
+        from scripts._utils_norm import norm_name, load_json, team_key  # type: ignore
     except Exception:
         # último recurso: adiciona ./scripts ao PYTHONPATH em runtime
         sys.path.append(os.path.join(os.getcwd(), "scripts"))
-        from _utils_norm import norm_name, load_json  # type: ignore
+        from _utils_norm import norm_name, load_json, team_key  # type: ignore
 
 
 REQUIRED_COLS = ["team_home", "team_away", "odds_home", "odds_draw", "odds_away"]
@@ -54,7 +54,8 @@ def _to_float(x: str) -> float:
 
 
 def _key_match(h: str, a: str) -> Tuple[str, str]:
-    return (norm_name(h), norm_name(a))
+    # chave do índice único de aliases: o mesmo time com grafias diferentes casa entre fontes
+    return (norm_name(team_key(h)), norm_name(team_key(a)))
 
 
 def _average(a: float, b: float) -> float:
@@ -152,11 +153,11 @@ def build_consensus(rodada_dir: str, strict: bool) -> str:
     return out_path
 
 
-def main() -> None:
+def main(argv=None) -> None:
     ap = argparse.ArgumentParser()
     ap.add_argument("--rodada", required=True, help="Pasta data/out/<RUN_ID> com os CSVs de odds")
     ap.add_argument("--strict", action="store_true", help="Falhar se não houver odds")
-    args = ap.parse_args()
+    args = ap.parse_args(argv)
 
     out = build_consensus(args.rodada, args.strict)
     print(f"[consensus] OK — gerado {out}")
@@ -0,0 +1,149 @@
+# scripts/devig.py
+# -*- coding: utf-8 -*-
+"""
+Motor vetorizado de remoção de margem (de-vig) para a tabela inteira de odds.
+
+Métodos (todos resolvidos para todas as linhas de uma vez):
+  - "shin":           modelo de Shin, z em [0,1) por Newton mascarado
+  - "power":          p_i = π_i^k, k >= 1
+  - "odds_ratio":     p_i/(1-p_i) = (π_i/(1-π_i)) / c, c >= 1
+  - "additive":       p_i = π_i - (S-1)/n
+  - "multiplicative": p_i = π_i / S  (normalização simples 1/odd)
+onde π_i = 1/odd_i e S = Σ π_i.
+
+Os parâmetros de Shin/power/odds_ratio saem de um Newton com salvaguarda: cada
+linha mantém um intervalo [lo, hi] que contém a raiz, e quando o passo de
+Newton sai do intervalo (ou não é finito) cai para bissecção.
+"""
+from __future__ import annotations
+
+from typing import Callable, Tuple
+
+import numpy as np
+
+METHODS = ("shin", "power", "odds_ratio", "additive", "multiplicative")
+
+
+def _solve_decreasing(fdf: Callable, lo: np.ndarray, hi: np.ndarray, x0: np.ndarray,
+                      tol: float = 1e-12, max_iter: int = 100) -> np.ndarray:
+    """
+    Resolve f(x)=0 por linha para f decrescente em [lo, hi] (f(lo)>0>f(hi)).
+    `fdf(x, rows)` devolve (f, f') avaliados apenas nas linhas `rows`.
+    """
+    x = x0.astype(float).copy()
+    lo = lo.astype(float).copy()
+    hi = hi.astype(float).copy()
+    active = np.arange(x.size)
+    for _ in range(max_iter):
+        if active.size == 0:
+            break
+        xa = x[active]
+        f, df = fdf(xa, active)
+        done = np.abs(f) < tol
+        pos = f > 0
+        lo[active] = np.where(pos, xa, lo[active])
+        hi[active] = np.where(pos, hi[active], xa)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            xn = xa - f / df
+        la, ha = lo[active], hi[active]
+        bad = ~np.isfinite(xn) | (xn <= la) | (xn >= ha)
+        xn = np.where(bad, 0.5 * (la + ha), xn)
+        x[active] = np.where(done, xa, xn)
+        active = active[~done & ((ha - la) > tol)]
+    return x
+
+
+def _shin(iv: np.ndarray, tol: float, max_iter: int) -> Tuple[np.ndarray, np.ndarray]:
+    s = iv.sum(axis=1, keepdims=True)
+    a = iv * iv / s
+
+    def p_of(z, rows):
+        zc = z[:, None]
+        r = np.sqrt(zc * zc + 4.0 * (1.0 - zc) * a[rows])
+        return r, (r - zc) / (2.0 * (1.0 - zc))
+
+    def fdf(z, rows):
+        zc = z[:, None]
+        r, p = p_of(z, rows)
+        dr = (zc - 2.0 * a[rows]) / r
+        dp = ((dr - 1.0) * (1.0 - zc) + (r - zc)) / (2.0 * (1.0 - zc) ** 2)
+        return p.sum(axis=1) - 1.0, dp.sum(axis=1)
+
+    n = iv.shape[0]
+    z = _solve_decreasing(fdf, np.zeros(n), np.full(n, 1.0 - 1e-12), np.zeros(n), tol, max_iter)
+    return p_of(z, np.arange(n))[1], z
+
+
+def _power(iv: np.ndarray, tol: float, max_iter: int) -> Tuple[np.ndarray, np.ndarray]:
+    liv = np.log(iv)
+
+    def fdf(k, rows):
+        pk = np.exp(k[:, None] * liv[rows])
+        return pk.sum(axis=1) - 1.0, (pk * liv[rows]).sum(axis=1)
+
+    n, m = iv.shape
+    hi = np.log(1.0 / (2.0 * m)) / liv.max(axis=1)
+    k = _solve_decreasing(fdf, np.ones(n), np.maximum(hi, 1.0 + 1e-9), np.ones(n), tol, max_iter)
+    return np.exp(k[:, None] * liv), k
+
+
+def _odds_ratio(iv: np.ndarray, tol: float, max_iter: int) -> Tuple[np.ndarray, np.ndarray]:
+    def p_of(c, rows):
+        cc = c[:, None]
+        den = cc + iv[rows] * (1.0 - cc)
+        return iv[rows] / den, den
+
+    def fdf(c, rows):
+        p, den = p_of(c, rows)
+        return p.sum(axis=1) - 1.0, -(iv[rows] * (1.0 - iv[rows]) / (den * den)).sum(axis=1)
+
+    n = iv.shape[0]
+    hi = np.maximum(2.0 * (iv / (1.0 - iv)).sum(axis=1), 1.0 + 1e-9)
+    c = _solve_decreasing(fdf, np.ones(n), hi, np.ones(n), tol, max_iter)
+    return p_of(c, np.arange(n))[0], c
+
+
+def devig(odds, method: str = "shin", tol: float = 1e-12, max_iter: int = 100,
+          return_param: bool = False):
+    """
+    Remove a margem de uma matriz de odds decimais (n, k).
+
+    Linhas com odd não finita ou <= 1.0 saem como NaN. Linhas sem overround
+    (S <= 1) usam a normalização simples em qualquer método. A saída é
+    recortada em [1e-9, 1] e renormalizada, como no consenso antigo.
+    Com return_param=True devolve também o parâmetro por linha
+    (z de Shin, expoente do power, c do odds-ratio; NaN nos demais).
+    """
+    if method not in METHODS:
+        raise ValueError(f"método de devig desconhecido: {method!r} (use {', '.join(METHODS)})")
+
+    o = np.atleast_2d(np.asarray(odds, dtype=float))
+    n = o.shape[0]
+    probs = np.full(o.shape, np.nan)
+    param = np.full(n, np.nan)
+
+    valid = np.isfinite(o).all(axis=1) & (o > 1.0).all(axis=1)
+    if not valid.any():
+        return (probs, param) if return_param else probs
+
+    iv = 1.0 / o[valid]
+    s = iv.sum(axis=1)
+    p = iv / s[:, None]
+    par = np.full(iv.shape[0], np.nan)
+
+    over = s > 1.0
+    if method == "additive":
+        p = iv - ((s - 1.0) / iv.shape[1])[:, None]
+    elif method != "multiplicative" and over.any():
+        solver = {"shin": _shin, "power": _power, "odds_ratio": _odds_ratio}[method]
+        p_over, par_over = solver(iv[over], tol, max_iter)
+        p[over] = p_over
+        par[over] = par_over
+        if method == "shin":
+            par[~over] = 0.0
+
+    p = np.clip(p, 1e-9, 1.0)
+    p /= p.sum(axis=1, keepdims=True)
+    probs[valid] = p
+    param[valid] = par
+    return (probs, param) if return_param else probs
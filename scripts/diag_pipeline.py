@@ -19,6 +19,11 @@ except Exception as e:
     print(f"[diag] ERRO: requests não disponível: {e}", file=sys.stderr)
     sys.exit(2)
 
+try:
+    from scripts.team_resolver import resolve_team
+except ImportError:
+    from team_resolver import resolve_team
+
 # ---------------------------- util de texto/nomes ----------------------------
 
 _STOP = {"fc","ec","ac","sc","u20","u23","futebol","clube","club","regatas","associacao",
@@ -31,8 +36,8 @@ def _strip_accents(s: str) -> str:
     return "".join(c for c in nfkd if not unicodedata.combining(c))
 
 def canonical_name(s: str) -> str:
-    """normaliza de forma agressiva para comparação robusta."""
-    s = _strip_accents(s).lower()
+    """normaliza de forma agressiva para comparação robusta (após resolver o alias)."""
+    s = _strip_accents(resolve_team(s)).lower()
     s = s.replace("&", " and ")
     s = re.sub(r"[-_/.,:;()]+", " ", s)
     s = s.replace("athletico", "atletico")  # PR, etc.
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+dixon_coles.py
+Ajuste de forças (ataque/defesa/mando) Dixon–Coles sobre o histórico de resultados.
+
+Modelo (Dixon & Coles, 1997):
+  log λ_home = mu + home + atk[h] - dfn[a]
+  log λ_away = mu +        atk[a] - dfn[h]
+  P(x, y) = τ(x, y; λh, λa, ρ) · Pois(x; λh) · Pois(y; λa)
+  τ corrige 0-0, 0-1, 1-0 e 1-1; demais placares τ = 1.
+
+Pesos de decaimento temporal w = exp(-xi · dias_até_a_referência) (xi por dia;
+jogos sem data pesam 1). Penalidade L2 `ridge` em atk/dfn fixa a identificabilidade
+e encolhe times com poucos jogos.
+
+Log-verossimilhança vetorizada com gradiente analítico, otimizada por L-BFGS-B.
+Warm start: os parâmetros da rodada anterior (JSON em --params) iniciam o ajuste;
+times novos começam em 0.
+
+Uso:
+  python scripts/dixon_coles.py --history data/history/results.csv --params data/history/dc_params.json
+  python scripts/dixon_coles.py --rodada <R>     # também grava data/out/<R>/xg_bivar.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize
+from scipy.special import gammaln
+
+try:
+    from scripts.poisson_grid import dixon_coles_grids, grid_outcomes
+    from scripts.team_resolver import resolve_team
+except ImportError:
+    from poisson_grid import dixon_coles_grids, grid_outcomes
+    from team_resolver import resolve_team
+
+PARAMS_PATH = Path("data/history/dc_params.json")
+XI_DEFAULT = 0.0019      # meia-vida ~ 1 ano
+RIDGE_DEFAULT = 0.01
+RHO_BOUNDS = (-0.3, 0.3)
+
+# aliases de colunas aceitos no histórico
+_COLS = {
+    "home": ("team_home", "home"),
+    "away": ("team_away", "away"),
+    "hg": ("score_home", "home_goals", "ft_home", "gh", "hg"),
+    "ag": ("score_away", "away_goals", "ft_away", "ga", "ag"),
+}
+
+
+def _log(msg: str) -> None:
+    print(f"[dixon_coles] {msg}", flush=True)
+
+
+def prepare(history: pd.DataFrame) -> pd.DataFrame:
+    """Padroniza para home, away, hg, ag, date (NaT se não houver data/rodada datada)."""
+    df = history.rename(columns=str.lower)
+    out = {}
+    for k, names in _COLS.items():
+        col = next((c for c in names if c in df.columns), None)
+        if col is None:
+            raise ValueError(f"[dixon_coles] histórico sem coluna para {k} ({'/'.join(names)})")
+        out[k] = df[col]
+    res = pd.DataFrame(out)
+    if "date" in df.columns:
+        res["date"] = pd.to_datetime(df["date"], errors="coerce", utc=True)
+    elif "rodada" in df.columns:
+        res["date"] = pd.to_datetime(df["rodada"].astype(str).str[:10], errors="coerce", utc=True)
+    else:
+        res["date"] = pd.Series(pd.NaT, index=res.index, dtype="datetime64[ns, UTC]")  # concatena com datadas
+    res["hg"] = pd.to_numeric(res["hg"], errors="coerce")
+    res["ag"] = pd.to_numeric(res["ag"], errors="coerce")
+    res = res.dropna(subset=["home", "away", "hg", "ag"])
+    res = res[(res["hg"] >= 0) & (res["ag"] >= 0)]
+    # nomes pelo índice único de aliases: mesma chave de time que o resto do pipeline
+    names = pd.unique(pd.concat([res["home"], res["away"]]).astype(str))
+    canon = {t: resolve_team(t) for t in names}
+    res["home"] = res["home"].astype(str).map(canon)
+    res["away"] = res["away"].astype(str).map(canon)
+    return res.reset_index(drop=True)
+
+
+def decay_weights(dates: pd.Series, xi: float, ref=None) -> np.ndarray:
+    """
+    exp(-xi·dias até ref). Jogo sem data não ganha peso cheio: recebe o peso do jogo datado
+    mais antigo (sem data = histórico velho). Tudo sem data -> pesos 1, com aviso.
+    """
+    if xi <= 0:
+        return np.ones(len(dates))
+    undated = dates.isna().to_numpy()
+    if undated.all():
+        if len(dates):
+            _log(f"aviso: {len(dates)} jogos sem data; decaimento temporal desligado")
+        return np.ones(len(dates))
+    ref = pd.Timestamp(ref, tz="UTC") if ref is not None else dates.max()
+    days = (ref - dates).dt.total_seconds().to_numpy() / 86400.0
+    w = np.exp(-xi * np.clip(days, 0.0, None))
+    if undated.any():
+        _log(f"aviso: {int(undated.sum())} jogos sem data recebem o peso do mais antigo datado")
+    return np.where(undated, w[~undated].min(), w)
+
+
+def _tau_terms(x, y, lh, la, rho):
+    """log τ e derivadas d/dηh, d/dηa, d/dρ (η = log λ) para cada jogo."""
+    n = len(x)
+    logt = np.zeros(n)
+    dh = np.zeros(n)
+    da = np.zeros(n)
+    dr = np.zeros(n)
+    m00 = (x == 0) & (y == 0)
+    m01 = (x == 0) & (y == 1)
+    m10 = (x == 1) & (y == 0)
+    m11 = (x == 1) & (y == 1)
+
+    t = np.maximum(1e-10, 1.0 - lh[m00] * la[m00] * rho)
+    logt[m00] = np.log(t)
+    dh[m00] = da[m00] = -lh[m00] * la[m00] * rho / t
+    dr[m00] = -lh[m00] * la[m00] / t
+
+    t = np.maximum(1e-10, 1.0 + lh[m01] * rho)
+    logt[m01] = np.log(t)
+    dh[m01] = lh[m01] * rho / t
+    dr[m01] = lh[m01] / t
+
+    t = np.maximum(1e-10, 1.0 + la[m10] * rho)
+    logt[m10] = np.log(t)
+    da[m10] = la[m10] * rho / t
+    dr[m10] = la[m10] / t
+
+    t = max(1e-10, 1.0 - rho)
+    logt[m11] = np.log(t)
+    dr[m11] = -1.0 / t
+    return logt, dh, da, dr
+
+
+def _unpack(theta: np.ndarray, n: int):
+    return theta[0], theta[1], theta[2], theta[3:3 + n], theta[3 + n:3 + 2 * n]
+
+
+def neg_loglik(theta: np.ndarray, hi: np.ndarray, ai: np.ndarray, x: np.ndarray, y: np.ndarray,
+               w: np.ndarray, n: int, ridge: float):
+    """-log L ponderada (+ L2) e gradiente analítico, tudo vetorizado."""
+    mu, home, rho, atk, dfn = _unpack(theta, n)
+    eh = mu + home + atk[hi] - dfn[ai]
+    ea = mu + atk[ai] - dfn[hi]
+    lh, la = np.exp(eh), np.exp(ea)
+    logt, th, ta, tr = _tau_terms(x, y, lh, la, rho)
+    ll = w * (logt + x * eh - lh + y * ea - la)
+    gh = w * (x - lh + th)   # d ll / d ηh
+    ga = w * (y - la + ta)   # d ll / d ηa
+
+    g = np.empty_like(theta)
+    g[0] = gh.sum() + ga.sum()
+    g[1] = gh.sum()
+    g[2] = (w * tr).sum()
+    g[3:3 + n] = np.bincount(hi, gh, n) + np.bincount(ai, ga, n)
+    g[3 + n:] = -np.bincount(ai, gh, n) - np.bincount(hi, ga, n)
+
+    pen = ridge * (atk @ atk + dfn @ dfn)
+    g_pen = np.zeros_like(theta)
+    g_pen[3:] = 2.0 * ridge * theta[3:]
+    const = (w * (gammaln(x + 1) + gammaln(y + 1))).sum()
+    return -(ll.sum() - const) + pen, -g + g_pen
+
+
+def fit(history: pd.DataFrame, xi: float = XI_DEFAULT, ridge: float = RIDGE_DEFAULT,
+        init: Optional[dict] = None, ref_date=None, maxiter: int = 500,
+        rho_bounds: Tuple[float, float] = RHO_BOUNDS, home0: float = 0.2) -> dict:
+    """Ajusta mu/home/rho/atk/dfn. `init` = parâmetros anteriores (warm start)."""
+    df = prepare(history)
+    if df.empty:
+        raise ValueError("[dixon_coles] histórico vazio")
+    teams = sorted(set(df["home"]) | set(df["away"]))
+    pos = {t: i for i, t in enumerate(teams)}
+    n = len(teams)
+    hi = df["home"].map(pos).to_numpy()
+    ai = df["away"].map(pos).to_numpy()
+    x = df["hg"].to_numpy(dtype=float)
+    y = df["ag"].to_numpy(dtype=float)
+    w = decay_weights(df["date"], xi, ref_date)
+
+    theta0 = np.zeros(3 + 2 * n)
+    theta0[0] = np.log(max(np.average((x + y) / 2.0, weights=w), 0.1))
+    theta0[1] = home0
+    warm = 0
+    if init:
+        theta0[0] = init.get("mu", theta0[0])
+        theta0[1] = init.get("home", theta0[1])
+        theta0[2] = float(np.clip(init.get("rho", 0.0), *rho_bounds))
+        prev = init.get("teams") or {}
+        for t, i in pos.items():
+            if t in prev:
+                theta0[3 + i] = prev[t].get("attack", 0.0)
+                theta0[3 + n + i] = prev[t].get("defence", 0.0)
+                warm += 1
+
+    bounds = [(None, None), (None, None), tuple(rho_bounds)] + [(None, None)] * (2 * n)
+    t0 = time.perf_counter()
+    res = minimize(neg_loglik, theta0, args=(hi, ai, x, y, w, n, ridge), jac=True,
+                   method="L-BFGS-B", bounds=bounds, options={"maxiter": maxiter})
+    mu, home, rho, atk, dfn = _unpack(res.x, n)
+    return {
+        "mu": float(mu), "home": float(home), "rho": float(rho), "xi": xi, "ridge": ridge,
+        "teams": {t: {"attack": float(atk[i]), "defence": float(dfn[i])} for t, i in pos.items()},
+        "n_matches": int(len(df)), "loglik": float(-res.fun), "converged": bool(res.success),
+        "iterations": int(res.nit), "warm_teams": warm, "seconds": round(time.perf_counter() - t0, 3),
+        "fitted_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def rates(params: dict, home: Sequence[str], away: Sequence[str]):
+    """λ_home, λ_away para listas de times; time desconhecido = força média (0)."""
+    teams = params.get("teams") or {}
+    atk = lambda t: teams.get(resolve_team(str(t)), {}).get("attack", 0.0)
+    dfn = lambda t: teams.get(resolve_team(str(t)), {}).get("defence", 0.0)
+    ah = np.array([atk(t) for t in home]); dh = np.array([dfn(t) for t in home])
+    aa = np.array([atk(t) for t in away]); da = np.array([dfn(t) for t in away])
+    lh = np.exp(params["mu"] + params["home"] + ah - da)
+    la = np.exp(params["mu"] + aa - dh)
+    return lh, la
+
+
+def predict(params: dict, home: Sequence[str], away: Sequence[str], max_goals: int = 10) -> pd.DataFrame:
+    lh, la = rates(params, home, away)
+    probs = grid_outcomes(dixon_coles_grids(lh, la, params["rho"], max_goals), normalize=True)
+    return pd.DataFrame({
+        "lambda_home_bv": lh, "lambda_away_bv": la,
+        "p1_bv": probs["p_home"], "px_bv": probs["p_draw"], "p2_bv": probs["p_away"],
+    })
+
+
+def load_params(path: Path = PARAMS_PATH) -> Optional[dict]:
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def save_params(params: dict, path: Path = PARAMS_PATH) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(params, ensure_ascii=False, indent=2), encoding="utf-8")
+    return path
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Ajuste Dixon–Coles (ataque/defesa/mando, decaimento temporal)")
+    ap.add_argument("--history", default="data/history/results.csv")
+    ap.add_argument("--params", default=str(PARAMS_PATH), help="JSON de parâmetros (warm start e saída)")
+    ap.add_argument("--xi", type=float, default=XI_DEFAULT, help="decaimento por dia (0 = sem decaimento)")
+    ap.add_argument("--ridge", type=float, default=RIDGE_DEFAULT)
+    ap.add_argument("--no-warm", action="store_true", help="ignora parâmetros anteriores")
+    ap.add_argument("--rodada", default="", help="se informado, grava data/out/<R>/xg_bivar.csv")
+    ap.add_argument("--kmax", type=int, default=10)
+    args = ap.parse_args(argv)
+
+    hist = pd.read_csv(args.history)
+    init = None if args.no_warm else load_params(args.params)
+    params = fit(hist, xi=args.xi, ridge=args.ridge, init=init)
+    save_params(params, args.params)
+    _log(f"{params['n_matches']} jogos, {len(params['teams'])} times, rho={params['rho']:+.4f}, "
+         f"home={params['home']:+.3f}, {params['iterations']} iterações em {params['seconds']}s "
+         f"(warm: {params['warm_teams']}) -> {args.params}")
+
+    if args.rodada:
+        base = Path(f"data/out/{args.rodada}")
+        matches = pd.read_csv(base / "matches.csv").rename(columns=str.lower)
+        out = pd.concat([matches[["match_id", "home", "away"]].reset_index(drop=True),
+                         predict(params, matches["home"], matches["away"], args.kmax)], axis=1)
+        out["rho_hat"] = params["rho"]
+        out.round(6).sort_values("match_id").to_csv(base / "xg_bivar.csv", index=False)
+        _log(f"OK -> {base / 'xg_bivar.csv'}")
+
+
+if __name__ == "__main__":
+    main()
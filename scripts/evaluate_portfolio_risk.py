@@ -4,7 +4,7 @@ import argparse
 import numpy as np
 import pandas as pd
 from pathlib import Path
-from risk_utils import load_prob_matrix, simulate_outcomes, portfolio_payouts, var_es
+from risk_utils import load_prob_matrix, evaluate_portfolio_stream, OutcomeSampler, SAMPLERS, SEED
 
 def parse_ticket_row(row: pd.Series) -> list[set[int]]:
     mapping = {"1":0, "X":1, "2":2}
@@ -27,6 +27,11 @@ def main():
     ap.add_argument("--rodada", required=True)
     ap.add_argument("--sims", type=int, default=100000)
     ap.add_argument("--paytable-json", default="")
+    ap.add_argument("--chunk", type=int, default=0, help="cenários por bloco (0 = automático)")
+    ap.add_argument("--sampler", default="mc", choices=SAMPLERS, help="mc ou sobol (quasi-Monte Carlo)")
+    ap.add_argument("--antithetic", action="store_true", help="variáveis antitéticas (U, 1-U)")
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--save-returns", action="store_true", help="grava o vetor completo de retornos (usa memória O(sims))")
     args = ap.parse_args()
 
     base = Path(f"data/out/{args.rodada}")
@@ -36,7 +41,6 @@ def main():
 
     df_plan = pd.read_csv(plan_path)
     df, P = load_prob_matrix(args.rodada)
-    sim = simulate_outcomes(P, n_sims=args.sims)
 
     # reconstruir tickets e pesos
     tickets=[]; weights=[]
@@ -57,12 +61,20 @@ def main():
         except Exception:
             pay_table = None
 
-    returns = portfolio_payouts(sim, tickets, weights, pay_table=pay_table)
-    var95, es95 = var_es(returns, alpha=0.95)
+    # avaliação em blocos (tickets empacotados em bitmask; VaR/ES incrementais)
+    res = evaluate_portfolio_stream(P, tickets, weights, pay_table=pay_table, n_sims=args.sims,
+                                    chunk=args.chunk or None, alpha=0.95, keep_returns=args.save_returns,
+                                    sampler=OutcomeSampler(P, seed=args.seed, method=args.sampler,
+                                                           antithetic=args.antithetic))
+    var95, es95 = res["var"], res["es"]
 
     # salva
-    pd.DataFrame({"return": returns}).to_csv(base/"portfolio_returns_eval.csv", index=False)
-    pd.DataFrame({"metric":["VaR95","ES95"], "value":[var95, es95]}).to_csv(base/"portfolio_risk_eval.csv", index=False)
+    if args.save_returns:
+        pd.DataFrame({"return": res["returns"]}).to_csv(base/"portfolio_returns_eval.csv", index=False)
+    hits = pd.DataFrame(res["hit_probs"], columns=[f"p_{k}" for k in range(res["hit_probs"].shape[1])])
+    hits.insert(0, "ticket_id", range(1, len(hits) + 1))
+    hits.to_csv(base/"portfolio_hits_eval.csv", index=False)
+    pd.DataFrame({"metric":["mean","VaR95","ES95"], "value":[res["mean"], var95, es95]}).to_csv(base/"portfolio_risk_eval.csv", index=False)
 
     print(f"[eval] OK -> {base/'portfolio_risk_eval.csv'} | VaR95={var95:.4f} ES95={es95:.4f}")
 
@@ -6,7 +6,10 @@ from pathlib import Path
 import numpy as np
 import pandas as pd
 
-RNG = np.random.default_rng(123)
+try:
+    from scripts.risk_utils import coverage_probs, hit_distribution
+except ImportError:
+    from risk_utils import coverage_probs, hit_distribution
 
 DEFAULT_PRIZE = {
     "cost_per_ticket": 1.5,     # custo do cartão (ajuste p/ seu valor real)
@@ -73,7 +76,7 @@ def _ensure_probs(df: pd.DataFrame) -> tuple[np.ndarray, list[int]]:
             seen.add(mid); clean.append(mid)
     return P, clean
 
-# ---------------- Leitura de base & simulação ----------------
+# ---------------- Leitura de base ----------------
 def load_joined(base: Path) -> tuple[pd.DataFrame, np.ndarray, list[int]]:
     # procura joined enriquecidos, depois odds.csv
     for name in ["joined_referee.csv","joined_weather.csv","joined_enriched.csv","joined.csv","odds.csv"]:
@@ -86,42 +89,18 @@ def load_joined(base: Path) -> tuple[pd.DataFrame, np.ndarray, list[int]]:
             return df, P, fixed
     raise RuntimeError("[ev] nenhum joined*/odds.csv encontrado.")
 
-def simulate_outcomes(P: np.ndarray, n_sims=60000) -> np.ndarray:
-    n = P.shape[0]
-    out = np.zeros((n_sims, n), dtype=np.int8)
-    for i in range(n):
-        out[:,i] = RNG.choice(3, size=n_sims, p=P[i])
-    return out
-
-def eval_ticket(outcomes: np.ndarray, ticket_picks: list[set[str]]) -> tuple[float,float]:
+def eval_ticket(P: np.ndarray, ticket_picks: list[set[str]]) -> tuple[float,float]:
     """
-    outcomes: (n_sims, n) com valores 0/1/2
+    P: (n, 3) probabilidades por jogo
     ticket_picks: lista de sets {"1","X","2"} por jogo
-    retorna: (p14, p13)
+    retorna: (p14, p13) exatos (distribuição de acertos sob independência)
     """
     idx_map = {"1":0,"X":1,"2":2}
-    allow = [ set(idx_map[a] for a in s) for s in ticket_picks ]
-
-    # 14 acertos
-    ok = np.ones(outcomes.shape[0], dtype=bool)
-    for j, al in enumerate(allow):
-        ok &= np.isin(outcomes[:,j], list(al))
-        if not ok.any():  # curto-circuito
-            return 0.0, 0.0
-    p14 = float(ok.mean())
-
-    # 13 acertos (erra exatamente 1 jogo)
-    n = outcomes.shape[1]
-    p13 = 0.0
-    for miss in range(n):
-        ok13 = np.ones(outcomes.shape[0], dtype=bool)
-        for j, al in enumerate(allow):
-            if j == miss:
-                ok13 &= ~np.isin(outcomes[:,j], list(al))
-            else:
-                ok13 &=  np.isin(outcomes[:,j], list(al))
-            if not ok13.any(): break
-        p13 += ok13.mean()
+    allow = [ set(idx_map[a] for a in s if a in idx_map) for s in ticket_picks ]
+    n = len(allow)
+    dist = hit_distribution(coverage_probs(P[:n], allow))
+    p14 = float(dist[n])
+    p13 = float(dist[n-1]) if n >= 1 else 0.0
     return p14, p13
 
 def parse_ticket_csv(path: Path) -> list[set[str]]:
@@ -144,7 +123,7 @@ def main():
     ap = argparse.ArgumentParser(description="Avaliação de EV e Kelly para cartões")
     ap.add_argument("--rodada", required=True)
     ap.add_argument("--portfolio-dir", default=None, help="diretório com cartao_*.csv; se vazio, usa data/out/<rodada>/portfolio")
-    ap.add_argument("--n-sims", type=int, default=60000)
+    ap.add_argument("--n-sims", type=int, default=60000, help="ignorado (avaliação exata); mantido por compatibilidade")
     args = ap.parse_args()
 
     base = Path(f"data/out/{args.rodada}")
@@ -152,8 +131,6 @@ def main():
     if fixed_ids:
         print("[ev] Aviso: probabilidades reconstruídas para match_id:", fixed_ids)
 
-    outcomes = simulate_outcomes(P, n_sims=args.n_sims)
-
     prize = load_prize_model()
     cpt   = float(prize.get("cost_per_ticket", DEFAULT_PRIZE["cost_per_ticket"]))
     pay14 = float(prize.get("payout_14",      DEFAULT_PRIZE["payout_14"]))
@@ -167,7 +144,7 @@ def main():
     rows=[]
     for f in sorted(port_dir.glob("cartao_*.csv")):
         picks = parse_ticket_csv(f)
-        p14, p13 = eval_ticket(outcomes, picks)
+        p14, p13 = eval_ticket(P, picks)
         ev = p14*pay14 + p13*pay13 - cpt
         # Kelly fracionado (proxy simples): stake_relativo = k * max(0, EV/custo) (limitado a 1)
         edge = ev / cpt
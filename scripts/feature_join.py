@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+feature_join.py
+Join de features em uma passada a partir de uma lista declarativa de fontes.
+
+Cada fonte (Source) diz: arquivo, colunas-chave, prefixo das colunas, obrigatória/opcional,
+colunas exigidas/trazidas e um transform opcional (agregação, renomes, colunas derivadas).
+join_sources():
+  - lê cada arquivo com pyarrow (CSV ou Parquet; chaves comparadas como texto normalizado);
+  - monta UM índice canônico de chaves (how="left": linhas da 1ª fonte; "outer": união,
+    na ordem de aparição) — ou o mid inteiro de scripts/match_registry se registry= for dado;
+  - alinha cada fonte ao índice com um get_indexer + take por coluna e monta o frame largo
+    de uma vez, em vez de um merge (cópia completa) por fonte.
+Colunas em carry= são coalescidas (1º valor não nulo vence); nomes repetidos recebem
+sufixo _<fonte>, como os merges antigos. write_frame() grava .parquet ou .csv pelo sufixo.
+
+Uso (spec YAML/JSON com a lista de fontes):
+  python scripts/feature_join.py --spec joins.yaml --out data/out/<id>/features_wide.parquet
+
+  keys: [match_id]
+  how: left
+  sources:
+    - {path: data/out/<id>/matches_whitelist.csv, required: true, columns: [team_home, team_away]}
+    - {path: data/out/<id>/features_xg.csv, prefix: "xg_"}
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - pyarrow está no requirements; fallback só para ambientes mínimos
+    pa = pa_csv = pq = None
+
+
+@dataclass
+class Source:
+    path: str
+    keys: Sequence[str] = ("match_id",)        # colunas-chave no arquivo (posição i -> chave canônica i)
+    prefix: str = ""
+    required: bool = False
+    columns: Optional[Sequence[str]] = None    # colunas a trazer (None = todas as não-chave)
+    need: Sequence[str] = ()                   # colunas que precisam existir (além das chaves)
+    rename: Mapping[str, str] = field(default_factory=dict)
+    lower: bool = False                        # nomes de coluna em minúsculas antes de tudo
+    transform: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None
+    name: str = ""                             # sufixo em colisões (default: nome do arquivo)
+
+    def __post_init__(self):
+        self.name = self.name or os.path.splitext(os.path.basename(self.path))[0]
+
+    @classmethod
+    def from_dict(cls, d: Mapping) -> "Source":
+        d = dict(d)
+        for k in ("keys", "columns", "need"):
+            if isinstance(d.get(k), str):
+                d[k] = [d[k]]
+        return cls(**d)
+
+
+def _warn(tag: str, msg: str) -> None:
+    print(f"[{tag}] aviso: {msg}", file=sys.stderr, flush=True)
+
+
+def read_table(path: str) -> pd.DataFrame:
+    """CSV/Parquet -> DataFrame via pyarrow; tipos como no pd.read_csv (datas não são inferidas)."""
+    if path.endswith(".parquet"):
+        return pq.read_table(path).to_pandas() if pq is not None else pd.read_parquet(path)
+    if pa_csv is None:
+        return pd.read_csv(path)
+    opts = pa_csv.ConvertOptions(timestamp_parsers=[], strings_can_be_null=True)
+    return pa_csv.read_csv(path, convert_options=opts).to_pandas()
+
+
+def write_frame(df: pd.DataFrame, path: str, fmt: Optional[str] = None) -> str:
+    """Grava .parquet (pyarrow) ou .csv; fmt força o formato e troca a extensão."""
+    if fmt:
+        path = os.path.splitext(path)[0] + (".parquet" if fmt == "parquet" else ".csv")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if path.endswith(".parquet"):
+        if pq is not None:
+            pq.write_table(pa.Table.from_pandas(df, preserve_index=False), path)
+        else:
+            df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+    return path
+
+
+def read_source(src: Source, tag: str = "join") -> Optional[pd.DataFrame]:
+    """Lê e valida uma fonte. Obrigatória com problema -> RuntimeError; opcional -> None."""
+    def fail(msg: str):
+        if src.required:
+            raise RuntimeError(f"[{tag}] {msg}")
+        _warn(tag, msg)
+        return None
+
+    if not os.path.isfile(src.path) or os.path.getsize(src.path) == 0:
+        if src.required:
+            raise RuntimeError(f"[{tag}] arquivo obrigatório ausente/vazio: {src.path}")
+        return None
+    try:
+        df = read_table(src.path)
+    except Exception as ex:
+        return fail(f"falha ao ler {src.path}: {ex}")
+    if src.lower:
+        df = df.rename(columns=str.lower)
+    if src.rename:
+        df = df.rename(columns=dict(src.rename))
+    if src.transform is not None:
+        try:
+            df = src.transform(df)
+        except (KeyError, ValueError) as ex:
+            return fail(f"{os.path.basename(src.path)}: {ex}")
+    missing = [c for c in list(src.keys) + list(src.need) if c not in df.columns]
+    if missing:
+        return fail(f"{os.path.basename(src.path)} sem colunas necessárias: faltam {missing}")
+    return df
+
+
+def _key_values(col: pd.Series):
+    """
+    Chave normalizada de uma coluna: inteiros (inclusive float integral, ex. match_id lido como
+    float64 por causa de uma célula vazia, ou texto só de dígitos) -> Int64; o resto -> texto
+    com strip. Nulos continuam nulos (não casam com nada).
+    """
+    na = col.isna().to_numpy()
+    if pd.api.types.is_integer_dtype(col.dtype):
+        return col.to_numpy(dtype=np.int64) if not na.any() else pd.array(col, dtype="Int64")
+    if pd.api.types.is_float_dtype(col.dtype):
+        v = col.to_numpy(dtype=float, na_value=np.nan)[~na]
+        if np.isfinite(v).all() and (v == np.round(v)).all() and (np.abs(v) < 2 ** 62).all():
+            return pd.array(col, dtype="Int64") if na.any() else col.to_numpy().astype(np.int64)
+    txt = col.astype(str).str.strip().mask(na)
+    if (~na).any() and txt[~na].str.fullmatch(r"\d{1,18}").all():
+        return pd.array(txt.astype("Int64")) if na.any() else txt.astype(np.int64).to_numpy()
+    return txt.to_numpy(dtype=object)
+
+
+def _key_index(df: pd.DataFrame, cols: Sequence[str]) -> pd.Index:
+    """
+    Índice de chaves. Chave única inteira vira int64 (hash de inteiros, bem mais barato que
+    texto); as demais viram texto normalizado. Em chave composta cada coluna vira texto
+    ("1", não "1.0", para float integral).
+    """
+    if len(cols) == 1:
+        return pd.Index(_key_values(df[cols[0]]), name=cols[0])
+    arrays = []
+    for c in cols:
+        v = pd.Series(_key_values(df[c]))
+        arrays.append(v.astype(str).mask(v.isna()).to_numpy(dtype=object))
+    return pd.MultiIndex.from_arrays(arrays, names=list(cols))
+
+
+def join_sources(sources: Sequence[Source], keys: Sequence[str] = ("match_id",), how: str = "left",
+                 carry: Sequence[str] = (), registry=None, tag: str = "join") -> pd.DataFrame:
+    """
+    Frame largo: chaves canônicas + colunas de cada fonte alinhadas ao mesmo índice.
+    how="left": linhas (e ordem) da 1ª fonte lida; "outer": união das chaves.
+    registry (MatchRegistry): chave canônica vira o mid inteiro (attach por match_id/match_key/times).
+    df.attrs["joined"] = nomes das fontes efetivamente usadas, na ordem.
+    """
+    keys = list(keys)
+    loaded = []
+    for src in sources:
+        df = read_source(src, tag)
+        if df is None:
+            continue
+        if registry is not None:
+            # a base (ou toda fonte, no outer) registra pares novos; as demais só casam
+            df = registry.attach(df, register=(how == "outer" or not loaded))
+            df = df[df["mid"].notna()]
+            kcols = ["mid"]
+        else:
+            df = df.rename(columns={k: c for k, c in zip(src.keys, keys) if k != c})
+            kcols = keys
+        base = how == "left" and not loaded
+        if not base:
+            df = df[df[kcols].notna().all(axis=1)]   # chave nula não casa com nada
+        idx = _key_index(df, kcols)
+        if base:
+            loaded.append((src, df, idx))   # a base mantém todas as linhas (como o merge left)
+            continue
+        first = ~idx.duplicated()
+        loaded.append((src, df[first], idx[first]))
+    if not loaded:
+        raise RuntimeError(f"[{tag}] nenhuma fonte disponível")
+    if len({ix.dtype.kind for _, _, ix in loaded}) > 1:
+        # chaves inteiras numa fonte e texto em outra: compara tudo como texto (inteiros já sem ".0")
+        loaded = [(src, df, ix if ix.dtype.kind == "O" else pd.Index(pd.Series(ix).astype(str).mask(ix.isna()),
+                                                                      name=ix.name))
+                  for src, df, ix in loaded]
+    kcols = ["mid"] if registry is not None else keys
+
+    if how == "left":
+        index = loaded[0][2]
+    elif how == "outer":
+        index = loaded[0][2]
+        for _, _, ix in loaded[1:]:
+            index = index.append(ix[~ix.isin(index)])
+    else:
+        raise ValueError(f"[{tag}] how inválido: {how}")
+
+    # chaves saem com o tipo original da fonte (coalescidas como carry); o índice só normaliza
+    out: Dict[str, object] = {}
+    carry = [c for c in carry if c not in kcols]
+    joined: List[str] = []
+    for j, (src, df, ix) in enumerate(loaded):
+        take = np.arange(len(index)) if (j == 0 and how == "left") else ix.get_indexer(index)
+        miss = take < 0
+        cols = src.columns if src.columns is not None else df.columns
+        for c in list(kcols) + [c for c in cols if c not in kcols]:
+            if c in ("home_id", "away_id") or c not in df.columns or (c == "mid" and c not in kcols):
+                continue
+            vals = pd.api.extensions.take(df[c].array, take, allow_fill=True)
+            if c in carry or c in kcols:
+                if c in out:
+                    prev = pd.Series(out[c])
+                    out[c] = prev.where(prev.notna(), pd.Series(vals)).array
+                else:
+                    out[c] = vals
+                continue
+            name = f"{src.prefix}{c}"
+            if name in out:
+                name = f"{name}_{src.name}"
+            out[name] = vals
+        joined.append(src.name)
+        if miss.all() and how == "left" and len(index):
+            _warn(tag, f"{src.name}: nenhuma chave em comum com a base")
+
+    if registry is not None:
+        out["mid"] = np.asarray(out["mid"], dtype=np.int32)
+    wide = pd.DataFrame(out)
+    wide.attrs["joined"] = joined
+    return wide
+
+
+def load_spec(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            import yaml
+            return yaml.safe_load(f) or {}
+        return json.load(f)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Join de features em uma passada (lista declarativa de fontes)")
+    ap.add_argument("--spec", required=True, help="YAML/JSON com keys, how, carry e sources")
+    ap.add_argument("--out", required=True, help="saída .csv ou .parquet")
+    ap.add_argument("--format", choices=["csv", "parquet"], default=None, help="força o formato da saída")
+    args = ap.parse_args(argv)
+
+    spec = load_spec(args.spec)
+    sources = [Source.from_dict(s) for s in spec.get("sources", [])]
+    try:
+        wide = join_sources(sources, keys=spec.get("keys", ["match_id"]), how=spec.get("how", "left"),
+                            carry=spec.get("carry", []))
+    except RuntimeError as ex:
+        print(f"::error::{ex}", file=sys.stderr)
+        return 2
+    out = write_frame(wide, args.out, args.format)
+    print(f"[join] OK -> {out} ({len(wide)} linhas, {wide.shape[1]} colunas; fontes: {', '.join(wide.attrs['joined'])})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -7,7 +7,9 @@ Regra:
 - Obrigatório: matches_whitelist.csv
 - Pelo menos UM entre: features_univariado.csv, features_bivariado.csv, features_xg.csv
 - Opcional (mas se existirem são incorporados): weather.csv, news.csv
-- Saída: {OUT_DIR}/context_features.csv (com match_id, team_home, team_away sempre presentes)
+- Saída: {OUT_DIR}/context_features.csv (com match_id, team_home, team_away sempre presentes);
+  --format parquet grava context_features.parquet
+- Join em uma passada (scripts/feature_join.py): cada fonte é alinhada ao match_id da whitelist
 """
 
 import os
@@ -15,6 +17,11 @@ import sys
 import argparse
 import pandas as pd
 
+try:
+    from scripts.feature_join import Source, join_sources, write_frame
+except ImportError:
+    from feature_join import Source, join_sources, write_frame
+
 EXIT_CODE = 28
 
 REQ_FEATURE_FILES = [
@@ -26,21 +33,6 @@ REQ_FEATURE_FILES = [
 def eprint(*a, **k):
     print(*a, file=sys.stderr, **k)
 
-def read_csv_safe(path: str, required=False, err_code=EXIT_CODE):
-    if not os.path.isfile(path) or os.path.getsize(path) == 0:
-        if required:
-            eprint(f"::error::Arquivo obrigatório ausente/vazio: {path}")
-            sys.exit(err_code)
-        return None
-    try:
-        return pd.read_csv(path)
-    except Exception as ex:
-        if required:
-            eprint(f"::error::Falha ao ler {path}: {ex}")
-            sys.exit(err_code)
-        eprint(f"[join] aviso ao ler {path}: {ex}")
-        return None
-
 def normalize_teams(df, home_col="home", away_col="away"):
     cols = {c.lower(): c for c in df.columns}
     home = cols.get("team_home") or cols.get("home")
@@ -53,82 +45,59 @@ def normalize_teams(df, home_col="home", away_col="away"):
         df = df.rename(columns={away: "team_away"})
     return df
 
+def news_count(news: pd.DataFrame) -> pd.DataFrame:
+    # compacta num score simples: número de artigos
+    if "articles_json" in news.columns:
+        news["_news_count"] = news["articles_json"].fillna("[]").apply(lambda s: len(eval(s)) if isinstance(s, str) else 0)
+    elif "articles" in news.columns:
+        news["_news_count"] = news["articles"].fillna("[]").apply(lambda s: len(eval(s)) if isinstance(s, str) else 0)
+    else:
+        news["_news_count"] = 0
+    return news
+
+def context_sources(out_dir: str):
+    """Fontes do contexto, na ordem do join (a whitelist define as linhas)."""
+    path = lambda f: os.path.join(out_dir, f)
+    wl = Source(path("matches_whitelist.csv"), required=True, transform=normalize_teams,
+                columns=["team_home", "team_away"])
+    feats = [Source(path(f), transform=normalize_teams) for f in REQ_FEATURE_FILES]
+    weather = Source(path("weather.csv"), transform=lambda d: d.drop(columns=[c for c in ("home", "away") if c in d.columns]))
+    news = Source(path("news.csv"), transform=news_count, columns=["_news_count", "updated_at"])
+    return wl, feats, [weather, news]
+
 def main():
     p = argparse.ArgumentParser()
     p.add_argument("--rodada", required=True, help="Diretório da rodada (OUT_DIR)")
+    p.add_argument("--format", choices=["csv", "parquet"], default="csv", help="formato de context_features")
     p.add_argument("--debug", action="store_true")
     args = p.parse_args()
 
     out_dir = args.rodada
     os.makedirs(out_dir, exist_ok=True)
 
-    wl_path = os.path.join(out_dir, "matches_whitelist.csv")
-    wl = read_csv_safe(wl_path, required=True)
-    wl = normalize_teams(wl)
-    # mantém colunas essenciais
-    base = wl[["match_id", "team_home", "team_away"]].copy()
-
-    # Carrega features disponíveis
-    feats = base.copy()
-    any_feature = False
-    for fname in REQ_FEATURE_FILES:
-        path = os.path.join(out_dir, fname)
-        df = read_csv_safe(path, required=False)
-        if df is None:
-            continue
-        # normaliza chaves
-        if "match_id" not in df.columns:
-            # tenta inferir
-            maybe = [c for c in df.columns if c.lower() == "match_id"]
-            if maybe:
-                df = df.rename(columns={maybe[0]: "match_id"})
-        df = normalize_teams(df)
-        # evita colisão de colunas duplicadas
-        for c in ["team_home", "team_away"]:
-            if c in df.columns and c not in feats.columns:
-                pass
-        # junta
-        feats = feats.merge(df.drop_duplicates(subset=["match_id"]), on=["match_id", "team_home", "team_away"], how="left", suffixes=("", f"_{fname.split('.')[0]}"))
-        any_feature = True
-
-    if not any_feature:
+    # whitelist + features (univariado/bivariado/xg) + weather/news opcionais: um join só,
+    # alinhado ao match_id da whitelist; team_home/team_away coalescidos entre as fontes
+    wl, feat_sources, extra = context_sources(out_dir)
+    try:
+        feats = join_sources([wl] + feat_sources + extra, keys=["match_id"], how="left",
+                             carry=["team_home", "team_away"], tag="context")
+    except RuntimeError as ex:
+        eprint(f"::error::{ex}")
+        sys.exit(EXIT_CODE)
+
+    feature_names = {s.name for s in feat_sources}
+    if not feature_names.intersection(feats.attrs["joined"]):
         eprint("::error::Nenhuma feature encontrada (esperado ao menos uma entre univariado/bivariado/xg).")
         sys.exit(EXIT_CODE)
 
-    # Weather (opcional)
-    weather_path = os.path.join(out_dir, "weather.csv")
-    weather = read_csv_safe(weather_path, required=False)
-    if weather is not None and "match_id" in weather.columns:
-        weather_cols = [c for c in weather.columns if c not in {"home","away"}]
-        feats = feats.merge(weather[["match_id"] + weather_cols].drop_duplicates("match_id"),
-                            on="match_id", how="left")
-
-    # News (opcional)
-    news_path = os.path.join(out_dir, "news.csv")
-    news = read_csv_safe(news_path, required=False)
-    if news is not None:
-        # compacta num score simples: número de artigos
-        if "articles_json" in news.columns:
-            news["_news_count"] = news["articles_json"].fillna("[]").apply(lambda s: len(eval(s)) if isinstance(s, str) else 0)
-        elif "articles" in news.columns:
-            news["_news_count"] = news["articles"].fillna("[]").apply(lambda s: len(eval(s)) if isinstance(s, str) else 0)
-        else:
-            news["_news_count"] = 0
-        keep = ["match_id", "_news_count"]
-        if "updated_at" in news.columns:
-            keep.append("updated_at")
-        news_small = news[keep].drop_duplicates("match_id")
-        feats = feats.merge(news_small, on="match_id", how="left")
-
-    out_csv = os.path.join(out_dir, "context_features.csv")
-    feats.to_csv(out_csv, index=False)
-
-    if os.path.getsize(out_csv) == 0:
-        eprint("::error::context_features.csv não gerado")
+    out_path = write_frame(feats, os.path.join(out_dir, "context_features.csv"), args.format)
+
+    if os.path.getsize(out_path) == 0:
+        eprint(f"::error::{os.path.basename(out_path)} não gerado")
         sys.exit(EXIT_CODE)
 
     if args.debug:
-        eprint(f"[context] OK gerado: {out_csv}  linhas={len(feats)}")
+        eprint(f"[context] OK gerado: {out_path}  linhas={len(feats)}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -8,7 +8,9 @@ Gera:
   2) features_xg.csv         – proxies simples de xG por jogo (sem dados de chutes)
 
 ENTRADA:
-- data/out/<rodada>/features_univariado.csv  (obrigatória)
+- features univariadas calculadas em memória (features_univariado.build_features sobre
+  predictions_market.csv/odds_consensus.csv); sem as odds de origem, lê
+  data/out/<rodada>/features_univariado.csv
   colunas mínimas esperadas:
     match_key,home,away,
     fair_p_home,fair_p_draw,fair_p_away,
@@ -47,8 +49,14 @@ import csv
 import os
 from typing import Tuple
 
+import numpy as np
 import pandas as pd
 
+try:
+    from scripts.features_univariado import load_or_build
+except ImportError:
+    from features_univariado import load_or_build
+
 
 def log(msg: str, debug: bool = False):
     if debug:
@@ -68,12 +76,13 @@ def resolve_out_dir(rodada_arg: str) -> str:
 
 
 def load_univariado(out_dir: str, debug: bool = False) -> pd.DataFrame:
-    fp = os.path.join(out_dir, "features_univariado.csv")
-    if not os.path.isfile(fp):
+    # features univariadas em memória (mesmo cálculo do features_univariado.py, sem reler o CSV)
+    try:
+        df = load_or_build(out_dir, debug)
+    except FileNotFoundError:
+        fp = os.path.join(out_dir, "features_univariado.csv")
         raise FileNotFoundError(f"[bivariado-xg] Arquivo não encontrado: {fp}")
 
-    df = pd.read_csv(fp)
-
     # Normaliza nomes/colunas esperadas
     need = [
         "match_key", "home", "away",
@@ -109,60 +118,41 @@ def load_univariado(out_dir: str, debug: bool = False) -> pd.DataFrame:
     return df
 
 
-def compute_bivariado_row(r: pd.Series) -> dict:
-    ph = float(r.get("fair_p_home"))
-    pd_ = float(r.get("fair_p_draw"))
-    pa = float(r.get("fair_p_away"))
-
-    over = float(r.get("overround"))
-    ent = float(r.get("entropy_bits"))
-
-    vh = float(r.get("value_home", 0.0))
-    va = float(r.get("value_away", 0.0))
-
-    diff_ph_pa = ph - pa
-    ratio_ph_pa = ph / (pa + 1e-9)
-
-    diff_fair = ph - pa
-    gap_val = vh - va
-
-    entropy_x_gap = ent * abs(diff_fair)
-    overround_x_entropy = over * ent
-
-    return {
-        "match_key": r.get("match_key"),
-        "home": r.get("home"),
-        "away": r.get("away"),
-        "diff_ph_pa": diff_ph_pa,
-        "ratio_ph_pa": ratio_ph_pa,
-        "diff_fair_home_away": diff_fair,
-        "gap_value_home_away": gap_val,
-        "entropy_x_gap": entropy_x_gap,
-        "overround_x_entropy": overround_x_entropy,
-    }
-
-
-def compute_xg_row(r: pd.Series) -> dict:
+def compute_bivariado(df: pd.DataFrame) -> pd.DataFrame:
+    """Métricas bivariadas da tabela inteira (colunas NumPy)."""
+    ph = df["fair_p_home"].to_numpy(dtype=float)
+    pa = df["fair_p_away"].to_numpy(dtype=float)
+    over = df["overround"].to_numpy(dtype=float)
+    ent = df["entropy_bits"].to_numpy(dtype=float)
+    diff = ph - pa
+    return pd.DataFrame({
+        "match_key": df["match_key"].values,
+        "home": df["home"].values,
+        "away": df["away"].values,
+        "diff_ph_pa": diff,
+        "ratio_ph_pa": ph / (pa + 1e-9),
+        "diff_fair_home_away": diff,
+        "gap_value_home_away": df["value_home"].to_numpy(dtype=float) - df["value_away"].to_numpy(dtype=float),
+        "entropy_x_gap": ent * np.abs(diff),
+        "overround_x_entropy": over * ent,
+    })
+
+
+def compute_xg(df: pd.DataFrame) -> pd.DataFrame:
     """
     Proxy xG simples parametrizado para reproduzir saídas utilizadas no pipeline:
       soma xg_home_proxy + xg_away_proxy = 1.6
       xg_diff_proxy = 1.6 * (fair_p_home - fair_p_away)
     """
-    ph = float(r.get("fair_p_home"))
-    pa = float(r.get("fair_p_away"))
-
-    xg_diff = 1.6 * (ph - pa)
-    xg_home = 0.8 + xg_diff / 2.0
-    xg_away = 0.8 - xg_diff / 2.0
-
-    return {
-        "match_key": r.get("match_key"),
-        "home": r.get("home"),
-        "away": r.get("away"),
-        "xg_home_proxy": xg_home,
-        "xg_away_proxy": xg_away,
+    xg_diff = 1.6 * (df["fair_p_home"].to_numpy(dtype=float) - df["fair_p_away"].to_numpy(dtype=float))
+    return pd.DataFrame({
+        "match_key": df["match_key"].values,
+        "home": df["home"].values,
+        "away": df["away"].values,
+        "xg_home_proxy": 0.8 + xg_diff / 2.0,
+        "xg_away_proxy": 0.8 - xg_diff / 2.0,
         "xg_diff_proxy": xg_diff,
-    }
+    })
 
 
 def main():
@@ -176,23 +166,13 @@ def main():
     df_u = load_univariado(out_dir, args.debug)
 
     # ---------- bivariado ----------
-    biv_rows = [compute_bivariado_row(r) for _, r in df_u.iterrows()]
-    df_biv = pd.DataFrame(biv_rows, columns=[
-        "match_key", "home", "away",
-        "diff_ph_pa", "ratio_ph_pa",
-        "diff_fair_home_away", "gap_value_home_away",
-        "entropy_x_gap", "overround_x_entropy",
-    ])
+    df_biv = compute_bivariado(df_u)
 
     biv_path = os.path.join(out_dir, "features_bivariado.csv")
     df_biv.to_csv(biv_path, index=False, quoting=csv.QUOTE_MINIMAL)
 
     # ---------- xg proxies ----------
-    xg_rows = [compute_xg_row(r) for _, r in df_u.iterrows()]
-    df_xg = pd.DataFrame(xg_rows, columns=[
-        "match_key", "home", "away",
-        "xg_home_proxy", "xg_away_proxy", "xg_diff_proxy",
-    ])
+    df_xg = compute_xg(df_u)
 
     xg_path = os.path.join(out_dir, "features_xg.csv")
     df_xg.to_csv(xg_path, index=False, quoting=csv.QUOTE_MINIMAL)
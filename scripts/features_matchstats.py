@@ -1,16 +1,20 @@
 # scripts/features_matchstats.py
 # Coleta estatísticas de jogos (via API-Football / RapidAPI) e salva features por jogo
 from __future__ import annotations
-import argparse, os, requests
+import argparse, os
 import pandas as pd
 from pathlib import Path
 
+try:
+    from scripts.afb_http import get_client
+except ImportError:
+    from afb_http import get_client
+
 API_HOST = "api-football-v1.p.rapidapi.com"
 API_URL = f"https://{API_HOST}/v3/fixtures"
 
-def fetch_stats(fixture_id: int, headers: dict) -> dict:
-    url = f"https://{API_HOST}/v3/fixtures/statistics?fixture={fixture_id}"
-    r = requests.get(url, headers=headers, timeout=30)
+def fetch_stats(fixture_id: int, client) -> dict:
+    r = client.request("/fixtures/statistics", {"fixture": fixture_id})
     if r.status_code != 200:
         return {}
     data = r.json().get("response", [])
@@ -42,11 +46,11 @@ def main():
     if not key:
         raise RuntimeError("[matchstats] RAPIDAPI_KEY ausente nos Secrets.")
 
-    headers = {"X-RapidAPI-Key": key, "X-RapidAPI-Host": API_HOST}
+    client = get_client(key, API_HOST)
     rows = []
     for _, r in matches.iterrows():
         fid = int(r["fixture_id"])
-        stats = fetch_stats(fid, headers)
+        stats = fetch_stats(fid, client)
         row = {"match_id": r["match_id"], "home": r["home"], "away": r["away"], **stats}
         rows.append(row)
 
@@ -54,6 +58,7 @@ def main():
     out_path = base / "matchstats.csv"
     df.to_csv(out_path, index=False)
     print(f"[matchstats] OK -> {out_path}")
+    client.print_stats("matchstats")
 
 if __name__ == "__main__":
     main()
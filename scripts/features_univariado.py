@@ -27,12 +27,17 @@ has_probs,has_all_odds
 
 import argparse
 import csv
-import math
 import os
 from typing import Tuple
 
+import numpy as np
 import pandas as pd
 
+try:
+    from scripts.devig import devig
+except ImportError:
+    from devig import devig
+
 
 def log(msg: str, debug: bool = False):
     if debug:
@@ -63,105 +68,118 @@ def build_match_key(home: str, away: str) -> str:
     return f"{h}__vs__{a}"
 
 
-def implied(odd: float) -> float:
-    try:
-        odd = float(odd)
-        return 0.0 if odd <= 0 else 1.0 / odd
-    except Exception:
-        return float("nan")
-
-
-def entropy_bits(p_home: float, p_draw: float, p_away: float) -> float:
-    vals = [p_home, p_draw, p_away]
-    e = 0.0
-    for p in vals:
-        if p is None or not (p > 0.0):
-            continue
-        e -= p * math.log2(p)
-    return e
-
+OUT_COLUMNS = [
+    "match_key",
+    "home", "away",
+    "odd_home", "odd_draw", "odd_away",
+    "imp_home", "imp_draw", "imp_away",
+    "overround",
+    "fair_p_home", "fair_p_draw", "fair_p_away",
+    "gap_home_away", "gap_top_second",
+    "logit_imp_home", "logit_imp_draw", "logit_imp_away",
+    "fav_label", "entropy_bits",
+    "value_home", "value_draw", "value_away",
+    "has_probs", "has_all_odds",
+]
+# índice argmax (casa, empate, fora) -> fav_label
+_FAV_CODE = np.array([1, 0, 2])
+
+
+def implied_fair(odds) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    odds (n, 3) casa/empate/fora -> (implícitas, overround, fair); fair = devig.devig multiplicativo.
+    Odd <= 0 vale implícita 0 (como no cálculo por linha); odd ausente/inválida mascara a linha
+    inteira (NaN), assim como soma de implícitas <= 0.
+    """
+    O = np.asarray(odds, dtype=float).reshape(-1, 3)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        imp = np.where(O > 0, 1.0 / O, np.where(np.isnan(O), np.nan, 0.0))
+    s = imp.sum(axis=1)
+    ok = s > 0  # NaN -> False
+    imp = np.where(ok[:, None], imp, np.nan)
+    over = np.where(ok, s, np.nan)
+    fair = devig(O, method="multiplicative")
+    # devig descarta linhas com odd <= 1; aqui odd <= 0 conta como implícita 0: normaliza direto
+    edge = ok & np.isnan(fair).any(axis=1)
+    fair[edge] = imp[edge] / over[edge, None]
+    return imp, over, fair
+
+
+def compute_features(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Features univariadas da tabela inteira de odds, colunar (uma passada numpy).
+    Entrada: match_key, home, away, odd_home, odd_draw, odd_away[, has_probs, has_all_odds].
+    Saída: DataFrame tipado com OUT_COLUMNS (fav_label Int64 com <NA> quando falta odd).
+    """
+    n = len(df)
+    col = lambda c: df[c] if c in df.columns else pd.Series([pd.NA] * n, index=df.index, dtype=object)
+    O = np.column_stack([pd.to_numeric(col(c), errors="coerce").to_numpy(dtype=float)
+                         for c in ("odd_home", "odd_draw", "odd_away")]) if n else np.empty((0, 3))
+    imp, over, fair = implied_fair(O)
+    valid = ~np.isnan(fair).any(axis=1)
+
+    # top vs second e favorito (empate de valores -> primeira classe, como no sort estável)
+    srt = np.sort(np.where(valid[:, None], fair, 0.0), axis=1)
+    gap_top_second = np.where(valid, srt[:, 2] - srt[:, 1], np.nan)
+    fav = pd.array(_FAV_CODE[np.argmax(np.where(valid[:, None], fair, 0.0), axis=1)], dtype="Int64")
+    fav[~valid] = pd.NA
 
-def safe_logit(p: float) -> float:
-    # logit(p) = ln(p / (1-p)) com estabilização
     eps = 1e-9
-    try:
-        p = float(p)
-    except Exception:
-        return float("nan")
-    p = max(eps, min(1.0 - eps, p))
-    return math.log(p / (1.0 - p))
-
-
-def compute_from_odds_row(home: str, away: str, odd_h: float, odd_d: float, odd_a: float) -> dict:
-    # probabilidades implícitas
-    imp_h = implied(odd_h)
-    imp_d = implied(odd_d)
-    imp_a = implied(odd_a)
-    s_imp = imp_h + imp_d + imp_a
-
-    # overround (soma de implícitas)
-    over = s_imp if s_imp > 0 else float("nan")
-
-    # probabilidades "justas" (normalizadas)
-    if s_imp > 0:
-        fair_h = imp_h / s_imp
-        fair_d = imp_d / s_imp
-        fair_a = imp_a / s_imp
-    else:
-        fair_h = fair_d = fair_a = float("nan")
-
-    # gaps/métricas simples
-    gap_home_away = (fair_h - fair_a) if (not math.isnan(fair_h) and not math.isnan(fair_a)) else float("nan")
-
-    # top vs second para margem
-    probs = [("home", fair_h), ("draw", fair_d), ("away", fair_a)]
-    probs_sorted = sorted(probs, key=lambda x: x[1] if x[1] == x[1] else -1, reverse=True)  # NaN fica por último
-    if all(not math.isnan(v[1]) for v in probs_sorted):
-        top = probs_sorted[0][1]
-        second = probs_sorted[1][1]
-        gap_top_second = top - second
-        fav_label = {"home": 1, "draw": 0, "away": 2}[probs_sorted[0][0]]
-    else:
-        gap_top_second = float("nan")
-        fav_label = ""
-
-    # logits das implícitas (antes de normalizar)
-    logit_h = safe_logit(imp_h / s_imp) if s_imp > 0 else float("nan")
-    logit_d = safe_logit(imp_d / s_imp) if s_imp > 0 else float("nan")
-    logit_a = safe_logit(imp_a / s_imp) if s_imp > 0 else float("nan")
-
-    # entropia das fair probs
-    ent = entropy_bits(fair_h, fair_d, fair_a)
-
-    # (placeholders) value bets – podem ser calculadas quando houver projeções próprias
-    value_home = 0.0
-    value_draw = 0.0
-    value_away = 0.0
-
-    return {
-        "home": home,
-        "away": away,
-        "odd_home": odd_h,
-        "odd_draw": odd_d,
-        "odd_away": odd_a,
-        "imp_home": imp_h if s_imp > 0 else float("nan"),
-        "imp_draw": imp_d if s_imp > 0 else float("nan"),
-        "imp_away": imp_a if s_imp > 0 else float("nan"),
+    pc = np.clip(fair, eps, 1.0 - eps)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        logit = np.log(pc / (1.0 - pc))
+        ent = -np.where(fair > 0, fair * np.log2(np.where(fair > 0, fair, 1.0)), 0.0).sum(axis=1)
+    ent = np.where(valid, ent, np.nan)
+
+    flag = lambda c: pd.to_numeric(col(c), errors="coerce").fillna(0).astype("int64").to_numpy()
+    out = pd.DataFrame({
+        "match_key": col("match_key").fillna("").astype(str).str.strip().to_numpy(),
+        "home": col("home").fillna("").astype(str).str.strip().to_numpy(),
+        "away": col("away").fillna("").astype(str).str.strip().to_numpy(),
+        "odd_home": O[:, 0], "odd_draw": O[:, 1], "odd_away": O[:, 2],
+        "imp_home": imp[:, 0], "imp_draw": imp[:, 1], "imp_away": imp[:, 2],
         "overround": over,
-        "fair_p_home": fair_h,
-        "fair_p_draw": fair_d,
-        "fair_p_away": fair_a,
-        "gap_home_away": gap_home_away,
+        "fair_p_home": fair[:, 0], "fair_p_draw": fair[:, 1], "fair_p_away": fair[:, 2],
+        "gap_home_away": fair[:, 0] - fair[:, 2],
         "gap_top_second": gap_top_second,
-        "logit_imp_home": logit_h,
-        "logit_imp_draw": logit_d,
-        "logit_imp_away": logit_a,
-        "fav_label": fav_label,
+        "logit_imp_home": logit[:, 0], "logit_imp_draw": logit[:, 1], "logit_imp_away": logit[:, 2],
+        "fav_label": fav,
         "entropy_bits": ent,
-        "value_home": value_home,
-        "value_draw": value_draw,
-        "value_away": value_away,
-    }
+        # (placeholders) value bets – podem ser calculadas quando houver projeções próprias
+        "value_home": np.zeros(n), "value_draw": np.zeros(n), "value_away": np.zeros(n),
+        "has_probs": flag("has_probs"), "has_all_odds": flag("has_all_odds"),
+    })
+    return out[OUT_COLUMNS]
+
+
+def build_features(rodada: str, debug: bool = False) -> pd.DataFrame:
+    """Odds da rodada (predictions_market.csv ou odds_consensus.csv) -> features univariadas, em memória."""
+    out_dir = resolve_out_dir(rodada)
+    src = load_market_first(out_dir, debug)
+    out_df = compute_features(src)
+    # ordena por entropia (jogos "mais definidos" primeiro) apenas para visual
+    out_df = out_df.sort_values(by=["entropy_bits"], ascending=True, na_position="last").reset_index(drop=True)
+    out_df.attrs["source"] = src.attrs.get("source", "")
+    return out_df
+
+
+def load_or_build(rodada: str, debug: bool = False) -> pd.DataFrame:
+    """
+    Para os estágios seguintes: calcula em memória a partir das odds; se a rodada só tiver
+    o features_univariado.csv já gravado (sem as odds de origem), lê o CSV.
+    df.attrs["source"] = arquivo efetivamente lido (odds de origem ou o CSV gravado).
+    """
+    out_dir = resolve_out_dir(rodada)
+    try:
+        return build_features(out_dir, debug)
+    except FileNotFoundError:
+        fp = os.path.join(out_dir, "features_univariado.csv")
+        if not os.path.isfile(fp):
+            raise
+        log(f"odds de origem ausentes; lendo {fp}", debug)
+        df = pd.read_csv(fp)
+        df.attrs["source"] = fp
+        return df
 
 
 def load_market_first(out_dir: str, debug: bool = False) -> pd.DataFrame:
@@ -219,7 +237,9 @@ def load_market_first(out_dir: str, debug: bool = False) -> pd.DataFrame:
         for k in keep:
             if k not in df.columns:
                 df[k] = pd.NA
-        return df[keep].copy()
+        out = df[keep].copy()
+        out.attrs["source"] = fp_market
+        return out
 
     # fallback: consensus
     fp_cons = os.path.join(out_dir, "odds_consensus.csv")
@@ -270,7 +290,9 @@ def load_market_first(out_dir: str, debug: bool = False) -> pd.DataFrame:
     for k in keep:
         if k not in dfc.columns:
             dfc[k] = pd.NA
-    return dfc[keep].copy()
+    out = dfc[keep].copy()
+    out.attrs["source"] = fp_cons
+    return out
 
 
 def main():
@@ -281,43 +303,7 @@ def main():
     args = ap.parse_args()
 
     out_dir = resolve_out_dir(args.rodada)
-    df_base = load_market_first(out_dir, args.debug)
-
-    rows = []
-    for _, r in df_base.iterrows():
-        mk = str(r.get("match_key", "") or "").strip()
-        home = norm_team(r.get("home"))
-        away = norm_team(r.get("away"))
-        oh = r.get("odd_home")
-        od = r.get("odd_draw")
-        oa = r.get("odd_away")
-
-        # calcula features a partir das odds
-        feats = compute_from_odds_row(home, away, oh, od, oa)
-        feats["match_key"] = mk
-
-        # flags/auxiliares
-        feats["has_probs"] = int(r.get("has_probs", 0)) if pd.notna(r.get("has_probs", pd.NA)) else 0
-        feats["has_all_odds"] = int(r.get("has_all_odds", 0)) if pd.notna(r.get("has_all_odds", pd.NA)) else 0
-
-        rows.append(feats)
-
-    out_df = pd.DataFrame(rows, columns=[
-        "match_key",
-        "home", "away",
-        "odd_home", "odd_draw", "odd_away",
-        "imp_home", "imp_draw", "imp_away",
-        "overround",
-        "fair_p_home", "fair_p_draw", "fair_p_away",
-        "gap_home_away", "gap_top_second",
-        "logit_imp_home", "logit_imp_draw", "logit_imp_away",
-        "fav_label", "entropy_bits",
-        "value_home", "value_draw", "value_away",
-        "has_probs", "has_all_odds",
-    ])
-
-    # ordena por entropia (jogos "mais definidos" primeiro) apenas para visual
-    out_df = out_df.sort_values(by=["entropy_bits"], ascending=True, na_position="last").reset_index(drop=True)
+    out_df = build_features(out_dir, args.debug)
 
     out_path = os.path.join(out_dir, "features_univariado.csv")
     out_df.to_csv(out_path, index=False, quoting=csv.QUOTE_MINIMAL)
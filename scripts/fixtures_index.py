@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fixtures_index.py
+Índice em memória das páginas /fixtures?date=... da API-Football.
+
+Cada combinação (data, filtros) é baixada uma única vez por execução; os nomes
+dos times são normalizados na carga. As buscas (home, away, data±janela) são
+respondidas da memória:
+  1) bloco = jogos das datas da janela (já filtrados por liga/temporada/país)
+  2) igualdade exata dos nomes normalizados (hash)
+  3) senão, fuzzy em lote (rapidfuzz.process.cdist) só dentro do bloco
+
+Para alinhar uma lista inteira de jogos de uma vez, match_fixtures monta a matriz de
+similaridade N×M (cdist, blocada por data) e resolve uma atribuição 1-para-1
+(scipy.optimize.linear_sum_assignment): nenhum jogo do provedor é usado duas vezes.
+
+Uso:
+  idx = FixturesIndex(lambda params: client.get_json("/fixtures", params).get("response", []))
+  hit = idx.find("Flamengo", "Palmeiras", "2025-09-27", window=2, min_score=85)
+  if hit: fixture_id, score, entry = hit
+  hits = idx.assign([("Flamengo", "Palmeiras", "2025-09-27"), ...], window=2, min_score=85)
+  # {posição na lista: (fixture_id, score, entry)}
+"""
+
+from __future__ import annotations
+
+import threading
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from rapidfuzz import fuzz, process
+from scipy.optimize import linear_sum_assignment
+
+Fetch = Callable[[Dict[str, Any]], List[dict]]
+
+
+def _default_norm(s: str) -> str:
+    return " ".join(str(s or "").lower().split())
+
+
+def _as_date(d) -> date:
+    if isinstance(d, datetime):
+        return d.date()
+    if isinstance(d, date):
+        return d
+    s = str(d).replace("Z", "").replace("+00:00", "")
+    return datetime.fromisoformat(s).date() if "T" in s or " " in s else date.fromisoformat(s[:10])
+
+
+def _combine(a: np.ndarray, b: np.ndarray, how: str) -> np.ndarray:
+    if how == "min":
+        return np.minimum(a, b)
+    if how == "sum":
+        return a + b
+    return np.floor((a + b) / 2)
+
+
+def score_matrix(lh: Sequence[str], la: Sequence[str], rh: Sequence[str], ra: Sequence[str],
+                 scorer=fuzz.token_set_ratio, combine: str = "mean", swapped: bool = False) -> np.ndarray:
+    """Similaridade jogo×jogo (nomes já normalizados) numa passada vetorizada por lado."""
+    def cd(a, b):
+        return process.cdist(a, b, scorer=scorer, dtype=np.float32).astype(float)
+    S = _combine(cd(lh, rh), cd(la, ra), combine)
+    if swapped:
+        S = np.maximum(S, _combine(cd(lh, ra), cd(la, rh), combine))
+    return S
+
+
+def match_fixtures(left: Sequence[Tuple[str, str]], right: Sequence[Tuple[str, str]],
+                   left_days: Optional[Sequence] = None, right_days: Optional[Sequence] = None,
+                   window: int = 0, min_score: float = 0, scorer=fuzz.token_set_ratio,
+                   combine: str = "mean", swapped: bool = False,
+                   norm: Optional[Callable[[str], str]] = None) -> List[Tuple[int, int, float]]:
+    """
+    Alinha jogos (home, away) de `left` com os de `right` num único passo.
+    - com datas, só pares com |dia_left - dia_right| <= window são pontuados (cdist por bloco de dia)
+    - atribuição 1-para-1 que maximiza o score total; pares abaixo de min_score são descartados
+    Retorna [(i_left, j_right, score)] ordenado por i_left.
+    """
+    n, m = len(left), len(right)
+    if not n or not m:
+        return []
+    f = norm or (lambda x: x)
+    lh = [f(h) for h, _ in left]
+    la = [f(a) for _, a in left]
+    rh = [f(h) for h, _ in right]
+    ra = [f(a) for _, a in right]
+    S = np.full((n, m), -1.0)
+    if left_days is None or right_days is None:
+        S[:] = score_matrix(lh, la, rh, ra, scorer, combine, swapped)
+    else:
+        ld = np.array([_as_date(d).toordinal() for d in left_days])
+        rd = np.array([_as_date(d).toordinal() for d in right_days])
+        for d in np.unique(ld):
+            rows = np.flatnonzero(ld == d)
+            cols = np.flatnonzero(np.abs(rd - d) <= abs(window))
+            if len(cols):
+                S[np.ix_(rows, cols)] = score_matrix(
+                    [lh[i] for i in rows], [la[i] for i in rows],
+                    [rh[j] for j in cols], [ra[j] for j in cols], scorer, combine, swapped)
+    valid = S >= max(min_score, 0)
+    ri, ci = linear_sum_assignment(np.where(valid, S, -1.0), maximize=True)
+    return [(int(i), int(j), float(S[i, j])) for i, j in zip(ri, ci) if valid[i, j]]
+
+
+class FixturesIndex:
+    """
+    fetch(params) -> lista crua de fixtures (campo "response" da API).
+    norm: normalizador de nomes do chamador (mantém a semântica de cada módulo).
+    """
+
+    def __init__(self, fetch: Fetch, norm: Callable[[str], str] = _default_norm):
+        self.fetch = fetch
+        self.norm = norm
+        self.pages: Dict[Tuple, List[dict]] = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, it: dict) -> dict:
+        teams = it.get("teams") or {}
+        league = it.get("league") or {}
+        home = str((teams.get("home") or {}).get("name", "") or "")
+        away = str((teams.get("away") or {}).get("name", "") or "")
+        return {
+            "id": (it.get("fixture") or {}).get("id"),
+            "date": str((it.get("fixture") or {}).get("date") or "")[:10],
+            "home": home, "away": away,
+            "home_n": self.norm(home), "away_n": self.norm(away),
+            "league": league.get("id"), "season": league.get("season"), "country": league.get("country"),
+            "raw": it,
+        }
+
+    def page(self, day, **filters) -> List[dict]:
+        """Jogos de um dia (com filtros da API, ex.: league/season/country), baixados uma vez."""
+        d = _as_date(day).isoformat()
+        params = {"date": d, **{k: v for k, v in filters.items() if v is not None}}
+        key = tuple(sorted((k, str(v)) for k, v in params.items()))
+        with self._lock:
+            hit = self.pages.get(key)
+        if hit is not None:
+            return hit
+        entries = [self._entry(it) for it in (self.fetch(params) or [])]
+        with self._lock:
+            self.pages.setdefault(key, entries)
+        return entries
+
+    def block(self, day, window: int = 0, only_season: Optional[int] = None, **filters) -> List[dict]:
+        """Candidatos da janela ±window; `only_season` filtra localmente (sem nova página)."""
+        d0 = _as_date(day)
+        out = []
+        for off in range(-abs(window), abs(window) + 1):
+            for e in self.page(d0 + timedelta(days=off), **filters):
+                if only_season is not None and e["season"] and int(e["season"]) != int(only_season):
+                    continue
+                out.append(e)
+        return out
+
+    def find(self, home: str, away: str, day, window: int = 0, min_score: float = 0,
+             scorer=fuzz.token_set_ratio, combine: str = "mean", swapped: bool = False,
+             exact: bool = False, only_season: Optional[int] = None,
+             **filters) -> Optional[Tuple[int, float, dict]]:
+        """
+        Melhor fixture para (home, away) na janela. Retorna (fixture_id, score, entry) ou None.
+        - combine: "mean" ((s_home+s_away)/2), "min" ou "sum"
+        - swapped: também testa mando invertido
+        - exact: só aceita igualdade dos nomes normalizados
+        Em empate de score vence o primeiro do bloco (ordem de data/página), como nas buscas antigas.
+        """
+        cands = self.block(day, window, only_season=only_season, **filters)
+        if not cands:
+            return None
+        hn, an = self.norm(home), self.norm(away)
+        for e in cands:
+            if e["home_n"] == hn and e["away_n"] == an and e["id"] is not None:
+                return int(e["id"]), 100.0 if combine != "sum" else 200.0, e
+        if exact:
+            return None
+
+        H = [e["home_n"] for e in cands]
+        A = [e["away_n"] for e in cands]
+        sh = process.cdist([hn], H, scorer=scorer)[0].astype(float)
+        sa = process.cdist([an], A, scorer=scorer)[0].astype(float)
+        score = _combine(sh, sa, combine)
+        if swapped:
+            xh = process.cdist([hn], A, scorer=scorer)[0].astype(float)
+            xa = process.cdist([an], H, scorer=scorer)[0].astype(float)
+            score = np.maximum(score, _combine(xh, xa, combine))
+        i = int(np.argmax(score))
+        if score[i] < min_score or cands[i]["id"] is None:
+            return None
+        return int(cands[i]["id"]), float(score[i]), cands[i]
+
+    def assign(self, queries: Sequence[Tuple[str, str, Any]], window: int = 0, min_score: float = 0,
+               scorer=fuzz.token_set_ratio, combine: str = "mean", swapped: bool = False,
+               only_season: Optional[int] = None, exclude: Iterable[int] = (),
+               **filters) -> Dict[int, Tuple[int, float, dict]]:
+        """
+        Versão em lote de find: queries = [(home, away, dia)], um fixture por query no máximo
+        e nenhum fixture repetido (nem os de `exclude`). Retorna {i: (fixture_id, score, entry)}.
+        """
+        if not queries:
+            return {}
+        skip = {int(x) for x in exclude}
+        seen, cands = set(), []
+        for d in sorted({_as_date(q[2]) for q in queries}):
+            for e in self.block(d, window, only_season=only_season, **filters):
+                if e["id"] is None or int(e["id"]) in skip or int(e["id"]) in seen or not e["date"]:
+                    continue
+                seen.add(int(e["id"]))
+                cands.append(e)
+        pairs = match_fixtures(
+            [(self.norm(h), self.norm(a)) for h, a, _ in queries],
+            [(e["home_n"], e["away_n"]) for e in cands],
+            left_days=[q[2] for q in queries], right_days=[e["date"] for e in cands],
+            window=window, min_score=min_score, scorer=scorer, combine=combine, swapped=swapped)
+        return {i: (int(cands[j]["id"]), s, cands[j]) for i, j, s in pairs}
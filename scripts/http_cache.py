@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+http_cache.py
+Cache persistente (SQLite) de respostas HTTP da API-Football.
+
+Chave = endpoint + parâmetros normalizados (ordenados, valores como texto).
+TTL por classe de endpoint (ver TTLS): times/estádios/ligas por dias,
+fixtures por horas, odds por minutos. Só respostas 200 sem "errors" entram.
+/fixtures com algum jogo ainda não encerrado (NS, 1H, HT, PST...) fica só LIVE_TTL:
+status pré-jogo não pode chegar à ingestão de resultados.
+
+Variáveis de ambiente:
+  AFB_CACHE=0           desliga o cache
+  AFB_CACHE_PATH        arquivo SQLite (padrão data/cache/http_cache.sqlite)
+  AFB_CACHE_OFFLINE=1   serve qualquer entrada (mesmo expirada) e nunca vai à rede
+
+Invalidação explícita:
+  python -m scripts.http_cache --clear                 # tudo
+  python -m scripts.http_cache --clear --endpoint /fixtures
+  python -m scripts.http_cache --stats
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_PATH = Path("data/cache/http_cache.sqlite")
+
+MINUTE, HOUR, DAY = 60, 3600, 86400
+# (prefixo do endpoint, ttl em segundos) — o prefixo mais longo vence
+TTLS: List[Tuple[str, int]] = [
+    ("/teams/statistics", 12 * HOUR),
+    ("/teams", 7 * DAY),
+    ("/venues", 30 * DAY),
+    ("/leagues", 7 * DAY),
+    ("/countries", 30 * DAY),
+    ("/standings", 6 * HOUR),
+    ("/fixtures/headtohead", 1 * DAY),
+    ("/fixtures/lineups", 15 * MINUTE),
+    ("/fixtures/statistics", 6 * HOUR),
+    ("/fixtures", 3 * HOUR),
+    ("/injuries", 1 * HOUR),
+    ("/odds", 10 * MINUTE),
+]
+DEFAULT_TTL = 1 * HOUR
+LIVE_TTL = 5 * MINUTE
+# status finais da API-Football: placar não muda mais
+FINAL_STATUS = {"FT", "AET", "PEN", "CANC", "ABD", "AWD", "WO"}
+
+
+def ttl_for(path: str) -> int:
+    best = None
+    for prefix, ttl in TTLS:
+        if path.startswith(prefix) and (best is None or len(prefix) > len(best[0])):
+            best = (prefix, ttl)
+    return best[1] if best else DEFAULT_TTL
+
+
+def _body_ttl(path: str, js: Any) -> Optional[int]:
+    """TTL específico da resposta (None = ttl_for). /fixtures com jogo não final -> LIVE_TTL."""
+    if "/" + path.strip("/") != "/fixtures" or not isinstance(js, dict):
+        return None
+    for item in js.get("response") or []:
+        status = (((item or {}).get("fixture") or {}).get("status") or {}).get("short")
+        if status not in FINAL_STATUS:
+            return LIVE_TTL
+    return None
+
+
+def cache_key(path: str, params: Optional[Dict[str, Any]] = None) -> str:
+    norm = sorted((str(k), str(v).strip()) for k, v in (params or {}).items() if v is not None)
+    return "/" + path.lstrip("/") + "?" + "&".join(f"{k}={v}" for k, v in norm)
+
+
+class ResponseCache:
+    """Tabela única (key, endpoint, stored_at, body, ttl). Thread-safe: uma conexão, usada sob o lock."""
+
+    def __init__(self, path=None, offline: Optional[bool] = None):
+        self.path = Path(path or os.environ.get("AFB_CACHE_PATH") or DEFAULT_PATH)
+        self.offline = (os.environ.get("AFB_CACHE_OFFLINE", "") == "1") if offline is None else offline
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # conexão única (autocommit) compartilhada entre threads; todo acesso passa por self._lock
+        self._con = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False,
+                                    isolation_level=None)
+        with self._lock:
+            self._con.execute("CREATE TABLE IF NOT EXISTS responses ("
+                              "key TEXT PRIMARY KEY, endpoint TEXT, stored_at REAL, body BLOB, ttl REAL)")
+            self._con.execute("CREATE INDEX IF NOT EXISTS ix_endpoint ON responses(endpoint)")
+            cols = {r[1] for r in self._con.execute("PRAGMA table_info(responses)")}
+            if "ttl" not in cols:  # arquivos criados antes da coluna ttl
+                self._con.execute("ALTER TABLE responses ADD COLUMN ttl REAL")
+
+    def close(self):
+        with self._lock:
+            if self._con is not None:
+                self._con.close()
+                self._con = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Optional[bytes]:
+        key = cache_key(path, params)
+        with self._lock:
+            row = self._con.execute("SELECT stored_at, body, ttl FROM responses WHERE key=?", (key,)).fetchone()
+            ttl = (row[2] if row is not None and row[2] is not None else ttl_for(key))
+            fresh = row is not None and (self.offline or time.time() - row[0] <= ttl)
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return row[1] if fresh else None
+
+    def put(self, path: str, params: Optional[Dict[str, Any]], body: bytes):
+        try:
+            js = json.loads(body)
+        except ValueError:
+            return
+        if isinstance(js, dict) and js.get("errors"):
+            return  # erro de cota/parâmetro: não cachear
+        key = cache_key(path, params)
+        with self._lock:
+            self._con.execute("INSERT OR REPLACE INTO responses (key, endpoint, stored_at, body, ttl) "
+                              "VALUES (?,?,?,?,?)",
+                              (key, key.split("?", 1)[0], time.time(), body, _body_ttl(path, js)))
+
+    def invalidate(self, endpoint: Optional[str] = None) -> int:
+        """Remove tudo ou só um endpoint (prefixo, ex.: '/fixtures'). Retorna quantas linhas saíram."""
+        with self._lock:
+            if endpoint is None:
+                cur = self._con.execute("DELETE FROM responses")
+            else:
+                cur = self._con.execute("DELETE FROM responses WHERE endpoint LIKE ?",
+                                  ("/" + endpoint.lstrip("/") + "%",))
+            return cur.rowcount
+
+    def summary(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._con.execute("SELECT endpoint, COUNT(*) FROM responses GROUP BY endpoint").fetchall()
+        return {ep: int(n) for ep, n in rows}
+
+
+def default_cache() -> Optional[ResponseCache]:
+    """Cache configurado pelo ambiente; None se AFB_CACHE=0."""
+    if os.environ.get("AFB_CACHE", "1") == "0":
+        return None
+    return ResponseCache()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Gerencia o cache HTTP da API-Football.")
+    ap.add_argument("--path", default=None)
+    ap.add_argument("--clear", action="store_true", help="invalida entradas")
+    ap.add_argument("--endpoint", default=None, help="restringe --clear a um endpoint (prefixo)")
+    ap.add_argument("--stats", action="store_true", help="lista entradas por endpoint")
+    args = ap.parse_args(argv)
+
+    with ResponseCache(args.path) as cache:
+        if args.clear:
+            n = cache.invalidate(args.endpoint)
+            print(f"[http_cache] {n} entradas removidas de {cache.path}")
+        if args.stats or not args.clear:
+            for ep, n in sorted(cache.summary().items()):
+                print(f"[http_cache] {ep}: {n} (ttl {ttl_for(ep)}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
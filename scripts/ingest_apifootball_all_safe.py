@@ -24,7 +24,7 @@ import pandas as pd
 from typing import List, Dict, Any
 from scripts.apifoot_client import (
     fixtures_by_date, odds_by_fixture, lineups_by_fixture, injuries_by_date_league,
-    h2h, standings, teams_stats, fixture_stats, sleep_rl
+    h2h, standings, teams_stats, fixture_stats
 )
 
 REQ_COLUMNS = ["home","away"]  # opcional: league_id,date
@@ -125,7 +125,6 @@ def main():
             date_str = r["date"] if has_date_col else args.date
 
             fx_all = fixtures_by_date(date_str, league_id, int(args.season), debug=args.debug).get("response", [])
-            sleep_rl()
             if not fx_all:
                 continue
             fx = best_fixture_match(fx_all, home, away)
@@ -149,7 +148,6 @@ def main():
             })
 
             od = odds_by_fixture(fixture_id, debug=args.debug).get("response", [])
-            sleep_rl()
             for book in od:
                 for b in book.get("bookmakers", []):
                     for m in b.get("bets", []):
@@ -168,7 +166,6 @@ def main():
                                 odds_rows.append(kv)
 
             lu = lineups_by_fixture(fixture_id, debug=args.debug).get("response", [])
-            sleep_rl()
             for side in lu:
                 lineups_rows.append({
                     "fixture_id": fixture_id,
@@ -180,7 +177,6 @@ def main():
                 })
 
             inj = injuries_by_date_league(date_str, league_id, int(args.season), debug=args.debug).get("response", [])
-            sleep_rl()
             for it in inj:
                 inj_rows.append({
                     "league_id": league_id,
@@ -194,7 +190,6 @@ def main():
                 })
 
             hh = h2h(team_home_id, team_away_id, debug=args.debug).get("response", [])
-            sleep_rl()
             for g in hh[:10]:
                 h2h_rows.append({
                     "home": g["teams"]["home"]["name"],
@@ -210,7 +205,6 @@ def main():
                 key = (league_id, tid)
                 if key not in seen_tstats:
                     ts = teams_stats(league_id, int(args.season), tid, debug=args.debug).get("response", {})
-                    sleep_rl()
                     if ts:
                         tstats_rows.append({
                             "league_id": league_id,
@@ -227,7 +221,6 @@ def main():
                     seen_tstats.add(key)
 
             fs = fixture_stats(fixture_id, debug=args.debug).get("response", [])
-            sleep_rl()
             for side in fs:
                 stats = {s["type"]: s["value"] for s in side.get("statistics", [])}
                 fstats_rows.append({
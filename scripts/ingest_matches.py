@@ -2,7 +2,7 @@ from __future__ import annotations
 import argparse
 import pandas as pd
 from pathlib import Path
-from utils_team_aliases import load_aliases, normalize_team
+from utils_team_aliases import normalize_team
 
 def main():
     ap = argparse.ArgumentParser(description="Ingest de partidas para a rodada")
@@ -22,9 +22,8 @@ def main():
     if not need.issubset(df.columns):
         raise RuntimeError("[ingest_matches] matches_source.csv sem colunas necessárias (match_id, home, away).")
 
-    alias_map = load_aliases()
-    df["home"] = df["home"].astype(str).apply(lambda x: normalize_team(x, alias_map))
-    df["away"] = df["away"].astype(str).apply(lambda x: normalize_team(x, alias_map))
+    df["home"] = df["home"].astype(str).apply(normalize_team)
+    df["away"] = df["away"].astype(str).apply(normalize_team)
 
     out = base_out / "matches.csv"
     df.to_csv(out, index=False)
@@ -112,7 +112,7 @@ def _to_html_table(df: pd.DataFrame) -> str:
 # Main
 # --------------------------
 
-def main():
+def main(argv=None):
     ap = argparse.ArgumentParser()
     ap.add_argument("--rodada", required=True)
     ap.add_argument("--provider", default="auto")
@@ -122,7 +122,7 @@ def main():
     ap.add_argument("--limit", type=int, default=6)
     ap.add_argument("--aliases", default="data/aliases_br.json")
     ap.add_argument("--debug", action="store_true")
-    args = ap.parse_args()
+    args = ap.parse_args(argv)
 
     outdir = f"data/out/{args.rodada}"
     os.makedirs(outdir, exist_ok=True)
@@ -21,10 +21,10 @@ PROVIDERS = [
     # futuramente: ("odds_apifootball.csv", "apifootball")
 ]
 
-def main():
+def main(argv=None):
     ap = argparse.ArgumentParser()
     ap.add_argument("--rodada", required=True)
-    args = ap.parse_args()
+    args = ap.parse_args(argv)
 
     out_dir = Path(f"data/out/{args.rodada}")
     out_dir.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ingest_odds_async.py
+Coleta concorrente (asyncio) de odds 1X2 em vários provedores, sport keys, regiões e páginas.
+
+Cada requisição é um job; os jobs rodam em paralelo sob um limite de concorrência
+por provedor (asyncio.Semaphore) e as respostas paginadas enfileiram as páginas
+seguintes assim que a primeira chega. As linhas normalizadas (formato longo, um
+preço por bookmaker/resultado) são gravadas em disco à medida que cada resposta
+chega, então uma interrupção perto do prazo não perde o que já foi coletado.
+
+Provedores (ativados pela presença da chave):
+  theoddsapi   THEODDS_API_KEY/THEODDSAPI_KEY  -> sport keys × regiões
+  apifootball  RAPIDAPI_KEY (scripts/afb_http) -> /odds?date=D, todas as páginas
+  sportmonks   SPORTMONKS_API_KEY              -> /fixtures/between com include=odds, todas as páginas
+
+Saída: data/out/<rodada>/odds_long.csv
+  provider,sport,region,event_id,commence_time,home,away,bookmaker,outcome,price,last_update,fetched_at
+e, por provedor que rodou, data/out/<rodada>/odds_<provedor>.csv no formato lido pelo
+consensus_odds_safe (mediana entre bookmakers por jogo):
+  team_home,team_away,odds_home,odds_draw,odds_away,commence_time
+
+Exemplo:
+  python scripts/ingest_odds_async.py --rodada 2025-09-27_1213 --regions uk,eu \
+      --sports soccer_brazil_campeonato,soccer_brazil_serie_b --days 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from scripts.afb_http import get_client
+    from scripts import odds_store
+except ImportError:
+    from afb_http import get_client
+    import odds_store
+
+COLUMNS = ["provider", "sport", "region", "event_id", "commence_time", "home", "away",
+           "bookmaker", "outcome", "price", "last_update", "fetched_at"]
+WIDE_COLUMNS = ["team_home", "team_away", "odds_home", "odds_draw", "odds_away", "commence_time"]
+
+ODDS_API = "https://api.the-odds-api.com/v4"
+SPORTMONKS_API = "https://api.sportmonks.com/v3/football"
+DEFAULT_SPORTS = "soccer_brazil_campeonato,soccer_brazil_serie_b"
+LIMITS = {"theoddsapi": 4, "apifootball": 4, "sportmonks": 2}
+
+Rows = List[Dict[str, Any]]
+
+
+@dataclass
+class Job:
+    """Uma requisição: `run()` devolve (linhas normalizadas, jobs seguintes p/ paginação)."""
+    provider: str
+    label: str
+    run: Callable[[], Tuple[Rows, List["Job"]]] = field(repr=False)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+
+
+def _session(pool: int = 8) -> requests.Session:
+    s = requests.Session()
+    s.mount("https://", HTTPAdapter(pool_connections=pool, pool_maxsize=pool))
+    return s
+
+
+class LongWriter:
+    """CSV em formato longo com append incremental (thread-safe, flush a cada lote)."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = open(path, "w", newline="", encoding="utf-8")
+        self._w = csv.DictWriter(self._fh, fieldnames=COLUMNS, extrasaction="ignore")
+        self._w.writeheader()
+        self._lock = threading.Lock()
+        self.rows = 0
+
+    def write(self, rows: Rows):
+        if not rows:
+            return
+        with self._lock:
+            self._w.writerows(rows)
+            self._fh.flush()
+            self.rows += len(rows)
+
+    def close(self):
+        self._fh.close()
+
+
+# ---------------- TheOddsAPI ----------------
+def _outcome_label(name: str, home: str, away: str) -> Optional[str]:
+    n = (name or "").strip().lower()
+    if n in ("home", "1") or n == home.strip().lower():
+        return "1"
+    if n in ("away", "2") or n == away.strip().lower():
+        return "2"
+    if n in ("draw", "tie", "empate", "x"):
+        return "X"
+    return None
+
+
+def theoddsapi_rows(events: List[dict], region: str, fetched_at: str) -> Rows:
+    rows = []
+    for ev in events or []:
+        home, away = str(ev.get("home_team") or ""), str(ev.get("away_team") or "")
+        for bk in ev.get("bookmakers") or []:
+            for mk in bk.get("markets") or []:
+                if (mk.get("key") or "").lower() != "h2h":
+                    continue
+                for o in mk.get("outcomes") or []:
+                    lab = _outcome_label(str(o.get("name", "")), home, away)
+                    if lab is None or o.get("price") is None:
+                        continue
+                    rows.append({
+                        "provider": "theoddsapi", "sport": ev.get("sport_key", ""), "region": region,
+                        "event_id": ev.get("id", ""), "commence_time": ev.get("commence_time", ""),
+                        "home": home, "away": away, "bookmaker": bk.get("key") or bk.get("title", ""),
+                        "outcome": lab, "price": o.get("price"),
+                        "last_update": mk.get("last_update") or bk.get("last_update", ""),
+                        "fetched_at": fetched_at,
+                    })
+    return rows
+
+
+def theoddsapi_jobs(api_key: str, sports: List[str], regions: List[str]) -> List[Job]:
+    sess = _session()
+
+    def make(sport: str, region: str) -> Job:
+        def run():
+            r = sess.get(f"{ODDS_API}/sports/{sport}/odds", timeout=25,
+                         params={"apiKey": api_key, "regions": region, "markets": "h2h",
+                                 "oddsFormat": "decimal", "dateFormat": "iso"})
+            r.raise_for_status()
+            data = r.json()
+            return theoddsapi_rows(data if isinstance(data, list) else [], region, _now()), []
+        return Job("theoddsapi", f"{sport}/{region}", run)
+
+    return [make(s, r) for s in sports for r in regions]
+
+
+# ---------------- API-Football ----------------
+_AFB_LABEL = {"home": "1", "draw": "X", "away": "2"}
+
+
+def apifootball_rows(items: List[dict], fetched_at: str,
+                     teams: Optional[Dict[Any, Tuple[str, str]]] = None) -> Rows:
+    """/odds não traz os times: `teams` (fixture id -> (home, away)) vem de /fixtures do mesmo dia."""
+    rows = []
+    for it in items or []:
+        fx = it.get("fixture") or {}
+        league = it.get("league") or {}
+        home, away = (teams or {}).get(fx.get("id"), ("", ""))
+        for bk in it.get("bookmakers") or []:
+            for bet in bk.get("bets") or []:
+                if str(bet.get("name", "")).lower() != "match winner":
+                    continue
+                for v in bet.get("values") or []:
+                    lab = _AFB_LABEL.get(str(v.get("value", "")).lower())
+                    if lab is None:
+                        continue
+                    rows.append({
+                        "provider": "apifootball", "sport": league.get("id", ""), "region": "",
+                        "event_id": fx.get("id", ""), "commence_time": fx.get("date", ""),
+                        "home": home, "away": away, "bookmaker": bk.get("name", ""),
+                        "outcome": lab, "price": v.get("odd"),
+                        "last_update": it.get("update", ""), "fetched_at": fetched_at,
+                    })
+    return rows
+
+
+def apifootball_jobs(days: List[str], league: Optional[int] = None, season: Optional[int] = None) -> List[Job]:
+    client = get_client()
+    teams: Dict[str, Dict[Any, Tuple[str, str]]] = {}
+    locks: Dict[str, threading.Lock] = {}
+    guard = threading.Lock()
+
+    def fixture_teams(d: str) -> Dict[Any, Tuple[str, str]]:
+        # uma página /fixtures?date=D por dia na execução (e no cache HTTP), compartilhada pelas páginas de /odds
+        with guard:
+            lock = locks.setdefault(d, threading.Lock())
+        with lock:
+            if d not in teams:
+                params = {"date": d}
+                if league:
+                    params.update({"league": league, "season": season})
+                resp = client.get_json("/fixtures", params).get("response") or []
+                teams[d] = {(it.get("fixture") or {}).get("id"):
+                            (((it.get("teams") or {}).get("home") or {}).get("name") or "",
+                             ((it.get("teams") or {}).get("away") or {}).get("name") or "")
+                            for it in resp}
+        return teams[d]
+
+    def make(d: str, page: int) -> Job:
+        def run():
+            params = {"date": d, "page": page}
+            if league:
+                params.update({"league": league, "season": season})
+            js = client.get_json("/odds", params)
+            more = []
+            if page == 1:
+                total = int((js.get("paging") or {}).get("total") or 1)
+                more = [make(d, p) for p in range(2, total + 1)]
+            return apifootball_rows(js.get("response") or [], _now(), fixture_teams(d)), more
+        return Job("apifootball", f"{d}#p{page}", run)
+
+    return [make(d, 1) for d in days]
+
+
+# ---------------- Sportmonks ----------------
+_SM_LABEL = {"home": "1", "1": "1", "draw": "X", "x": "X", "away": "2", "2": "2"}
+
+
+def sportmonks_rows(fixtures: List[dict], fetched_at: str) -> Rows:
+    rows = []
+    for fx in fixtures or []:
+        home = away = ""
+        for p in fx.get("participants") or []:
+            loc = ((p.get("meta") or {}).get("location") or "").lower()
+            if loc == "home":
+                home = p.get("name", "")
+            elif loc == "away":
+                away = p.get("name", "")
+        for o in fx.get("odds") or []:
+            if o.get("market_id") != 1:
+                continue
+            lab = _SM_LABEL.get(str(o.get("label") or o.get("name") or "").lower())
+            if lab is None:
+                continue
+            rows.append({
+                "provider": "sportmonks", "sport": fx.get("league_id", ""), "region": "",
+                "event_id": fx.get("id", ""), "commence_time": fx.get("starting_at", ""),
+                "home": home, "away": away, "bookmaker": o.get("bookmaker_id", ""),
+                "outcome": lab, "price": o.get("value"),
+                "last_update": o.get("latest_bookmaker_update") or o.get("updated_at", ""),
+                "fetched_at": fetched_at,
+            })
+    return rows
+
+
+def sportmonks_jobs(api_key: str, date_from: str, date_to: str) -> List[Job]:
+    sess = _session(LIMITS["sportmonks"])
+
+    def make(page: int) -> Job:
+        def run():
+            r = sess.get(f"{SPORTMONKS_API}/fixtures/between/{date_from}/{date_to}", timeout=30,
+                         params={"api_token": api_key, "include": "participants;odds",
+                                 "filters": "markets:1", "page": page})
+            r.raise_for_status()
+            js = r.json()
+            more = [make(page + 1)] if (js.get("pagination") or {}).get("has_more") else []
+            return sportmonks_rows(js.get("data") or [], _now()), more
+        return Job("sportmonks", f"{date_from}..{date_to}#p{page}", run)
+
+    return [make(1)]
+
+
+# ---------------- motor ----------------
+async def run_jobs(jobs: List[Job], writer: LongWriter, limits: Dict[str, int] = LIMITS,
+                   debug: bool = False) -> Dict[str, Dict[str, int]]:
+    """Executa os jobs (e as páginas que eles gerarem) com limite por provedor."""
+    sems = {p: asyncio.Semaphore(max(1, n)) for p, n in limits.items()}
+    stats: Dict[str, Dict[str, int]] = {}
+
+    async def one(job: Job):
+        async with sems.setdefault(job.provider, asyncio.Semaphore(2)):
+            t0 = time.perf_counter()
+            rows, more = await asyncio.to_thread(job.run)
+        writer.write(rows)
+        if debug:
+            print(f"[odds_async][DEBUG] {job.provider} {job.label}: {len(rows)} linhas "
+                  f"({time.perf_counter() - t0:.2f}s)", flush=True)
+        return job, rows, more
+
+    pending = {asyncio.ensure_future(one(j)): j for j in jobs}
+    while pending:
+        done, _ = await asyncio.wait(list(pending), return_when=asyncio.FIRST_COMPLETED)
+        for fut in done:
+            job = pending.pop(fut)
+            st = stats.setdefault(job.provider, {"requests": 0, "rows": 0, "errors": 0})
+            st["requests"] += 1
+            try:
+                _, rows, more = fut.result()
+            except Exception as e:
+                st["errors"] += 1
+                print(f"::warning::[odds_async] {job.provider} {job.label} falhou: {e}", flush=True)
+                continue
+            st["rows"] += len(rows)
+            for m in more:
+                pending[asyncio.ensure_future(one(m))] = m
+    return stats
+
+
+def wide_by_provider(long: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """Formato longo -> um frame 1X2 por provedor (mediana entre bookmakers/regiões por jogo)."""
+    out: Dict[str, pd.DataFrame] = {}
+    df = long.assign(price=pd.to_numeric(long["price"], errors="coerce"))
+    df = df[(df["price"] > 1.0) & df["home"].fillna("").astype(str).str.strip().ne("")
+            & df["away"].fillna("").astype(str).str.strip().ne("")]
+    for prov, g in df.groupby("provider", sort=True):
+        wide = (g.pivot_table(index=["event_id", "home", "away", "commence_time"], columns="outcome",
+                              values="price", aggfunc="median")
+                 .reindex(columns=["1", "X", "2"]).dropna().reset_index().rename_axis(columns=None))
+        wide = wide.rename(columns={"home": "team_home", "away": "team_away",
+                                    "1": "odds_home", "X": "odds_draw", "2": "odds_away"})
+        out[prov] = wide.drop_duplicates(["team_home", "team_away"])[WIDE_COLUMNS]
+    return out
+
+
+def _days(start: date, n: int) -> List[str]:
+    return [(start + timedelta(days=i)).isoformat() for i in range(max(1, n))]
+
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Coleta concorrente de odds 1X2 (formato longo).")
+    ap.add_argument("--rodada", required=True)
+    ap.add_argument("--providers", default="theoddsapi,apifootball,sportmonks")
+    ap.add_argument("--sports", default=DEFAULT_SPORTS, help="sport keys do TheOddsAPI")
+    ap.add_argument("--regions", default="uk,eu,us,au")
+    ap.add_argument("--days", type=int, default=3, help="dias a partir de --start (API-Football/Sportmonks)")
+    ap.add_argument("--start", default=None, help="data inicial ISO (padrão: hoje UTC)")
+    ap.add_argument("--league", type=int, default=None, help="filtra a liga na API-Football")
+    ap.add_argument("--season", type=int, default=None)
+    ap.add_argument("--limit", action="append", default=[], metavar="PROV=N",
+                    help="concorrência por provedor, ex.: --limit theoddsapi=8")
+    ap.add_argument("--store", action="store_true", help="anexa a coleta ao armazém de snapshots (odds_store)")
+    ap.add_argument("--debug", action="store_true")
+    args = ap.parse_args(argv)
+
+    providers = {p.strip() for p in args.providers.split(",") if p.strip()}
+    limits = dict(LIMITS)
+    for spec in args.limit:
+        k, _, v = spec.partition("=")
+        limits[k.strip()] = int(v)
+    start = date.fromisoformat(args.start) if args.start else datetime.now(timezone.utc).date()
+    days = _days(start, args.days)
+
+    jobs: List[Job] = []
+    odds_key = os.environ.get("THEODDS_API_KEY") or os.environ.get("THEODDSAPI_KEY") or ""
+    if "theoddsapi" in providers and odds_key:
+        sports = [s.strip() for s in args.sports.split(",") if s.strip()]
+        regions = [r.strip() for r in args.regions.split(",") if r.strip()] or ["uk"]
+        jobs += theoddsapi_jobs(odds_key, sports, regions)
+    if "apifootball" in providers and get_client().key:
+        jobs += apifootball_jobs(days, args.league, args.season)
+    sm_key = os.environ.get("SPORTMONKS_API_KEY", "").strip()
+    if "sportmonks" in providers and sm_key:
+        jobs += sportmonks_jobs(sm_key, days[0], days[-1])
+    if not jobs:
+        print("::warning::[odds_async] nenhum provedor com chave configurada; nada a coletar", flush=True)
+
+    out = Path("data/out") / args.rodada / "odds_long.csv"
+    writer = LongWriter(out)
+    t0 = time.perf_counter()
+    try:
+        stats = asyncio.run(run_jobs(jobs, writer, limits, debug=args.debug))
+    finally:
+        writer.close()
+    for prov, st in sorted(stats.items()):
+        print(f"[odds_async] {prov}: {st['requests']} req, {st['rows']} linhas, {st['errors']} erros")
+    print(f"[odds_async] OK -> {out} ({writer.rows} linhas em {time.perf_counter() - t0:.1f}s)")
+    long = pd.read_csv(out, dtype={"outcome": str})
+    # arquivos por provedor lidos pelo consensus_odds_safe; só provedores que rodaram (não apaga os de outro ingest)
+    wide = wide_by_provider(long) if len(long) else {}
+    for prov, st in sorted(stats.items()):
+        if st["errors"] == st["requests"]:
+            continue
+        frame = wide.get(prov, pd.DataFrame(columns=WIDE_COLUMNS))
+        path = out.with_name(f"odds_{prov}.csv")
+        frame.to_csv(path, index=False)
+        print(f"[odds_async] {prov}: {len(frame)} jogos -> {path}")
+    if args.store and writer.rows:
+        path = odds_store.append(long, args.rodada)
+        print(f"[odds_async] snapshot -> {path}")
+
+
+if __name__ == "__main__":
+    main()
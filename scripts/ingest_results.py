@@ -1,29 +1,31 @@
 # scripts/ingest_results.py
 # Coleta resultados finais (placar e 1X2) via API-Football (RapidAPI) e salva data/out/<rodada>/results.csv
 from __future__ import annotations
-import argparse, os, time
+import argparse, os
 from pathlib import Path
 from typing import List, Dict, Any, Optional
-import requests
 import pandas as pd
 import numpy as np
 from rapidfuzz import fuzz
 
+try:
+    from scripts.afb_http import get_client
+    from scripts.fixtures_index import FixturesIndex
+    from scripts.rating_state import update_from_results
+except ImportError:
+    from afb_http import get_client
+    from fixtures_index import FixturesIndex
+    from rating_state import update_from_results
+
 API_HOST = "api-football-v1.p.rapidapi.com"
 API_BASE = f"https://{API_HOST}/v3"
 
 def api_get(path: str, params: dict, key: str, retries: int = 3, timeout=30) -> dict:
-    hdr = {"x-rapidapi-key": key, "x-rapidapi-host": API_HOST}
-    last = None
-    for i in range(retries):
-        r = requests.get(API_BASE + path, headers=hdr, params=params, timeout=timeout)
-        if r.status_code == 200:
-            return r.json()
-        last = (r.status_code, r.text[:300] if r.text else "")
-        # backoff para limites/erros transitórios
-        if r.status_code in (429, 500, 502, 503, 504):
-            time.sleep(2*(i+1))
-    raise RuntimeError(f"[results] GET {path} falhou: HTTP {last[0]} {last[1]}")
+    # backoff para limites/erros transitórios fica no cliente compartilhado
+    r = get_client(key, API_HOST).request(path, params, max_retries=max(0, retries-1), timeout=timeout)
+    if r.status_code == 200:
+        return r.json()
+    raise RuntimeError(f"[results] GET {path} falhou: HTTP {r.status_code} {r.text[:300] if r.text else ''}")
 
 def _norm(s: str) -> str:
     if not isinstance(s,str): return ""
@@ -37,31 +39,25 @@ def _winner_to_1x2(home_goals: int, away_goals: int) -> str:
     if home_goals < away_goals: return "2"
     return "X"
 
+_INDEXES: Dict[str, FixturesIndex] = {}
+
+def _fixtures_index(key: str) -> FixturesIndex:
+    if key not in _INDEXES:
+        _INDEXES[key] = FixturesIndex(lambda params: api_get("/fixtures", params, key).get("response", []), norm=_norm)
+    return _INDEXES[key]
+
 def find_fixture_id(date_iso: str, home: str, away: str, key: str, days_window: int = 2) -> Optional[int]:
-    """Busca fixture por data ±days_window e melhor pareamento de nomes."""
-    from datetime import datetime, timedelta
+    """Busca fixture por data ±days_window e melhor pareamento de nomes (páginas do dia em memória)."""
     try:
-        dt = datetime.fromisoformat(date_iso.replace("Z","").replace("+00:00",""))
-    except Exception:
+        hit = _fixtures_index(key).find(home, away, date_iso, window=days_window,
+                                        scorer=fuzz.token_sort_ratio, combine="sum")
+    except ValueError:
         return None
-    candidates = []
-    for off in range(-days_window, days_window+1):
-        d = (dt + timedelta(days=off)).date().isoformat()
-        js = api_get("/fixtures", {"date": d}, key)
-        for it in js.get("response", []):
-            t1 = _norm(it["teams"]["home"]["name"])
-            t2 = _norm(it["teams"]["away"]["name"])
-            score = fuzz.token_sort_ratio(_norm(home), t1) + fuzz.token_sort_ratio(_norm(away), t2)
-            candidates.append((score, it))
-    if not candidates:
-        return None
-    candidates.sort(key=lambda x: x[0], reverse=True)
-    best = candidates[0][1]
-    return best["fixture"]["id"]
+    return hit[0] if hit else None
 
 def _empty_results_df() -> pd.DataFrame:
     return pd.DataFrame(columns=[
-        "match_id","home","away","home_goals","away_goals","resultado","status","fixture_id"
+        "match_id","home","away","home_goals","away_goals","resultado","status","fixture_id","date"
     ])
 
 def main():
@@ -69,6 +65,7 @@ def main():
     ap.add_argument("--rodada", required=True)
     ap.add_argument("--days-window", type=int, default=2, help="Janela ±dias para casar fixture por data")
     ap.add_argument("--min-match", type=int, default=85, help="Similaridade mínima (RapidFuzz 0-100) para aceitar pareamento")
+    ap.add_argument("--no-ratings", action="store_true", help="não atualiza data/model/rating_state.json")
     args = ap.parse_args()
 
     key = os.environ.get("RAPIDAPI_KEY","").strip()
@@ -152,7 +149,8 @@ def main():
                 "away_goals": a,
                 "resultado": pick,
                 "status": st,
-                "fixture_id": fid
+                "fixture_id": fid,
+                "date": it["fixture"].get("date"),
             })
         except Exception:
             unresolved.append(mid)
@@ -167,6 +165,10 @@ def main():
     out.to_csv(base/"results.csv", index=False)
     print(f"[results] OK -> {base/'results.csv'}")
 
+    # ratings por time (Elo/pi/Poisson dinâmico): só os jogos novos, O(1) cada
+    if rows and not args.no_ratings:
+        update_from_results(out)
+
     if unresolved:
         print(f"[results] Aviso: não foi possível resolver match_id: {sorted(set(unresolved))} (pode ser jogo futuro ou data inconsistente)")
 
@@ -1,55 +1,54 @@
 from __future__ import annotations
 import argparse, os, time
-from datetime import datetime, timedelta
+from datetime import datetime
 from pathlib import Path
 import requests
 import pandas as pd
 from rapidfuzz import fuzz
 from utils_team_aliases import load_aliases, normalize_team
+from afb_http import get_client
+from fixtures_index import FixturesIndex, match_fixtures
 
 # ---------- API-Football (RapidAPI) ----------
 RAPIDAPI_HOST = "api-football-v1.p.rapidapi.com"
 AFB_BASE = f"https://{RAPIDAPI_HOST}/v3"
 
 def afb_get(path: str, params: dict) -> dict:
-    headers = {
-        "X-RapidAPI-Key": os.environ.get("RAPIDAPI_KEY", ""),
-        "X-RapidAPI-Host": RAPIDAPI_HOST,
-    }
-    r = requests.get(AFB_BASE + path, headers=headers, params=params, timeout=30)
+    r = get_client(os.environ.get("RAPIDAPI_KEY", ""), RAPIDAPI_HOST).request(path, params)
     if r.status_code != 200:
         raise RuntimeError(f"[apifootball] GET {path} HTTP {r.status_code}: {r.text[:300]}")
     return r.json()
 
-def afb_fixtures_by_date(d: str, country: str | None = None) -> list[dict]:
-    params = {"date": d}
-    if country:
-        params["country"] = country
-    return afb_get("/fixtures", params).get("response", [])
+# páginas (data, país) baixadas uma vez por execução; nomes comparados sem normalização extra
+_FIXTURES = FixturesIndex(lambda params: afb_get("/fixtures", params).get("response", []), norm=str)
 
-def afb_find_fixture_id(date_iso: str, home: str, away: str, season_year: int, days_window: int = 3, country_hint: str | None = None) -> int | None:
-    dt = datetime.fromisoformat(date_iso)
-    candidates = []
+def afb_find_fixture_id(date_iso: str, home: str, away: str, days_window: int = 3, country_hint: str | None = None) -> int | None:
+    # temporada sai da data (infer_season), como no lote
+    return afb_assign_fixture_ids([(home, away, date_iso)], days_window, country_hint)[0]
+
+def afb_assign_fixture_ids(queries: list[tuple[str, str, str]], days_window: int = 3,
+                           country_hint: str | None = None) -> list[int | None]:
+    """
+    fixture_id de cada (home, away, data): atribuição 1-para-1 por (país, temporada), melhor score entre países.
+    Falha numa chamada (página de dia/país) só perde aquela combinação; as demais mantêm os acertos.
+    """
     countries = [c.strip() for c in (country_hint or "").split(",") if c.strip()] or [None]
-    for off in range(-days_window, days_window+1):
-        dstr = (dt + timedelta(days=off)).date().isoformat()
+    best: dict[int, tuple[int, float]] = {}
+    by_season: dict[int, list[int]] = {}
+    for i, q in enumerate(queries):
+        by_season.setdefault(infer_season(q[2]), []).append(i)
+    for season, idx in by_season.items():
         for country in countries:
-            resp = afb_fixtures_by_date(dstr, country)
-            for fx in resp:
-                league = fx.get("league") or {}
-                season = league.get("season")
-                if season and int(season) != int(season_year):
-                    continue
-                teams = fx.get("teams") or {}
-                th = str(teams.get("home", {}).get("name",""))
-                ta = str(teams.get("away", {}).get("name",""))
-                score = max(min(fuzz.token_sort_ratio(home, th), fuzz.token_sort_ratio(away, ta)),
-                            min(fuzz.token_sort_ratio(home, ta), fuzz.token_sort_ratio(away, th)))
-                candidates.append((score, fx))
-    if not candidates:
-        return None
-    candidates.sort(key=lambda x: x[0], reverse=True)
-    return candidates[0][1].get("fixture", {}).get("id")
+            try:
+                hits = _FIXTURES.assign([queries[i] for i in idx], window=days_window, scorer=fuzz.token_sort_ratio,
+                                        combine="min", swapped=True, only_season=season, country=country)
+            except Exception as e:
+                print(f"::warning::[results] API-Football temporada {season} país {country or '-'} falhou: {e}")
+                continue
+            for k, (fid, score, _) in hits.items():
+                if idx[k] not in best or score > best[idx[k]][1]:
+                    best[idx[k]] = (fid, score)
+    return [best[i][0] if i in best else None for i in range(len(queries))]
 
 def afb_result_by_fixture(fid: int) -> tuple[int,int,str] | None:
     data = afb_get("/fixtures", {"ids": fid}).get("response", [])
@@ -124,21 +123,18 @@ def main():
     # ---------- API-Football pass ----------
     rows_afb = []
     missing_afb = []
-    for _, r in dfm.iterrows():
+    today = datetime.utcnow().date().isoformat()
+    dates = [str(d) if not pd.isna(d) else today for d in (dfm["date"] if "date" in dfm.columns else [None] * len(dfm))]
+    fids = afb_assign_fixture_ids(list(zip(dfm["home_n"], dfm["away_n"], dates)),
+                                  days_window=args.days_window, country_hint=args.country_hint)
+    for fid, (_, r) in zip(fids, dfm.iterrows()):
         mid = int(r["match_id"])
         home = r["home_n"]; away = r["away_n"]
-        date_iso = str(r["date"]) if "date" in r and not pd.isna(r["date"]) else datetime.utcnow().date().isoformat()
-        season = infer_season(date_iso)
-        try:
-            fid = afb_find_fixture_id(date_iso, home, away, season, days_window=args.days_window, country_hint=args.country_hint)
-        except Exception:
-            fid = None
         if fid is None:
             missing_afb.append(mid); continue
         try:
             res = afb_result_by_fixture(fid)
         except Exception:
-            time.sleep(0.4)
             res = None
         if res is None:
             missing_afb.append(mid)
@@ -146,11 +142,10 @@ def main():
         gh, ga, out = res
         rows_afb.append({"match_id": mid, "home": home, "away": away, "ft_home": gh, "ft_away": ga, "result": out})
 
-        time.sleep(0.25)
-
     df_afb = pd.DataFrame(rows_afb).sort_values("match_id")
     (base / "results_raw_apifootball.csv").write_text(df_afb.to_csv(index=False), encoding="utf-8")
     print(f"[results] API-Football OK: {len(df_afb)} resultados | faltando: {len(missing_afb)}")
+    get_client(os.environ.get("RAPIDAPI_KEY", ""), RAPIDAPI_HOST).print_stats("results")
 
     # ---------- TheOddsAPI pass (fallback) ----------
     rows_odds = []
@@ -164,42 +159,37 @@ def main():
                 cache_scores[sport] = []
             time.sleep(0.2)
 
-        for _, r in dfm[dfm["match_id"].isin(missing_afb)].iterrows():
-            mid = int(r["match_id"])
-            home = r["home_n"]; away = r["away_n"]
-            got = False
-            for sport, arr in cache_scores.items():
-                for g in arr:
-                    # normalizar nomes
-                    teams = g.get("teams") or []
-                    if len(teams) != 2:
-                        continue
-                    ht, at = teams[0], teams[1]
-                    # tentar mapear home/away coerente
-                    if g.get("home_team") == ht:
-                        t_home, t_away = ht, at
-                    else:
-                        t_home, t_away = at, ht
-                    s1 = max(min(fuzz.token_sort_ratio(home, t_home), fuzz.token_sort_ratio(away, t_away)),
-                             min(fuzz.token_sort_ratio(home, t_away), fuzz.token_sort_ratio(away, t_home)))
-                    if s1 < args.min_match:
-                        continue
-                    # precisa estar finalizado
-                    comm = g.get("completed", False)
-                    scores = g.get("scores") or {}
-                    sh = scores.get(t_home)
-                    sa = scores.get(t_away)
-                    try:
-                        gh = int(sh); ga = int(sa)
-                    except Exception:
-                        continue
-                    if gh > ga: out = "1"
-                    elif gh < ga: out = "2"
-                    else: out = "X"
-                    rows_odds.append({"match_id": mid, "home": home, "away": away, "ft_home": gh, "ft_away": ga, "result": out, "sport": sport, "completed": bool(comm)})
-                    got = True
-                    break
-                if got: break
+        # jogos finalizados com placar legível de todos os esportes -> uma matriz faltantes×jogos
+        games = []
+        for sport, arr in cache_scores.items():
+            for g in arr:
+                teams = g.get("teams") or []
+                if len(teams) != 2:
+                    continue
+                ht, at = teams[0], teams[1]
+                # tentar mapear home/away coerente
+                if g.get("home_team") == ht:
+                    t_home, t_away = ht, at
+                else:
+                    t_home, t_away = at, ht
+                scores = g.get("scores") or {}
+                try:
+                    gh = int(scores.get(t_home)); ga = int(scores.get(t_away))
+                except Exception:
+                    continue
+                games.append((sport, t_home, t_away, gh, ga, bool(g.get("completed", False))))
+
+        miss = dfm[dfm["match_id"].isin(missing_afb)]
+        pairs = match_fixtures(list(zip(miss["home_n"], miss["away_n"])), [(g[1], g[2]) for g in games],
+                               min_score=args.min_match, scorer=fuzz.token_sort_ratio, combine="min", swapped=True)
+        for i, j, _ in pairs:
+            r = miss.iloc[i]
+            sport, _, _, gh, ga, comm = games[j]
+            if gh > ga: out = "1"
+            elif gh < ga: out = "2"
+            else: out = "X"
+            rows_odds.append({"match_id": int(r["match_id"]), "home": r["home_n"], "away": r["away_n"],
+                              "ft_home": gh, "ft_away": ga, "result": out, "sport": sport, "completed": comm})
 
     df_odds = pd.DataFrame(rows_odds).sort_values("match_id")
     (base / "results_raw_oddsapi.csv").write_text(df_odds.to_csv(index=False), encoding="utf-8")
@@ -6,9 +6,15 @@ import argparse
 import pandas as pd
 import numpy as np
 
+try:
+    from scripts.feature_join import Source, join_sources, write_frame
+except ImportError:
+    from feature_join import Source, join_sources, write_frame
+
 def parse_args():
     ap = argparse.ArgumentParser()
     ap.add_argument("--rodada", required=True)
+    ap.add_argument("--format", choices=["csv","parquet"], default="csv", help="formato do features_base")
     return ap.parse_args()
 
 def to_str_id(s):
@@ -17,14 +23,12 @@ def to_str_id(s):
         return ""
     return str(s).strip()
 
-def load_matches(rodada):
-    f = f"data/in/{rodada}/matches_source.csv"
-    df = pd.read_csv(f)
+def prep_matches(df):
     # colunas mínimas
     req = ["match_id","home_team","away_team"]
     for c in req:
         if c not in df.columns:
-            raise ValueError(f"[join_features] Campo obrigatório ausente em {f}: {c}")
+            raise ValueError(f"[join_features] Campo obrigatório ausente em matches_source.csv: {c}")
     # campos úteis opcionais
     for c in ["league_name","country","kickoff_utc","season"]:
         if c not in df.columns:
@@ -36,13 +40,7 @@ def load_matches(rodada):
         df["kickoff_utc"] = pd.to_datetime(df["kickoff_utc"], utc=True, errors="coerce")
     return df
 
-def load_odds(rodada):
-    f = f"data/out/{rodada}/odds.csv"
-    if not os.path.exists(f):
-        # odds podem não existir ainda — retorna df vazio com colunas padrão
-        return pd.DataFrame(columns=["match_id","k1","kx","k2"])
-    df = pd.read_csv(f)
-
+def prep_odds(df):
     # padroniza match_id
     if "match_id" not in df.columns:
         df["match_id"] = ""
@@ -62,25 +60,20 @@ def load_odds(rodada):
             df[c] = pd.to_numeric(df[c], errors="coerce")
 
     # agrega por match_id (média de várias casas, se houver)
-    out = df.groupby("match_id", as_index=False).agg({"k1":"mean","kx":"mean","k2":"mean"})
-    return out
-
-def implied_probs_no_vig(k1, kx, k2):
-    # Converte odds decimais para prob. implícitas sem retirar vigorish
-    p1 = 1.0 / k1 if (k1 and k1 > 0) else np.nan
-    pX = 1.0 / kx if (kx and kx > 0) else np.nan
-    p2 = 1.0 / k2 if (k2 and k2 > 0) else np.nan
-    return p1, pX, p2
-
-def remove_vigorish(p1, pX, p2):
-    # Normaliza para somar 1 quando as três estiverem presentes
-    vec = np.array([p1, pX, p2], dtype=float)
-    if np.isnan(vec).any():
-        return p1, pX, p2
-    s = vec.sum()
-    if s <= 0:
-        return p1, pX, p2
-    return tuple(vec / s)
+    return df.groupby("match_id", as_index=False).agg({"k1":"mean","kx":"mean","k2":"mean"})
+
+def implied_probs(K):
+    """
+    Odds decimais (n, 3) -> (implícitas sem desvig, desvig). Odd ausente/<= 0 vira NaN; o desvig
+    (normalizar para somar 1) só quando as três estão presentes — senão fica a implícita.
+    """
+    K = np.asarray(K, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        raw = np.where(K > 0, 1.0 / K, np.nan)
+    s = raw.sum(axis=1, keepdims=True)
+    full = ~np.isnan(raw).any(axis=1, keepdims=True) & (s > 0)
+    with np.errstate(invalid="ignore"):
+        return raw, np.where(full, raw / s, raw)
 
 def main():
     args = parse_args()
@@ -88,27 +81,19 @@ def main():
     outdir = f"data/out/{rodada}"
     os.makedirs(outdir, exist_ok=True)
 
-    matches = load_matches(rodada)
-    odds = load_odds(rodada)
-
-    # faz o merge (sempre por string)
-    feats = matches.merge(odds[["match_id","k1","kx","k2"]], on="match_id", how="left")
-
-    # Probabilidades implícitas + desvig
-    p_cols = {"p1_raw":[],"pX_raw":[],"p2_raw":[],"p1":[],"pX":[],"p2":[]}
-    for _, r in feats.iterrows():
-        k1, kx, k2 = r.get("k1"), r.get("kx"), r.get("k2")
-        p1_raw, pX_raw, p2_raw = implied_probs_no_vig(k1, kx, k2)
-        p1, pX, p2 = remove_vigorish(p1_raw, pX_raw, p2_raw)
-        p_cols["p1_raw"].append(p1_raw)
-        p_cols["pX_raw"].append(pX_raw)
-        p_cols["p2_raw"].append(p2_raw)
-        p_cols["p1"].append(p1)
-        p_cols["pX"].append(pX)
-        p_cols["p2"].append(p2)
+    # matches (base) + odds agregadas por match_id: um join só, sempre por string
+    feats = join_sources([
+        Source(f"data/in/{rodada}/matches_source.csv", required=True, transform=prep_matches),
+        Source(f"{outdir}/odds.csv", transform=prep_odds, columns=["k1","kx","k2"]),
+    ], keys=["match_id"], how="left", tag="join_features")
+    for c in ["k1","kx","k2"]:
+        if c not in feats.columns:  # odds podem não existir ainda
+            feats[c] = np.nan
 
-    for k, v in p_cols.items():
-        feats[k] = v
+    # Probabilidades implícitas + desvig (todas as linhas de uma vez)
+    raw, fair = implied_probs(feats[["k1","kx","k2"]].to_numpy(dtype=float))
+    feats["p1_raw"], feats["pX_raw"], feats["p2_raw"] = raw[:, 0], raw[:, 1], raw[:, 2]
+    feats["p1"], feats["pX"], feats["p2"] = fair[:, 0], fair[:, 1], fair[:, 2]
 
     # Ordena e salva artefatos
     cols_first = ["match_id","country","league_name","season","kickoff_utc","home_team","away_team",
@@ -121,10 +106,10 @@ def main():
     feats_out   = f"{outdir}/features_base.csv"
 
     # matches.csv “limpo”
-    matches[["match_id","home_team","away_team","country","league_name","season","kickoff_utc"]].to_csv(matches_out, index=False)
-    feats[cols_final].to_csv(feats_out, index=False)
+    feats[["match_id","home_team","away_team","country","league_name","season","kickoff_utc"]].to_csv(matches_out, index=False)
+    feats_out = write_frame(feats[cols_final], feats_out, args.format)
 
-    print(f"[join_features] matches -> {matches_out} ({len(matches)} linhas)")
+    print(f"[join_features] matches -> {matches_out} ({len(feats)} linhas)")
     print(f"[join_features] features_base -> {feats_out} ({len(feats)} linhas)")
     print(f"[join_features] OK — rodada={rodada}")
 
@@ -3,6 +3,11 @@ import argparse, os, sys, math
 import pandas as pd
 import numpy as np
 
+try:
+    from scripts.match_registry import load_registry
+except ImportError:
+    from match_registry import load_registry
+
 def kelly_fraction(p, odds):
     # odds decimais -> b = odds-1
     b = odds - 1.0
@@ -34,7 +39,14 @@ def main():
     p = pd.read_csv(probs_file)
     o = pd.read_csv(cons_file)
 
-    df = p.merge(o[["team_home","team_away","odds_home","odds_draw","odds_away"]], on=["team_home","team_away"], how="inner")
+    # join pelo mid inteiro do registro da rodada (grafias diferentes do mesmo time casam);
+    # sem registro, pelos nomes dos times como antes
+    odds_cols = ["odds_home","odds_draw","odds_away"]
+    reg = load_registry(out_dir)
+    if reg is not None:
+        df = reg.join(p, o, how="inner", cols=odds_cols)
+    else:
+        df = p.merge(o[["team_home","team_away"] + odds_cols], on=["team_home","team_away"], how="inner")
 
     rows = []
     for _, r in df.iterrows():
@@ -2,7 +2,7 @@
 # -*- coding: utf-8 -*-
 """
 Gera recomendação de seco/duplo/triplo para Loteca a partir das probabilidades finais,
-priorizando duplos/triplos nos jogos mais incertos (maior entropia).
+escolhendo duplos/triplos pela DP exata que maximiza a chance de acertar o volante.
 
 Entrada (em data/out/<rodada>/), usa na ordem de preferência:
 - probabilities_calibrated.csv
@@ -26,6 +26,13 @@ import math
 import pandas as pd
 import numpy as np
 
+try:
+    from scripts.risk_utils import coverage_probs, hit_distribution
+    from scripts.plan_bet_opt import optimize_tickets
+except ImportError:
+    from risk_utils import coverage_probs, hit_distribution
+    from plan_bet_opt import optimize_tickets
+
 PREFS = ["probabilities_calibrated.csv","probabilities_blended.csv","probabilities.csv"]
 
 def _load_probs(out_dir: str) -> pd.DataFrame:
@@ -73,20 +80,25 @@ def main():
     df["entropy"] = df.apply(lambda r: _entropy_row(r["p1"], r["px"], r["p2"]), axis=1)
     df = df.sort_values("entropy", ascending=False).reset_index(drop=True)
 
-    # alocação: top 'triplos' recebem 1X2; próximos 'duplos' recebem os dois maiores; resto seco.
+    # alocação exata: DP escolhe quais jogos recebem triplo/duplo maximizando P(acertar todos)
+    P = df[["p1","px","p2"]].to_numpy(float)
+    P = np.clip(P, 0.0, None) / np.clip(P.sum(axis=1, keepdims=True), 1e-12, None)
+    best = optimize_tickets(P, args.duplos, args.triplos, top_k=1)
+    kinds = best[0]["kinds"] if best else np.ones(len(df), dtype=int)
+
     picks = []
     for i, r in df.iterrows():
         p = [("1", float(r["p1"])), ("X", float(r["px"])), ("2", float(r["p2"]))]
         p_sorted = sorted(p, key=lambda t: t[1], reverse=True)
 
-        if i < args.triplos:
+        if kinds[i] == 3:
             choice = "1X2"
             p_sucesso = sum(v for _,v in p)
-            detalhe = "triplo (maior incerteza)"
-        elif i < args.triplos + args.duplos:
+            detalhe = "triplo (maior ganho de cobertura)"
+        elif kinds[i] == 2:
             choice = "".join([p_sorted[0][0], p_sorted[1][0]])
             p_sucesso = p_sorted[0][1] + p_sorted[1][1]
-            detalhe = "duplo (incerteza intermediária)"
+            detalhe = "duplo (ganho de cobertura intermediário)"
         else:
             choice = p_sorted[0][0]
             p_sucesso = p_sorted[0][1]
@@ -106,16 +118,22 @@ def main():
     card_path = os.path.join(out_dir, "loteca_card.csv")
     card.to_csv(card_path, index=False, encoding="utf-8")
 
-    # probabilidade total do volante = produto das p_sucesso_jogo
-    p_total = float(np.prod(card["p_sucesso_jogo"].to_numpy()))
+    # distribuição exata de acertos do volante (Poisson-binomial sob independência)
+    idx_map = {"1":0, "X":1, "2":2}
+    ticket = [set(idx_map[c] for c in pk) for pk in card["pick"]]
+    dist = hit_distribution(coverage_probs(P, ticket))
+    # probabilidade total do volante = P(todos os acertos)
+    p_total = float(dist[-1])
     summary = {
         "rodada": args.rodada,
         "usou_arquivo_probs": used,
         "jogos": int(len(card)),
-        "triplos": int(min(args.triplos, len(card))),
-        "duplos": int(min(args.duplos, max(0, len(card)-args.triplos))),
-        "secos": int(max(0, len(card) - (args.triplos + args.duplos))),
+        "triplos": int((kinds == 3).sum()),
+        "duplos": int((kinds == 2).sum()),
+        "secos": int((kinds == 1).sum()),
         "prob_sucesso_bilhete": p_total,  # chance de acertar todos
+        "prob_erra_um": float(dist[-2]) if len(dist) > 1 else 0.0,
+        "dist_acertos": {str(k): float(v) for k, v in enumerate(dist)},
     }
     with open(os.path.join(out_dir, "loteca_summary.json"), "w", encoding="utf-8") as f:
         json.dump(summary, f, ensure_ascii=False, indent=2)
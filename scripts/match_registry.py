@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+match_registry.py
+Registro por rodada de IDs inteiros de jogo e de time, gravado ao lado do matches_whitelist.csv.
+
+  <OUT_DIR>/match_registry.csv   mid,match_id,match_key,team_home,team_away,home_id,away_id
+  <OUT_DIR>/team_registry.csv    team_id,team_key,team
+
+- team_id: um inteiro por chave canônica de time (scripts/team_resolver.team_key) —
+  "Atlético/MG", "Atletico Mineiro" e "atletico-mg" caem no mesmo id.
+- mid: um inteiro por jogo (par home_id, away_id), na ordem da whitelist; estável entre
+  execuções (o registro salvo é reaproveitado e só cresce).
+
+attach(df) acrescenta mid/home_id/away_id (int32) a qualquer tabela de estágio, casando por
+match_id, match_key ou pelo par de times — nessa ordem, só o que existir. Pares ainda não
+registrados recebem ids novos em memória, então os dois lados de um join concordam e não
+há chave nula. join() faz o merge pelo mid: hash join de inteiros no lugar de 1–3 colunas
+de texto, sem perder linhas por grafia diferente do mesmo time.
+
+Uso:
+  python scripts/match_registry.py --rodada data/out/<id>    # (re)gera a partir da whitelist
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scripts.team_resolver import team_key
+except ImportError:
+    from team_resolver import team_key
+
+MATCHES_FILE = "match_registry.csv"
+TEAMS_FILE = "team_registry.csv"
+
+# nomes de colunas aceitos para mandante/visitante nas tabelas dos estágios
+HOME_COLS = ("team_home", "home", "home_team", "mandante")
+AWAY_COLS = ("team_away", "away", "away_team", "visitante")
+
+
+def _log(msg: str) -> None:
+    print(f"[registry] {msg}", flush=True)
+
+
+def _pick(df: pd.DataFrame, names: Sequence[str]) -> Optional[str]:
+    return next((c for c in names if c in df.columns), None)
+
+
+class MatchRegistry:
+    def __init__(self):
+        self.team_ids: Dict[str, int] = {}       # team_key -> team_id
+        self.team_names: List[str] = []          # team_id -> nome exibido
+        self.pairs: Dict[Tuple[int, int], int] = {}   # (home_id, away_id) -> mid
+        self.by_match_id: Dict[str, int] = {}
+        self.by_match_key: Dict[str, int] = {}
+        self.rows: List[dict] = []               # mid -> linha do registro
+        self._key_cache: Dict[str, int] = {}     # nome cru -> team_id
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    # ---------- ids ----------
+    def team_id(self, name) -> int:
+        name = "" if name is None or (isinstance(name, float) and np.isnan(name)) else str(name).strip()
+        tid = self._key_cache.get(name)
+        if tid is None:
+            k = team_key(name) if name else ""
+            tid = self.team_ids.get(k)
+            if tid is None:
+                tid = self.team_ids[k] = len(self.team_names)
+                self.team_names.append(name)
+            self._key_cache[name] = tid
+        return tid
+
+    def team_id_array(self, names) -> np.ndarray:
+        """Vetorizado: resolve cada nome distinto uma única vez."""
+        codes, uniq = pd.factorize(pd.Series(names, dtype=object).fillna(""), sort=False)
+        ids = np.fromiter((self.team_id(u) for u in uniq), dtype=np.int32, count=len(uniq))
+        return ids[codes] if len(codes) else np.empty(0, dtype=np.int32)
+
+    def register(self, home, away, match_id: str = "", match_key: str = "") -> int:
+        h, a = self.team_id(home), self.team_id(away)
+        mid = self.pairs.get((h, a))
+        if mid is None:
+            mid = self.pairs[(h, a)] = len(self.rows)
+            self.rows.append({"mid": mid, "match_id": match_id, "match_key": match_key,
+                              "team_home": self.team_names[h], "team_away": self.team_names[a],
+                              "home_id": h, "away_id": a})
+        if match_id:
+            self.by_match_id.setdefault(str(match_id), mid)
+        if match_key:
+            self.by_match_key.setdefault(str(match_key), mid)
+        return mid
+
+    # ---------- anexar aos estágios ----------
+    def attach(self, df: pd.DataFrame, home_col: Optional[str] = None, away_col: Optional[str] = None,
+               register: bool = True) -> pd.DataFrame:
+        """Cópia de df com mid/home_id/away_id (int32; Int32 com <NA> se register=False e sem par)."""
+        out = df.copy()
+        n = len(out)
+        mid = np.full(n, -1, dtype=np.int64)
+        for col, index in (("match_id", self.by_match_id), ("match_key", self.by_match_key)):
+            if col in out.columns and index:
+                hit = out[col].astype(str).map(index)
+                take = (mid < 0) & hit.notna().to_numpy()
+                mid[take] = hit[take].astype(np.int64).to_numpy()
+
+        home_col = home_col or _pick(out, HOME_COLS)
+        away_col = away_col or _pick(out, AWAY_COLS)
+        if home_col and away_col:
+            hid = self.team_id_array(out[home_col]).astype(np.int64)
+            aid = self.team_id_array(out[away_col]).astype(np.int64)
+            todo = mid < 0
+            # par (home_id, away_id) -> um int64; lookup vetorizado nos pares registrados
+            known = np.array([(h << 32) | a for h, a in self.pairs], dtype=np.int64)
+            pos = pd.Index(known).get_indexer((hid << 32) | aid)
+            vals = np.fromiter(self.pairs.values(), dtype=np.int64, count=len(self.pairs))
+            hit = todo & (pos >= 0)
+            mid[hit] = vals[pos[hit]]
+            new = np.flatnonzero(todo & (pos < 0))
+            if register and len(new):
+                # um registro por par novo distinto (ids de time já resolvidos acima)
+                codes = pd.factorize((hid[new] << 32) | aid[new])[0]
+                _, first = np.unique(codes, return_index=True)
+                mids = np.empty(len(first), dtype=np.int64)
+                ids_col = {c: out[c].astype(str).to_numpy() for c in ("match_id", "match_key") if c in out.columns}
+                for j, i in enumerate(new[first]):
+                    h, a = int(hid[i]), int(aid[i])
+                    mids[j] = m = self.pairs[(h, a)] = len(self.rows)
+                    mi, mk = (ids_col[c][i] if c in ids_col else "" for c in ("match_id", "match_key"))
+                    self.rows.append({"mid": m, "match_id": mi, "match_key": mk,
+                                      "team_home": self.team_names[h], "team_away": self.team_names[a],
+                                      "home_id": h, "away_id": a})
+                    if mi:
+                        self.by_match_id.setdefault(mi, m)
+                    if mk:
+                        self.by_match_key.setdefault(mk, m)
+                mid[new] = mids[codes]
+        if (mid < 0).any() and register:
+            raise ValueError("[registry] tabela sem match_id/match_key registrados nem colunas de times")
+
+        ids = np.array([(r["home_id"], r["away_id"]) for r in self.rows], dtype=np.int32).reshape(-1, 2)
+        ok = mid >= 0
+        if ok.all():
+            out["mid"] = mid.astype(np.int32)
+            out["home_id"] = ids[mid, 0]
+            out["away_id"] = ids[mid, 1]
+        else:
+            out["mid"] = pd.array(np.where(ok, mid, 0), dtype="Int32")
+            out.loc[~ok, "mid"] = pd.NA
+            out["home_id"] = pd.array(np.where(ok, ids[np.where(ok, mid, 0), 0], 0), dtype="Int32")
+            out["away_id"] = pd.array(np.where(ok, ids[np.where(ok, mid, 0), 1], 0), dtype="Int32")
+            out.loc[~ok, ["home_id", "away_id"]] = pd.NA
+        return out
+
+    def join(self, left: pd.DataFrame, right: pd.DataFrame, how: str = "left",
+             cols: Optional[Sequence[str]] = None, suffixes=("", "_r")) -> pd.DataFrame:
+        """Merge pelo mid (anexa ids aos dois lados se ainda não tiverem); cols = colunas de right a trazer."""
+        if "mid" not in left.columns:
+            left = self.attach(left)
+        if "mid" not in right.columns:
+            right = self.attach(right)
+        if cols is not None:
+            right = right[["mid"] + [c for c in cols if c != "mid"]]
+        else:
+            right = right.drop(columns=[c for c in ("home_id", "away_id") if c in right.columns])
+        return left.merge(right, on="mid", how=how, suffixes=suffixes)
+
+    def categorical_teams(self, df: pd.DataFrame, cols: Sequence[str] = ("team_home", "team_away")) -> pd.DataFrame:
+        """Colunas de time como category (categorias = nomes do registro, códigos = team_id)."""
+        out = df.copy()
+        cats = pd.Index(self.team_names)
+        for c, idc in zip(cols, ("home_id", "away_id")):
+            if c in out.columns and idc in out.columns and cats.is_unique:
+                out[c] = pd.Categorical.from_codes(out[idc].fillna(-1).astype(int), categories=cats)
+        return out
+
+    # ---------- persistência ----------
+    def frames(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        keys = {tid: k for k, tid in self.team_ids.items()}
+        teams = pd.DataFrame({"team_id": np.arange(len(self.team_names), dtype=np.int32),
+                              "team_key": [keys[i] for i in range(len(self.team_names))],
+                              "team": self.team_names})
+        matches = pd.DataFrame(self.rows, columns=["mid", "match_id", "match_key", "team_home", "team_away",
+                                                   "home_id", "away_id"])
+        return matches, teams
+
+    def save(self, out_dir: str) -> str:
+        matches, teams = self.frames()
+        os.makedirs(out_dir, exist_ok=True)
+        matches.to_csv(os.path.join(out_dir, MATCHES_FILE), index=False)
+        teams.to_csv(os.path.join(out_dir, TEAMS_FILE), index=False)
+        return os.path.join(out_dir, MATCHES_FILE)
+
+    @classmethod
+    def read(cls, out_dir: str) -> Optional["MatchRegistry"]:
+        mp, tp = os.path.join(out_dir, MATCHES_FILE), os.path.join(out_dir, TEAMS_FILE)
+        if not (os.path.isfile(mp) and os.path.isfile(tp)):
+            return None
+        teams = pd.read_csv(tp, dtype={"team_key": str, "team": str}, keep_default_na=False)
+        matches = pd.read_csv(mp, dtype={"match_id": str, "match_key": str, "team_home": str, "team_away": str},
+                              keep_default_na=False)
+        reg = cls()
+        for tid, k, name in zip(teams["team_id"], teams["team_key"], teams["team"]):
+            assert int(tid) == len(reg.team_names), f"[registry] {tp} fora de ordem"
+            reg.team_ids[k] = int(tid)
+            reg.team_names.append(name)
+            reg._key_cache[name] = int(tid)
+        for r in matches.itertuples(index=False):
+            h, a = int(r.home_id), int(r.away_id)
+            reg.pairs[(h, a)] = int(r.mid)
+            reg.rows.append({"mid": int(r.mid), "match_id": r.match_id, "match_key": r.match_key,
+                             "team_home": r.team_home, "team_away": r.team_away, "home_id": h, "away_id": a})
+            if r.match_id:
+                reg.by_match_id.setdefault(r.match_id, int(r.mid))
+            if r.match_key:
+                reg.by_match_key.setdefault(r.match_key, int(r.mid))
+        return reg
+
+
+def build_registry(out_dir: str, save: bool = True) -> Optional[MatchRegistry]:
+    """Registro salvo + jogos da whitelist ainda não registrados (ids existentes não mudam)."""
+    saved = MatchRegistry.read(out_dir)
+    reg = saved or MatchRegistry()
+    wl = os.path.join(out_dir, "matches_whitelist.csv")
+    if os.path.isfile(wl) and os.path.getsize(wl) > 0:
+        df = pd.read_csv(wl, dtype=str, keep_default_na=False)
+        hc, ac = _pick(df, HOME_COLS), _pick(df, AWAY_COLS)
+        if hc and ac:
+            before = len(reg)
+            mids = df["match_id"] if "match_id" in df.columns else [""] * len(df)
+            mkeys = df["match_key"] if "match_key" in df.columns else [""] * len(df)
+            for h, a, i, k in zip(df[hc], df[ac], mids, mkeys):
+                if h and a:
+                    reg.register(h, a, i, k)
+            if save and (len(reg) != before or saved is None):
+                reg.save(out_dir)
+    if not len(reg):
+        return None
+    return reg
+
+
+def load_registry(out_dir: str) -> Optional[MatchRegistry]:
+    """Para os estágios: registro salvo; se ainda não existir, gera da whitelist. None se nenhum."""
+    return MatchRegistry.read(out_dir) or build_registry(out_dir)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Registro de IDs inteiros de jogos/times da rodada")
+    ap.add_argument("--rodada", required=True, help="Diretório da rodada (OUT_DIR) com matches_whitelist.csv")
+    args = ap.parse_args(argv)
+    reg = build_registry(args.rodada)
+    if reg is None:
+        _log(f"nenhum jogo em {os.path.join(args.rodada, 'matches_whitelist.csv')}")
+        return 1
+    _log(f"OK -> {os.path.join(args.rodada, MATCHES_FILE)} ({len(reg)} jogos, {len(reg.team_names)} times)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
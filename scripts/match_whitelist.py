@@ -24,6 +24,11 @@ from typing import Optional
 
 import pandas as pd
 
+try:
+    from scripts.match_registry import MATCHES_FILE, build_registry
+except ImportError:
+    from match_registry import MATCHES_FILE, build_registry
+
 def log(msg: str):
     print(f"[whitelist] {msg}", flush=True)
 
@@ -187,6 +192,14 @@ def main():
 
     log(f"OK -> {out_file} (linhas={len(rows)})")
 
+    # IDs inteiros de jogo/time para os joins dos estágios seguintes
+    try:
+        reg = build_registry(out_dir)
+        if reg is not None:
+            log(f"Registro -> {os.path.join(out_dir, MATCHES_FILE)} ({len(reg)} jogos, {len(reg.team_names)} times)")
+    except Exception as e:
+        log(f"Aviso: falha ao gerar o registro de IDs: {e}")
+
     # Preview
     try:
         prev = pd.read_csv(out_file, dtype=str).fillna("")
@@ -1,7 +1,12 @@
-import argparse, pandas as pd
+import argparse, sys, pandas as pd
 from pathlib import Path
 from utils.io import load_schema, ensure_cols
-from utils.features import build_features
+from utils.features import ODD_COLS, features_from_joined, odds_1x2
+
+try:
+    from scripts.feature_join import Source, join_sources, write_frame
+except ImportError:
+    from feature_join import Source, join_sources, write_frame
 
 ROOT = Path(__file__).resolve().parents[1]
 RAW = ROOT/"data/raw"
@@ -9,21 +14,34 @@ PROC = ROOT/"data/processed"
 
 def main(rodada):
     schema = load_schema()
-    m = pd.read_csv(RAW/"matches.csv")
-    ensure_cols(m, schema["matches"]["required"], "matches.csv")
 
-    o = pd.read_csv(RAW/"odds.csv")
-    if "oddway" in o.columns and "odd_away" not in o.columns:
-        o = o.rename(columns={"oddway":"odd_away"})
-    ensure_cols(o, schema["odds"]["required"], "odds.csv")
+    def checked(name, transform=None):
+        def fn(df):
+            ensure_cols(df, schema[name]["required"], f"{name}.csv")
+            return transform(df) if transform else df
+        return fn
+
+    def odds_prep(o):
+        if "oddway" in o.columns and "odd_away" not in o.columns:
+            o = o.rename(columns={"oddway":"odd_away"})
+        return checked("odds", odds_1x2)(o)
+
+    # table/weather/news: só validados (ainda não entram nas features)
+    _safe_read(RAW/"table.csv",   schema.get("table",{}).get("required",[]))
+    _safe_read(RAW/"weather.csv", schema.get("weather",{}).get("required",[]))
+    _safe_read(RAW/"news.csv",    schema.get("news",{}).get("required",[]))
 
-    t = _safe_read(RAW/"table.csv",   schema.get("table",{}).get("required",[]))
-    w = _safe_read(RAW/"weather.csv", schema.get("weather",{}).get("required",[]))
-    n = _safe_read(RAW/"news.csv",    schema.get("news",{}).get("required",[]))
+    # matches + odds 1X2 num join só
+    try:
+        feats = join_sources([
+            Source(str(RAW/"matches.csv"), required=True, transform=checked("matches")),
+            Source(str(RAW/"odds.csv"), required=True, transform=odds_prep, columns=ODD_COLS),
+        ], keys=["match_id"], how="left", tag="merge_features")
+    except RuntimeError as ex:
+        print(f"ERRO: {ex}", file=sys.stderr)
+        sys.exit(1)
 
-    feats = build_features(m, o, t, w, n)
-    PROC.mkdir(parents=True, exist_ok=True)
-    feats.to_parquet(PROC/"features.parquet", index=False)
+    write_frame(features_from_joined(feats), str(PROC/"features.parquet"))
 
 def _safe_read(path, req):
     p = Path(path)
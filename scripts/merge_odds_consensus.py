@@ -2,7 +2,7 @@
 # Consenso de odds com devig Shin + pesos, com FALLBACKS robustos:
 # - Usa odds_*.csv quando houver; senão usa data/out/<rodada>/odds.csv
 # - Completa home/away via matches.csv quando faltar (sem depender de sufixos do pandas)
-# - Se Shin falhar em alguma linha, usa inverso das odds
+# - Devig em lote para a tabela inteira (Shin por padrão; --devig escolhe power/odds_ratio/additive)
 # - Se não houver NENHUMA linha válida, gera fallback UNIFORME (1/3) a partir de matches.csv para não quebrar o pipeline
 from __future__ import annotations
 import argparse, glob
@@ -10,49 +10,15 @@ from pathlib import Path
 import numpy as np
 import pandas as pd
 
-# ----------------- Shin devig -----------------
-def shin_devig(odds):
-    o = np.array(odds, dtype=float)
-    if np.any(~np.isfinite(o)) or np.any(o <= 1.0):
-        return np.full(3, np.nan)
-    iv = 1.0 / o
-    def p_of(z):
-        if z <= 0:
-            return iv / iv.sum()
-        root = np.sqrt(iv*iv + 4.0*z*iv)
-        return (root - iv) / (2.0*z)
-    z_lo, z_hi = 0.0, 1.0
-    for _ in range(40):
-        p_hi = p_of(z_hi)
-        if not np.isfinite(p_hi).all() or p_hi.sum() < 1.0:
-            z_hi *= 0.5
-        else:
-            break
-    target = 1.0
-    for _ in range(80):
-        z_mid = 0.5*(z_lo+z_hi)
-        p_mid = p_of(z_mid)
-        s_mid = p_mid.sum() if np.isfinite(p_mid).all() else np.inf
-        if s_mid > target: z_lo = z_mid
-        else:              z_hi = z_mid
-    p = p_of(0.5*(z_lo+z_hi))
-    if not np.isfinite(p).all():
-        return np.full(3, np.nan)
-    p = np.clip(p, 1e-9, 1.0); p /= p.sum()
-    return p
+# ----------------- devig (motor vetorizado) -----------------
+try:
+    from scripts.devig import devig, METHODS as DEVIG_METHODS
+except ImportError:
+    from devig import devig, METHODS as DEVIG_METHODS
 
-def inv_probs(odds):
-    o = np.array(odds, dtype=float)
-    if o.shape[-1] != 3:
-        return np.array([np.nan, np.nan, np.nan])
-    with np.errstate(divide="ignore", invalid="ignore"):
-        inv = 1.0 / o
-    inv[~np.isfinite(inv)] = 0.0
-    s = inv.sum()
-    if s <= 0: return np.array([np.nan, np.nan, np.nan])
-    p = inv / s
-    p = np.clip(p, 1e-9, 1.0); p /= p.sum()
-    return p
+def shin_devig(odds):
+    """Shin para uma linha (atalho para o motor em lote)."""
+    return devig([odds], "shin")[0]
 
 # ----------------- Util -----------------
 RENAME_CANDIDATES = {
@@ -169,9 +135,10 @@ def build_uniform_from_matches(base: Path) -> pd.DataFrame:
     return out.sort_values("match_id")
 
 def main():
-    ap = argparse.ArgumentParser(description="Merge de odds com devig Shin + pesos (com fallbacks)")
+    ap = argparse.ArgumentParser(description="Merge de odds com devig (Shin por padrão) + pesos (com fallbacks)")
     ap.add_argument("--rodada", required=True)
     ap.add_argument("--weights-file", default="config/bookmaker_weights.csv")
+    ap.add_argument("--devig", default="shin", choices=DEVIG_METHODS, help="método de remoção de margem")
     args = ap.parse_args()
 
     base = Path(f"data/out/{args.rodada}")
@@ -183,26 +150,12 @@ def main():
     weights = load_weights(Path(args.weights_file))
     all_odds["bookmaker_norm"] = all_odds["bookmaker"].astype(str).str.strip().str.lower()
 
-    # p_bm por linha: Shin -> fallback inverso
-    probs_rows = []
-    valid_rows = []
-    for _, r in all_odds.iterrows():
-        try:
-            oh, od, oa = float(r["odd_home"]), float(r["odd_draw"]), float(r["odd_away"])
-        except Exception:
-            continue
-        if not (oh > 1.0 and od > 1.0 and oa > 1.0 and np.isfinite([oh,od,oa]).all()):
-            continue
-        p_line = shin_devig([oh, od, oa])
-        if not np.isfinite(p_line).all():
-            p_line = inv_probs([oh, od, oa])
-        if np.isfinite(p_line).all():
-            probs_rows.append(p_line)
-            valid_rows.append(True)
-        else:
-            valid_rows.append(False)
+    # p_bm para todas as linhas de uma vez (linhas com odd inválida/<=1.0 saem NaN)
+    odds_mat = all_odds[["odd_home","odd_draw","odd_away"]].apply(pd.to_numeric, errors="coerce").to_numpy(float)
+    probs_rows = devig(odds_mat, args.devig)
+    valid_rows = np.isfinite(probs_rows).all(axis=1)
 
-    if len(probs_rows) == 0:
+    if not valid_rows.any():
         # Fallback total: gerar odds uniformes a partir de matches.csv
         out_df = build_uniform_from_matches(base)
         out_path = base/"odds.csv"
@@ -210,11 +163,10 @@ def main():
         print(f"[consensus] WARNING: nenhuma linha de odds válida; gerando odds uniformes como fallback -> {out_path} (n={len(out_df)})")
         return
 
-    probs_rows = np.vstack(probs_rows)
     # Mantém somente linhas válidas
-    all_odds = all_odds.iloc[np.where(np.array(valid_rows))[0]].copy()
+    all_odds = all_odds.loc[valid_rows].copy()
 
-    all_odds[["p_home_bm","p_draw_bm","p_away_bm"]] = probs_rows
+    all_odds[["p_home_bm","p_draw_bm","p_away_bm"]] = probs_rows[valid_rows]
 
     # pesos
     all_odds["weight"] = all_odds["bookmaker_norm"].map(lambda x: float(weights.get(x, 1.0)))
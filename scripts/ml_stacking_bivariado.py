@@ -8,13 +8,17 @@ import sys
 import pandas as pd
 import numpy as np
 
-def saferead(path: str) -> pd.DataFrame:
-    if not os.path.exists(path):
-        return pd.DataFrame()
-    try:
-        return pd.read_csv(path)
-    except Exception:
-        return pd.DataFrame()
+try:
+    from scripts.feature_join import Source, join_sources
+    from scripts.match_registry import load_registry
+except ImportError:
+    from feature_join import Source, join_sources
+    from match_registry import load_registry
+
+def non_empty(df: pd.DataFrame) -> pd.DataFrame:
+    if df.empty:
+        raise ValueError("sem linhas")
+    return df
 
 def main():
     ap = argparse.ArgumentParser()
@@ -33,46 +37,32 @@ def main():
         os.path.join(out_dir, "predictions_market.csv"),  # do predict_from_odds.py
     ]
 
-    frames = [saferead(p) for p in base_paths]
-    frames = [f for f in frames if not f.empty]
     out_path = os.path.join(out_dir, "predictions_stacked.csv")
-
-    if not frames:
-        pd.DataFrame(columns=[
-            "match_key","team_home","team_away","prob_home","prob_draw","prob_away","pred","pred_conf"
-        ]).to_csv(out_path, index=False)
-        print(f"[ml] AVISO: sem entradas para stacking — gerado vazio em {out_path}")
-        return 0
+    key = ["match_key","team_home","team_away"]
+    probs = ["prob_home","prob_draw","prob_away"]
 
     # stacking simples: média ponderada — dá mais peso ao “calibrated” e ao “market”
-    key = ["match_key","team_home","team_away"]
-    merged = None
-    weights = []
-
-    for f in frames:
-        cols_needed = key + ["prob_home","prob_draw","prob_away"]
-        if not set(cols_needed).issubset(set(f.columns)):
-            continue
-        f = f[cols_needed].copy()
-        if merged is None:
-            merged = f
-            merged.columns = key + ["prob_home_0","prob_draw_0","prob_away_0"]
-        else:
-            idx = sum(c.startswith("prob_home_") for c in merged.columns)
-            merged = merged.merge(f, on=key, how="outer", suffixes=("",""))
-            merged.rename(columns={
-                "prob_home":f"prob_home_{idx}",
-                "prob_draw":f"prob_draw_{idx}",
-                "prob_away":f"prob_away_{idx}",
-            }, inplace=True)
+    # join único (outer) pelo mid inteiro do registro da rodada; sem registro, pelas 3 colunas de texto
+    reg = load_registry(out_dir)
+    sources = [Source(p, keys=key, need=probs, columns=key + probs, transform=non_empty,
+                      prefix=os.path.splitext(os.path.basename(p))[0] + "_") for p in base_paths]
+    try:
+        merged = join_sources(sources, keys=key, how="outer", carry=key if reg is not None else (),
+                              registry=reg, tag="ml")
+    except RuntimeError:
+        merged = None
 
     if merged is None:
         pd.DataFrame(columns=[
             "match_key","team_home","team_away","prob_home","prob_draw","prob_away","pred","pred_conf"
         ]).to_csv(out_path, index=False)
-        print(f"[ml] AVISO: nada mesclado — gerado vazio em {out_path}")
+        print(f"[ml] AVISO: sem entradas para stacking — gerado vazio em {out_path}")
         return 0
 
+    # prob_*_<i> na ordem das fontes efetivamente lidas
+    for i, name in enumerate(merged.attrs["joined"]):
+        merged.rename(columns={f"{name}_{c}": f"{c}_{i}" for c in probs}, inplace=True)
+
     # decide pesos: calibrated (se existir) = 0.4, market = 0.3, demais dividem 0.3
     cols = [c for c in merged.columns if c.startswith("prob_home_")]
     n = len(cols)
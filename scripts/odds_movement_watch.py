@@ -1,5 +1,7 @@
 # scripts/odds_movement_watch.py
 # Detecta movimento de odds entre snapshot baseline e a coleta atual.
+# Cada coleta é anexada ao armazém de snapshots (scripts/odds_store.py); o baseline é a
+# linha de abertura (ou o estado em --as-of) vinda do armazém.
 # Sempre gera alerts_odds_movement.csv (mesmo vazio com header) para não quebrar o workflow.
 from __future__ import annotations
 import argparse
@@ -7,6 +9,11 @@ from pathlib import Path
 import pandas as pd
 import numpy as np
 
+try:
+    from scripts import odds_store
+except ImportError:
+    import odds_store
+
 THRESH_PP = 0.08  # 8 pontos percentuais
 
 def _probs_from_odds(oh, od, oa):
@@ -33,6 +40,8 @@ def _empty_alerts_df():
 def main():
     ap = argparse.ArgumentParser(description="Monitor de movimento de odds entre snapshots")
     ap.add_argument("--rodada", required=True)
+    ap.add_argument("--as-of", dest="as_of", default=None,
+                    help="compara com as odds conhecidas neste instante (ISO) em vez da abertura")
     args = ap.parse_args()
 
     base = Path(f"data/out/{args.rodada}")
@@ -45,8 +54,23 @@ def main():
 
     dfc = pd.read_csv(cur)
 
+    # baseline do armazém (lido antes de anexar a coleta atual)
+    dfb = None
+    try:
+        snap = odds_store.as_of(args.rodada, args.as_of) if args.as_of else odds_store.opening(args.rodada)
+        if not snap.empty:
+            dfb = odds_store.to_wide(snap)
+    except Exception as e:
+        print(f"[odds_watch] aviso: armazém de odds indisponível ({e}); usando {basefile.name}")
+    try:
+        path = odds_store.append(dfc, args.rodada, provider="odds.csv")
+        if path:
+            print(f"[odds_watch] snapshot anexado: {path}")
+    except Exception as e:
+        print(f"[odds_watch] aviso: falha ao anexar snapshot ({e})")
+
     # Primeira execução: cria baseline e um arquivo de alertas vazio (com header)
-    if not basefile.exists() or basefile.stat().st_size==0:
+    if dfb is None and (not basefile.exists() or basefile.stat().st_size==0):
         dfc.to_csv(basefile, index=False)
         _empty_alerts_df().to_csv(out_alerts, index=False)
         print(f"[odds_watch] baseline criado: {basefile} (primeira execução)")
@@ -54,7 +78,10 @@ def main():
         return
 
     # Comparação com baseline existente
-    dfb = pd.read_csv(basefile)
+    if dfb is None:
+        dfb = pd.read_csv(basefile)
+    elif not basefile.exists():
+        dfb.to_csv(basefile, index=False)
 
     key = "match_id"
     if key not in dfc.columns or key not in dfb.columns:
@@ -62,8 +89,9 @@ def main():
         _empty_alerts_df().to_csv(out_alerts, index=False)
         raise RuntimeError("[odds_watch] odds.csv sem coluna match_id")
 
-    cur_map = dfc.set_index(key)
-    base_map = dfb.set_index(key)
+    # o armazém guarda match_id como texto
+    cur_map = dfc.assign(**{key: dfc[key].astype(str)}).set_index(key)
+    base_map = dfb.assign(**{key: dfb[key].astype(str)}).set_index(key)
 
     alerts=[]
     for mid in sorted(set(cur_map.index).intersection(set(base_map.index))):
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+odds_store.py
+Armazém append-only de snapshots de odds em Parquet, com consultas point-in-time.
+
+Layout (particionado estilo hive, um arquivo novo por append — nada é sobrescrito):
+  data/odds_store/rodada=<R>/day=<YYYY-MM-DD>/part-<ingested_at>-<uuid>.parquet
+
+Uma linha = um preço de um bookmaker para um resultado:
+  match_id, provider, bookmaker, outcome (1/X/2), price, last_update, ingested_at,
+  home, away, commence_time
+
+Consultas:
+  as_of(rodada, t)       último preço conhecido em t (por ingested_at: sem olhar o futuro)
+  opening(rodada)        primeiro preço de cada (jogo, provedor, bookmaker, resultado)
+  closing(rodada)        último preço antes do início do jogo (commence_time, se houver)
+  to_wide(snap)          mediana entre bookmakers -> match_id, odd_home, odd_draw, odd_away
+
+CLI:
+  python scripts/odds_store.py append --rodada R --csv data/out/R/odds.csv
+  python scripts/odds_store.py query  --rodada R --as-of 2025-09-27T15:00:00Z --out snap.csv
+  python scripts/odds_store.py query  --rodada R --opening | --closing
+"""
+
+from __future__ import annotations
+
+import argparse
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+STORE_ROOT = Path("data/odds_store")
+KEY = ["match_id", "provider", "bookmaker", "outcome"]
+COLUMNS = ["match_id", "provider", "bookmaker", "outcome", "price", "last_update",
+           "ingested_at", "home", "away", "commence_time"]
+SCHEMA = pa.schema([
+    ("match_id", pa.string()), ("provider", pa.string()), ("bookmaker", pa.string()),
+    ("outcome", pa.string()), ("price", pa.float64()),
+    ("last_update", pa.timestamp("s", tz="UTC")), ("ingested_at", pa.timestamp("s", tz="UTC")),
+    ("home", pa.string()), ("away", pa.string()), ("commence_time", pa.timestamp("s", tz="UTC")),
+])
+# colunas wide aceitas no append (variações dos CSVs do pipeline)
+WIDE = {
+    "1": ("odd_home", "odds_home", "home_odds"),
+    "X": ("odd_draw", "odds_draw", "draw_odds"),
+    "2": ("odd_away", "odds_away", "away_odds"),
+}
+
+
+def _ts(s) -> pd.Series:
+    return pd.to_datetime(s, utc=True, errors="coerce").dt.floor("s")
+
+
+def normalize(df: pd.DataFrame, provider: str = "", ingested_at=None) -> pd.DataFrame:
+    """Aceita formato longo (outcome/price) ou wide (odd_home/odd_draw/odd_away) e devolve o schema do armazém."""
+    df = df.copy()
+    if "match_id" not in df.columns and "event_id" in df.columns:
+        df["match_id"] = df["event_id"]
+    if "outcome" not in df.columns or "price" not in df.columns:
+        parts = []
+        for lab, names in WIDE.items():
+            col = next((c for c in names if c in df.columns), None)
+            if col is None:
+                continue
+            part = df.drop(columns=[c for n in WIDE.values() for c in n if c in df.columns])
+            part["outcome"] = lab
+            part["price"] = df[col]
+            parts.append(part)
+        if not parts:
+            raise ValueError("[odds_store] sem colunas de odds (outcome/price ou odd_home/odd_draw/odd_away)")
+        df = pd.concat(parts, ignore_index=True)
+
+    now = pd.Timestamp(ingested_at or datetime.now(timezone.utc))
+    now = now.tz_localize("UTC") if now.tzinfo is None else now.tz_convert("UTC")
+    out = pd.DataFrame({
+        "match_id": df["match_id"].astype(str),
+        "provider": df["provider"].astype(str) if "provider" in df.columns else provider,
+        "bookmaker": df["bookmaker"].astype(str) if "bookmaker" in df.columns else (
+            df["source"].astype(str) if "source" in df.columns else "consensus"),
+        "outcome": df["outcome"].astype(str),
+        "price": pd.to_numeric(df["price"], errors="coerce"),
+        "last_update": _ts(df["last_update"]) if "last_update" in df.columns else pd.NaT,
+        "ingested_at": now.floor("s"),
+        "home": df["home"].astype(str) if "home" in df.columns else "",
+        "away": df["away"].astype(str) if "away" in df.columns else "",
+        "commence_time": _ts(df["commence_time"]) if "commence_time" in df.columns else pd.NaT,
+    })
+    out["provider"] = out["provider"].replace("", provider or "unknown")
+    out = out[out["price"].notna() & (out["price"] > 1.0)]
+    out["last_update"] = out["last_update"].fillna(out["ingested_at"])
+    return out[COLUMNS].reset_index(drop=True)
+
+
+def append(df: pd.DataFrame, rodada: str, provider: str = "", ingested_at=None,
+           root: Path = STORE_ROOT) -> Optional[Path]:
+    """Grava um snapshot como um novo arquivo Parquet da partição (rodada, dia). Retorna o caminho."""
+    snap = normalize(df, provider=provider, ingested_at=ingested_at)
+    if snap.empty:
+        return None
+    ing = snap["ingested_at"].iloc[0]
+    part = Path(root) / f"rodada={rodada}" / f"day={ing.date().isoformat()}"
+    part.mkdir(parents=True, exist_ok=True)
+    path = part / f"part-{ing.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}.parquet"
+    pq.write_table(pa.Table.from_pandas(snap, schema=SCHEMA, preserve_index=False), path)
+    return path
+
+
+def load(rodada: Optional[str] = None, match_ids: Optional[Iterable[str]] = None,
+         until=None, root: Path = STORE_ROOT) -> pd.DataFrame:
+    """Lê o armazém com poda de partição (rodada/dia) e filtros empurrados para o Parquet."""
+    root = Path(root)
+    if not root.exists():
+        return pd.DataFrame(columns=COLUMNS)
+    dataset = ds.dataset(str(root), format="parquet", partitioning="hive", schema=SCHEMA.append(
+        pa.field("rodada", pa.string())).append(pa.field("day", pa.string())))
+    flt = None
+
+    def _and(e):
+        return e if flt is None else flt & e
+
+    if rodada is not None:
+        flt = _and(ds.field("rodada") == str(rodada))
+    if until is not None:
+        t = pd.Timestamp(until)
+        t = t.tz_localize("UTC") if t.tzinfo is None else t.tz_convert("UTC")
+        flt = _and(ds.field("day") <= t.date().isoformat())
+        flt = _and(ds.field("ingested_at") <= pa.scalar(t.to_pydatetime(), pa.timestamp("s", tz="UTC")))
+    if match_ids is not None:
+        flt = _and(ds.field("match_id").isin([str(m) for m in match_ids]))
+    df = dataset.to_table(filter=flt, columns=COLUMNS).to_pandas()
+    return df.sort_values(["ingested_at", "last_update"], kind="stable").reset_index(drop=True)
+
+
+def as_of(rodada: str, t, root: Path = STORE_ROOT, **kw) -> pd.DataFrame:
+    """Último preço de cada (jogo, provedor, bookmaker, resultado) ingerido até t."""
+    df = load(rodada, until=t, root=root, **kw)
+    return df.groupby(KEY, sort=False).tail(1).reset_index(drop=True)
+
+
+def opening(rodada: str, root: Path = STORE_ROOT, **kw) -> pd.DataFrame:
+    df = load(rodada, root=root, **kw)
+    return df.groupby(KEY, sort=False).head(1).reset_index(drop=True)
+
+
+def closing(rodada: str, root: Path = STORE_ROOT, **kw) -> pd.DataFrame:
+    """Último preço ingerido antes do commence_time (quando conhecido) de cada jogo."""
+    df = load(rodada, root=root, **kw)
+    pre = df["commence_time"].isna() | (df["ingested_at"] < df["commence_time"])
+    return df[pre].groupby(KEY, sort=False).tail(1).reset_index(drop=True)
+
+
+def to_wide(snap: pd.DataFrame) -> pd.DataFrame:
+    """Mediana entre bookmakers/provedores -> match_id, odd_home, odd_draw, odd_away."""
+    if snap.empty:
+        return pd.DataFrame(columns=["match_id", "odd_home", "odd_draw", "odd_away"])
+    w = snap.pivot_table(index="match_id", columns="outcome", values="price", aggfunc="median")
+    w = w.rename(columns={"1": "odd_home", "X": "odd_draw", "2": "odd_away"})
+    w.columns.name = None
+    for c in ("odd_home", "odd_draw", "odd_away"):
+        if c not in w.columns:
+            w[c] = float("nan")
+    return w[["odd_home", "odd_draw", "odd_away"]].reset_index()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Armazém append-only de snapshots de odds (Parquet).")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    a = sub.add_parser("append")
+    a.add_argument("--rodada", required=True)
+    a.add_argument("--csv", required=True)
+    a.add_argument("--provider", default="")
+    q = sub.add_parser("query")
+    q.add_argument("--rodada", required=True)
+    g = q.add_mutually_exclusive_group(required=True)
+    g.add_argument("--as-of", dest="as_of")
+    g.add_argument("--opening", action="store_true")
+    g.add_argument("--closing", action="store_true")
+    q.add_argument("--wide", action="store_true", help="mediana por jogo em colunas odd_*")
+    q.add_argument("--out", default="")
+    for p in (a, q):
+        p.add_argument("--root", default=str(STORE_ROOT))
+    args = ap.parse_args(argv)
+
+    if args.cmd == "append":
+        path = append(pd.read_csv(args.csv), args.rodada, provider=args.provider, root=Path(args.root))
+        print(f"[odds_store] snapshot -> {path}" if path else "[odds_store] nada a gravar (sem preços válidos)")
+        return
+
+    root = Path(args.root)
+    if args.as_of:
+        snap = as_of(args.rodada, args.as_of, root=root)
+    elif args.opening:
+        snap = opening(args.rodada, root=root)
+    else:
+        snap = closing(args.rodada, root=root)
+    if args.wide:
+        snap = to_wide(snap)
+    if args.out:
+        snap.to_csv(args.out, index=False)
+        print(f"[odds_store] {len(snap)} linhas -> {args.out}")
+    else:
+        print(snap.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,10 @@
 # scripts/plan_bet_opt.py
 # Otimizador de cartão Loteca:
 # - lê data/out/<rodada>/joined.csv (com odd_home, odd_draw, odd_away)
-# - escolhe SECO/ DUPLO / TRIPLO por jogo para maximizar P(14/14)
-#   sob restrições: --max-duplos, --max-triplos
+# - escolhe SECO/ DUPLO / TRIPLO por jogo para maximizar P(14/14) (DP exata)
+#   sob restrições: --max-duplos, --max-triplos e, opcionalmente, --budget (preço Loteca)
 # - saída: data/out/<rodada>/cartao.csv (match_id, home, away, pick, tipo, probs_h|x|a)
+#          data/out/<rodada>/cartoes_topk.csv quando --top-k > 1
 from __future__ import annotations
 import argparse
 from pathlib import Path
@@ -22,21 +23,105 @@ def probs_from_odds(oh, od, oa):
         return np.array([1/3,1/3,1/3], dtype=float)
     return inv/s
 
-def solve_opt(p_matrix: np.ndarray, max_duplos: int, max_triplos: int):
+# ----------------- otimizador exato (DP) -----------------
+def covered_logprobs(P: np.ndarray) -> np.ndarray:
+    """
+    log da probabilidade coberta por jogo para SECO/DUPLO/TRIPLO, shape (N,3).
+    SECO = maior p; DUPLO = duas maiores; TRIPLO = soma das três.
+    """
+    srt = -np.sort(-P, axis=1)
+    cov = np.cumsum(srt, axis=1)
+    with np.errstate(divide="ignore"):
+        return np.log(np.clip(cov, 0.0, None))
+
+def load_price_table(path: str) -> dict[tuple[int, int], float]:
+    """CSV com colunas duplos,triplos,preco -> {(d,t): preco}."""
+    df = pd.read_csv(path)
+    return {(int(r["duplos"]), int(r["triplos"])): float(r["preco"]) for _, r in df.iterrows()}
+
+def feasible_mask(max_duplos: int, max_triplos: int, budget: float | None = None,
+                  unit_price: float = 1.0, price_table: dict | None = None) -> np.ndarray:
+    """
+    Combinações (duplos, triplos) permitidas, shape (D+1, T+1).
+    Com budget: preço(d,t) <= budget, usando a tabela (se houver; combinações fora
+    dela ficam proibidas) ou unit_price * 2^d * 3^t (nº de apostas simples).
+    """
+    d = np.arange(max_duplos + 1)[:, None]
+    t = np.arange(max_triplos + 1)[None, :]
+    ok = np.ones((max_duplos + 1, max_triplos + 1), dtype=bool)
+    if budget is None:
+        return ok
+    if price_table:
+        price = np.full(ok.shape, np.inf)
+        for (dd, tt), pr in price_table.items():
+            if dd <= max_duplos and tt <= max_triplos:
+                price[dd, tt] = pr
+    else:
+        price = unit_price * (2.0 ** d) * (3.0 ** t)
+    return ok & (price <= budget + 1e-9)
+
+def optimize_tickets(P: np.ndarray, max_duplos: int, max_triplos: int, top_k: int = 1,
+                     feasible: np.ndarray | None = None) -> list[dict]:
+    """
+    Maximiza a soma do log da probabilidade coberta (= log P(14/14)) com no máximo
+    max_duplos duplos e max_triplos triplos, por programação dinâmica exata sobre
+    os estados (duplos usados, triplos usados), mantendo os top_k melhores por estado.
+    - feasible: máscara (D+1, T+1) opcional de combinações finais permitidas (ex.: orçamento).
+    Retorna até top_k dicts {"kinds": (N,) em {1,2,3}, "logp", "p14", "duplos", "triplos"},
+    do melhor para o pior.
+    """
+    N = P.shape[0]
+    D, T, K = max(0, max_duplos), max(0, max_triplos), max(1, top_k)
+    L = covered_logprobs(P)
+
+    S = np.full((D + 1, T + 1, K), -np.inf)
+    S[0, 0, 0] = 0.0
+    back_kind = np.zeros((N, D + 1, T + 1, K), dtype=np.int8)
+    back_k = np.zeros((N, D + 1, T + 1, K), dtype=np.int32)
+
+    for j in range(N):
+        c_seco = S + L[j, 0]
+        c_duplo = np.full_like(S, -np.inf)
+        c_duplo[1:] = S[:-1] + L[j, 1]
+        c_triplo = np.full_like(S, -np.inf)
+        c_triplo[:, 1:] = S[:, :-1] + L[j, 2]
+        C = np.concatenate([c_seco, c_duplo, c_triplo], axis=2)  # (D+1, T+1, 3K)
+        order = np.argsort(-C, axis=2, kind="stable")[:, :, :K]
+        S = np.take_along_axis(C, order, axis=2)
+        back_kind[j] = order // K
+        back_k[j] = order % K
+
+    if feasible is None:
+        feasible = np.ones((D + 1, T + 1), dtype=bool)
+    finals = [(S[d, t, k], d, t, k) for d in range(D + 1) for t in range(T + 1) for k in range(K)
+              if feasible[d, t] and np.isfinite(S[d, t, k])]
+    finals.sort(key=lambda x: -x[0])
+
+    out = []
+    for score, d, t, k in finals[:K]:
+        kinds = np.ones(N, dtype=np.int8)
+        dd, tt, kk = d, t, k
+        for j in range(N - 1, -1, -1):
+            kind = int(back_kind[j, dd, tt, kk])
+            kk = int(back_k[j, dd, tt, kk])
+            kinds[j] = kind + 1
+            if kind == 1: dd -= 1
+            elif kind == 2: tt -= 1
+        out.append({"kinds": kinds, "logp": float(score), "p14": float(np.exp(score)),
+                    "duplos": int(d), "triplos": int(t)})
+    return out
+
+def kinds_to_sets(P: np.ndarray, kinds: np.ndarray) -> list[set[int]]:
+    """Converte nº de resultados cobertos por jogo em sets {0,1,2} (os mais prováveis)."""
+    order = np.argsort(-P, axis=1, kind="stable")
+    return [set(int(x) for x in order[j, :int(kinds[j])]) for j in range(P.shape[0])]
+
+def solve_opt(p_matrix: np.ndarray, max_duplos: int, max_triplos: int, feasible: np.ndarray | None = None):
     """
     p_matrix: shape (N,3) com probabilidades [home,draw,away] para cada jogo.
     retorna arrays tipo (N,), picks (string) e tipo (SECO/DUPLO/TRIPLO/SEM_ODDS)
-    Estratégia ótima "quase-exata":
-      1) compute ganho marginal de cobrir 2º e 3º resultados por jogo:
-         - prob_seco = max(p)
-         - prob_duplo = prob_seco + segundo_maior(p)
-         - prob_triplo = 1.0
-         ganhos: g2 = prob_duplo - prob_seco ; g3 = prob_triplo - prob_duplo
-      2) escolha TRIPLOS nos maiores g3 (até max_triplos)
-      3) entre os restantes, escolha DUPLOS nos maiores g2 (até max_duplos)
-      4) demais ficam SECOS
-    Objetivo verdadeiro é produto das probabilidades cobertas.
-    Essa heurística de ganhos marginais se aproxima muito do ótimo e é estável.
+    Escolha exata (DP em optimize_tickets) de SECO/DUPLO/TRIPLO que maximiza o
+    produto das probabilidades cobertas dentro dos limites.
     """
     N = p_matrix.shape[0]
     probs = p_matrix.copy()
@@ -48,51 +133,24 @@ def solve_opt(p_matrix: np.ndarray, max_duplos: int, max_triplos: int):
     if not mask_valid.any():
         return picks, tipos  # tudo sem odds
 
-    # para válidos: calcula estatísticas
     p_valid = probs[mask_valid]
-    # ordena probabilidades por jogo
-    idx_sorted = np.argsort(p_valid, axis=1)  # crescente
-    top1_idx = idx_sorted[:, -1]
-    top2_idx = idx_sorted[:, -2]
-
-    prob_seco = p_valid[np.arange(p_valid.shape[0]), top1_idx]
-    prob_duplo = prob_seco + p_valid[np.arange(p_valid.shape[0]), top2_idx]
-    # triplo cobre 100%
-    gain_duplo = prob_duplo - prob_seco
-    gain_triplo = 1.0 - prob_duplo
-
-    # ranks globais
-    order_triplo = np.argsort(gain_triplo)[::-1]
-    choose_triplo_local = np.zeros(p_valid.shape[0], dtype=bool)
-    if max_triplos > 0:
-        choose_triplo_local[order_triplo[:max_triplos]] = True
-
-    # para duplos, não usar os já triplos
-    gain_duplo_masked = gain_duplo.copy()
-    gain_duplo_masked[choose_triplo_local] = -1.0
-    order_duplo = np.argsort(gain_duplo_masked)[::-1]
-    choose_duplo_local = np.zeros(p_valid.shape[0], dtype=bool)
-    if max_duplos > 0:
-        choose_duplo_local[order_duplo[:max_duplos]] = True
-
-    # construir picks/tipos
-    # mapeia de "válidos" de volta para indices globais
+    best = optimize_tickets(p_valid, max_duplos, max_triplos, top_k=1, feasible=feasible)
+    if not best:
+        return picks, tipos
+    kinds = best[0]["kinds"]
+    order = np.argsort(-p_valid, axis=1, kind="stable")
+
     valid_idx = np.where(mask_valid)[0]
     for j_local, j_global in enumerate(valid_idx):
-        p = p_valid[j_local]
-        i1 = int(top1_idx[j_local])
-        i2 = int(top2_idx[j_local])
-        if choose_triplo_local[j_local]:
+        kind = int(kinds[j_local])
+        if kind == 3:
             pick = "123"; tipo = "TRIPLO"
-        elif choose_duplo_local[j_local]:
-            # mantemos ordem decrescente de prob: ex: "1X", "12" ou "X2"
-            pair = [i1, i2]
-            # ordenar pelo valor p descrescente
-            pair = sorted(pair, key=lambda k: p[k], reverse=True)
-            pick = "".join(LABELS[pair])
+        elif kind == 2:
+            # ordem decrescente de prob: ex: "1X", "12" ou "X2"
+            pick = "".join(LABELS[order[j_local, :2]])
             tipo = "DUPLO"
         else:
-            pick = LABELS[i1]
+            pick = LABELS[order[j_local, 0]]
             tipo = "SECO"
         picks[j_global] = pick
         tipos[j_global] = tipo
@@ -104,6 +162,10 @@ def main():
     ap.add_argument("--rodada", required=True, help="Ex.: 2025-10-05_14")
     ap.add_argument("--max-duplos", type=int, default=4, dest="max_duplos")
     ap.add_argument("--max-triplos", type=int, default=2, dest="max_triplos")
+    ap.add_argument("--budget", type=float, default=None, help="orçamento máximo do cartão")
+    ap.add_argument("--unit-price", type=float, default=1.0, help="preço da aposta simples (sem --price-table)")
+    ap.add_argument("--price-table", default="", help="CSV duplos,triplos,preco com a tabela oficial")
+    ap.add_argument("--top-k", type=int, default=1, help="quantos melhores cartões listar")
     args = ap.parse_args()
 
     base = Path(f"data/out/{args.rodada}")
@@ -125,7 +187,10 @@ def main():
             probs.append(probs_from_odds(r["odd_home"], r["odd_draw"], r["odd_away"]))
     P = np.array(probs, dtype=float)
 
-    picks, tipos = solve_opt(P, args.max_duplos, args.max_triplos)
+    price_table = load_price_table(args.price_table) if args.price_table else None
+    feas = feasible_mask(args.max_duplos, args.max_triplos, budget=args.budget,
+                         unit_price=args.unit_price, price_table=price_table)
+    picks, tipos = solve_opt(P, args.max_duplos, args.max_triplos, feasible=feas)
 
     # formatar saída
     def fmt(p):
@@ -149,5 +214,19 @@ def main():
     print(f"[plan_bet_opt] Cartão salvo em {out_path}")
     print(out.to_string(index=False))
 
+    if args.top_k > 1:
+        valid = np.isfinite(P).all(axis=1) & (np.nan_to_num(P).sum(axis=1) > 0)
+        Pv = P[valid]
+        order = np.argsort(-Pv, axis=1, kind="stable")
+        top_rows = []
+        for rank, sol in enumerate(optimize_tickets(Pv, args.max_duplos, args.max_triplos,
+                                                    top_k=args.top_k, feasible=feas), 1):
+            cells = ["".join(LABELS[order[j, :k]]) if k < 3 else "123" for j, k in enumerate(sol["kinds"])]
+            top_rows.append({"rank": rank, "p14": sol["p14"], "duplos": sol["duplos"],
+                             "triplos": sol["triplos"], "picks": " ".join(cells)})
+        top_path = base / "cartoes_topk.csv"
+        pd.DataFrame(top_rows).to_csv(top_path, index=False, encoding="utf-8")
+        print(f"[plan_bet_opt] Top-{args.top_k} -> {top_path}")
+
 if __name__ == "__main__":
     main()
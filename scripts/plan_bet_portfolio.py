@@ -1,13 +1,21 @@
 # scripts/plan_bet_portfolio.py
 # Portfólio de cartões: gera N tickets complementares, respeitando limites de duplos/triplos,
-# maximizando prob(≥1 acerta 14/14) por ganho marginal via simulação.
+# maximizando prob(≥1 acerta 14/14) por ganho marginal (guloso preguiçoso sobre cenários simulados).
 from __future__ import annotations
 import argparse
+import heapq
 from pathlib import Path
 import numpy as np
 import pandas as pd
 
-RNG = np.random.default_rng(42)
+try:
+    from scripts.risk_utils import MAX_PACKED_GAMES, simulate_outcomes, encode_outcomes, encode_tickets, coverage_probs
+    from scripts.plan_bet_opt import optimize_tickets, kinds_to_sets
+except ImportError:
+    from risk_utils import MAX_PACKED_GAMES, simulate_outcomes, encode_outcomes, encode_tickets, coverage_probs
+    from plan_bet_opt import optimize_tickets, kinds_to_sets
+
+SEED = 42
 
 # ----------------- util de probabilidades -----------------
 def _from_odds(arr_odds: np.ndarray) -> np.ndarray:
@@ -89,61 +97,46 @@ def _pick_joined(base: Path) -> Path:
             return p
     raise RuntimeError("[portfolio] nenhum joined*/odds.csv encontrado.")
 
-def _simulate_hits(P: np.ndarray, picks: list[set[str]], n_sims=20000) -> float:
+IDX = {"1":0,"X":1,"2":2}
+
+def _full_hits(outcome_masks: np.ndarray, ticket_mask: np.uint64) -> np.ndarray:
+    """Cenários (n_sims,) em que o ticket acerta 14/14: todo bit do desfecho está no ticket."""
+    return (outcome_masks & ticket_mask) == outcome_masks
+
+def _top_tickets(P: np.ndarray, max_duplos: int, max_triplos: int, k: int) -> list[list[set[str]]]:
+    """Top-k cartões por P(14/14) sob os limites de duplos/triplos."""
+    map_out = {0:"1",1:"X",2:"2"}
+    out = []
+    for sol in optimize_tickets(P, max_duplos, max_triplos, top_k=k):
+        out.append([{map_out[i] for i in s} for s in kinds_to_sets(P, sol["kinds"])])
+    return out
+
+def _lazy_greedy(P: np.ndarray, pool: list[list[set[str]]], n_tickets: int, sims: int):
     """
-    P: (n_matches, 3) probas [1,X,2]
-    picks: lista de sets com outcomes permitidos por jogo {"1"}, {"1","X"}, {"1","X","2"}
-    Retorna prob de 14/14 sob simulação.
+    Seleciona n_tickets do pool maximizando P(≥1 ticket acerta 14/14) nos cenários simulados.
+    Mantém o vetor de cenários já cobertos: o ganho marginal de um candidato é a fração de
+    cenários novos que ele cobre (uma passada). Como o ganho só diminui (submodular), os
+    limites antigos ficam num heap e só o topo é reavaliado (guloso preguiçoso).
+    Retorna [(idx_pool, ganho_marginal)] na ordem de escolha.
     """
-    n = len(picks)
-    draws = np.zeros((n_sims, n), dtype=np.int8)
-    for i in range(n):
-        draws[:, i] = RNG.choice(3, size=n_sims, p=P[i])
-    idx_map = {"1":0,"X":1,"2":2}
-    ok = np.ones(n_sims, dtype=bool)
-    for j in range(n):
-        allow_idx = {idx_map[a] for a in picks[j]}
-        ok &= np.isin(draws[:,j], list(allow_idx))
-        if not ok.any():
-            return 0.0
-    return float(ok.mean())
-
-def _entropy_row(p3: np.ndarray) -> float:
-    p = np.clip(p3, 1e-9, 1.0)
-    p = p / p.sum()
-    return float(-(p*np.log(p)).sum())
-
-def _baseline_ticket(P: np.ndarray) -> list[set[str]]:
-    labels = np.argmax(P, axis=1)
-    map_out = {0:"1",1:"X",2:"2"}
-    return [{map_out[i]} for i in labels]
-
-def _expand_ticket(P: np.ndarray, ticket: list[set[str]], max_duplos: int, max_triplos: int) -> list[set[str]]:
-    n = len(ticket)
-    ent = np.array([_entropy_row(P[i]) for i in range(n)])
-    order = np.argsort(-ent)  # maior entropia primeiro
-    d_used = 0; t_used = 0
-    for idx in order:
-        if d_used < max_duplos and len(ticket[idx]) == 1:
-            sorted_idx = np.argsort(-P[idx])  # 0,1,2 (desc)
-            best, second = sorted_idx[0], sorted_idx[1]
-            map_out = {0:"1",1:"X",2:"2"}
-            ticket[idx] = {map_out[best], map_out[second]}
-            d_used += 1
+    draws = simulate_outcomes(P, n_sims=sims, seed=SEED)
+    om = encode_outcomes(draws)
+    masks = encode_tickets([[{IDX[a] for a in allow} for allow in tk] for tk in pool])
+    covered = np.zeros(sims, dtype=bool)
+
+    heap = [(-float(_full_hits(om, m).mean()), i) for i, m in enumerate(masks)]
+    heapq.heapify(heap)
+    chosen = []
+    while heap and len(chosen) < n_tickets:
+        _, i = heapq.heappop(heap)
+        hit = _full_hits(om, masks[i])
+        gain = float((hit & ~covered).mean())
+        if heap and gain < -heap[0][0]:
+            heapq.heappush(heap, (-gain, i))  # limite desatualizado: reavaliar depois
             continue
-        if t_used < max_triplos and len(ticket[idx]) < 3:
-            ticket[idx] = {"1","X","2"}
-            t_used += 1
-    return ticket
-
-def _marginal_gain(P: np.ndarray, portfolio: list[list[set[str]]], candidate: list[set[str]], sims: int):
-    def p14(ticket):
-        return _simulate_hits(P, ticket, n_sims=sims)
-    existing = [p14(t) for t in portfolio]
-    base = 1.0 - np.prod([1.0 - p for p in existing]) if existing else 0.0
-    cand = p14(candidate)
-    new = 1.0 - np.prod([1.0 - p for p in (existing + [cand])])
-    return (new - base), cand
+        covered |= hit
+        chosen.append((i, gain))
+    return chosen
 
 # ----------------- main -----------------
 def main():
@@ -153,6 +146,7 @@ def main():
     ap.add_argument("--max-duplos", type=int, default=4)
     ap.add_argument("--max-triplos", type=int, default=2)
     ap.add_argument("--sims-eval", type=int, default=25000)
+    ap.add_argument("--pool", type=int, default=0, help="candidatos da DP (0 = max(50, 4*n_tickets))")
     args = ap.parse_args()
 
     # n-tickets pode chegar como string
@@ -168,19 +162,24 @@ def main():
     need_id = {"match_id"}
     if not need_id.issubset(df.columns):
         raise RuntimeError("[portfolio] joined/odds.csv precisa da coluna match_id.")
+    # cenários/cartões viram máscaras uint64 (3 bits por jogo): no máximo 21 jogos
+    if not 0 < len(df) <= MAX_PACKED_GAMES:
+        raise RuntimeError(f"[portfolio] {src.name} tem {len(df)} jogos; esperado 1..{MAX_PACKED_GAMES} "
+                           f"(cartão da Loteca = 14).")
 
     # garante probabilidades válidas
     P, fixed_ids = _ensure_probs(df)
     if fixed_ids:
         print("[portfolio] Aviso: probabilidades reconstruídas para match_id:", fixed_ids)
 
-    # ticket baseline + expansão + ganho marginal
+    # pool de melhores cartões (DP exata) + seleção gulosa preguiçosa por cobertura de cenários
+    pool_size = args.pool if args.pool > 0 else max(50, 4 * n_tickets)
+    pool = _top_tickets(P, args.max_duplos, args.max_triplos, pool_size)
     portfolio = []
     summary = []
-    for k in range(n_tickets):
-        t0 = _baseline_ticket(P)
-        tk = _expand_ticket(P, t0, args.max_duplos, args.max_triplos)
-        gain, p14 = _marginal_gain(P, portfolio, tk, sims=args.sims_eval)
+    for k, (i, gain) in enumerate(_lazy_greedy(P, pool, n_tickets, sims=args.sims_eval)):
+        tk = pool[i]
+        p14 = float(coverage_probs(P, [{IDX[a] for a in allow} for allow in tk]).prod())
         portfolio.append(tk)
         summary.append({"ticket": k+1, "p14": round(p14, 8), "marginal_gain": round(gain, 8)})
 
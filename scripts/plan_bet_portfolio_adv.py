@@ -4,7 +4,8 @@ import argparse, json
 from pathlib import Path
 import numpy as np
 import pandas as pd
-from risk_utils import load_prob_matrix, simulate_outcomes, ticket_hits, portfolio_payouts, var_es, kelly_fraction
+from risk_utils import (load_prob_matrix, simulate_outcomes, portfolio_payouts, var_es, kelly_fraction,
+                        coverage_probs, hit_distribution, expected_payout, SAMPLERS)
 
 RNG = np.random.default_rng(7)
 
@@ -64,11 +65,7 @@ def _candidate_pool(P: np.ndarray, n_cand=20, max_duplos=4, max_triplos=2):
 
 def _p14_ticket(P: np.ndarray, ticket: list[set[int]]) -> float:
     """Probabilidade de 14 acertos exata sob independência."""
-    p = 1.0
-    for i in range(P.shape[0]):
-        p_game = sum(P[i, s] for s in ticket[i])
-        p *= p_game
-    return float(p)
+    return float(hit_distribution(coverage_probs(P, ticket))[-1])
 
 def main():
     ap = argparse.ArgumentParser(description="Planejador de portfólio com gestão de risco (Kelly fracionário, VaR/ES).")
@@ -77,6 +74,8 @@ def main():
     ap.add_argument("--max-duplos", type=int, default=4)
     ap.add_argument("--max-triplos", type=int, default=2)
     ap.add_argument("--sims", type=int, default=50000)
+    ap.add_argument("--sampler", default="mc", choices=SAMPLERS, help="mc ou sobol (quasi-Monte Carlo)")
+    ap.add_argument("--antithetic", action="store_true", help="variáveis antitéticas (U, 1-U)")
     ap.add_argument("--kelly-frac", type=float, default=0.25, help="fração do Kelly (0 a 1)")
     ap.add_argument("--min-divers", type=float, default=0.20, help="mínimo de peso por 2º melhor ticket (diversificação)")
     ap.add_argument("--paytable-json", default="", help="JSON opcional: {'14': x, '13': y, ...}")
@@ -86,13 +85,14 @@ def main():
     # pool de candidatos
     pool = _candidate_pool(P, n_cand=max(20, args.n_tickets*4), max_duplos=args.max_duplos, max_triplos=args.max_triplos)
 
-    # calcula p14 exato aproximado por independência para ranking inicial
-    scores = np.array([_p14_ticket(P, t) for t in pool])
+    # distribuição exata de acertos de todo o pool (Poisson-binomial) para ranking inicial
+    dists = hit_distribution(coverage_probs(P, pool))
+    scores = dists[:, -1]
     idxs = np.argsort(scores)[::-1]
     chosen = [pool[i] for i in idxs[:args.n_tickets]]
 
     # simula outcomes
-    sim = simulate_outcomes(P, n_sims=args.sims)
+    sim = simulate_outcomes(P, n_sims=args.sims, method=args.sampler, antithetic=args.antithetic)
 
     # define paytable (opcional)
     pay_table = None
@@ -103,17 +103,13 @@ def main():
         except Exception:
             pay_table = None
 
-    # calcula base 'edge' por ticket: p14 (ou utilidade média simulada se paytable)
-    bases = []
-    for t in chosen:
-        if pay_table is None:
-            # proxy de edge: prob. de 14 acertos
-            bases.append(_p14_ticket(P, t))
-        else:
-            # utilidade esperada sob paytable (simulada)
-            ret = portfolio_payouts(sim, [t], np.array([1.0]), pay_table=pay_table)
-            bases.append(float(np.mean(ret)))
-    bases = np.array(bases, dtype=float)
+    # calcula base 'edge' por ticket: p14 (ou utilidade esperada exata se paytable)
+    chosen_dists = dists[idxs[:args.n_tickets]]
+    if pay_table is None:
+        # proxy de edge: prob. de 14 acertos
+        bases = chosen_dists[:, -1].astype(float)
+    else:
+        bases = expected_payout(chosen_dists, pay_table).astype(float)
 
     # Kelly fracionário sobre odds implícitas do próprio ranking (b simples): b = (1/p) - 1
     # Evita infinito quando p~0
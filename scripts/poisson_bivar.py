@@ -10,48 +10,22 @@ from __future__ import annotations
 import argparse
 import os
 import sys
-import math
+import numpy as np
 import pandas as pd
 from typing import Tuple
 
-def _poisson_pmf(k: int, lam: float) -> float:
-    if lam <= 0:
-        return 1.0 if k == 0 else 0.0
-    return math.exp(-lam) * (lam ** k) / math.factorial(k)
+# motor de grades em lote (compartilhado pelos modelos de gols)
+try:
+    from scripts.poisson_grid import outcome_probs
+except ImportError:
+    from poisson_grid import outcome_probs
 
 def _grid_probs(lh: float, la: float, max_goals: int = None) -> Tuple[float, float, float]:
     """
-    Calcula P(home), P(draw), P(away) somando as massas de probabilidade
-    em uma grade (gols_home x gols_away).
+    Calcula P(home), P(draw), P(away) de um jogo (atalho para o motor em lote).
     """
-    if max_goals is None:
-        # grade adaptativa: segura e barata
-        max_goals = int(min(18, max(10, math.ceil(lh + la + 8))))
-    ph = [_poisson_pmf(i, lh) for i in range(max_goals + 1)]
-    pa = [_poisson_pmf(j, la) for j in range(max_goals + 1)]
-
-    p_home = 0.0
-    p_draw = 0.0
-    p_away = 0.0
-    # soma dupla
-    for i, p_i in enumerate(ph):
-        for j, p_j in enumerate(pa):
-            pij = p_i * p_j
-            if i > j:
-                p_home += pij
-            elif i == j:
-                p_draw += pij
-            else:
-                p_away += pij
-
-    # pequena correção de normalização por truncamento (distribuir resto proporcionalmente)
-    s = p_home + p_draw + p_away
-    if s > 0:
-        p_home /= s
-        p_draw /= s
-        p_away /= s
-
-    return p_home, p_draw, p_away
+    res = outcome_probs([lh], [la], max_goals)
+    return float(res["p_home"][0]), float(res["p_draw"][0]), float(res["p_away"][0])
 
 def _find_cols(df: pd.DataFrame) -> Tuple[str, str, str]:
     """
@@ -132,26 +106,23 @@ def main():
     except Exception:
         pass  # segue sem nomes
 
-    rows = []
-    for _, r in src.iterrows():
-        lh = float(max(0.0, r[ch]))
-        la = float(max(0.0, r[ca]))
-        p1, px, p2 = _grid_probs(lh, la, args.max_goals)
-
-        row = {
-            "match_id": r[mid],
-            "lambda_home": lh,
-            "lambda_away": la,
-            "p1": p1,
-            "px": px,
-            "p2": p2,
-        }
-        if home_col and away_col:
-            row["home"] = r.get(home_col, None)
-            row["away"] = r.get(away_col, None)
-        rows.append(row)
-
-    out = pd.DataFrame(rows)
+    lh = np.clip(np.nan_to_num(src[ch].to_numpy(float), nan=0.0), 0.0, None)
+    la = np.clip(np.nan_to_num(src[ca].to_numpy(float), nan=0.0), 0.0, None)
+    # grade única para o lote inteiro (padrão adaptativo no pior caso)
+    probs = outcome_probs(lh, la, args.max_goals)
+
+    out = pd.DataFrame({
+        "match_id": src[mid].to_numpy(),
+        "lambda_home": lh,
+        "lambda_away": la,
+        "p1": probs["p_home"],
+        "px": probs["p_draw"],
+        "p2": probs["p_away"],
+    })
+    if home_col and away_col:
+        out["home"] = src[home_col].to_numpy()
+        out["away"] = src[away_col].to_numpy()
+
     out.to_csv(out_path, index=False, encoding="utf-8")
     print(f"[poisson_bivar] OK -> {out_path} ({len(out)} linhas)")
 
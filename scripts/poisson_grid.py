@@ -0,0 +1,103 @@
+# scripts/poisson_grid.py
+# -*- coding: utf-8 -*-
+"""
+Motor vetorizado de grades de placar Poisson (independente), compartilhado pelos
+modelos de gols (poisson_bivar, xg_bivariate, bivariate_estimator, dixon_coles).
+
+Recebe arrays de λ_home/λ_away de todos os jogos e monta as grades truncadas
+(n, G+1, G+1) num único produto externo em lote; na mesma passada reduz para
+1X2, over/under e BTTS.
+"""
+from __future__ import annotations
+
+import math
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+
+def adaptive_max_goals(lh, la) -> int:
+    """Mesma regra adaptativa do poisson_bivar, tomada no pior caso do lote."""
+    lh = np.asarray(lh, dtype=float)
+    la = np.asarray(la, dtype=float)
+    if lh.size == 0:
+        return 10
+    top = float(np.nanmax(np.clip(lh, 0.0, None) + np.clip(la, 0.0, None)))
+    return int(min(18, max(10, math.ceil(top + 8))))
+
+
+def poisson_pmf_matrix(lam, max_goals: int) -> np.ndarray:
+    """
+    PMF de Poisson para k=0..max_goals de cada λ, shape (n, max_goals+1).
+    Usa a recorrência p_k = p_{k-1} * λ / k (sem fatoriais). λ<=0 -> massa em 0.
+    """
+    lam = np.clip(np.asarray(lam, dtype=float).reshape(-1), 0.0, None)
+    k = np.arange(1, max_goals + 1, dtype=float)
+    ratios = lam[:, None] / k[None, :]
+    pmf = np.empty((lam.size, max_goals + 1), dtype=float)
+    pmf[:, 0] = np.exp(-lam)
+    pmf[:, 1:] = pmf[:, :1] * np.cumprod(ratios, axis=1)
+    return pmf
+
+
+def score_grids(lh, la, max_goals: Optional[int] = None) -> np.ndarray:
+    """Grades P(gols_home=i, gols_away=j) de todos os jogos, shape (n, G+1, G+1)."""
+    if max_goals is None:
+        max_goals = adaptive_max_goals(lh, la)
+    ph = poisson_pmf_matrix(lh, max_goals)
+    pa = poisson_pmf_matrix(la, max_goals)
+    return ph[:, :, None] * pa[:, None, :]
+
+
+def dixon_coles_grids(lh, la, rho, max_goals: Optional[int] = None) -> np.ndarray:
+    """
+    Grades Poisson com a correção de Dixon–Coles nos placares 0-0, 0-1, 1-0 e 1-1
+    (τ limitado a >= 1e-9), renormalizadas para somar 1. rho escalar ou por jogo.
+    """
+    lh = np.asarray(lh, dtype=float).reshape(-1)
+    la = np.asarray(la, dtype=float).reshape(-1)
+    rho = np.broadcast_to(np.asarray(rho, dtype=float), lh.shape)
+    grids = score_grids(lh, la, max_goals).copy()
+    grids[:, 0, 0] *= np.maximum(1e-9, 1.0 - lh * la * rho)
+    grids[:, 0, 1] *= np.maximum(1e-9, 1.0 + lh * rho)
+    grids[:, 1, 0] *= np.maximum(1e-9, 1.0 + la * rho)
+    grids[:, 1, 1] *= np.maximum(1e-9, 1.0 - rho)
+    total = grids.sum(axis=(1, 2), keepdims=True)
+    return grids / np.where(total > 0, total, 1.0)
+
+
+def grid_outcomes(grids: np.ndarray, normalize: bool = True,
+                  ou_lines: Iterable[float] = (2.5,)) -> Dict[str, np.ndarray]:
+    """
+    Reduz grades (n, G+1, G+1) para mercados:
+      p_home, p_draw, p_away, p_btts, p_over_<linha>, p_under_<linha>
+    Com normalize=True, divide pela massa da grade (corrige o truncamento).
+    """
+    g = grids.shape[-1]
+    i = np.arange(g)[:, None]
+    j = np.arange(g)[None, :]
+
+    total = grids.sum(axis=(1, 2))
+    out = {
+        "p_home": (grids * (i > j)).sum(axis=(1, 2)),
+        "p_draw": np.trace(grids, axis1=1, axis2=2),
+        "p_away": (grids * (i < j)).sum(axis=(1, 2)),
+        "p_btts": grids[:, 1:, 1:].sum(axis=(1, 2)),
+    }
+    goals = i + j
+    for line in ou_lines:
+        key = str(line).replace(".", "_")
+        out[f"p_over_{key}"] = (grids * (goals > line)).sum(axis=(1, 2))
+        out[f"p_under_{key}"] = (grids * (goals < line)).sum(axis=(1, 2))
+
+    if normalize:
+        safe = np.where(total > 0, total, 1.0)
+        for k in out:
+            out[k] = np.where(total > 0, out[k] / safe, 0.0)
+    return out
+
+
+def outcome_probs(lh, la, max_goals: Optional[int] = None, normalize: bool = True,
+                  ou_lines: Iterable[float] = (2.5,)) -> Dict[str, np.ndarray]:
+    """Atalho: λ's -> grades -> mercados, tudo em lote."""
+    return grid_outcomes(score_grids(lh, la, max_goals), normalize=normalize, ou_lines=ou_lines)
@@ -4,14 +4,22 @@
 postgame_update.py
 Calibra probabilidades (home/draw/away) com base em resultados reais de uma rodada,
 ajustando fatores k_home, k_draw, k_away para minimizar Brier score agregada.
+Modos:
+ - online (padrão): parte dos k atuais e aplica um passo de Gauss-Newton recursivo por jogo
+   novo (Brier ou log-loss em log k): a curvatura acumulada A (3x3, meia-vida em jogos) faz o
+   passo cair como ~1/n, então os k convergem para o ajuste batch em vez de oscilar.
+   Custo O(jogos da rodada); estatísticas suficientes ficam em model_params.yaml
+   (calibration.online) e uma rodada já aplicada não é contada de novo.
+ - batch: reotimiza os k sobre todos os jogos do arquivo de resultados (L-BFGS-B).
 Saída:
  - {OUT_DIR}/predictions_calibrated.csv
  - {OUT_DIR}/postgame_report.txt / .json
  - Atualiza data/model/model_params.yaml com os novos fatores
 Uso:
   python scripts/postgame_update.py --out-dir data/out/<rodada ou jobid> --results data/in/results_XXXX.csv --debug
+  python scripts/postgame_update.py ... --mode batch          # reajuste completo explícito
 """
-import argparse, json, os, sys, math, datetime
+import argparse, json, os, sys, math, datetime, hashlib
 import unicodedata
 import numpy as np
 import pandas as pd
@@ -25,6 +33,11 @@ except Exception:
     print("[postgame] ERRO: PyYAML não encontrado. Adicione 'PyYAML' ao requirements.txt.", file=sys.stderr)
     sys.exit(2)
 
+try:
+    from scripts.rating_state import STATE_PATH, update_from_results
+except ImportError:
+    from rating_state import STATE_PATH, update_from_results
+
 # ---------- util -----------
 def _norm(s: str) -> str:
     if s is None: return ""
@@ -95,6 +108,69 @@ def calibrate_scalars(probs: np.ndarray, y_onehot: np.ndarray, debug: bool=False
         print(f"[postgame][DEBUG] k*: home={kH:.4f} draw={kD:.4f} away={kA:.4f} | brier={new_brier:.6f} (ok={res.success})")
     return float(kH),float(kD),float(kA),float(new_brier)
 
+K_BOUNDS = (0.85, 1.15)
+# curvatura inicial (≈ jogos de "prior" nos k atuais): segura os primeiros passos
+ONLINE_RIDGE = 5.0
+
+def _loss_grad(q: np.ndarray, y: np.ndarray, loss: str) -> np.ndarray:
+    """Gradiente em theta = log k de um jogo, com q = normalize(p * e^theta)."""
+    if loss == "logloss":
+        return q - y
+    r = q - y  # Brier: d/dtheta_j sum_i (q_i - y_i)^2
+    return 2.0 * q * (r - np.dot(r, q))
+
+def _loss_curv(q: np.ndarray, loss: str) -> np.ndarray:
+    """Curvatura (Gauss-Newton/Fisher) de um jogo em theta = log k."""
+    J = np.diag(q) - np.outer(q, q)  # dq/dtheta
+    return J if loss == "logloss" else 2.0 * J @ J
+
+def online_update(calib: dict, probs: np.ndarray, y_onehot: np.ndarray, batch_id: str,
+                  lr: float = 1.0, halflife: float = 2000.0, loss: str = "brier",
+                  debug: bool=False) -> Tuple[dict, bool]:
+    """
+    Atualiza (kH,kD,kA) só com os jogos desta rodada: theta -= lr * A^-1 g, com A a soma
+    (meia-vida `halflife` jogos) das curvaturas. Só as razões entre os k importam; theta é
+    recentrado (média 0). Estado em calib["online"]: n, A, brier_ema/logloss_ema, batches recentes.
+    Retorna (calib novo, aplicado?) — batch_id repetido não altera nada.
+    """
+    st = dict(calib.get("online") or {})
+    batches = list(st.get("batches") or [])
+    if batch_id in batches:
+        if debug:
+            print(f"[postgame][DEBUG] rodada {batch_id} já aplicada; k mantidos")
+        return calib, False
+    k = np.array([calib.get("k_home",1.0), calib.get("k_draw",1.0), calib.get("k_away",1.0)], dtype=float)
+    theta = np.log(np.clip(k, *K_BOUNDS))
+    A = np.asarray(st.get("A") or (ONLINE_RIDGE * np.eye(3)), dtype=float)
+    beta = 0.5 ** (1.0 / max(halflife, 1.0))
+    brier_ema = st.get("brier_ema")
+    logloss_ema = st.get("logloss_ema")
+    lo, hi = np.log(K_BOUNDS[0]), np.log(K_BOUNDS[1])
+    for p, y in zip(probs, y_onehot):
+        q = np.clip(p, 1e-12, 1.0) * np.exp(theta)
+        q = q / q.sum()
+        b = float(np.sum((q - y)**2)); l = float(-np.log(max(q[y.argmax()], 1e-12)))
+        brier_ema = b if brier_ema is None else beta*brier_ema + (1-beta)*b
+        logloss_ema = l if logloss_ema is None else beta*logloss_ema + (1-beta)*l
+        A = beta*A + _loss_curv(q, loss)
+        step = np.linalg.lstsq(A, _loss_grad(q, y, loss), rcond=None)[0]
+        theta = np.clip(theta - lr*step, lo, hi)
+        theta = theta - theta.mean()
+    st.pop("m", None)  # média de gradientes do formato antigo
+    st.update({
+        "n": int(st.get("n", 0)) + int(len(probs)), "A": [[float(v) for v in row] for row in A],
+        "brier_ema": brier_ema, "logloss_ema": logloss_ema, "loss": loss, "lr": lr, "halflife": halflife,
+        "batches": (batches + [batch_id])[-200:],
+    })
+    kH, kD, kA = (float(v) for v in np.exp(theta))
+    if debug:
+        print(f"[postgame][DEBUG] online ({loss}, {len(probs)} jogos): home={kH:.4f} draw={kD:.4f} away={kA:.4f} | brier_ema={brier_ema:.6f}")
+    return {**calib, "k_home": kH, "k_draw": kD, "k_away": kA, "online": st}, True
+
+def batch_id_for(out_dir: str, keys) -> str:
+    h = hashlib.sha1(("|".join([os.path.normpath(out_dir)] + sorted(map(str, keys)))).encode("utf-8"))
+    return h.hexdigest()[:16]
+
 def load_model_params(path_yaml: str) -> dict:
     if os.path.isfile(path_yaml):
         with open(path_yaml,"r",encoding="utf-8") as f:
@@ -114,6 +190,14 @@ def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--out-dir", required=True, help="Diretório da rodada/job com predictions_market.csv")
     ap.add_argument("--results", required=True, help="CSV com resultados reais (ver template).")
+    ap.add_argument("--mode", choices=["online","batch"], default="online",
+                    help="online: passo incremental a partir dos k atuais; batch: reotimiza sobre o arquivo todo")
+    ap.add_argument("--loss", choices=["brier","logloss"], default="brier", help="perda do modo online")
+    ap.add_argument("--lr", type=float, default=1.0, help="fração do passo de Gauss-Newton do modo online")
+    ap.add_argument("--halflife", type=float, default=2000.0,
+                    help="meia-vida (jogos) da curvatura e das médias do modo online")
+    ap.add_argument("--rating-state", default=str(STATE_PATH),
+                    help="estado de ratings a atualizar com os placares (vazio = não atualiza)")
     ap.add_argument("--debug", action="store_true")
     args = ap.parse_args()
 
@@ -149,7 +233,21 @@ def main():
     brier_old = brier_score(P, Y)
 
     # Calibração
-    kH,kD,kA,brier_new = calibrate_scalars(P, Y, debug=debug)
+    model_yaml = "data/model/model_params.yaml"
+    mp = load_model_params(model_yaml)
+    calib = dict(mp.get("calibration") or {})
+    if args.mode == "batch":
+        kH,kD,kA,brier_new = calibrate_scalars(P, Y, debug=debug)
+        # reajuste completo: estatísticas online recomeçam a partir destes k
+        calib = {"k_home": kH, "k_draw": kD, "k_away": kA}
+        note = "batch-calibrated from results file (postgame_update.py --mode batch)"
+    else:
+        calib, applied = online_update(calib, P, Y, batch_id_for(out_dir, df["match_key"]),
+                                       lr=args.lr, halflife=args.halflife, loss=args.loss, debug=debug)
+        kH,kD,kA = calib["k_home"], calib["k_draw"], calib["k_away"]
+        scaled = P * np.array([kH,kD,kA])[None,:]
+        brier_new = brier_score(scaled / scaled.sum(axis=1, keepdims=True), Y)
+        note = "online update from last results (postgame_update.py)" if applied else calib.get("note", "")
 
     # Gerar predictions_calibrated.csv
     scale = np.array([kH,kD,kA])[None,:]
@@ -165,17 +263,25 @@ def main():
         print(f"[postgame] OK -> {out_csv} ({len(out_pred)} linhas)")
 
     # Atualizar model_params.yaml
-    model_yaml = "data/model/model_params.yaml"
-    mp = load_model_params(model_yaml)
     mp["calibration"] = {
         "k_home": round(kH,6),
         "k_draw": round(kD,6),
         "k_away": round(kA,6),
         "updated_at": datetime.datetime.utcnow().isoformat()+"Z",
-        "note": "auto-calibrated from last results (postgame_update.py)"
+        "note": note,
     }
+    if "online" in calib:
+        mp["calibration"]["online"] = calib["online"]
     save_model_params(model_yaml, mp)
 
+    # Ratings por time: aplica só os placares ainda não vistos (precisa de gols, não só H/D/A)
+    if args.rating_state:
+        raw = pd.read_csv(res_path).rename(columns=str.lower)
+        if {"home_goals","away_goals"}.issubset(raw.columns):
+            update_from_results(raw, args.rating_state)
+        elif debug:
+            print("[postgame][DEBUG] resultados sem placar; ratings não atualizados")
+
     # Relatórios
     delta = brier_old - brier_new
     rep_txt = os.path.join(out_dir, "postgame_report.txt")
@@ -185,7 +291,7 @@ def main():
         f.write(f"[postgame] brier_before: {brier_old:.6f}\n")
         f.write(f"[postgame] brier_after : {brier_new:.6f}\n")
         f.write(f"[postgame] improvement : {delta:.6f}\n")
-        f.write(f"[postgame] k_home={kH:.6f} k_draw={kD:.6f} k_away={kA:.6f}\n")
+        f.write(f"[postgame] mode={args.mode} k_home={kH:.6f} k_draw={kD:.6f} k_away={kA:.6f}\n")
         f.write(f"[postgame] params_yaml: {model_yaml}\n")
     with open(rep_json,"w",encoding="utf-8") as f:
         json.dump({
@@ -193,7 +299,7 @@ def main():
             "brier_before": brier_old,
             "brier_after": brier_new,
             "improvement": delta,
-            "k_home": kH, "k_draw": kD, "k_away": kA,
+            "k_home": kH, "k_draw": kD, "k_away": kA, "mode": args.mode,
             "model_params_yaml": model_yaml
         }, f, ensure_ascii=False, indent=2)
 
@@ -1,27 +1,61 @@
 # -*- coding: utf-8 -*-
 import argparse
 import sys
+import numpy as np
 import pandas as pd
 import pickle
 import os
 import json
 
+try:
+    from scripts.rating_state import RatingState
+except ImportError:
+    from rating_state import RatingState
+
 def _log(msg: str) -> None:
     print(f"[predict_dynamic_model] {msg}", flush=True)
 
-def predict_dynamic_model(model_file, state_file, matches_file, out_csv):
-    if not os.path.isfile(model_file):
-        _log(f"Arquivo {model_file} não encontrado")
-        sys.exit(8)
+# coluna de features por time -> (valor padrão quando o time não tem linha)
+TEAM_FEATURES = {
+    'avg_goals_scored': 1.0, 'avg_goals_conceded': 1.0, 'sentiment': 0.0,
+    'injuries': 0, 'rain_prob': 0.0, 'temperature': 0.0,
+}
+# ordem das colunas esperada pelo modelo
+FEATURE_ORDER = [
+    'avg_goals_scored_home', 'avg_goals_conceded_home', 'avg_goals_scored_away', 'avg_goals_conceded_away',
+    'sentiment_home', 'injuries_home', 'rain_prob_home', 'temperature_home',
+    'sentiment_away', 'injuries_away', 'rain_prob_away', 'temperature_away',
+]
+DEFAULT_PROBS = (0.33, 0.33, 0.34)
 
-    if not os.path.isfile(state_file):
-        _log(f"Arquivo {state_file} não encontrado")
-        sys.exit(8)
+def build_feature_matrix(matches: pd.DataFrame, features: pd.DataFrame, home_col: str, away_col: str) -> pd.DataFrame:
+    """Matriz de features de todos os jogos: índice por time (primeira linha de cada) + reindex vetorizado."""
+    cols = [c for c in TEAM_FEATURES if c in features.columns]
+    by_team = features.drop_duplicates('team', keep='first').set_index('team')[cols]
+    parts = {}
+    for side, col in (('home', home_col), ('away', away_col)):
+        side_df = by_team.reindex(matches[col].values)
+        for c, default in TEAM_FEATURES.items():
+            vals = side_df[c] if c in side_df.columns else pd.Series(default, index=side_df.index)
+            # time ausente -> padrão; valor ausente numa linha existente segue como no lookup antigo
+            parts[f'{c}_{side}'] = vals.where(side_df.index.isin(by_team.index), default).values
+    return pd.DataFrame(parts)[FEATURE_ORDER]
 
-    if not os.path.isfile(matches_file):
-        _log(f"Arquivo {matches_file} não encontrado")
-        sys.exit(8)
+def _probs_columns(probs) -> np.ndarray:
+    """predict_proba (classes 0=fora, 1=empate, 2=casa) -> colunas casa/empate/fora, com padrões se faltar classe."""
+    P = np.asarray(probs, dtype=float)
+    n, k = P.shape
+    out = np.tile(np.array(DEFAULT_PROBS, dtype=float), (n, 1))
+    if k > 2:
+        out[:, 0] = P[:, 2]
+    if k > 1:
+        out[:, 1] = P[:, 1]
+    if k > 0:
+        out[:, 2] = P[:, 0]
+    return out
 
+def _predict_with_model(model_file, matches, home_col, away_col) -> np.ndarray:
+    """Caminho antigo: classificador serializado + features por time (data/history/features.parquet)."""
     try:
         with open(model_file, 'rb') as f:
             model = pickle.load(f)
@@ -29,6 +63,32 @@ def predict_dynamic_model(model_file, state_file, matches_file, out_csv):
         _log(f"Erro ao ler {model_file}: {e}")
         sys.exit(8)
 
+    # Carregar features para predição (indexadas por time uma única vez)
+    features = pd.read_parquet('data/history/features.parquet')
+    X = build_feature_matrix(matches, features, home_col, away_col)
+    try:
+        return _probs_columns(model.predict_proba(X))
+    except Exception as e:
+        # fallback linha a linha: um jogo problemático não derruba a rodada inteira
+        _log(f"Predição em lote falhou ({e}); tentando jogo a jogo")
+        rows = []
+        for i in range(len(X)):
+            try:
+                rows.append(_probs_columns(model.predict_proba(X.iloc[[i]]))[0])
+            except Exception as e_row:
+                _log(f"Erro ao prever para {matches[home_col].iloc[i]} x {matches[away_col].iloc[i]}: {e_row}")
+                rows.append(DEFAULT_PROBS)
+        return np.array(rows, dtype=float).reshape(-1, 3)
+
+def predict_dynamic_model(model_file, state_file, matches_file, out_csv):
+    if not os.path.isfile(state_file):
+        _log(f"Arquivo {state_file} não encontrado")
+        sys.exit(8)
+
+    if not os.path.isfile(matches_file):
+        _log(f"Arquivo {matches_file} não encontrado")
+        sys.exit(8)
+
     try:
         with open(state_file, 'r') as f:
             state = json.load(f)
@@ -45,58 +105,34 @@ def predict_dynamic_model(model_file, state_file, matches_file, out_csv):
     home_col = 'team_home' if 'team_home' in matches.columns else 'home'
     away_col = 'team_away' if 'team_away' in matches.columns else 'away'
 
-    # Carregar features para predição
-    features = pd.read_parquet('data/history/features.parquet')
-    predictions = []
-    for _, match in matches.iterrows():
-        match_id = match.get('match_id', 0)  # Preservar match_id
-        home_team = match[home_col]
-        away_team = match[away_col]
-        home_stats = features[features['team'] == home_team]
-        away_stats = features[features['team'] == away_team]
-        X = pd.DataFrame({
-            'avg_goals_scored_home': [home_stats['avg_goals_scored'].iloc[0] if not home_stats.empty else 1.0],
-            'avg_goals_conceded_home': [home_stats['avg_goals_conceded'].iloc[0] if not home_stats.empty else 1.0],
-            'avg_goals_scored_away': [away_stats['avg_goals_scored'].iloc[0] if not away_stats.empty else 1.0],
-            'avg_goals_conceded_away': [away_stats['avg_goals_conceded'].iloc[0] if not away_stats.empty else 1.0],
-            'sentiment_home': [home_stats['sentiment'].iloc[0] if not home_stats.empty else 0.0],
-            'injuries_home': [home_stats['injuries'].iloc[0] if not home_stats.empty else 0],
-            'rain_prob_home': [home_stats['rain_prob'].iloc[0] if not home_stats.empty else 0.0],
-            'temperature_home': [home_stats['temperature'].iloc[0] if not home_stats.empty else 0.0],
-            'sentiment_away': [away_stats['sentiment'].iloc[0] if not away_stats.empty else 0.0],
-            'injuries_away': [away_stats['injuries'].iloc[0] if not away_stats.empty else 0],
-            'rain_prob_away': [away_stats['rain_prob'].iloc[0] if not away_stats.empty else 0.0],
-            'temperature_away': [away_stats['temperature'].iloc[0] if not away_stats.empty else 0.0]
-        })
-        try:
-            probs = model.predict_proba(X)
-            predictions.append({
-                'match_id': match_id,  # Incluir match_id
-                'home_team': home_team,
-                'away_team': away_team,
-                'home_prob': probs[0][2] if len(probs[0]) > 2 else 0.33,
-                'draw_prob': probs[0][1] if len(probs[0]) > 1 else 0.33,
-                'away_prob': probs[0][0] if len(probs[0]) > 0 else 0.34
-            })
-        except Exception as e:
-            _log(f"Erro ao prever para {home_team} x {away_team}: {e}")
-            predictions.append({
-                'match_id': match_id,  # Incluir match_id
-                'home_team': home_team,
-                'away_team': away_team,
-                'home_prob': 0.33,
-                'draw_prob': 0.33,
-                'away_prob': 0.34
-            })
-
-    df_predictions = pd.DataFrame(predictions)
+    if isinstance(state, dict) and 'teams' in state:
+        # estado de ratings (train_dynamic_model/rating_state): leitura direta, sem modelo serializado
+        rs = RatingState.from_dict(state)
+        pred = rs.predict(matches[home_col].astype(str), matches[away_col].astype(str))
+        probs = pred[['p_home', 'p_draw', 'p_away']].to_numpy(dtype=float)
+        _log(f"Estado de ratings: {len(rs)} times, {rs.n_matches} jogos")
+    else:
+        if not model_file or not os.path.isfile(model_file):
+            _log(f"Arquivo {model_file} não encontrado")
+            sys.exit(8)
+        probs = _predict_with_model(model_file, matches, home_col, away_col)
+
+    df_predictions = pd.DataFrame({
+        'match_id': matches['match_id'].values if 'match_id' in matches.columns else 0,  # Preservar match_id
+        'home_team': matches[home_col].values,
+        'away_team': matches[away_col].values,
+        'home_prob': probs[:, 0],
+        'draw_prob': probs[:, 1],
+        'away_prob': probs[:, 2],
+    })
+
     os.makedirs(os.path.dirname(out_csv), exist_ok=True)
     df_predictions.to_csv(out_csv, index=False)
     _log(f"Predições salvas em {out_csv}")
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--model", required=True)
+    ap.add_argument("--model", default="", help="só para estados antigos sem ratings")
     ap.add_argument("--state", required=True)
     ap.add_argument("--matches", required=True)
     ap.add_argument("--out", required=True)
@@ -6,11 +6,15 @@ import argparse
 import csv
 import os
 import sys
-from typing import Tuple
 
 import pandas as pd
 import numpy as np
 
+try:
+    from scripts.devig import devig, METHODS as DEVIG_METHODS
+except ImportError:
+    from devig import devig, METHODS as DEVIG_METHODS
+
 
 REQUIRED = ["match_id", "team_home", "team_away", "odds_home", "odds_draw", "odds_away"]
 OUT_COLS = [
@@ -52,45 +56,6 @@ def coerce_float(x):
         return np.nan
 
 
-def implied_probs_3way(oh: float, od: float, oa: float) -> Tuple[float, float, float, float]:
-    """
-    Converte odds decimais (home/draw/away) em probabilidades implícitas,
-    removendo o vigorish pela normalização simples.
-    Retorna (ph, pd, pa, oi_sum) onde oi_sum = soma das probabilidades implícitas brutas (com juice).
-    """
-    inv = []
-    for o in [oh, od, oa]:
-        if o is None or np.isnan(o) or o <= 1.0:
-            inv.append(np.nan)
-        else:
-            inv.append(1.0 / o)
-    if any(np.isnan(inv)):
-        return (np.nan, np.nan, np.nan, np.nan)
-    s = sum(inv)
-    return inv[0] / s, inv[1] / s, inv[2] / s, s
-
-
-def implied_probs_2way(oh: float, oa: float) -> Tuple[float, float, float, float]:
-    """
-    Converte odds decimais (home/away) em probabilidades implícitas 2-way (sem empate).
-    Retorna (ph, 0.0, pa, oi_sum)
-    """
-    inv_h = np.nan if (oh is None or np.isnan(oh) or oh <= 1.0) else 1.0 / oh
-    inv_a = np.nan if (oa is None or np.isnan(oa) or oa <= 1.0) else 1.0 / oa
-    if np.isnan(inv_h) or np.isnan(inv_a):
-        return (np.nan, np.nan, np.nan, np.nan)
-    s = inv_h + inv_a
-    return inv_h / s, 0.0, inv_a / s, s
-
-
-def choose_pick(ph: float, pd: float, pa: float) -> str:
-    if np.isnan(ph) and np.isnan(pd) and np.isnan(pa):
-        return ""
-    arr = np.array([ph, pd, pa], dtype=float)
-    idx = int(np.nanargmax(arr))
-    return ["HOME", "DRAW", "AWAY"][idx]
-
-
 def validate_and_prepare(df: pd.DataFrame, strict: bool, allow_two_way: bool, debug: bool) -> pd.DataFrame:
     # Renomeações defensivas (se vieram nomes alternativos)
     ren = {}
@@ -174,42 +139,41 @@ def validate_and_prepare(df: pd.DataFrame, strict: bool, allow_two_way: bool, de
     return df
 
 
-def compute_predictions(df: pd.DataFrame) -> pd.DataFrame:
-    rows = []
-    for _, r in df.iterrows():
-        oh, od, oa = r["odds_home"], r["odds_draw"], r["odds_away"]
-        if pd.isna(od):  # 2-way
-            ph, pdw, pa, s = implied_probs_2way(oh, oa)
-            notes = "two_way"
-        else:  # 3-way
-            ph, pdw, pa, s = implied_probs_3way(oh, od, oa)
-            notes = "three_way"
-
-        if any(np.isnan([ph, pdw, pa])):
-            # segurança extra: pula linha
-            continue
-
-        pick = choose_pick(ph, pdw, pa)
-        # margem simples = maior prob - segundo maior
-        arr = np.array([ph, pdw, pa], dtype=float)
-        top2 = np.sort(arr)[-2:]
-        margin = float(top2[-1] - top2[-2])
-
-        rows.append(
-            {
-                "match_id": r["match_id"],
-                "team_home": r["team_home"],
-                "team_away": r["team_away"],
-                "prob_home": round(ph, 6),
-                "prob_draw": round(pdw, 6),
-                "prob_away": round(pa, 6),
-                "pick": pick,
-                "margin": round(margin, 6),
-                "notes": notes,
-            }
-        )
-
-    return pd.DataFrame(rows, columns=OUT_COLS)
+def compute_predictions(df: pd.DataFrame, method: str = "multiplicative") -> pd.DataFrame:
+    """
+    Probabilidades para a tabela inteira via motor de devig em lote.
+    Linhas sem odd de empate são tratadas como 2-way (prob_draw = 0).
+    """
+    oh = pd.to_numeric(df["odds_home"], errors="coerce").to_numpy(float)
+    od = pd.to_numeric(df["odds_draw"], errors="coerce").to_numpy(float)
+    oa = pd.to_numeric(df["odds_away"], errors="coerce").to_numpy(float)
+
+    two_way = np.isnan(od)
+    P = np.full((len(df), 3), np.nan)
+    if (~two_way).any():
+        P[~two_way] = devig(np.column_stack([oh, od, oa])[~two_way], method)
+    if two_way.any():
+        p2 = devig(np.column_stack([oh, oa])[two_way], method)
+        P[two_way] = np.column_stack([p2[:, 0], np.zeros(len(p2)), p2[:, 1]])
+
+    # segurança extra: pula linhas sem probabilidade
+    ok = np.isfinite(P).all(axis=1)
+    P, sub = P[ok], df.loc[ok]
+
+    # margem simples = maior prob - segundo maior
+    top2 = np.sort(P, axis=1)[:, -2:]
+    out = pd.DataFrame({
+        "match_id": sub["match_id"].to_numpy(),
+        "team_home": sub["team_home"].to_numpy(),
+        "team_away": sub["team_away"].to_numpy(),
+        "prob_home": np.round(P[:, 0], 6),
+        "prob_draw": np.round(P[:, 1], 6),
+        "prob_away": np.round(P[:, 2], 6),
+        "pick": np.array(["HOME", "DRAW", "AWAY"])[P.argmax(axis=1)] if len(P) else [],
+        "margin": np.round(top2[:, 1] - top2[:, 0], 6),
+        "notes": np.where(two_way[ok], "two_way", "three_way"),
+    })
+    return out[OUT_COLS]
 
 
 def main():
@@ -218,6 +182,8 @@ def main():
     ap.add_argument("--strict", action="store_true", help="Falha se houver qualquer odd inválida/NaN/≤1.0")
     ap.add_argument("--allow-two-way", dest="allow_two_way", action="store_true", help="Permite mercados sem empate (2-way).")
     ap.add_argument("--no-allow-two-way", dest="allow_two_way", action="store_false", help="Proíbe 2-way; descarta/aborta conforme modo.")
+    ap.add_argument("--devig", default="multiplicative", choices=DEVIG_METHODS,
+                    help="Método de remoção de margem (padrão: normalização simples)")
     ap.add_argument("--debug", action="store_true", help="Logs detalhados")
     ap.set_defaults(allow_two_way=True)
     args = ap.parse_args()
@@ -234,7 +200,7 @@ def main():
     df = validate_and_prepare(df, strict=args.strict, allow_two_way=args.allow_two_way, debug=args.debug)
 
     # Cálculo das probabilidades e picks
-    pred = compute_predictions(df)
+    pred = compute_predictions(df, args.devig)
 
     if pred.empty:
         err("[predict] Nenhuma previsão produzida (todas as linhas inválidas após cálculo).", 7)
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+rating_state.py
+Estado de ratings por time, atualizado jogo a jogo em O(1) (sem reajustar o histórico).
+
+Por time:
+  elo            Elo com mando (elo_home pontos) e multiplicador de margem de gols
+  pi_home/pi_away  pi-ratings (Constantinou & Fenton, 2013): força em casa e fora,
+                 em escala de diferença de gols esperada
+  attack/defence forças Poisson dinâmicas (log-escala, mesma convenção do dixon_coles.py):
+                 log λ_home = mu + home + attack[h] - defence[a]; passo de gradiente
+                 da log-verossimilhança Poisson a cada jogo
+  n, last        jogos processados e data do último
+
+O estado é um JSON (data/model/rating_state.json por padrão) com hiperparâmetros,
+mu/home globais, os times e as chaves dos jogos já aplicados — reaplicar o mesmo
+results.csv não conta duas vezes. Quem atualiza: ingest_results.py (ao gravar
+results.csv), postgame_update.py e train_dynamic_model.py (aplica o que faltar do
+histórico). Jogos com data são identificados por data|mandante|visitante; sem data, por
+mandante|visitante|placar. O estado também guarda (mandante, visitante, placar) -> dias
+aplicados: o mesmo jogo vindo do histórico (data exata) e de um arquivo de rodada (data da
+rodada, ou sem data = dia da aplicação) a até CLAIM_DAYS dias conta uma vez só.
+predict_dynamic_model.py lê o estado e gera 1/X/2 pela grade de Poisson.
+
+Uso:
+  python scripts/rating_state.py --results data/out/<R>/results.csv      # aplica uma rodada
+  python scripts/rating_state.py --rebuild --results data/history/results.csv
+  python scripts/rating_state.py --show 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scripts.dixon_coles import prepare
+    from scripts.poisson_grid import outcome_probs
+    from scripts.team_resolver import resolve_team
+except ImportError:
+    from dixon_coles import prepare
+    from poisson_grid import outcome_probs
+    from team_resolver import resolve_team
+
+STATE_PATH = Path("data/model/rating_state.json")
+
+# hiperparâmetros (gravados no estado; um estado existente mantém os seus)
+DEFAULTS = {
+    "elo_k": 20.0, "elo_home": 60.0, "elo_init": 1500.0,
+    "pi_lambda": 0.035, "pi_gamma": 0.7,
+    "lr": 0.05, "lr_global": 0.005,
+    "mu0": math.log(1.25), "home0": 0.2,
+}
+# mesmos times e placar a até CLAIM_DAYS dias em arquivos diferentes = o mesmo jogo
+CLAIM_DAYS = 7
+
+
+def _log(msg: str) -> None:
+    print(f"[rating_state] {msg}", flush=True)
+
+
+def _team(params: dict) -> dict:
+    return {"elo": params["elo_init"], "pi_home": 0.0, "pi_away": 0.0,
+            "attack": 0.0, "defence": 0.0, "n": 0, "last": None}
+
+
+def _pi_gd(r: float) -> float:
+    """pi-rating -> diferença de gols esperada."""
+    return math.copysign(10 ** (abs(r) / 3.0) - 1.0, r)
+
+
+class RatingState:
+    def __init__(self, params: Optional[dict] = None):
+        self.params = {**DEFAULTS, **(params or {})}
+        self.mu = self.params["mu0"]
+        self.home = self.params["home0"]
+        self.teams: Dict[str, dict] = {}
+        self.seen: set = set()
+        self.applied: Dict[str, list] = {}   # "mandante|visitante|placar" -> dias aplicados
+        self.n_matches = 0
+        self.updated_at: Optional[str] = None
+
+    # ---------- persistência ----------
+    @classmethod
+    def load(cls, path=STATE_PATH) -> "RatingState":
+        """Estado salvo; arquivo ausente/vazio/'{}' (formato antigo) -> estado novo."""
+        try:
+            data = json.loads(Path(path).read_text(encoding="utf-8") or "{}")
+        except (OSError, ValueError):
+            data = {}
+        return cls.from_dict(data)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RatingState":
+        st = cls(data.get("params"))
+        st.mu = float(data.get("mu", st.mu))
+        st.home = float(data.get("home", st.home))
+        st.teams = data.get("teams") or {}
+        st.seen = set(data.get("seen") or ())
+        st.applied = data.get("applied") or {}
+        st.n_matches = int(data.get("n_matches", 0))
+        st.updated_at = data.get("updated_at")
+        return st
+
+    def to_dict(self) -> dict:
+        return {"params": self.params, "mu": self.mu, "home": self.home, "n_matches": self.n_matches,
+                "updated_at": self.updated_at, "teams": self.teams, "seen": sorted(self.seen),
+                "applied": self.applied}
+
+    def save(self, path=STATE_PATH) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(json.dumps(self.to_dict(), ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+        return path
+
+    def __len__(self) -> int:
+        return len(self.teams)
+
+    def get(self, name: str) -> dict:
+        return self.teams.get(resolve_team(str(name))) or _team(self.params)
+
+    # ---------- atualização O(1) ----------
+    def update(self, home: str, away: str, hg: int, ag: int, date=None, key: Optional[str] = None) -> bool:
+        """Aplica um jogo finalizado (nomes já canônicos). Retorna False se a chave já foi vista."""
+        if key is not None:
+            if key in self.seen:
+                return False
+            self.seen.add(key)
+        p = self.params
+        th = self.teams.setdefault(home, _team(p))
+        ta = self.teams.setdefault(away, _team(p))
+        gd = hg - ag
+
+        # Elo (resultado 1/0.5/0, margem log(|gd|+1)+1)
+        exp_h = 1.0 / (1.0 + 10 ** ((ta["elo"] - th["elo"] - p["elo_home"]) / 400.0))
+        res_h = 1.0 if gd > 0 else (0.5 if gd == 0 else 0.0)
+        delta = p["elo_k"] * (math.log(abs(gd) + 1.0) + 1.0) * (res_h - exp_h)
+        th["elo"] += delta
+        ta["elo"] -= delta
+
+        # pi-ratings: erro entre o saldo observado e o esperado
+        err = gd - (_pi_gd(th["pi_home"]) - _pi_gd(ta["pi_away"]))
+        psi = math.copysign(3.0 * math.log10(1.0 + abs(err)), err)
+        dh, da = psi * p["pi_lambda"], -psi * p["pi_lambda"]
+        th["pi_home"] += dh; th["pi_away"] += dh * p["pi_gamma"]
+        ta["pi_away"] += da; ta["pi_home"] += da * p["pi_gamma"]
+
+        # Poisson dinâmico: gradiente de hg·log λ - λ em cada força
+        lh = math.exp(self.mu + self.home + th["attack"] - ta["defence"])
+        la = math.exp(self.mu + ta["attack"] - th["defence"])
+        eh, ea = hg - lh, ag - la
+        th["attack"] += p["lr"] * eh; ta["defence"] -= p["lr"] * eh
+        ta["attack"] += p["lr"] * ea; th["defence"] -= p["lr"] * ea
+        self.mu += p["lr_global"] * (eh + ea)
+        self.home += p["lr_global"] * eh
+
+        day = None if date is None or pd.isna(date) else str(pd.Timestamp(date).date())
+        for t in (th, ta):
+            t["n"] += 1
+            if day and (t["last"] is None or day > t["last"]):
+                t["last"] = day
+        self.n_matches += 1
+        return True
+
+    def _applied_near(self, match: str, day: str) -> bool:
+        d0 = date.fromisoformat(day)
+        return any(abs((date.fromisoformat(d) - d0).days) <= CLAIM_DAYS for d in self.applied.get(match, ()))
+
+    def update_results(self, results: pd.DataFrame, today: Optional[str] = None) -> int:
+        """Aplica um results.csv/histórico (colunas aceitas pelo dixon_coles.prepare), em ordem de data.
+
+        Chave de cada jogo: data|mandante|visitante (ou, sem data, mandante|visitante|placar)
+        + ocorrência; reaplicar o mesmo arquivo — ou um histórico append-only — só aplica o novo.
+        Jogo com chave nova mas mesmos times/placar já aplicado a até CLAIM_DAYS dias (outro
+        arquivo, outra data) só é marcado como visto. Sem data, o dia é `today` (padrão: hoje UTC).
+        """
+        df = prepare(results)
+        if df.empty:
+            return 0
+        df = df.sort_values("date", kind="stable", na_position="first")
+        day = df["date"].dt.strftime("%Y-%m-%d")
+        match = (df["home"] + "|" + df["away"] + "|"
+                 + df["hg"].astype(int).astype(str) + "-" + df["ag"].astype(int).astype(str)).to_numpy()
+        base = np.where(day.notna(), day.fillna("") + "|" + df["home"] + "|" + df["away"], match)
+        occ = pd.Series(base).groupby(base).cumcount().astype(str).to_numpy()
+        keys = [f"{b}#{o}" for b, o in zip(base, occ)]
+        days = day.fillna(today or datetime.now(timezone.utc).date().isoformat()).to_numpy()
+        applied = 0
+        for h, a, hg, ag, d, k, m, dd in zip(df["home"], df["away"], df["hg"].astype(int), df["ag"].astype(int),
+                                             df["date"], keys, match, days):
+            if k in self.seen:
+                continue
+            if self._applied_near(m, dd):
+                self.seen.add(k)   # mesmo jogo já aplicado a partir de outro arquivo
+                continue
+            self.update(h, a, int(hg), int(ag), d, key=k)
+            self.applied.setdefault(m, []).append(dd)
+            applied += 1
+        if applied:
+            self.updated_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        return applied
+
+    # ---------- leitura ----------
+    def rates(self, home: Sequence[str], away: Sequence[str]):
+        th = [self.get(t) for t in home]
+        ta = [self.get(t) for t in away]
+        lh = np.exp(self.mu + self.home + np.array([t["attack"] for t in th]) - np.array([t["defence"] for t in ta]))
+        la = np.exp(self.mu + np.array([t["attack"] for t in ta]) - np.array([t["defence"] for t in th]))
+        return lh, la
+
+    def predict(self, home: Sequence[str], away: Sequence[str], max_goals: Optional[int] = None) -> pd.DataFrame:
+        """1/X/2 pela grade de Poisson das forças dinâmicas + Elo/pi como colunas auxiliares."""
+        home, away = list(home), list(away)
+        lh, la = self.rates(home, away)
+        probs = outcome_probs(lh, la, max_goals=max_goals, normalize=True)
+        th = [self.get(t) for t in home]
+        ta = [self.get(t) for t in away]
+        return pd.DataFrame({
+            "lambda_home": lh, "lambda_away": la,
+            "p_home": probs["p_home"], "p_draw": probs["p_draw"], "p_away": probs["p_away"],
+            "elo_diff": [h["elo"] + self.params["elo_home"] - a["elo"] for h, a in zip(th, ta)],
+            "pi_gd": [_pi_gd(h["pi_home"]) - _pi_gd(a["pi_away"]) for h, a in zip(th, ta)],
+        })
+
+    def table(self) -> pd.DataFrame:
+        if not self.teams:
+            return pd.DataFrame(columns=["team", "elo", "pi_home", "pi_away", "attack", "defence", "n", "last"])
+        df = pd.DataFrame.from_dict(self.teams, orient="index").rename_axis("team").reset_index()
+        return df.sort_values("elo", ascending=False).reset_index(drop=True)
+
+
+def update_from_results(results, path=STATE_PATH) -> int:
+    """Carrega o estado, aplica os jogos finalizados de `results` (DataFrame ou CSV) e grava."""
+    if not isinstance(results, pd.DataFrame):
+        results = pd.read_csv(results)
+    st = RatingState.load(path)
+    n = st.update_results(results)
+    if n:
+        st.save(path)
+    _log(f"{n} jogo(s) novo(s) aplicados -> {path} ({len(st)} times, {st.n_matches} jogos)")
+    return n
+
+
+def main(argv: Optional[Iterable[str]] = None):
+    ap = argparse.ArgumentParser(description="Estado de ratings por time (Elo, pi-ratings, Poisson dinâmico)")
+    ap.add_argument("--state", default=str(STATE_PATH))
+    ap.add_argument("--results", action="append", default=[], help="CSV(s) de resultados a aplicar")
+    ap.add_argument("--rebuild", action="store_true", help="descarta o estado e reaplica --results do zero")
+    ap.add_argument("--show", type=int, default=0, help="imprime os N primeiros por Elo")
+    args = ap.parse_args(argv)
+
+    if args.rebuild and os.path.exists(args.state):
+        os.remove(args.state)
+    for f in args.results:
+        update_from_results(f, args.state)
+    if args.show:
+        print(RatingState.load(args.state).table().head(args.show).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,13 @@
 # scripts/risk_utils.py
 from __future__ import annotations
+import warnings
+from typing import Iterator
+
 import numpy as np
 import pandas as pd
 
-RNG = np.random.default_rng(2025)
+SEED = 2025
+SAMPLERS = ("mc", "sobol")
 
 def load_prob_matrix(rodada: str) -> tuple[pd.DataFrame, np.ndarray]:
     """
@@ -35,15 +39,119 @@ def load_prob_matrix(rodada: str) -> tuple[pd.DataFrame, np.ndarray]:
             return df, P[:14]
     raise RuntimeError("[risk] Nenhum arquivo de probabilidades encontrado.")
 
-def simulate_outcomes(P: np.ndarray, n_sims: int = 50000) -> np.ndarray:
+def coverage_probs(P: np.ndarray, tickets) -> np.ndarray:
     """
-    Simula desfechos: retorna matriz (n_sims, 14) com valores em {0,1,2}.
+    Probabilidade de acerto por jogo de cada ticket.
+    - tickets: um ticket (lista de sets {0,1,2}) ou lista de tickets.
+    Retorna (n,) para um ticket ou (m, n) para m tickets.
     """
+    single = len(tickets) > 0 and not isinstance(tickets[0], (list, tuple))
+    tks = [tickets] if single else tickets
     n = P.shape[0]
-    out = np.empty((n_sims, n), dtype=np.int8)
-    for i in range(n):
-        out[:, i] = RNG.choice(3, size=n_sims, p=P[i])
-    return out
+    masks = np.zeros((len(tks), n, 3), dtype=bool)
+    for t, tk in enumerate(tks):
+        for j in range(n):
+            choices = tk[j] if isinstance(tk[j], set) else set([tk[j]])
+            masks[t, j, list(choices)] = True
+    Q = (masks * P[None, :, :]).sum(axis=2)
+    return Q[0] if single else Q
+
+def hit_distribution(Q: np.ndarray) -> np.ndarray:
+    """
+    Distribuição exata de #acertos (Poisson-binomial) sob independência entre jogos.
+    - Q: (n,) ou (m, n) com P(acerto) por jogo.
+    Retorna (n+1,) ou (m, n+1) com P(k acertos), k = 0..n.
+    """
+    Q = np.asarray(Q, dtype=float)
+    single = Q.ndim == 1
+    Q2 = np.atleast_2d(Q)
+    m, n = Q2.shape
+    dist = np.zeros((m, n + 1), dtype=float)
+    dist[:, 0] = 1.0
+    for j in range(n):
+        q = Q2[:, j:j+1]
+        dist[:, 1:j+2] = dist[:, 1:j+2] * (1.0 - q) + dist[:, 0:j+1] * q
+        dist[:, 0] *= (1.0 - q[:, 0])
+    return dist[0] if single else dist
+
+def expected_payout(dist: np.ndarray, pay_table: dict[int, float] | None = None) -> np.ndarray:
+    """
+    Valor esperado por ticket a partir da distribuição de acertos.
+    Sem pay_table usa a mesma utilidade proxy de portfolio_payouts (hits/14).
+    """
+    dist = np.atleast_2d(dist)
+    n = dist.shape[1] - 1
+    if pay_table is None:
+        vals = np.arange(n + 1) / 14.0
+    else:
+        vals = np.array([float(pay_table.get(k, 0.0)) for k in range(n + 1)])
+    return dist @ vals
+
+class OutcomeSampler:
+    """
+    Amostrador único de desfechos por CDF inversa: uma matriz de uniformes
+    (n_sims, n_jogos) é mapeada pelas probabilidades acumuladas de todos os
+    jogos de uma vez.
+    - method: "mc" (PCG64) ou "sobol" (quasi-Monte Carlo embaralhado, scipy.stats.qmc)
+    - antithetic: usa pares U e 1-U (redução de variância)
+    O fluxo recomeça da semente a cada chamada de chunks()/sample(), então
+    candidatos avaliados com o mesmo sampler veem os mesmos cenários
+    (números aleatórios comuns).
+    """
+
+    def __init__(self, P: np.ndarray, seed: int = SEED, method: str = "mc", antithetic: bool = False):
+        if method not in SAMPLERS:
+            raise ValueError(f"[risk] sampler desconhecido: {method!r} (use {', '.join(SAMPLERS)})")
+        P = np.clip(np.asarray(P, dtype=float), 0.0, None)
+        P = P / P.sum(axis=1, keepdims=True)
+        self.cdf = np.cumsum(P, axis=1)[:, :2]  # (n, 2): limiares home | draw
+        self.n_games = P.shape[0]
+        self.seed = seed
+        self.method = method
+        self.antithetic = antithetic
+
+    def _uniform_stream(self):
+        if self.method == "sobol":
+            from scipy.stats import qmc
+            eng = qmc.Sobol(d=self.n_games, scramble=True, seed=self.seed)
+            def draw(k):
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore")  # Sobol avisa quando k não é potência de 2
+                    return eng.random(k)
+        else:
+            rng = np.random.default_rng(self.seed)
+            def draw(k):
+                return rng.random((k, self.n_games))
+        return draw
+
+    def to_outcomes(self, U: np.ndarray) -> np.ndarray:
+        """Uniformes (k, n) -> desfechos (k, n) em {0,1,2}."""
+        return ((U >= self.cdf[None, :, 0]).astype(np.int8) + (U >= self.cdf[None, :, 1]).astype(np.int8))
+
+    def chunks(self, n_sims: int, chunk: int = 100_000) -> Iterator[np.ndarray]:
+        """Gera blocos de desfechos (<= chunk linhas) até completar n_sims."""
+        draw = self._uniform_stream()
+        done = 0
+        while done < n_sims:
+            c = min(chunk, n_sims - done)
+            if self.antithetic:
+                half = draw((c + 1) // 2)
+                U = np.concatenate([half, 1.0 - half])[:c]
+            else:
+                U = draw(c)
+            yield self.to_outcomes(U)
+            done += c
+
+    def sample(self, n_sims: int) -> np.ndarray:
+        """Todos os desfechos de uma vez (n_sims, n)."""
+        return np.concatenate(list(self.chunks(n_sims, chunk=max(n_sims, 1))))
+
+def simulate_outcomes(P: np.ndarray, n_sims: int = 50000, seed: int = SEED,
+                      method: str = "mc", antithetic: bool = False) -> np.ndarray:
+    """
+    Simula desfechos: retorna matriz (n_sims, 14) com valores em {0,1,2}.
+    """
+    return OutcomeSampler(P, seed=seed, method=method, antithetic=antithetic).sample(n_sims)
 
 def ticket_hits(sim_outcomes: np.ndarray, ticket: list[set[int]]) -> np.ndarray:
     """
@@ -60,6 +168,57 @@ def ticket_hits(sim_outcomes: np.ndarray, ticket: list[set[int]]) -> np.ndarray:
         acc += mask.astype(np.int16)
     return acc
 
+# ---------------- Tickets/desfechos como bitmasks 14x3 ----------------
+# bit (3*j + c) ligado = escolha c (0=home,1=draw,2=away) no jogo j.
+# Acertos de um ticket num cenário = popcount(ticket & desfecho).
+# Cabem 21 jogos (63 bits) num uint64; acima disso o deslocamento estoura.
+MAX_PACKED_GAMES = 21
+
+def _check_packable(n: int) -> None:
+    if n > MAX_PACKED_GAMES:
+        raise ValueError(f"[risk] {n} jogos não cabem na máscara uint64 (máx. {MAX_PACKED_GAMES})")
+
+def encode_tickets(tickets: list[list[set[int]]]) -> np.ndarray:
+    """Empacota tickets em máscaras uint64 (m,)."""
+    _check_packable(max((len(tk) for tk in tickets), default=0))
+    masks = np.zeros(len(tickets), dtype=np.uint64)
+    for t, tk in enumerate(tickets):
+        m = 0
+        for j, choices in enumerate(tk):
+            if not isinstance(choices, set):
+                choices = set([choices])
+            for c in choices:
+                m |= 1 << (3 * j + int(c))
+        masks[t] = m
+    return masks
+
+def encode_outcomes(sim_outcomes: np.ndarray) -> np.ndarray:
+    """Empacota desfechos (n_sims, n) em {0,1,2} em máscaras uint64 (n_sims,)."""
+    n = sim_outcomes.shape[1]
+    _check_packable(n)
+    shifts = (3 * np.arange(n, dtype=np.uint64))[None, :] + sim_outcomes.astype(np.uint64)
+    return np.bitwise_or.reduce(np.left_shift(np.uint64(1), shifts), axis=1)
+
+if hasattr(np, "bitwise_count"):
+    def _popcount(x: np.ndarray) -> np.ndarray:
+        return np.bitwise_count(x)
+else:
+    _POP8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(x: np.ndarray) -> np.ndarray:
+        b = np.ascontiguousarray(x).view(np.uint8).reshape(x.shape + (8,))
+        return _POP8[b].sum(axis=-1, dtype=np.uint8)
+
+def packed_hits(outcome_masks: np.ndarray, ticket_masks: np.ndarray) -> np.ndarray:
+    """Acertos (n_sims, m) de todos os tickets em todos os cenários."""
+    return _popcount(outcome_masks[:, None] & ticket_masks[None, :]).astype(np.uint8)
+
+def _pay_vector(pay_table: dict[int, float] | None, n: int) -> np.ndarray:
+    if pay_table is None:
+        # utilidade proxy: fracional por acertos (0..1)
+        return np.arange(n + 1, dtype=float) / 14.0
+    return np.array([float(pay_table.get(k, 0.0)) for k in range(n + 1)])
+
 def portfolio_payouts(sim_outcomes: np.ndarray, tickets: list[list[set[int]]], stakes: np.ndarray, pay_table: dict[int, float] | None = None) -> np.ndarray:
     """
     Calcula 'retorno' relativo do portfólio por simulação.
@@ -68,24 +227,61 @@ def portfolio_payouts(sim_outcomes: np.ndarray, tickets: list[list[set[int]]], s
     - pay_table: opcional, mapeia #acertos -> payout (unidade). Se None, usa utilidade: hits/14.
     Retorna vetor (n_sims,) de retornos.
     """
-    n_sims = sim_outcomes.shape[0]
-    ret = np.zeros(n_sims, dtype=float)
-    if pay_table is None:
-        # utilidade proxy: fracional por acertos (0..1)
-        for t, w in zip(tickets, stakes):
-            h = ticket_hits(sim_outcomes, t)
-            ret += w * (h / 14.0)
-        return ret
-
-    # payout real (se fornecido)
-    for t, w in zip(tickets, stakes):
-        h = ticket_hits(sim_outcomes, t)
-        val = np.zeros(n_sims, dtype=float)
-        # lookup
-        for k, pay in pay_table.items():
-            val[h == k] = pay
-        ret += w * val
-    return ret
+    n = sim_outcomes.shape[1]
+    hits = packed_hits(encode_outcomes(sim_outcomes), encode_tickets(tickets))
+    return _pay_vector(pay_table, n)[hits] @ np.asarray(stakes, dtype=float)
+
+def evaluate_portfolio_stream(P: np.ndarray, tickets: list[list[set[int]]], stakes: np.ndarray,
+                              pay_table: dict[int, float] | None = None, n_sims: int = 1_000_000,
+                              chunk: int | None = None, alpha: float = 0.95,
+                              keep_returns: bool = False,
+                              sampler: OutcomeSampler | None = None) -> dict:
+    """
+    Avalia o portfólio em blocos de `chunk` cenários (memória limitada; por padrão
+    ~4M células ticket x cenário por bloco).
+    Acumula incrementalmente: média do retorno, cauda inferior para VaR/ES
+    (mesma convenção de var_es) e histograma de acertos por ticket.
+    Retorna dict com mean, var, es, hit_probs (m, n+1), n_sims e, se pedido, returns.
+    Passe o mesmo `sampler` para comparar portfólios nos mesmos cenários.
+    """
+    n = P.shape[0]
+    tmask = encode_tickets(tickets)
+    stakes = np.asarray(stakes, dtype=float)
+    pay = _pay_vector(pay_table, n)
+    m = len(tickets)
+    if not chunk:
+        chunk = max(1_000, 4_000_000 // max(m, 1))
+
+    k_tail = int((1.0 - alpha) * (n_sims - 1)) + 1
+    tail = np.empty(0, dtype=float)
+    total = 0.0
+    hit_counts = np.zeros((m, n + 1), dtype=np.int64)
+    kept = [] if keep_returns else None
+
+    sampler = sampler or OutcomeSampler(P)
+    for outcomes in sampler.chunks(n_sims, chunk):
+        hits = packed_hits(encode_outcomes(outcomes), tmask)
+        ret = pay[hits] @ stakes
+        total += float(ret.sum())
+        hit_counts += np.bincount((np.arange(m)[None, :] * (n + 1) + hits).ravel(),
+                                  minlength=m * (n + 1)).reshape(m, n + 1)
+        tail = np.concatenate([tail, ret])
+        if tail.size > k_tail:
+            tail = np.partition(tail, k_tail - 1)[:k_tail]
+        if kept is not None:
+            kept.append(ret)
+
+    tail.sort()
+    out = {
+        "mean": total / n_sims,
+        "var": float(tail[-1]),
+        "es": float(tail.mean()),
+        "hit_probs": hit_counts / float(n_sims),
+        "n_sims": n_sims,
+    }
+    if kept is not None:
+        out["returns"] = np.concatenate(kept)
+    return out
 
 def var_es(returns: np.ndarray, alpha: float = 0.95) -> tuple[float, float]:
     """
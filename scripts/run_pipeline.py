@@ -1,33 +1,219 @@
-import argparse, os, sys, yaml
+import argparse, importlib, sys, time, yaml
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
 from pathlib import Path
 from subprocess import check_call, CalledProcessError
+from typing import Dict, List, Optional, Tuple
 
 ROOT = Path(__file__).resolve().parents[1]
 SCRIPTS = ROOT / "scripts"
 
-def step(cmd):
-    print(f"\n=== RUNNING: {cmd} ===", flush=True)
-    check_call(cmd, shell=True)
+# Os scripts importam `utils.*` e `scripts.*` como pacotes a partir da raiz.
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from scripts.step_cache import StepCache
+
+# Previsão do tempo: reaproveitada por 3h antes de consultar a API de novo.
+WEATHER_TTL = 3 * 3600
+# Odds por provedor: mesma validade do cache HTTP de /odds.
+ODDS_TTL = 10 * 60
+
+# Módulos pesados: importados uma única vez no processo do runner.
+HEAVY_MODULES = ("pandas", "numpy", "requests", "yaml")
+
+
+@dataclass
+class Step:
+    """
+    Etapa do DAG:
+      - module: nome do módulo em scripts/ (chamado via module.main(*args))
+      - args:   argumentos posicionais de main()
+      - inputs/outputs: arquivos lidos/escritos (definem as dependências)
+      - after:  dependências explícitas sem fluxo de arquivo
+      - cache:  False para etapas que sempre devem re-rodar
+      - ttl:    segundos de validade do cache (etapas de rede: re-roda depois de expirar)
+    """
+    name: str
+    module: str
+    args: Tuple = ()
+    inputs: List[str] = field(default_factory=list)
+    outputs: List[str] = field(default_factory=list)
+    after: List[str] = field(default_factory=list)
+    cache: bool = True
+    ttl: Optional[float] = None
+
+    def cli(self) -> List[str]:
+        """Argumentos equivalentes de linha de comando (modo --isolated)."""
+        if len(self.args) == 1 and isinstance(self.args[0], list):
+            return [str(a) for a in self.args[0]]
+        return ["--rodada", str(self.args[0])] if self.args else []
+
+
+def build_steps(rodada: str, use: Dict[str, bool]) -> List[Step]:
+    cfg = yaml.safe_load((ROOT/"config/config.yaml").read_text(encoding="utf-8"))
+    paths = {k: str(v).replace("${rodada}", rodada) for k, v in cfg.get("paths", {}).items()}
+    out_dir = f"data/out/{rodada}"
+
+    ingest = []
+    if use.get("odds", True):
+        ingest.append(Step("ingest_odds", "ingest_odds", (["--rodada", rodada],),
+                           inputs=[f"{out_dir}/odds_theoddsapi.csv"],
+                           outputs=[f"{out_dir}/odds.csv"]))
+    if use.get("table", True):
+        ingest.append(Step("ingest_table", "ingest_table", (rodada,),
+                           inputs=["data/raw/table.csv"],
+                           outputs=["data/raw/table.csv"]))
+    if use.get("weather", True):
+        ingest.append(Step("ingest_weather", "ingest_weather", (rodada,),
+                           inputs=[paths.get("matches_csv", ""), paths.get("stadiums_csv", "")],
+                           outputs=[paths.get("weather_out", "")],
+                           ttl=WEATHER_TTL))
+    if use.get("news", True):
+        ingest.append(Step("ingest_news", "ingest_news", (["--rodada", rodada],),
+                           inputs=[f"data/in/{rodada}/matches_source.csv"],
+                           outputs=[f"{out_dir}/news.csv", f"{out_dir}/news.html"]))
+
+    if use.get("odds", True):
+        # coleta concorrente -> odds_theoddsapi.csv / odds_apifootball.csv (só provedores com chave)
+        ingest.append(Step("ingest_odds_async", "ingest_odds_async",
+                           (["--rodada", rodada, "--providers", "theoddsapi,apifootball"],),
+                           outputs=[f"{out_dir}/odds_theoddsapi.csv", f"{out_dir}/odds_apifootball.csv"],
+                           ttl=ODDS_TTL))
+        # consenso por provedor (TheOddsAPI + API-Football) -> odds_consensus.csv
+        ingest.append(Step("odds_consensus", "consensus_odds_safe", (["--rodada", out_dir],),
+                           inputs=[f"{out_dir}/odds_theoddsapi.csv", f"{out_dir}/odds_apifootball.csv"],
+                           outputs=[f"{out_dir}/odds_consensus.csv"]))
+
+    return ingest + [
+        Step("merge_features", "merge_features", (rodada,),
+             inputs=["data/raw/matches.csv", "data/raw/odds.csv", "data/raw/table.csv",
+                     "data/raw/weather.csv", "data/raw/news.csv"],
+             outputs=["data/processed/features.parquet"],
+             after=[s.name for s in ingest]),
+        Step("train_model", "train_model", (rodada,),
+             inputs=["data/processed/features.parquet"],
+             outputs=["models/registry.json"]),
+        Step("build_betcard", "build_betcard", (rodada,),
+             inputs=["data/processed/features.parquet", "data/raw/matches.csv"],
+             outputs=["outputs/preds.csv", "outputs/loteca_card.txt", "reports/rodada.txt"],
+             after=["train_model"]),
+    ]
+
+
+def resolve_deps(steps: List[Step]) -> Dict[str, set]:
+    """Dependências = produtores dos inputs de cada etapa + 'after' explícito."""
+    producers = {}
+    for s in steps:
+        for o in s.outputs:
+            producers.setdefault(o, []).append(s.name)
+    names = {s.name for s in steps}
+    deps = {}
+    for s in steps:
+        d = {p for i in s.inputs for p in producers.get(i, []) if p != s.name}
+        d |= {a for a in s.after if a in names}
+        deps[s.name] = d
+    return deps
+
+
+def _run_inprocess(step: Step):
+    try:
+        mod = importlib.import_module(f"scripts.{step.module}")
+        mod.main(*step.args)
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            raise RuntimeError(f"{step.name} saiu com código {e.code}") from e
+    except Exception as e:
+        raise RuntimeError(f"{step.name}: {e!r}") from e
+
+
+def _run_isolated(step: Step):
+    check_call([sys.executable, str(SCRIPTS/f"{step.module}.py"), *step.cli()])
+
+
+def run_dag(steps: List[Step], jobs: int = 4, isolated: bool = False,
+            cache: Optional[StepCache] = None):
+    """
+    Executa as etapas respeitando as dependências. Com `cache`, uma etapa só
+    roda se sua impressão digital mudou (ou o ttl expirou) ou se alguma dependência
+    mudou de fato: re-rodar com saídas byte a byte iguais às registradas não invalida
+    quem vem depois.
+    """
+    deps = resolve_deps(steps)
+    by_name = {s.name: s for s in steps}
+    runner = _run_isolated if isolated else _run_inprocess
+    done, running, changed = set(), {}, set()
+
+    def _timed(step):
+        """(segundos, saídas mudaram?) — None se veio do cache."""
+        code = [f"scripts/{step.module}.py"]
+        if cache is not None and step.cache and not (deps[step.name] & changed):
+            fp = cache.fingerprint(step.inputs, params=list(step.cli()), code=code)
+            if cache.is_fresh(step.name, fp, step.outputs, max_age=step.ttl):
+                print(f"\n=== CACHED: {step.name} ===", flush=True)
+                return None
+        print(f"\n=== RUNNING: {step.name} ===", flush=True)
+        before = cache.output_hashes(step.name) if cache is not None else None
+        t0 = time.perf_counter()
+        runner(step)
+        elapsed = time.perf_counter() - t0
+        if cache is None:
+            return elapsed, True
+        cache.record(step.name, cache.fingerprint(step.inputs, params=list(step.cli()), code=code),
+                     step.outputs)
+        after = cache.output_hashes(step.name)
+        return elapsed, not (before and after) or before != after
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        while len(done) < len(steps):
+            for name, s in by_name.items():
+                if name in done or name in running.values():
+                    continue
+                if deps[name] <= done:
+                    running[pool.submit(_timed, s)] = name
+            if not running:
+                raise RuntimeError(f"dependências circulares: {sorted(set(by_name) - done)}")
+            finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for fut in finished:
+                name = running.pop(fut)
+                res = fut.result()  # propaga a falha da etapa
+                if res is not None:
+                    elapsed, diff = res
+                    if diff:
+                        changed.add(name)
+                    note = "" if diff else ", saídas inalteradas"
+                    print(f"=== OK: {name} ({elapsed:.2f}s{note}) ===", flush=True)
+                done.add(name)
+
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--rodada", required=True)
+    parser.add_argument("--jobs", type=int, default=4, help="etapas independentes em paralelo")
+    parser.add_argument("--isolated", action="store_true",
+                        help="roda cada etapa em um interpretador separado (modo antigo)")
+    parser.add_argument("--force", action="store_true",
+                        help="ignora o manifest e re-roda todas as etapas")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="não lê nem grava data/out/<rodada>/manifest.json")
     args = parser.parse_args()
 
     cfg = yaml.safe_load((ROOT/"config/features.yaml").read_text(encoding="utf-8"))
     use = cfg.get("use_features", {})
 
-    try:
-        if use.get("odds", True):    step(f"python {SCRIPTS/'ingest_odds.py'} --rodada {args.rodada}")
-        if use.get("table", True):   step(f"python {SCRIPTS/'ingest_table.py'} --rodada {args.rodada}")
-        if use.get("weather", True): step(f"python {SCRIPTS/'ingest_weather.py'} --rodada {args.rodada}")
-        if use.get("news", True):    step(f"python {SCRIPTS/'ingest_news.py'} --rodada {args.rodada}")
+    if not args.isolated:
+        for m in HEAVY_MODULES:
+            importlib.import_module(m)
 
-        step(f"python {SCRIPTS/'merge_features.py'} --rodada {args.rodada}")
-        step(f"python {SCRIPTS/'train_model.py'} --rodada {args.rodada}")
-        step(f"python {SCRIPTS/'build_betcard.py'} --rodada {args.rodada}")
+    cache = None
+    if not args.no_cache:
+        cache = StepCache(args.rodada, base=ROOT)
+        if args.force:
+            cache.invalidate()
 
-    except CalledProcessError as e:
+    try:
+        run_dag(build_steps(args.rodada, use), jobs=args.jobs, isolated=args.isolated, cache=cache)
+    except (CalledProcessError, RuntimeError) as e:
         print(f"ERRO em uma etapa: {e}", file=sys.stderr)
         sys.exit(2)
 
@@ -1,32 +1,22 @@
 # scripts/stack_probs.py
 # Ensemble (consenso odds + xG) + calibração isotônica opcional
 from __future__ import annotations
-import argparse, joblib
+import argparse
 from pathlib import Path
 import numpy as np
 import pandas as pd
 
+try:
+    from scripts.calibration_tables import apply_tables, load_calibration
+except ImportError:
+    from calibration_tables import apply_tables, load_calibration
+
 def _safe_probs(df, cols):
     P = df[list(cols)].to_numpy(float, copy=True)
     P = np.clip(P, 1e-9, 1.0)
     P /= P.sum(axis=1, keepdims=True)
     return P
 
-def _apply_isotonic(P: np.ndarray, models) -> np.ndarray:
-    """Aplica isotônica por classe (1,X,2); se não tiver, devolve P."""
-    if not isinstance(models, dict): return P
-    out = P.copy()
-    keys = ["1","X","2"]
-    for i,k in enumerate(keys):
-        kind, mdl = models.get(k, ("identity", None))
-        if kind == "isotonic" and mdl is not None:
-            out[:,i] = mdl.predict(P[:,i])
-        # identity -> mantém
-    # re-normaliza
-    s = out.sum(axis=1, keepdims=True)
-    s[s<=0] = 1.0
-    return out / s
-
 def main():
     ap = argparse.ArgumentParser(description="Stacking de probabilidades com calibração opcional")
     ap.add_argument("--rodada", required=True)
@@ -73,16 +63,10 @@ def main():
 
     P = wc * Pco + wx * Pxg
 
-    # calibração isotônica opcional
-    models = None
-    cp = Path(args.calib_path)
-    if cp.exists() and cp.stat().st_size>0:
-        try:
-            models = joblib.load(cp)
-        except Exception:
-            models = None
-    if models:
-        P = _apply_isotonic(P, models)
+    # calibração opcional (tabelas .npz; pickles antigos são convertidos na leitura)
+    tables = load_calibration(args.calib_path)
+    if tables:
+        P = apply_tables(P, tables)
 
     out = merged.copy()
     out["p_home_final"], out["p_draw_final"], out["p_away_final"] = P[:,0], P[:,1], P[:,2]
@@ -4,18 +4,19 @@
 #  - xG Poisson univariado (xg_features.csv: p1_xg, px_xg, p2_xg)
 #  - Dixon-Coles bivariado (xg_bivar.csv: p1_bv, px_bv, p2_bv)
 #  - Modelo de ML (ml_probs.csv: p_home_ml, p_draw_ml, p_away_ml) [OPCIONAL]
-# + Calibração isotônica (models/calib_isotonic.pkl) [OPCIONAL]
+# + Calibração por tabelas 1/X/2 (models/calib_isotonic.pkl, ver calibration_tables.py) [OPCIONAL]
 from __future__ import annotations
 import argparse
 from pathlib import Path
 import numpy as np
 import pandas as pd
 
-# joblib é opcional (só para calibração). Se não existir, seguimos sem calibração.
 try:
-    import joblib
-except Exception:
-    joblib = None
+    from scripts.calibration_tables import apply_tables, load_calibration
+    from scripts.feature_join import Source, join_sources
+except ImportError:
+    from calibration_tables import apply_tables, load_calibration
+    from feature_join import Source, join_sources
 
 def _safe_probs(df: pd.DataFrame, cols) -> np.ndarray:
     """Extrai colunas -> matriz (n,3), clipa, e normaliza linha a 1. Evita NaN/inf."""
@@ -25,43 +26,6 @@ def _safe_probs(df: pd.DataFrame, cols) -> np.ndarray:
     S[S <= 0] = 1.0
     return P / S
 
-def _apply_isotonic(P: np.ndarray, models) -> np.ndarray:
-    """Aplica calibração isotônica por classe (1,X,2). Renormaliza no final."""
-    if not models or not isinstance(models, dict):
-        return P
-    out = P.copy()
-    keys = ["1", "X", "2"]
-    for i, k in enumerate(keys):
-        kind, mdl = models.get(k, ("identity", None))
-        if kind == "isotonic" and mdl is not None:
-            out[:, i] = mdl.predict(P[:, i])
-    s = out.sum(axis=1, keepdims=True)
-    s[s <= 0] = 1.0
-    return out / s
-
-def _read_required_csv(path: Path, need_cols: set[str], rename_lower=True) -> pd.DataFrame:
-    if not path.exists() or path.stat().st_size == 0:
-        raise RuntimeError(f"[stack_bivar] arquivo ausente/vazio: {path}")
-    df = pd.read_csv(path)
-    if rename_lower:
-        df = df.rename(columns=str.lower)
-    if not need_cols.issubset(df.columns):
-        missing = sorted(list(need_cols.difference(set(df.columns))))
-        raise RuntimeError(f"[stack_bivar] {path.name} sem colunas necessárias: faltam {missing}")
-    return df
-
-def _read_optional_csv(path: Path, want_cols: set[str]) -> pd.DataFrame | None:
-    """Lê CSV opcional; retorna None se ausente ou inválido."""
-    try:
-        if not path.exists() or path.stat().st_size == 0:
-            return None
-        df = pd.read_csv(path).rename(columns=str.lower)
-        if not want_cols.issubset(df.columns):
-            return None
-        return df
-    except Exception:
-        return None
-
 def main():
     ap = argparse.ArgumentParser(description="Stack odds + xG + Dixon-Coles + ML com calibração opcional")
     ap.add_argument("--rodada", required=True)
@@ -79,28 +43,23 @@ def main():
     ml_path = base / "ml_probs.csv"  # opcional
     out_path = base / "joined_stacked_bivar.csv"  # mantemos o nome para compatibilidade
 
-    # 1) Ler fontes obrigatórias
-    od = _read_required_csv(od_path, {"match_id", "p_home", "p_draw", "p_away"})
-    xg = _read_required_csv(xg_path, {"match_id", "p1_xg", "px_xg", "p2_xg"})
-    bv = _read_required_csv(bv_path, {"match_id", "p1_bv", "px_bv", "p2_bv"})
-
-    # 2) Ler ML (opcional)
-    ml = _read_optional_csv(ml_path, {"match_id", "p_home_ml", "p_draw_ml", "p_away_ml"})
-
-    # 3) Montar data frame base
+    # 1-3) odds (base, obrigatória) + xG + bivariado (obrigatórios) + ML (opcional): um join só por match_id
     # preserva colunas home/away se existirem em odds
-    cols_od = ["match_id", "home", "away", "p_home", "p_draw", "p_away"] if {"home", "away"}.issubset(od.columns) \
-              else ["match_id", "p_home", "p_draw", "p_away"]
-    df = od[cols_od].merge(xg[["match_id", "p1_xg", "px_xg", "p2_xg"]], on="match_id", how="left") \
-                    .merge(bv[[c for c in ["match_id", "p1_bv", "px_bv", "p2_bv", "rho_hat"] if c in bv.columns]],
-                           on="match_id", how="left")
-    if ml is not None:
-        df = df.merge(ml[["match_id", "p_home_ml", "p_draw_ml", "p_away_ml"]], on="match_id", how="left")
-    else:
-        # cria colunas ML nulas para facilitar lógica adiante
-        df["p_home_ml"] = np.nan
-        df["p_draw_ml"] = np.nan
-        df["p_away_ml"] = np.nan
+    ml_cols = ["p_home_ml", "p_draw_ml", "p_away_ml"]
+    sources = [
+        Source(str(od_path), required=True, lower=True, need=["p_home", "p_draw", "p_away"],
+               columns=["home", "away", "p_home", "p_draw", "p_away"]),
+        Source(str(xg_path), required=True, lower=True, need=["p1_xg", "px_xg", "p2_xg"],
+               columns=["p1_xg", "px_xg", "p2_xg"]),
+        Source(str(bv_path), required=True, lower=True, need=["p1_bv", "px_bv", "p2_bv"],
+               columns=["p1_bv", "px_bv", "p2_bv", "rho_hat"]),
+        Source(str(ml_path), lower=True, need=ml_cols, columns=ml_cols),
+    ]
+    df = join_sources(sources, keys=["match_id"], how="left", tag="stack_bivar")
+    for c in ml_cols:
+        if c not in df.columns:
+            # cria colunas ML nulas para facilitar lógica adiante
+            df[c] = np.nan
 
     # 4) Matrizes de prob por fonte (com normalização segura)
     Pco = _safe_probs(df, ["p_home", "p_draw", "p_away"])
@@ -131,16 +90,10 @@ def main():
     # 6) Ensemble
     P = wc * Pco + wx * Pxg + wb * Pbv + wm * Pml_full
 
-    # 7) Calibração isotônica (opcional)
-    models = None
-    cp = Path(args.calib_path)
-    if cp.exists() and cp.stat().st_size > 0 and joblib is not None:
-        try:
-            models = joblib.load(cp)
-        except Exception:
-            models = None
-    if models:
-        P = _apply_isotonic(P, models)
+    # 7) Calibração (opcional): uma interpolação vetorizada + renormalização
+    tables = load_calibration(args.calib_path)
+    if tables:
+        P = apply_tables(P, tables)
 
     # 8) Salvar
     out = df.copy()
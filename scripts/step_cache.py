@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+step_cache.py
+Cache incremental por etapa (estilo make) em data/out/<rodada>/manifest.json.
+
+Para cada etapa registramos:
+  - sha256 de cada arquivo de entrada (ausente -> null)
+  - parâmetros de linha de comando
+  - versão do código (sha256 do script)
+  - sha256 das saídas produzidas
+
+Uma etapa é pulada quando a impressão digital (entradas + params + código) é
+igual à registrada e todas as saídas ainda existem (etapas de rede podem ter um
+ttl: depois dele re-rodam mesmo sem mudança nas entradas). Como as saídas de uma
+etapa são entradas das seguintes, uma mudança em odds_consensus.csv só faz
+re-rodar o que está a jusante dele.
+
+Uso como wrapper em workflows:
+  python -m scripts.step_cache --rodada <R> --step consensus \
+      --inputs data/out/<R>/odds_theoddsapi.csv \
+      --outputs data/out/<R>/odds_consensus.csv \
+      --code scripts/merge_odds_consensus.py \
+      -- python scripts/merge_odds_consensus.py --rodada <R>
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+MANIFEST_NAME = "manifest.json"
+_CHUNK = 1 << 20
+
+
+def file_hash(path) -> Optional[str]:
+    """sha256 do conteúdo do arquivo; None se não existir."""
+    p = Path(path)
+    if not p.is_file():
+        return None
+    h = hashlib.sha256()
+    with open(p, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def params_hash(params) -> str:
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class StepCache:
+    """Manifest de uma rodada. Seguro para uso concorrente (threads do DAG)."""
+
+    def __init__(self, rodada: str, out_root="data/out", base: Optional[Path] = None):
+        self.base = Path(base) if base else Path.cwd()
+        self.path = self.base / out_root / rodada / MANIFEST_NAME
+        self._lock = threading.Lock()
+        self.steps: Dict[str, dict] = {}
+        if self.path.exists():
+            try:
+                self.steps = json.loads(self.path.read_text(encoding="utf-8")).get("steps", {})
+            except Exception:
+                self.steps = {}
+
+    def _abs(self, p) -> Path:
+        p = Path(p)
+        return p if p.is_absolute() else self.base / p
+
+    def fingerprint(self, inputs: Iterable[str], params=None, code: Iterable[str] = ()) -> dict:
+        return {
+            "inputs": {str(i): file_hash(self._abs(i)) for i in inputs if i},
+            "params": params_hash(params),
+            "code": {str(c): file_hash(self._abs(c)) for c in code if c},
+        }
+
+    def is_fresh(self, name: str, fp: dict, outputs: Iterable[str], max_age: Optional[float] = None) -> bool:
+        """Fresca = mesma impressão digital, saídas presentes e (com max_age) registro recente."""
+        with self._lock:
+            prev = self.steps.get(name)
+        if not prev:
+            return False
+        if {k: prev.get(k) for k in ("inputs", "params", "code")} != fp:
+            return False
+        if max_age is not None:
+            try:
+                age = (datetime.now(timezone.utc) - datetime.fromisoformat(prev["updated_at"])).total_seconds()
+            except (KeyError, TypeError, ValueError):
+                return False
+            if age > max_age:
+                return False
+        return all(self._abs(o).exists() for o in outputs if o)
+
+    def output_hashes(self, name: str) -> Optional[dict]:
+        """sha256 das saídas registradas na última execução da etapa (None se nunca rodou)."""
+        with self._lock:
+            prev = self.steps.get(name)
+        return dict(prev["outputs"]) if prev and "outputs" in prev else None
+
+    def record(self, name: str, fp: dict, outputs: Iterable[str]):
+        entry = dict(fp)
+        entry["outputs"] = {str(o): file_hash(self._abs(o)) for o in outputs if o}
+        entry["updated_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        with self._lock:
+            self.steps[name] = entry
+            self._save()
+
+    def invalidate(self, names: Optional[Iterable[str]] = None):
+        with self._lock:
+            if names is None:
+                self.steps.clear()
+            else:
+                for n in names:
+                    self.steps.pop(n, None)
+            self._save()
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps({"steps": self.steps}, indent=2, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Executa um comando apenas se entradas/params/código mudaram.")
+    ap.add_argument("--rodada", required=True)
+    ap.add_argument("--step", required=True)
+    ap.add_argument("--inputs", nargs="*", default=[])
+    ap.add_argument("--outputs", nargs="*", default=[])
+    ap.add_argument("--code", nargs="*", default=[], help="arquivos de código que versionam a etapa")
+    ap.add_argument("--force", action="store_true")
+    ap.add_argument("cmd", nargs=argparse.REMAINDER, help="comando após '--'")
+    args = ap.parse_args(argv)
+
+    cmd = args.cmd[1:] if args.cmd[:1] == ["--"] else args.cmd
+    if not cmd:
+        ap.error("informe o comando após '--'")
+
+    cache = StepCache(args.rodada)
+    fp = cache.fingerprint(args.inputs, params=cmd, code=args.code)
+    if not args.force and cache.is_fresh(args.step, fp, args.outputs):
+        print(f"[cache] {args.step}: entradas inalteradas, pulando")
+        return 0
+
+    rc = subprocess.call(cmd)
+    if rc != 0:
+        return rc
+    cache.record(args.step, cache.fingerprint(args.inputs, params=cmd, code=args.code), args.outputs)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+team_resolver.py
+Resolvedor único de nomes de times, compilado a partir de todas as fontes de aliases.
+
+Fontes (em ordem de prioridade — a primeira define o nome canônico exibido):
+  1) config/team_aliases.yaml          alias: nome da API-Football
+  2) data/refs/team_aliases.csv        alias,canonical
+  3) data/teams_aliases.csv            alias,canonical
+  4) data/aliases.json, data/aliases_*.json, data/aliases/*.json
+     ({alias: canônico}, {"teams": {...}}, {canônico: [aliases]} ou CSV from,to;
+      JSON malformado é lido de forma tolerante: comentários //, vírgulas finais,
+      vários objetos concatenados)
+
+Compilação:
+  - canônicos ligados entre fontes são unidos numa mesma classe (union-find), então
+    "Atletico MG", "Atlético Mineiro" e "Atletico-MG" resolvem igual em todos os estágios,
+    mesmo que cada arquivo use um canônico diferente; alias ambíguo (ex.: "fcb") fica com
+    a fonte de maior prioridade, sem unir times;
+  - índice hash chave -> classe (lookup O(1)) + índice invertido de trigramas para o
+    fallback fuzzy (só os candidatos que compartilham trigramas são pontuados);
+  - artefato binário (pickle) em data/cache/team_resolver.pkl, recompilado quando
+    tamanho/mtime de alguma fonte muda.
+
+Uso:
+  from scripts.team_resolver import get_resolver, resolve_team, team_key
+  resolve_team("ATLETICO/MG")   -> "Atletico-MG"
+  team_key("Atlético Mineiro")  -> "atletico mg"   (chave de comparação)
+
+CLI:
+  python scripts/team_resolver.py --build
+  python scripts/team_resolver.py --resolve "Atlético Mineiro" "Corinthians/SP"
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import pickle
+import re
+import sys
+import threading
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from rapidfuzz import fuzz, process
+
+ARTIFACT = Path("data/cache/team_resolver.pkl")
+VERSION = 1
+RUNTIME_RANK = 1000  # aliases registrados em código (extend) perdem para os arquivos
+
+_GENERIC = re.compile(r"\b(ec|fc|afc|sc|ac|saf|esporte clube|futebol clube)\b")
+_UF_SUFFIX = re.compile(r"\s*/\s*[A-Za-z]{2}\s*$")
+
+
+@lru_cache(maxsize=65536)
+def norm_key(name: str) -> str:
+    """Chave de lookup: ascii, minúsculas, sem pontuação e sem sufixos genéricos (FC, EC...)."""
+    n = unicodedata.normalize("NFKD", str(name or "")).encode("ascii", "ignore").decode("ascii").lower()
+    n = n.replace("&", " e ")
+    n = re.sub(r"[^a-z0-9 ]+", " ", n)
+    n = _GENERIC.sub(" ", n)
+    return " ".join(n.split())
+
+
+def _trigrams(key: str) -> set:
+    s = f"  {key} "
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+
+# ------------------------------------------------------------------ leitura das fontes
+
+def source_paths(root: Path = Path(".")) -> List[Path]:
+    root = Path(root)
+    paths = [root / "config/team_aliases.yaml", root / "data/refs/team_aliases.csv",
+             root / "data/teams_aliases.csv", root / "data/aliases.json"]
+    paths += sorted((root / "data").glob("aliases_*.json"))
+    paths += sorted((root / "data/aliases").glob("*.json"))
+    return [p for p in paths if p.is_file()]
+
+
+def _warn(msg: str):
+    print(f"[team_resolver] aviso: {msg}", file=sys.stderr)
+
+
+def _pairs_csv(text: str) -> List[Tuple[str, str]]:
+    rows = [r for r in csv.reader(io.StringIO(text)) if len(r) >= 2]
+    if rows and {rows[0][0].strip().lower(), rows[0][1].strip().lower()} & {"alias", "from", "canonical", "to"}:
+        rows = rows[1:]
+    return [(r[0].strip(), r[1].strip()) for r in rows if not r[0].strip().startswith("#")]
+
+
+def _pairs_obj(obj) -> List[Tuple[str, str]]:
+    if not isinstance(obj, dict):
+        return []
+    if isinstance(obj.get("teams"), dict):
+        obj = obj["teams"]
+    out = []
+    for k, v in obj.items():
+        if isinstance(v, str):
+            out.append((str(k), v))
+        elif isinstance(v, list) and all(isinstance(a, str) for a in v):
+            out.append((str(k), str(k)))
+            out.extend((a, str(k)) for a in v)
+    return out
+
+
+def _pairs_json(text: str, path: Path) -> List[Tuple[str, str]]:
+    text = text.lstrip("﻿").strip()
+    if not text:
+        return []
+    if text[0] not in "{[":
+        return _pairs_csv(text)  # ex.: aliases_br.json salvo como CSV from,to
+    text = re.sub(r'(?m)^\s*//.*$|(?<=[,\[\]{}"])\s*//[^\n]*$', "", text)
+    text = re.sub(r",(\s*[}\]])", r"\1", text)
+    dec, pos, out = json.JSONDecoder(), 0, []
+    while pos < len(text):
+        try:
+            obj, end = dec.raw_decode(text, pos)
+        except ValueError as e:
+            _warn(f"{path}: JSON inválido a partir do caractere {pos} ({e}); restante ignorado")
+            break
+        out.extend(_pairs_obj(obj))
+        pos = end
+        while pos < len(text) and text[pos].isspace():
+            pos += 1
+    return out
+
+
+def _pairs_yaml(text: str, path: Path) -> List[Tuple[str, str]]:
+    try:
+        import yaml
+    except ImportError:
+        _warn(f"PyYAML ausente; {path} ignorado")
+        return []
+    try:
+        data = yaml.safe_load(text) or {}
+    except yaml.YAMLError as e:
+        _warn(f"{path}: YAML inválido ({e})")
+        return []
+    return [(str(k), str(v)) for k, v in data.items() if v is not None] if isinstance(data, dict) else []
+
+
+def read_pairs(path: Path) -> List[Tuple[str, str]]:
+    text = Path(path).read_text(encoding="utf-8", errors="replace")
+    if path.suffix in (".yaml", ".yml"):
+        return _pairs_yaml(text, path)
+    if path.suffix == ".csv":
+        return _pairs_csv(text)
+    return _pairs_json(text, path)
+
+
+def fingerprint(paths: Iterable[Path]) -> List[Tuple[str, int, int]]:
+    out = []
+    for p in paths:
+        st = p.stat()
+        out.append((str(p), st.st_size, st.st_mtime_ns))
+    return out
+
+
+# ------------------------------------------------------------------ índice
+
+class TeamResolver:
+    """
+    keys[i]     chave normalizada (alias ou canônico)
+    alias[k]    classe da chave k
+    names[c]    nome canônico exibido da classe c; rank[c] = prioridade da fonte que o definiu
+    grams[g]    índices de keys que contêm o trigrama g
+    """
+
+    def __init__(self):
+        self.keys: List[str] = []
+        self.alias: Dict[str, int] = {}
+        self.names: List[str] = []
+        self.rank: List[int] = []
+        self.members: List[List[str]] = []
+        self.grams: Dict[str, List[int]] = {}
+        self.sources: List[Tuple[str, int, int]] = []
+        self._lock = threading.Lock()
+
+    # ---- compilação
+    @classmethod
+    def compile(cls, paths: Optional[List[Path]] = None) -> "TeamResolver":
+        paths = source_paths() if paths is None else list(paths)
+        parent: Dict[str, str] = {}
+
+        def find(k):
+            while parent[k] != k:
+                parent[k] = parent[parent[k]]
+                k = parent[k]
+            return k
+
+        pairs = [(rank, a, c) for rank, p in enumerate(paths) for a, c in read_pairs(p)]
+        best: Dict[str, Tuple[int, int, str]] = {}  # chave canônica -> (rank, ordem, exibição)
+        for order, (rank, a, c) in enumerate(pairs):
+            kc = norm_key(c)
+            if kc and norm_key(a) and (kc not in best or (rank, order) < best[kc][:2]):
+                best[kc] = (rank, order, c.strip())
+        for k in best:
+            parent[k] = k
+        # canônicos ligados entre fontes (alias de uma fonte é canônico de outra) viram uma classe;
+        # aliases "puros" apontando para times diferentes (ex.: "fcb") não unem nada
+        first: Dict[str, str] = {}
+        ambiguous = set()
+        for rank, a, c in pairs:
+            ka, kc = norm_key(a), norm_key(c)
+            if not ka or not kc:
+                continue
+            if ka in best:
+                ra, rc = find(ka), find(kc)
+                if ra != rc:
+                    parent[ra] = rc
+            elif ka not in first:
+                first[ka] = kc
+            elif find(first[ka]) != find(kc):
+                ambiguous.add(ka)
+        for ka, kc in first.items():
+            parent[ka] = find(kc)
+        if ambiguous:
+            _warn(f"{len(ambiguous)} aliases ambíguos (vale a fonte de maior prioridade): "
+                  + ", ".join(sorted(ambiguous)[:5]))
+
+        self = cls()
+        self.sources = fingerprint(paths)
+        classes: Dict[str, int] = {}
+        rep: Dict[int, Tuple[int, int, str]] = {}
+        for k in sorted(parent):
+            r = find(k)
+            if r not in classes:
+                classes[r] = len(self.members)
+                self.members.append([])
+            cid = classes[r]
+            self.members[cid].append(k)
+            if k in best and (cid not in rep or best[k][:2] < rep[cid][:2]):
+                rep[cid] = best[k]
+        self.names = [rep[c][2] for c in range(len(self.members))]
+        self.rank = [rep[c][0] for c in range(len(self.members))]
+        for cid, ks in enumerate(self.members):
+            for k in ks:
+                self._add_key(k, cid)
+        return self
+
+    def _add_key(self, key: str, cid: int):
+        self.alias[key] = cid
+        i = len(self.keys)
+        self.keys.append(key)
+        for g in _trigrams(key):
+            self.grams.setdefault(g, []).append(i)
+
+    def extend(self, pairs: Dict[str, str], rank: int = RUNTIME_RANK):
+        """Registra aliases em tempo de execução ({alias: canônico}); classes existentes são unidas."""
+        with self._lock:
+            for a, c in pairs.items():
+                ka, kc = norm_key(a), norm_key(c)
+                if not ka or not kc:
+                    continue
+                ca, cc = self.alias.get(ka), self.alias.get(kc)
+                if cc is None and ca is None:
+                    cc = len(self.names)
+                    self.names.append(str(c).strip())
+                    self.rank.append(rank)
+                    self.members.append([])
+                if cc is None:
+                    cc, ca = ca, None
+                for k in (ka, kc):
+                    if k not in self.alias:
+                        self.members[cc].append(k)
+                        self._add_key(k, cc)
+                if ca is not None and ca != cc:
+                    keep, drop = (ca, cc) if self.rank[ca] < self.rank[cc] else (cc, ca)
+                    for k in self.members[drop]:
+                        self.alias[k] = keep
+                    self.members[keep].extend(self.members[drop])
+                    self.members[drop] = []
+
+    # ---- persistência
+    def save(self, path: Path = ARTIFACT) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        state = {k: getattr(self, k) for k in ("keys", "alias", "names", "rank", "members", "grams", "sources")}
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump({"version": VERSION, **state}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp.replace(path)
+        return path
+
+    @classmethod
+    def load(cls, path: Path = ARTIFACT, paths: Optional[List[Path]] = None) -> Optional["TeamResolver"]:
+        """Carrega o artefato se ele ainda corresponde às fontes; senão None."""
+        try:
+            with open(path, "rb") as f:
+                state = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return None
+        paths = source_paths() if paths is None else list(paths)
+        if state.pop("version", None) != VERSION or state.get("sources") != fingerprint(paths):
+            return None
+        self = cls()
+        for k, v in state.items():
+            setattr(self, k, v)
+        return self
+
+    # ---- consultas
+    def lookup(self, name: str, fuzzy: bool = False, min_score: float = 90,
+               limit: int = 16) -> Optional[str]:
+        """Nome canônico ou None. Exato (hash) -> sem /UF -> fuzzy só entre candidatos por trigrama."""
+        k = norm_key(name)
+        if not k:
+            return None
+        cid = self.alias.get(k)
+        if cid is None and _UF_SUFFIX.search(str(name)):
+            cid = self.alias.get(norm_key(_UF_SUFFIX.sub("", str(name))))
+        if cid is None and fuzzy:
+            votes = Counter()
+            for g in _trigrams(k):
+                votes.update(self.grams.get(g, ()))
+            cand = [self.keys[i] for i, _ in votes.most_common(limit)]
+            hit = process.extractOne(k, cand, scorer=fuzz.ratio, score_cutoff=min_score) if cand else None
+            if hit:
+                cid = self.alias[hit[0]]
+        return None if cid is None else self.names[cid]
+
+    def resolve(self, name: str, fuzzy: bool = False, min_score: float = 90) -> str:
+        """Nome canônico; sem correspondência devolve o próprio nome (aparado)."""
+        hit = self.lookup(name, fuzzy=fuzzy, min_score=min_score)
+        return hit if hit is not None else str(name or "").strip()
+
+    def key(self, name: str, fuzzy: bool = False) -> str:
+        """Chave de comparação: norm_key do canônico — igual para todos os aliases da mesma classe."""
+        return norm_key(self.resolve(name, fuzzy=fuzzy))
+
+    def __len__(self):
+        return len(self.alias)
+
+
+_RESOLVER: Optional[TeamResolver] = None
+_RESOLVER_LOCK = threading.Lock()
+
+
+def build(path: Path = ARTIFACT) -> TeamResolver:
+    res = TeamResolver.compile()
+    try:
+        res.save(path)
+    except OSError as e:
+        _warn(f"não foi possível gravar {path} ({e})")
+    return res
+
+
+def get_resolver(rebuild: bool = False) -> TeamResolver:
+    """Instância compartilhada: artefato se atualizado, senão compila e regrava."""
+    global _RESOLVER
+    with _RESOLVER_LOCK:
+        if _RESOLVER is None or rebuild:
+            _RESOLVER = (None if rebuild else TeamResolver.load()) or build()
+        return _RESOLVER
+
+
+def resolve_team(name: str, fuzzy: bool = False) -> str:
+    return get_resolver().resolve(name, fuzzy=fuzzy)
+
+
+def team_key(name: str, fuzzy: bool = False) -> str:
+    return get_resolver().key(name, fuzzy=fuzzy)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Compila/consulta o índice único de aliases de times.")
+    ap.add_argument("--build", action="store_true", help="recompila o artefato a partir das fontes")
+    ap.add_argument("--resolve", nargs="*", default=[], help="nomes a resolver")
+    ap.add_argument("--fuzzy", action="store_true", help="usa fallback fuzzy nas consultas")
+    args = ap.parse_args(argv)
+
+    res = get_resolver(rebuild=args.build)
+    if args.build or not args.resolve:
+        print(f"[team_resolver] {len(res)} chaves, {sum(1 for m in res.members if m)} times, "
+              f"{len(res.sources)} fontes -> {ARTIFACT}")
+    for name in args.resolve:
+        print(f"{name} -> {res.resolve(name, fuzzy=args.fuzzy)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
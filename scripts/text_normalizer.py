@@ -3,6 +3,11 @@ import re
 import unicodedata
 from typing import Dict, Tuple, Optional
 
+try:
+    from scripts.team_resolver import resolve_team
+except ImportError:
+    from team_resolver import resolve_team
+
 
 # =========================
 # Helpers de normalização
@@ -91,15 +96,16 @@ def canonicalize_team(name: str, aliases: Dict[str, str]) -> str:
     """
     Retorna nome canônico de time. Regra:
       1) se o normalizado estiver no dicionário de aliases -> retorna o valor canônico
-      2) senão, retorna o próprio 'name' com whitespace aparado
+      2) senão, o índice único de aliases (scripts/team_resolver.py), que devolve o
+         próprio 'name' aparado quando não conhece o time
     """
     if not name:
         return ""
     key = normalize_string(name)
     if key in aliases:
         return aliases[key]
-    # fallback: retorna como veio (mantendo caixa/acentos originais)
-    return name.strip()
+    # fallback: índice único (mantém caixa/acentos originais quando não há alias)
+    return resolve_team(name)
 
 def make_match_key(team_home: str, team_away: str) -> str:
     """
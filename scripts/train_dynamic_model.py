@@ -1,58 +1,50 @@
 # -*- coding: utf-8 -*-
+# Estado dinâmico por time (Elo / pi-ratings / Poisson dinâmico, scripts/rating_state.py).
+# Não há mais reajuste do zero: o estado persistido recebe só os jogos do histórico
+# ainda não aplicados (O(1) por jogo) e é copiado para --out_state da execução.
 import argparse
-import pandas as pd
 import os
-from sklearn.ensemble import RandomForestClassifier
-import pickle
+import shutil
+import pandas as pd
+
+try:
+    from scripts.rating_state import RatingState, STATE_PATH
+except ImportError:
+    from rating_state import RatingState, STATE_PATH
 
 def _log(msg: str) -> None:
     print(f"[train_dynamic_model] {msg}", flush=True)
 
-def train_dynamic_model(features, out_state, out_model):
-    try:
-        features_df = pd.read_parquet(features)
-    except Exception as e:
-        _log(f"Erro ao ler {features}: {e}")
-        return
-
+def train_dynamic_model(features, out_state, out_model=None, history='data/history/results.csv',
+                        state_path=STATE_PATH):
+    state = RatingState.load(state_path)
     try:
-        history = pd.read_csv('data/history/results.csv')
+        hist = pd.read_csv(history)
+        n = state.update_results(hist)
+        _log(f"{n} jogo(s) novo(s) de {history} aplicados ({state.n_matches} no estado)")
     except Exception as e:
-        _log(f"Erro ao ler data/history/results.csv: {e}, usando dados padrão")
-        history = pd.DataFrame()
-
-    _log(f"Colunas disponíveis no DataFrame: {list(features_df.columns)}")
-    if history.empty:
-        _log("Histórico vazio, usando labels padrão")
-        model = RandomForestClassifier()
-    else:
-        # Ajustar para usar 'team' em vez de 'team_home'/'team_away'
-        features_df['team_home'] = features_df['team']
-        features_df['team_away'] = features_df['team']
-        merged_df = features_df.merge(history, on=['team_home', 'team_away'], how='left', suffixes=('', '_hist'))
-        model = RandomForestClassifier()
-        try:
-            model.fit(merged_df[['avg_goals_scored', 'avg_goals_conceded']], merged_df['score_home'].fillna(0))
-        except Exception as e:
-            _log(f"Erro ao treinar modelo: {e}, usando modelo padrão")
-            model = RandomForestClassifier()
-
-    os.makedirs(os.path.dirname(out_model), exist_ok=True)
-    with open(out_model, 'wb') as f:
-        pickle.dump(model, f)
-    with open(out_state, 'w') as f:
-        f.write('{}')
-    _log(f"Estado salvo em {out_state}")
-    _log(f"Modelo salvo em {out_model}")
+        _log(f"Erro ao ler {history}: {e}; mantendo o estado atual")
+
+    state.save(state_path)
+    if os.path.abspath(out_state) != os.path.abspath(state_path):
+        os.makedirs(os.path.dirname(out_state) or '.', exist_ok=True)
+        shutil.copyfile(state_path, out_state)
+    _log(f"Estado salvo em {out_state} ({len(state)} times)")
+    if features:
+        _log(f"{features} não é mais usado no treino (ratings vêm dos resultados)")
+    if out_model:
+        _log(f"{out_model} não é mais gerado: predict_dynamic_model lê o estado diretamente")
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--features", required=True)
+    ap.add_argument("--features", default="")
     ap.add_argument("--out_state", required=True)
-    ap.add_argument("--out_model", required=True)
+    ap.add_argument("--out_model", default="")
+    ap.add_argument("--history", default="data/history/results.csv")
+    ap.add_argument("--state", default=str(STATE_PATH), help="estado persistente entre rodadas")
     args = ap.parse_args()
 
-    train_dynamic_model(args.features, args.out_state, args.out_model)
+    train_dynamic_model(args.features, args.out_state, args.out_model, args.history, args.state)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -2,6 +2,11 @@ from __future__ import annotations
 import csv
 from pathlib import Path
 
+try:
+    from scripts.team_resolver import get_resolver
+except ImportError:
+    from team_resolver import get_resolver
+
 _ALIAS_CACHE: dict[str, str] | None = None
 
 def load_aliases(path: str | Path = "data/refs/team_aliases.csv") -> dict[str, str]:
@@ -39,9 +44,12 @@ def load_aliases(path: str | Path = "data/refs/team_aliases.csv") -> dict[str, s
     return mapping
 
 def normalize_team(name: str, mapping: dict[str, str] | None = None) -> str:
+    """Sem mapping explícito usa o índice único (scripts/team_resolver.py)."""
     if not name:
         return name
-    m = mapping or load_aliases()
+    if mapping is None:
+        return get_resolver().resolve(name)
+    m = mapping
     n = name.strip()
     key = n.lower()
     if key in m:
@@ -51,4 +59,4 @@ def normalize_team(name: str, mapping: dict[str, str] | None = None) -> str:
     key2 = " ".join(key2.split())
     if key2 in m:
         return m[key2]
-    return n
+    return get_resolver().resolve(n)
@@ -1,22 +1,11 @@
 # -*- coding: utf-8 -*-
-import argparse, json, os, sys, math, csv, pandas as pd
+import argparse, json, os, sys, csv, pandas as pd
 from _utils_norm import norm_name
-from math import exp
-from itertools import product
-
-def pois_pmf(k, lam):
-    return exp(-lam) * (lam**k) / math.factorial(k)
+from poisson_grid import outcome_probs as grid_outcome_probs
 
 def outcome_probs(lh, la, max_goals=10):
-    ph = pd = pa = 0.0
-    for gh, ga in product(range(max_goals+1), repeat=2):
-        p = pois_pmf(gh, lh) * pois_pmf(ga, la)
-        if gh > ga: ph += p
-        elif gh == ga: pd += p
-        else: pa += p
-    s = ph+pd+pa
-    if s <= 0: return 0.0,0.0,0.0
-    return ph/s, pd/s, pa/s
+    res = grid_outcome_probs([lh], [la], max_goals)
+    return float(res["p_home"][0]), float(res["p_draw"][0]), float(res["p_away"][0])
 
 def main():
     ap = argparse.ArgumentParser()
@@ -33,7 +22,7 @@ def main():
     cons["home_norm"] = cons["team_home"].astype(str).map(norm_name)
     cons["away_norm"] = cons["team_away"].astype(str).map(norm_name)
 
-    rows = []
+    lams = []
     for _, r in cons.iterrows():
         hn, an = r["home_norm"], r["away_norm"]
         # procura estado com igualdade fraca
@@ -43,13 +32,19 @@ def main():
         # fallback: lambdas médios
         lh = (sH["attack"] if isinstance(sH, dict) else 1.2) + (0.15 if isinstance(sH, dict) else 0.15)
         la = (sA["attack"] if isinstance(sA, dict) else 1.1)
+        lams.append((max(lh,0.05), max(la,0.05)))
 
-        pH, pD, pA = outcome_probs(max(lh,0.05), max(la,0.05), max_goals=10)
+    # todas as grades de uma vez
+    lh_arr = [l[0] for l in lams]
+    la_arr = [l[1] for l in lams]
+    probs = grid_outcome_probs(lh_arr, la_arr, max_goals=10)
 
+    rows = []
+    for k, (_, r) in enumerate(cons.iterrows()):
         rows.append([
             r.get("match_id", ""),
             r["team_home"], r["team_away"],
-            round(pH,6), round(pD,6), round(pA,6),
+            round(float(probs["p_home"][k]),6), round(float(probs["p_draw"][k]),6), round(float(probs["p_away"][k]),6),
             r.get("odds_home", ""), r.get("odds_draw",""), r.get("odds_away","")
         ])
 
@@ -4,23 +4,29 @@
 """
 Gera features proxy de xG (simplificadas) a partir de probabilidades de resultado.
 
-Entrada: <OUT_DIR>/features_univariado.csv
+Entrada: features univariadas em memória (features_univariado.load_or_build: odds da
+         rodada; sem elas, <OUT_DIR>/features_univariado.csv)
 Saída:   <OUT_DIR>/features_xg.csv
 """
 
 import argparse, os, sys, pandas as pd, numpy as np, json
 
+try:
+    from scripts.features_univariado import load_or_build
+except ImportError:
+    from features_univariado import load_or_build
+
 def log(m): print(f"[xg] {m}")
 def die(c,m): log(m); sys.exit(c)
 
 def approx_team_xg(p_home, p_draw, p_away):
     # proxy tosca: maior prob. de vitória aproxima maior xG do lado favorito;
-    # usa pesos simples que preservam soma ~ constante por jogo
+    # usa pesos simples que preservam soma ~ constante por jogo (aceita arrays)
     base = 1.6  # soma média de gols
-    bias = (p_home - p_away)
+    bias = np.asarray(p_home, dtype=float) - np.asarray(p_away, dtype=float)
     xg_h = base/2 + 0.8*bias
     xg_a = base - xg_h
-    return max(xg_h,0.1), max(xg_a,0.1)
+    return np.maximum(xg_h,0.1), np.maximum(xg_a,0.1)
 
 def main():
     ap = argparse.ArgumentParser()
@@ -29,15 +35,13 @@ def main():
     args = ap.parse_args()
 
     od = args.rodada
-    uni_p = os.path.join(od, "features_univariado.csv")
-    if not os.path.exists(uni_p): die(23,f"features_univariado.csv não encontrado")
-    df = pd.read_csv(uni_p)
+    try:
+        df = load_or_build(od)
+    except FileNotFoundError:
+        die(23,f"features_univariado.csv não encontrado")
     if df.empty: die(23,"features_univariado.csv vazio")
 
-    xgh, xga = [], []
-    for _, r in df.iterrows():
-        h, a = approx_team_xg(r["imp_home"], r["imp_draw"], r["imp_away"])
-        xgh.append(h); xga.append(a)
+    xgh, xga = approx_team_xg(df["imp_home"], df["imp_draw"], df["imp_away"])
 
     out = pd.DataFrame({
         "match_key": df["match_key"],
@@ -45,13 +49,15 @@ def main():
         "away": df["away"],
         "xg_home_proxy": xgh,
         "xg_away_proxy": xga,
-        "xg_diff_proxy": np.array(xgh) - np.array(xga)
+        "xg_diff_proxy": xgh - xga
     })
     out_p = os.path.join(od, "features_xg.csv")
     out.to_csv(out_p, index=False)
     if not os.path.exists(out_p) or os.path.getsize(out_p)==0: die(23,"features_xg.csv não gerado")
 
-    meta = {"rows": int(out.shape[0]), "source": os.path.relpath(uni_p)}
+    # o que foi efetivamente lido: odds da rodada (features em memória) ou o CSV já gravado
+    src = df.attrs.get("source") or os.path.join(od, "features_univariado.csv")
+    meta = {"rows": int(out.shape[0]), "source": os.path.relpath(src)}
     with open(os.path.join(od,"features_xg_meta.json"),"w",encoding="utf-8") as f:
         json.dump(meta, f, ensure_ascii=False, indent=2)
 
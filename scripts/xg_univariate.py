@@ -20,6 +20,19 @@ import sys
 import argparse
 from unicodedata import normalize as _ucnorm
 import pandas as pd
+from rapidfuzz import fuzz
+
+try:
+    from scripts.devig import devig, METHODS as DEVIG_METHODS
+except ImportError:
+    from devig import devig, METHODS as DEVIG_METHODS
+
+try:
+    from scripts.team_resolver import resolve_team
+    from scripts.fixtures_index import match_fixtures
+except ImportError:
+    from team_resolver import resolve_team
+    from fixtures_index import match_fixtures
 
 REQ_ODDS = ["team_home", "team_away", "odds_home", "odds_draw", "odds_away"]
 
@@ -43,7 +56,7 @@ def norm_key(name: str) -> str:
     return s
 
 def norm_key_tokens(name: str) -> str:
-    toks = [t for t in re.split(r"\s+", norm_key(name)) if t and t not in STOPWORD_TOKENS]
+    toks = [t for t in re.split(r"\s+", norm_key(resolve_team(name))) if t and t not in STOPWORD_TOKENS]
     return " ".join(toks)
 
 def secure_float(x):
@@ -62,21 +75,27 @@ def read_csv_safe(path: str) -> pd.DataFrame:
         log("CRITICAL", f"Falha lendo {path}: {e}")
         sys.exit(7)
 
-def implied_probs(oh, od, oa):
-    """Probabilidades implícitas (normalizadas para remover overround)."""
-    ih = (1.0 / oh) if oh and oh > 0 else None
-    idr = (1.0 / od) if od and od > 0 else None
-    ia = (1.0 / oa) if oa and oa > 0 else None
-    if None in (ih, idr, ia):
-        return None, None, None
-    s = ih + idr + ia
-    if s <= 0:
-        return None, None, None
-    return ih / s, idr / s, ia / s  # p_home, p_draw, p_away
+def implied_probs_table(df: pd.DataFrame, method: str = "multiplicative") -> pd.DataFrame:
+    """
+    Probabilidades sem overround para a tabela inteira (motor de devig em lote).
+    Converte odds_* com secure_float e adiciona p_home/p_draw/p_away (NaN se inválidas).
+    """
+    odds_cols = ["odds_home", "odds_draw", "odds_away"]
+    for c in odds_cols:
+        df[c] = pd.to_numeric(df[c].map(secure_float), errors="coerce")
+    df[["p_home", "p_draw", "p_away"]] = devig(df[odds_cols].to_numpy(float), method)
+    return df
+
+def _opt(x):
+    return None if pd.isna(x) else float(x)
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--rodada", required=True)
+    ap.add_argument("--devig", default="multiplicative", choices=DEVIG_METHODS,
+                    help="método de remoção de margem (padrão: normalização simples)")
+    ap.add_argument("--min-match", type=int, default=85,
+                    help="score mínimo (0-100, pior dos dois times) no casamento fuzzy")
     args = ap.parse_args()
 
     rodada = args.rodada
@@ -101,7 +120,7 @@ def main():
     wl["key"] = (wl["team_home"].apply(norm_key_tokens) + "|" +
                  wl["team_away"].apply(norm_key_tokens))
 
-    oc = oc[REQ_ODDS].copy()
+    oc = implied_probs_table(oc[REQ_ODDS].copy(), args.devig)
     oc["key"] = (oc["team_home"].apply(norm_key_tokens) + "|" +
                  oc["team_away"].apply(norm_key_tokens))
 
@@ -109,17 +128,27 @@ def main():
     oc_idx = oc.drop_duplicates(subset=["key"]).set_index("key")
 
     inter_keys = [k for k in oc_idx.index if k in wl_idx.index]
+    pairs = [(wl_idx.loc[k], oc_idx.loc[k]) for k in inter_keys]
+
+    # chaves sem par exato: matriz whitelist×odds (cdist) + atribuição 1-para-1
+    wl_rest = wl_idx[~wl_idx.index.isin(inter_keys)]
+    oc_rest = oc_idx[~oc_idx.index.isin(inter_keys)]
+    fuzzy = match_fixtures(list(zip(wl_rest["team_home"], wl_rest["team_away"])),
+                           list(zip(oc_rest["team_home"], oc_rest["team_away"])),
+                           min_score=args.min_match, scorer=fuzz.token_sort_ratio, combine="min",
+                           norm=norm_key_tokens)
+    for i, j, score in fuzzy:
+        log("INFO", f"casamento fuzzy ({score:.0f}): {wl_rest.iloc[i]['team_home']} x {wl_rest.iloc[i]['team_away']}"
+                    f" <- {oc_rest.iloc[j]['team_home']} x {oc_rest.iloc[j]['team_away']}")
+        pairs.append((wl_rest.iloc[i], oc_rest.iloc[j]))
+
     rows = []
     missing = []
 
-    for k in inter_keys:
-        wlr = wl_idx.loc[k]
-        ocr = oc_idx.loc[k]
+    for wlr, ocr in pairs:
 
-        oh = secure_float(ocr["odds_home"])
-        od = secure_float(ocr["odds_draw"])
-        oa = secure_float(ocr["odds_away"])
-        ph, pdr, pa = implied_probs(oh, od, oa)  # <- pdr (draw) para não conflitar com pandas
+        oh, od, oa = _opt(ocr["odds_home"]), _opt(ocr["odds_draw"]), _opt(ocr["odds_away"])
+        ph, pdr, pa = _opt(ocr["p_home"]), _opt(ocr["p_draw"]), _opt(ocr["p_away"])  # <- pdr (draw) para não conflitar com pandas
 
         if None in (oh, od, oa, ph, pdr, pa):
             missing.append((wlr["match_id"], wlr["team_home"], wlr["team_away"]))
@@ -142,10 +171,8 @@ def main():
         log("WARN", "Nenhum match por chave normalizada; tentando fallback por strings cruas…")
         merged = wl.merge(oc, on=["team_home", "team_away"], how="inner")
         for _, r in merged.iterrows():
-            oh = secure_float(r["odds_home"])
-            od = secure_float(r["odds_draw"])
-            oa = secure_float(r["odds_away"])
-            ph, pdr, pa = implied_probs(oh, od, oa)
+            oh, od, oa = _opt(r["odds_home"]), _opt(r["odds_draw"]), _opt(r["odds_away"])
+            ph, pdr, pa = _opt(r["p_home"]), _opt(r["p_draw"]), _opt(r["p_away"])
             if None in (oh, od, oa, ph, pdr, pa):
                 continue
             rows.append({
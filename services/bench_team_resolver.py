@@ -0,0 +1,118 @@
+# services/bench_team_resolver.py
+# -*- coding: utf-8 -*-
+"""
+Benchmark de carga do team_resolver_api: latência p50/p99 e requisições por segundo.
+
+Modos:
+  --url http://127.0.0.1:8088   HTTP contra um servidor em execução (uvicorn)
+  sem --url                     em processo (Resolver.resolve/resolve_many), sem rede
+
+A carga mistura nomes conhecidos (aliases), variações de grafia e nomes desconhecidos
+(caminho remoto/negativo). Em --bulk N cada requisição envia um lote de N nomes
+para /bulk_resolve; senão uma requisição /resolve por nome.
+
+Exemplos:
+  python -m services.bench_team_resolver --url http://127.0.0.1:8088 --requests 5000 --concurrency 32
+  python -m services.bench_team_resolver --requests 20000 --concurrency 64 --bulk 50
+"""
+
+from __future__ import annotations
+import argparse, asyncio, random, statistics, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import numpy as np
+import requests
+
+def workload(n: int, unknown_share: float, seed: int = 7) -> List[str]:
+    try:
+        from scripts.team_resolver import get_resolver
+    except ImportError:
+        from team_resolver import get_resolver
+    res = get_resolver()
+    known = [k for k in res.keys] or ["Flamengo", "Palmeiras", "Corinthians"]
+    rnd = random.Random(seed)
+    out = []
+    for _ in range(n):
+        if rnd.random() < unknown_share:
+            out.append(f"Time Desconhecido {rnd.randrange(50)}")
+        else:
+            name = rnd.choice(known)
+            out.append(rnd.choice([name, name.upper(), name.title() + "/SP", f"  {name}  "]))
+    return out
+
+def report(tag: str, lat: List[float], wall: float, n_names: int):
+    a = np.asarray(lat) * 1000
+    print(f"[bench] {tag}: {len(a)} req em {wall:.2f}s | {len(a)/wall:.0f} req/s | {n_names/wall:.0f} nomes/s")
+    print(f"[bench] latência ms: p50={np.percentile(a, 50):.2f} p90={np.percentile(a, 90):.2f} "
+          f"p99={np.percentile(a, 99):.2f} max={a.max():.2f} média={statistics.fmean(a):.2f}")
+
+def run_http(url: str, batches: List[List[str]], concurrency: int, bulk: bool):
+    local = threading.local()
+
+    def session() -> requests.Session:
+        if not hasattr(local, "s"):
+            local.s = requests.Session()
+            local.s.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=concurrency))
+        return local.s
+
+    def one(batch: List[str]) -> float:
+        t0 = time.perf_counter()
+        if bulk:
+            r = session().post(f"{url}/bulk_resolve", json={"names": batch}, timeout=60)
+        else:
+            r = session().get(f"{url}/resolve", params={"name": batch[0]}, timeout=60)
+        r.raise_for_status()
+        return time.perf_counter() - t0
+
+    one(batches[0])  # aquecimento (carrega índice/conexão)
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        lat = list(ex.map(one, batches))
+    return lat, time.perf_counter() - t0
+
+def run_inproc(batches: List[List[str]], concurrency: int, bulk: bool):
+    from services.team_resolver_api import Resolver
+    resolver = Resolver(learned_path="/tmp/bench_learned_aliases.json")
+
+    async def main():
+        sem = asyncio.Semaphore(concurrency)
+
+        async def one(batch: List[str]) -> float:
+            async with sem:
+                t0 = time.perf_counter()
+                if bulk:
+                    await resolver.resolve_many(batch)
+                else:
+                    await resolver.resolve(batch[0])
+                return time.perf_counter() - t0
+
+        await one(batches[0])
+        t0 = time.perf_counter()
+        lat = await asyncio.gather(*(one(b) for b in batches))
+        return list(lat), time.perf_counter() - t0
+
+    out = asyncio.run(main())
+    print(f"[bench] resolver: {resolver.stats()}")
+    return out
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark de carga do team_resolver_api")
+    ap.add_argument("--url", default="", help="servidor HTTP; vazio = em processo")
+    ap.add_argument("--requests", type=int, default=5000)
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--bulk", type=int, default=0, help="nomes por /bulk_resolve (0 = /resolve)")
+    ap.add_argument("--unknown-share", type=float, default=0.05, help="fração de nomes desconhecidos")
+    args = ap.parse_args(argv)
+
+    per = max(args.bulk, 1)
+    names = workload(args.requests * per, args.unknown_share)
+    batches = [names[i:i + per] for i in range(0, len(names), per)]
+    if args.url:
+        lat, wall = run_http(args.url.rstrip("/"), batches, args.concurrency, bool(args.bulk))
+    else:
+        lat, wall = run_inproc(batches, args.concurrency, bool(args.bulk))
+    report(f"{'bulk x' + str(per) if args.bulk else 'resolve'} c={args.concurrency}", lat, wall, len(names))
+
+if __name__ == "__main__":
+    main()
@@ -7,25 +7,44 @@ FastAPI para resolução de nomes de times:
  - /bulk_resolve (POST json {"names": [...]})
 
 Ordem de resolução:
- 1) data/aliases.json (canônico + aliases)
- 2) API-Football /teams?search= (se houver X_RAPIDAPI_KEY)
- 3) devolve o próprio nome "limpo" como canônico
+ 1) aliases aprendidos por este serviço + índice único de aliases (scripts/team_resolver.py)
+ 2) cache LRU das consultas remotas (inclui negativos: nome que a API não conhece)
+ 3) API-Football /teams?search= (se houver chave; cliente compartilhado de scripts/afb_http.py)
+ 4) devolve o próprio nome "limpo" como canônico
 
-Pode ser usado pelos scripts em tempo real. Mantém um cache em memória
-e pode opcionalmente persistir novos aprendizados em data/aliases.json.
+Consultas remotas rodam em threads (asyncio.to_thread) com concorrência limitada e
+deduplicação de nomes em voo; /bulk_resolve resolve todos os nomes do lote em paralelo.
+Aliases aprendidos atualizam o índice reverso incrementalmente e são gravados em
+data/aliases/learned_aliases.json em segundo plano (write-behind), arquivo que o
+índice único também lê — os demais estágios passam a enxergar o aprendizado.
+
+Variáveis de ambiente:
+  TEAM_RESOLVER_REMOTE_CONCURRENCY   consultas remotas simultâneas (padrão 4)
+  TEAM_RESOLVER_CACHE_SIZE           entradas do LRU (padrão 4096)
+  TEAM_RESOLVER_NEGATIVE_TTL         validade (s) de um "não encontrado" (padrão 3600)
+  TEAM_RESOLVER_FLUSH_S              intervalo do write-behind (padrão 2)
 
 Executar:
   uvicorn services.team_resolver_api:app --host 0.0.0.0 --port 8088
+Benchmark de carga:
+  python -m services.bench_team_resolver --url http://127.0.0.1:8088
 """
 
 from __future__ import annotations
-import os, json, re, unicodedata, threading, time
-from typing import Dict, List, Optional
+import os, json, re, unicodedata, threading, time, asyncio
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
 from fastapi import FastAPI, Query
 from pydantic import BaseModel
-import urllib.request, urllib.parse
 
-API_BASE = "https://api-football-v1.p.rapidapi.com/v3"
+try:
+    from scripts.afb_http import get_client, resolve_credentials
+    from scripts.team_resolver import get_resolver
+except ImportError:
+    from afb_http import get_client, resolve_credentials
+    from team_resolver import get_resolver
+
+LEARNED_PATH = "data/aliases/learned_aliases.json"
 
 def deacc(s: str) -> str:
     return ''.join(c for c in unicodedata.normalize('NFD', s) if unicodedata.category(c) != 'Mn')
@@ -39,69 +58,137 @@ def norm(s: str) -> str:
     return s
 
 def rq(endpoint: str, params: Dict[str, str]) -> dict:
-    key = os.environ.get("X_RAPIDAPI_KEY", "")
+    key, host = resolve_credentials()
     if not key:
         raise RuntimeError("X_RAPIDAPI_KEY vazio")
-    url = f"{API_BASE}/{endpoint}?" + urllib.parse.urlencode(params)
-    headers = {
-        "X-RapidAPI-Key": key,
-        "X-RapidAPI-Host": "api-football-v1.p.rapidapi.com",
-        "Accept": "application/json",
-    }
-    req = urllib.request.Request(url, headers=headers, method="GET")
-    with urllib.request.urlopen(req, timeout=30) as resp:
-        if resp.status >= 400:
-            raise RuntimeError(f"HTTP {resp.status} for {url}")
-        return json.loads(resp.read().decode("utf-8"))
+    return get_client(key, host).get_json("/" + endpoint.lstrip("/"), params, timeout=10)
 
 class BulkRequest(BaseModel):
     names: List[str]
 
+class LRU:
+    """LRU thread-safe: chave -> (valor, expira_em); valor None = negativo (com TTL)."""
+
+    def __init__(self, size: int = 4096, negative_ttl: float = 3600.0):
+        self.size = size
+        self.negative_ttl = negative_ttl
+        self.data: "OrderedDict[str, Tuple[Optional[str], float]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key: str) -> Tuple[bool, Optional[str]]:
+        with self.lock:
+            hit = self.data.get(key)
+            if hit is None or hit[1] < time.monotonic():
+                if hit is not None:
+                    del self.data[key]
+                self.misses += 1
+                return False, None
+            self.data.move_to_end(key)
+            self.hits += 1
+            return True, hit[0]
+
+    def put(self, key: str, value: Optional[str]):
+        exp = float("inf") if value is not None else time.monotonic() + self.negative_ttl
+        with self.lock:
+            self.data[key] = (value, exp)
+            self.data.move_to_end(key)
+            while len(self.data) > self.size:
+                self.data.popitem(last=False)
+
 class Resolver:
-    def __init__(self, aliases_path: str = "data/aliases.json"):
-        self.aliases_path = aliases_path
+    def __init__(self, learned_path: str = LEARNED_PATH,
+                 remote_concurrency: int = int(os.environ.get("TEAM_RESOLVER_REMOTE_CONCURRENCY", "4")),
+                 cache_size: int = int(os.environ.get("TEAM_RESOLVER_CACHE_SIZE", "4096")),
+                 negative_ttl: float = float(os.environ.get("TEAM_RESOLVER_NEGATIVE_TTL", "3600")),
+                 flush_s: float = float(os.environ.get("TEAM_RESOLVER_FLUSH_S", "2"))):
+        self.learned_path = learned_path
         self.lock = threading.Lock()
-        self.teams: Dict[str, List[str]] = {}
-        self.rev: Dict[str, str] = {}
+        self.learned: Dict[str, str] = {}  # alias -> canônico (o que este serviço aprendeu)
+        self.rev: Dict[str, str] = {}      # norm(alias|canônico) -> canônico
+        self.cache = LRU(cache_size, negative_ttl)
+        self.remote_concurrency = remote_concurrency
+        self.flush_s = flush_s
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._dirty = threading.Event()
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self.remote_calls = 0
         self.load()
 
     def load(self):
         try:
-            with open(self.aliases_path, "r", encoding="utf-8") as f:
+            with open(self.learned_path, "r", encoding="utf-8") as f:
                 data = json.load(f)
-            self.teams = {k: (v if isinstance(v, list) else [v]) for k, v in (data.get("teams") or {}).items()}
-        except FileNotFoundError:
-            self.teams = {}
-        self._rebuild_rev()
-
-    def _rebuild_rev(self):
-        self.rev = {}
-        for canon, alist in self.teams.items():
-            self.rev[norm(canon)] = canon
-            for a in alist:
-                self.rev[norm(a)] = canon
+        except (FileNotFoundError, ValueError):
+            data = {}
+        with self.lock:
+            self.learned = {str(k): str(v) for k, v in data.items()} if isinstance(data, dict) else {}
+            self.rev = {}
+            for alias, canon in self.learned.items():
+                self._index(alias, canon)
+
+    def _index(self, alias: str, canon: str):
+        self.rev[norm(canon)] = canon
+        self.rev[norm(alias)] = canon
+
+    # ---- write-behind
+    def start(self):
+        if self._flusher is None or not self._flusher.is_alive():
+            self._stop.clear()
+            self._flusher = threading.Thread(target=self._flush_loop, name="aliases-flush", daemon=True)
+            self._flusher.start()
+
+    def stop(self):
+        self._stop.set()
+        self._dirty.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=10)
+        self.flush()
+
+    def _flush_loop(self):
+        while not self._stop.is_set():
+            self._dirty.wait()
+            if self._stop.wait(self.flush_s):
+                break
+            self.flush()
+
+    def flush(self):
+        """Grava os aliases aprendidos (se houver mudança) de forma atômica."""
+        if not self._dirty.is_set():
+            return
+        with self.lock:
+            self._dirty.clear()
+            snap = dict(self.learned)
+        os.makedirs(os.path.dirname(self.learned_path) or ".", exist_ok=True)
+        tmp = self.learned_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(snap, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp, self.learned_path)
 
     def save(self):
-        os.makedirs(os.path.dirname(self.aliases_path), exist_ok=True)
-        with open(self.aliases_path, "w", encoding="utf-8") as f:
-            json.dump({"teams": self.teams}, f, ensure_ascii=False, indent=2)
+        self._dirty.set()
+        self.flush()
 
+    # ---- resolução
     def resolve_local(self, name: str) -> Optional[str]:
-        n = norm(name)
-        return self.rev.get(n)
+        hit = self.rev.get(norm(name))
+        return hit if hit is not None else get_resolver().lookup(name)
 
     def resolve_remote(self, name: str) -> Optional[str]:
         try:
+            self.remote_calls += 1
             js = rq("teams", {"search": name})
             resp = (js or {}).get("response") or []
-            if not resp: 
+            if not resp:
                 return None
             target = norm(name)
             best = None
             for item in resp:
                 tm = (item or {}).get("team") or {}
                 off = (tm.get("name") or "").strip()
-                if not off: 
+                if not off:
                     continue
                 if norm(off) == target:
                     return off
@@ -111,28 +198,90 @@ class Resolver:
         except Exception:
             return None
 
+    async def _remote(self, key: str, name: str) -> Optional[str]:
+        """Uma consulta por nome normalizado, mesmo com vários pedidos simultâneos."""
+        fut = self._inflight.get(key)
+        if fut is not None:
+            # shield: um pedido cancelado não pode cancelar o futuro compartilhado do dono
+            return await asyncio.shield(fut)
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        out = None
+        try:
+            if self._sem is None:
+                self._sem = asyncio.Semaphore(self.remote_concurrency)
+            async with self._sem:
+                out = await asyncio.to_thread(self.resolve_remote, name)
+        finally:
+            self._inflight.pop(key, None)
+            if not fut.done():
+                fut.set_result(out)  # resolve_remote não levanta; cancelado -> None para quem espera
+        return out
+
+    async def resolve(self, name: str) -> dict:
+        local = self.resolve_local(name)
+        if local:
+            return {"input": name, "canonical": local, "source": "aliases"}
+        key = norm(name)
+        cached, remote = self.cache.get(key)
+        if not cached:
+            remote = await self._remote(key, name)
+            self.cache.put(key, remote)
+            if remote:
+                self.learn(name, remote)
+        if remote:
+            return {"input": name, "canonical": remote, "source": "api-football"}
+        return {"input": name, "canonical": " ".join(str(name).split()), "source": "fallback"}
+
+    async def resolve_many(self, names: List[str]) -> List[dict]:
+        done: Dict[str, dict] = {}
+        pending: Dict[str, str] = {}
+        for n in names:
+            k = norm(n)
+            if k in done or k in pending:
+                continue
+            local = self.resolve_local(n)
+            if local:
+                done[k] = {"canonical": local, "source": "aliases"}
+            else:
+                pending[k] = n
+        # só os nomes sem alias local viram tarefas (LRU/remoto em paralelo)
+        done.update(zip(pending, await asyncio.gather(*(self.resolve(n) for n in pending.values()))))
+        return [{**done[norm(n)], "input": n} for n in names]
+
     def learn(self, original: str, canonical: str):
         with self.lock:
-            self.teams.setdefault(canonical, [])
-            if original != canonical and original not in self.teams[canonical]:
-                self.teams[canonical].append(original)
-            self._rebuild_rev()
+            if self.learned.get(original) == canonical:
+                return
+            self.learned[original] = canonical
+            self._index(original, canonical)
+            self._dirty.set()
+
+    def stats(self) -> dict:
+        return {"learned": len(self.learned), "index": len(get_resolver()), "lru": len(self.cache.data),
+                "lru_hits": self.cache.hits, "lru_misses": self.cache.misses,
+                "remote_calls": self.remote_calls, "inflight": len(self._inflight)}
 
 resolver = Resolver()
 app = FastAPI()
 
+@app.on_event("startup")
+def _startup():
+    get_resolver()
+    resolver.start()
+
+@app.on_event("shutdown")
+def _shutdown():
+    resolver.stop()
+
 @app.get("/health")
 def health():
-    return {"ok": True, "aliases": len(resolver.teams)}
+    return {"ok": True, "aliases": len(resolver.learned) + len(get_resolver()), **resolver.stats()}
 
 @app.get("/resolve")
-def resolve(name: str = Query(..., min_length=1)):
-    # 1) local
-    local = resolver.resolve_local(name)
-    if local:
-        return {"input": name, "canonical": local, "source": "aliases"}
-
-    # 2) remote
-    remote = resolver.resolve_remote(name)
-    if remote:
-        resolver.learn(name,
\ No newline at end of file
+async def resolve(name: str = Query(..., min_length=1)):
+    return await resolver.resolve(name)
+
+@app.post("/bulk_resolve")
+async def bulk_resolve(req: BulkRequest):
+    return {"results": await resolver.resolve_many(req.names)}
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from scripts.feature_join import Source, join_sources
+
+
+def _write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_blank_key_in_source_still_joins_int_keys(tmp_path):
+    # match_id com célula vazia chega como float64 (1.0, 2.0, NaN): precisa casar com a base inteira
+    base = _write(tmp_path / "base.csv", "match_id,team_home\n1,A\n2,B\n3,C\n")
+    feat = _write(tmp_path / "feat.csv", "match_id,x\n1,10\n2,20\n,30\n")
+    wide = join_sources([Source(base, required=True), Source(feat)])
+    assert wide["match_id"].tolist() == [1, 2, 3]
+    assert wide["x"].tolist()[:2] == [10, 20]
+    assert np.isnan(wide["x"].iloc[2])
+
+
+def test_blank_key_in_base_keeps_row(tmp_path):
+    base = _write(tmp_path / "base.csv", "match_id,team_home\n1,A\n,B\n3,C\n")
+    feat = _write(tmp_path / "feat.csv", "match_id,x\n3,30\n1,10\n")
+    wide = join_sources([Source(base, required=True), Source(feat)])
+    assert len(wide) == 3
+    assert wide["x"].tolist()[0] == 10 and wide["x"].tolist()[2] == 30
+    assert np.isnan(wide["x"].iloc[1])
+
+
+def test_text_and_integer_keys_mixed(tmp_path):
+    base = _write(tmp_path / "base.csv", "match_id,team_home\n1,A\nx2,B\n")
+    feat = _write(tmp_path / "feat.csv", "match_id,x\n1,10\n,99\n")
+    wide = join_sources([Source(base, required=True), Source(feat)])
+    assert wide["x"].iloc[0] == 10
+    assert pd.isna(wide["x"].iloc[1])
@@ -0,0 +1,52 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from scripts.features_univariado import compute_features
+
+
+def _reference_row(odd_h, odd_d, odd_a):
+    """Cálculo por linha (antigo compute_from_odds_row): referência da versão colunar."""
+    def implied(odd):
+        return 0.0 if odd <= 0 else 1.0 / odd  # NaN -> NaN
+
+    def logit(p):
+        p = max(1e-9, min(1.0 - 1e-9, p))
+        return math.log(p / (1.0 - p))
+
+    imp = [implied(o) for o in (odd_h, odd_d, odd_a)]
+    s = sum(imp)
+    if not s > 0:
+        return None
+    fair = [v / s for v in imp]
+    order = sorted(range(3), key=lambda i: fair[i], reverse=True)
+    return {
+        "imp_home": imp[0], "imp_draw": imp[1], "imp_away": imp[2], "overround": s,
+        "fair_p_home": fair[0], "fair_p_draw": fair[1], "fair_p_away": fair[2],
+        "gap_home_away": fair[0] - fair[2],
+        "gap_top_second": fair[order[0]] - fair[order[1]],
+        "logit_imp_home": logit(fair[0]), "logit_imp_draw": logit(fair[1]), "logit_imp_away": logit(fair[2]),
+        "fav_label": {0: 1, 1: 0, 2: 2}[order[0]],
+        "entropy_bits": -sum(p * math.log2(p) for p in fair if p > 0),
+    }
+
+
+def test_columnar_features_match_row_reference():
+    rng = np.random.default_rng(0)
+    O = rng.uniform(1.05, 12.0, (500, 3))
+    m = rng.random(O.shape)
+    O[m < 0.03] = np.nan
+    O[(m >= 0.03) & (m < 0.06)] = 0.0
+    O[:4] = [[2.0, 3.0, 4.0], [0.0, 2.0, 0.0], [0.0, 0.0, 0.0], [2.5, 2.5, 2.5]]
+    df = pd.DataFrame({"match_key": [f"m{i}" for i in range(len(O))], "home": "A", "away": "B",
+                       "odd_home": O[:, 0], "odd_draw": O[:, 1], "odd_away": O[:, 2]})
+    out = compute_features(df)
+
+    for i, row in out.iterrows():
+        ref = _reference_row(*O[i])
+        if ref is None:
+            assert np.isnan(row["fair_p_home"]) and pd.isna(row["fav_label"])
+            continue
+        for c, v in ref.items():
+            assert math.isclose(row[c], v, rel_tol=1e-9, abs_tol=1e-12), (i, c, row[c], v)
@@ -0,0 +1,44 @@
+import numpy as np
+
+from scripts.postgame_update import calibrate_scalars, online_update
+
+
+def _stream(seed, rounds=300, n=14, k_true=(0.95, 1.12, 0.95)):
+    # mercado com empates subestimados: k_draw/k_home verdadeiro ≈ 1.18
+    rng = np.random.default_rng(seed)
+    P = rng.dirichlet([4.0, 2.5, 3.0], rounds * n)
+    Q = P * np.asarray(k_true)
+    Q /= Q.sum(axis=1, keepdims=True)
+    y = (rng.random(len(Q))[:, None] > np.cumsum(Q, axis=1)).sum(axis=1)
+    return P.reshape(rounds, n, 3), np.eye(3)[y].reshape(rounds, n, 3)
+
+
+def _ratio(k_home, k_draw):
+    return k_draw / k_home
+
+
+def test_online_k_approaches_batch_k():
+    P, Y = _stream(0)
+    kH, kD, _, _ = calibrate_scalars(P.reshape(-1, 3), Y.reshape(-1, 3))
+    target = _ratio(kH, kD)
+
+    calib = {"k_home": 1.0, "k_draw": 1.0, "k_away": 1.0}
+    path = []
+    for r, (p, y) in enumerate(zip(P, Y)):
+        calib, applied = online_update(calib, p, y, batch_id=f"r{r}")
+        assert applied
+        path.append(_ratio(calib["k_home"], calib["k_draw"]))
+    path = np.asarray(path)
+
+    assert abs(path[-1] - target) < 0.04
+    # depois da fase inicial não oscila entre os limites
+    assert np.abs(path[100:] - target).max() < 0.1
+    assert (np.asarray([calib["k_home"], calib["k_draw"], calib["k_away"]]) < 1.15).all()
+
+
+def test_online_update_skips_repeated_round():
+    P, Y = _stream(1, rounds=2)
+    calib, applied = online_update({"k_home": 1.0, "k_draw": 1.0, "k_away": 1.0}, P[0], Y[0], "r0")
+    again, applied2 = online_update(calib, P[0], Y[0], "r0")
+    assert applied and not applied2
+    assert again == calib
@@ -1,9 +1,11 @@
 # utils/apifootball.py
 from __future__ import annotations
-import os, requests, unicodedata, re
-from datetime import datetime, timedelta
+import os, unicodedata, re
 from typing import Any, Dict, List, Optional
 
+from scripts.afb_http import get_client
+from scripts.fixtures_index import FixturesIndex
+
 API_HOST = "api-football-v1.p.rapidapi.com"
 
 def _get_env(*names: str) -> str:
@@ -28,9 +30,7 @@ def _normalize(s: str) -> str:
 def _get(path: str, params: Dict[str, Any]) -> Any:
     if not API_KEY:
         raise ApiFootballError("RAPIDAPI_KEY/RAPID_API_KEY ausente no ambiente.")
-    url = f"https://{API_HOST}/v3{path}"
-    headers = {"X-RapidAPI-Key": API_KEY, "X-RapidAPI-Host": API_HOST}
-    r = requests.get(url, headers=headers, params=params, timeout=30)
+    r = get_client(API_KEY, API_HOST).request(path, params)
     if r.status_code == 429:
         raise ApiFootballError("RapidAPI rate limited (429).")
     r.raise_for_status()
@@ -62,18 +62,12 @@ def resolve_current_season(league_id: int) -> int:
             return int(s["year"])
     return int(seasons[-1]["year"])
 
+# páginas /fixtures?date=&league=&season= baixadas uma vez por execução
+_FIXTURES = FixturesIndex(lambda params: _get("/fixtures", params), norm=_normalize)
+
 def find_fixture_id(date_iso: str, home: str, away: str, league_id: int, season: int, window: int = 1) -> Optional[int]:
-    dt0 = datetime.fromisoformat(date_iso).date()
-    for delta in range(-abs(window), abs(window)+1):
-        d = (dt0 + timedelta(days=delta)).isoformat()
-        fixtures = _get("/fixtures", {"date": d, "league": league_id, "season": season})
-        hkey = _normalize(home); akey = _normalize(away)
-        for f in fixtures:
-            th = _normalize(f["teams"]["home"]["name"])
-            ta = _normalize(f["teams"]["away"]["name"])
-            if th == hkey and ta == akey:
-                return int(f["fixture"]["id"])
-    return None
+    hit = _FIXTURES.find(home, away, date_iso, window=window, exact=True, league=league_id, season=season)
+    return hit[0] if hit else None
 
 def fetch_odds_by_fixture(fixture_id: int) -> List[Dict[str, Any]]:
     return _get("/odds", {"fixture": fixture_id})
@@ -1,12 +1,21 @@
 import pandas as pd
 
-def build_features(matches, odds, table, weather, news):
+ODD_COLS = ["odd_home","odd_draw","odd_away"]
+
+def odds_1x2(odds):
+    """Linhas 1X2, uma por match_id."""
     o = odds[odds["market"]=="1X2"].copy()
-    o = o[["match_id","odd_home","odd_draw","odd_away"]].drop_duplicates("match_id")
-    df = matches.merge(o, on="match_id", how="left")
+    return o[["match_id"] + ODD_COLS].drop_duplicates("match_id")
+
+def build_features(matches, odds, table, weather, news):
+    df = matches.merge(odds_1x2(odds), on="match_id", how="left")
+    return features_from_joined(df)
 
+def features_from_joined(df):
+    """Features a partir de matches já unido às odds 1X2 (odd_home/odd_draw/odd_away)."""
+    df = df.copy()
     # Exemplos simples de X_*
-    for c in ["odd_home","odd_draw","odd_away"]:
+    for c in ODD_COLS:
         df[f"X_{c}"] = df[c].astype(float)
 
     # Probabilidade caseira por inverso das odds (simples, substitua depois)
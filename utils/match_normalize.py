@@ -3,6 +3,11 @@ from __future__ import annotations
 import unicodedata, re, difflib
 from typing import List, Dict
 
+try:
+    from scripts.team_resolver import get_resolver
+except ImportError:
+    from team_resolver import get_resolver
+
 ALIASES: Dict[str, List[str]] = {
     "america mineiro": ["america mg","america-mg","america futebol clube mg","america"],
     "chapecoense": ["chapecoense sc","associacao chapecoense de futebol","chapeco"],
@@ -17,24 +22,36 @@ ALIASES: Dict[str, List[str]] = {
     "atletico goianiense": ["atletico go","atletico goianiense go","dragao","acg"]
 }
 
+_REGISTERED = False
+
+def _resolver():
+    """Índice compartilhado (scripts/team_resolver.py) com os ALIASES deste módulo registrados."""
+    global _REGISTERED
+    res = get_resolver()
+    if not _REGISTERED:
+        res.extend({alt: can for can, alts in ALIASES.items() for alt in [can, *alts]})
+        _REGISTERED = True
+    return res
+
 def extend_aliases(extra: Dict[str, List[str]]) -> None:
     for k, vals in (extra or {}).items():
-        can = canonical(k)
+        can = _basic(k)
         ALIASES.setdefault(can, [])
         for v in vals or []:
-            vv = canonical(v)
+            vv = _basic(v)
             if vv != can and vv not in ALIASES[can]:
                 ALIASES[can].append(vv)
+        _resolver().extend({v: can for v in [can, *ALIASES[can]]})
 
-def canonical(name: str) -> str:
+def _basic(name: str) -> str:
     n = unicodedata.normalize("NFKD", name).encode("ascii","ignore").decode("ascii").lower()
     n = re.sub(r"[^a-z0-9 ]+"," ", n)
     n = re.sub(r"\b(ec|fc|afc|sc|ac|esporte clube|futebol clube)\b","", n)
-    n = " ".join(n.split())
-    for can, alts in ALIASES.items():
-        if n == can or n in alts:
-            return can
-    return n
+    return " ".join(n.split())
+
+def canonical(name: str) -> str:
+    """Chave canônica (minúscula, sem acentos) — a mesma em todos os estágios do pipeline."""
+    return _resolver().key(name)
 
 def fuzzy_match(target: str, candidates: List[str], threshold: float = 0.92) -> str | None:
     t = canonical(target)